@@ -0,0 +1,174 @@
+"""
+基准测试文档生成器
+
+按参数化的形状生成 .docx：段落数、标题比例、每段文本运行数、表格数与行数、
+合并单元格比例、嵌套表格、编号与项目符号列表、手工输入的编号段落、嵌入图片。文本颜色、字号
+等属性刻意不统一，让各个规则都有需要修复的内容。相同的形状和随机种子
+生成内容相同的文档。
+"""
+
+import random
+import struct
+import zlib
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from docx import Document
+from docx.shared import Cm, Pt, RGBColor
+from docx.table import _Cell
+
+COLORS = [RGBColor(0, 0, 0), RGBColor(255, 0, 0), RGBColor(0, 102, 204), RGBColor(34, 139, 34)]
+FONTS = ["宋体", "微软雅黑", "Arial", "Times New Roman"]
+WORDS = ["格式", "文档", "规范", "标题", "段落", "表格", "Word", "format", "rule", "2024"]
+
+
+class DocumentShape:
+    """文档形状参数"""
+
+    def __init__(self, paragraphs: int = 100, heading_ratio: float = 0.1, runs_per_paragraph: int = 3,
+                 tables: int = 2, table_rows: int = 5, table_cols: int = 4, merged_ratio: float = 0.1,
+                 nested_tables: int = 0, list_items: int = 10, manual_list_items: int = 5, images: int = 0,
+                 image_size: int = 64, horizontal_rules: int = 2, seed: int = 0):
+        self.paragraphs = paragraphs
+        self.heading_ratio = heading_ratio  # 段落中标题所占比例
+        self.runs_per_paragraph = runs_per_paragraph
+        self.tables = tables
+        self.table_rows = table_rows
+        self.table_cols = table_cols
+        self.merged_ratio = merged_ratio  # 与右侧单元格合并的单元格比例
+        self.nested_tables = nested_tables  # 嵌入在表格单元格中的表格数
+        self.list_items = list_items  # 编号列表和项目符号列表各自的项数
+        self.manual_list_items = manual_list_items  # 以 "1. "、"- " 开头的普通段落各自的数量
+        self.images = images
+        self.image_size = image_size  # 图片边长（像素）
+        self.horizontal_rules = horizontal_rules  # markdown 转换留下的横线段落数
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'DocumentShape':
+        return cls(**values)
+
+    def dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def scaled(self, factor: int) -> 'DocumentShape':
+        """段落、表格、列表和图片数量按比例放大的形状"""
+        values = self.dict()
+        for key in ('paragraphs', 'tables', 'nested_tables', 'list_items', 'manual_list_items', 'images',
+                    'horizontal_rules'):
+            values[key] = values[key] * factor
+        return DocumentShape(**values)
+
+
+# 基准测试使用的标准形状
+SHAPES: Dict[str, DocumentShape] = {
+    "small": DocumentShape(paragraphs=50, tables=1, list_items=5),
+    "medium": DocumentShape(paragraphs=500, tables=10, table_rows=10, nested_tables=2,
+                            list_items=30, images=2),
+    "large": DocumentShape(paragraphs=3000, tables=40, table_rows=20, nested_tables=5,
+                           list_items=100, images=5),
+    "tables": DocumentShape(paragraphs=50, tables=60, table_rows=30, table_cols=6, merged_ratio=0.3,
+                            nested_tables=10, list_items=0),
+    "media": DocumentShape(paragraphs=100, tables=2, images=20, image_size=512),
+}
+
+
+def make_png(width: int, height: int, rng: random.Random) -> bytes:
+    """生成内容随机（不可压缩）的 RGB PNG 图片"""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data)))
+
+    rows = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+def _text(rng: random.Random, words: int = 6) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _add_body_paragraph(document, shape: DocumentShape, rng: random.Random):
+    paragraph = document.add_paragraph()
+    for _ in range(shape.runs_per_paragraph):
+        run = paragraph.add_run(_text(rng) + " ")
+        run.font.color.rgb = rng.choice(COLORS)
+        run.font.name = rng.choice(FONTS)
+        run.font.size = Pt(rng.choice([9, 10.5, 12, 14]))
+        run.bold = rng.random() < 0.2
+
+
+def _row_cells(table, tr) -> list:
+    """直接按 w:tc 取出一行的单元格，避免 python-docx 每次重新计算整个表格的网格"""
+    return [_Cell(tc, table) for tc in tr.tc_lst]
+
+
+def _fill_table(table, shape: DocumentShape, rng: random.Random):
+    for tr in table._tbl.tr_lst:
+        for cell in _row_cells(table, tr):
+            run = cell.paragraphs[0].add_run(_text(rng, 3))
+            run.font.color.rgb = rng.choice(COLORS)
+
+    # 与右侧单元格合并；已合并的单元格跳过
+    for tr in table._tbl.tr_lst:
+        cells = _row_cells(table, tr)
+        column = 0
+        while column < len(cells) - 1:
+            if rng.random() < shape.merged_ratio:
+                cells[column].merge(cells[column + 1])
+                column += 2
+            else:
+                column += 1
+
+
+def generate_document(shape: DocumentShape, path: str, seed: Optional[int] = None):
+    """按形状生成文档并保存到 path"""
+    rng = random.Random(shape.seed if seed is None else seed)
+    document = Document()
+
+    # 标题与正文交错，横线、表格、列表和图片均匀分布在正文中
+    headings = int(shape.paragraphs * shape.heading_ratio)
+    heading_every = shape.paragraphs // headings if headings else 0
+    insert_points = {}
+    for kind, count in (("table", shape.tables), ("image", shape.images), ("rule", shape.horizontal_rules)):
+        for index in range(count):
+            position = (index + 1) * shape.paragraphs // (count + 1)
+            insert_points.setdefault(position, []).append(kind)
+
+    nested_remaining = shape.nested_tables
+    tables_remaining = shape.tables
+    for index in range(shape.paragraphs):
+        if heading_every and index % heading_every == 0:
+            document.add_heading(_text(rng, 3), level=rng.choice([1, 2, 3]))
+        else:
+            _add_body_paragraph(document, shape, rng)
+
+        for kind in insert_points.get(index, []):
+            if kind == "table":
+                table = document.add_table(rows=shape.table_rows, cols=shape.table_cols)
+                _fill_table(table, shape, rng)
+                # 把嵌套表格平均分配到各个表格
+                nested = -(-nested_remaining // tables_remaining) if tables_remaining else 0
+                for _ in range(nested):
+                    inner = _row_cells(table, table._tbl.tr_lst[0])[0].add_table(rows=2, cols=2)
+                    _fill_table(inner, DocumentShape(table_cols=2, merged_ratio=0), rng)
+                nested_remaining -= nested
+                tables_remaining -= 1
+            elif kind == "image":
+                image = make_png(shape.image_size, shape.image_size, rng)
+                document.add_picture(BytesIO(image), width=Cm(4))
+            else:
+                document.add_paragraph("---")
+
+    for style in ("List Number", "List Bullet"):
+        for _ in range(shape.list_items):
+            document.add_paragraph(_text(rng, 4), style=style)
+
+    # markdown 转换留下的手工编号和项目符号
+    for index in range(shape.manual_list_items):
+        document.add_paragraph(f"{index % 9 + 1}. {_text(rng, 4)}")
+        document.add_paragraph(f"- {_text(rng, 4)}")
+
+    document.save(path)
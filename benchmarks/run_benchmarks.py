@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试
+
+对 corpus.SHAPES 中的每种文档形状分别计时：
+- load：加载文档（RuleContext）
+- rule/<规则ID>：单独执行每个规则（不含加载和保存）
+- preset/<预设ID>：执行 config/presets.yaml 中每个预设的全部规则
+- save：执行全部启用规则后保存文档
+- diff：DiffService 准备对比、处理文档、生成对比的完整流程
+
+每项测量重复 --repeat 次，每次使用语料文档的新副本，记录中位数和最小值。
+结果写入 JSON，可以保存为基线；指定 --baseline 时与基线比较，
+中位数变慢超过 --tolerance 且超过 --min-delta 毫秒的项视为性能退化，退出码为 1。
+
+用法:
+    python benchmarks/run_benchmarks.py --shapes small medium --repeat 5
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "python-backend"))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+# 基准测试测量实际执行，不使用处理结果缓存
+os.environ["WORD_FORMAT_FIXER_CACHE_SIZE_MB"] = "0"
+
+import docx  # noqa: E402
+from corpus import SHAPES, DocumentShape, generate_document  # noqa: E402
+from core.config_loader import ConfigLoader  # noqa: E402
+from core.context import RuleContext  # noqa: E402
+from core.engine import RuleEngine  # noqa: E402
+
+RESULT_FORMAT = 1
+DEFAULT_CORPUS_DIR = BENCHMARKS_DIR / ".corpus"
+DEFAULT_OUTPUT = BENCHMARKS_DIR / "results" / "latest.json"
+
+
+def corpus_document(name: str, shape: DocumentShape, corpus_dir: Path) -> Path:
+    """返回形状对应的语料文档，按形状参数缓存，参数不变时不重新生成"""
+    digest = hashlib.sha1(json.dumps(shape.dict(), sort_keys=True).encode()).hexdigest()[:10]
+    path = corpus_dir / f"{name}-{digest}.docx"
+    if not path.exists():
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        generate_document(shape, str(temp_path))
+        os.replace(temp_path, path)
+    return path
+
+
+def preset_rules() -> Dict[str, List[Dict[str, Any]]]:
+    """config/presets.yaml 中每个预设启用的规则，转换为 execute 的 active_rules"""
+    loader = ConfigLoader()
+    return {
+        preset_id: [{"rule_id": rule_id, "params": params}
+                    for rule_id, params in loader.load_preset_config(preset_id).items()]
+        for preset_id in loader.get_all_presets()
+    }
+
+
+class BenchmarkRunner:
+    """对一个语料文档执行全部测量"""
+
+    def __init__(self, source: Path, repeat: int, work_dir: Path):
+        self.source = source
+        self.repeat = repeat
+        self.work_dir = work_dir
+        self.samples: Dict[str, List[float]] = {}
+
+    def fresh_copy(self) -> str:
+        """每次测量使用源文档的新副本，避免前一次处理的结果影响后一次"""
+        target = self.work_dir / self.source.name
+        shutil.copyfile(self.source, target)
+        return str(target)
+
+    def record(self, metric: str, milliseconds: float):
+        self.samples.setdefault(metric, []).append(milliseconds)
+
+    def measure(self, metric: str, action: Callable[[str], Any]):
+        """重复执行 action(文档副本) 并记录墙钟时间"""
+        for _ in range(self.repeat):
+            path = self.fresh_copy()
+            start = time.perf_counter()
+            action(path)
+            self.record(metric, (time.perf_counter() - start) * 1000)
+
+    def run(self, presets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[float]]:
+        self.measure("load", RuleContext)
+
+        # 每次执行使用新的引擎，避免前一次请求中的参数残留在规则配置中
+        rule_ids = sorted(RuleEngine().rules)
+        for _ in range(self.repeat):
+            for rule_id in rule_ids:
+                # 规则耗时包括遍历文档和应用补丁，不含加载和保存
+                path = self.fresh_copy()
+                start = time.perf_counter()
+                result = RuleEngine().execute(path, [{"rule_id": rule_id}], instrumentation=True)
+                total = (time.perf_counter() - start) * 1000
+                stages = result["instrumentation"]
+                self.record(f"rule/{rule_id}",
+                            total - stages["load"]["wall_time_ms"] - stages["save"]["wall_time_ms"])
+
+            result = RuleEngine().execute(self.fresh_copy(), instrumentation=True)
+            self.record("save", result["instrumentation"]["save"]["wall_time_ms"])
+
+        for preset_id, active_rules in presets.items():
+            self.measure(f"preset/{preset_id}", lambda path: RuleEngine().execute(path, active_rules))
+
+        self.measure("diff", self.diff_end_to_end)
+        self.measure("process_with_diff", self.process_with_diff)
+        return self.samples
+
+    @staticmethod
+    def diff_end_to_end(path: str):
+        from services.diff_service import DiffService
+
+        service = DiffService()
+        session = service.prepare_diff(path)["session"]
+        RuleEngine().execute(path)
+        result = service.generate_diff(path, session=session)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+
+    @staticmethod
+    def process_with_diff(path: str):
+        from services.application_service import DocumentProcessingService
+        from services.diff_service import DiffService
+
+        service = DocumentProcessingService()
+        # 每次都实际执行规则，与 diff 的耗时可比
+        service.result_cache = None
+        result = service.process_with_diff(path, DiffService())
+        if result["diff"]["status"] != "success":
+            raise RuntimeError(result["diff"]["message"])
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, Any]]:
+    return {
+        metric: {
+            "median_ms": round(statistics.median(values), 3),
+            "min_ms": round(min(values), 3),
+            "samples": [round(value, 3) for value in values],
+        }
+        for metric, values in samples.items()
+    }
+
+
+def run_benchmarks(shape_names: List[str], repeat: int, corpus_dir: Path) -> Dict[str, Any]:
+    """运行基准测试，返回可序列化的结果"""
+    presets = preset_rules()
+    metrics: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="wff_bench_") as work_dir:
+        for name in shape_names:
+            source = corpus_document(name, SHAPES[name], corpus_dir)
+            print(f"[{name}] {source.name} ({source.stat().st_size // 1024} KB)", file=sys.stderr)
+            samples = BenchmarkRunner(source, repeat, Path(work_dir)).run(presets)
+            for metric, summary in summarize(samples).items():
+                metrics[f"{name}/{metric}"] = summary
+
+    return {
+        "format": RESULT_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "python_docx": getattr(docx, "__version__", "unknown"),
+        },
+        "repeat": repeat,
+        "shapes": {name: SHAPES[name].dict() for name in shape_names},
+        "metrics": metrics,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+                    min_delta_ms: float = 2.0) -> List[Dict[str, Any]]:
+    """
+    与基线比较中位数
+    :param tolerance: 允许变慢的比例，0.25 表示慢 25% 以内不算退化
+    :param min_delta_ms: 绝对差值小于该值时忽略，避免极短的测量因噪声误报
+    :return: 退化的测量项，按变慢比例从大到小排列
+    """
+    regressions = []
+    for metric, summary in current["metrics"].items():
+        reference = baseline.get("metrics", {}).get(metric)
+        if reference is None:
+            continue
+        before, after = reference["median_ms"], summary["median_ms"]
+        if after - before > min_delta_ms and after > before * (1 + tolerance):
+            regressions.append({
+                "metric": metric,
+                "baseline_ms": before,
+                "current_ms": after,
+                "ratio": round(after / before, 3) if before else None,
+            })
+    return sorted(regressions, key=lambda item: item["ratio"] or float("inf"), reverse=True)
+
+
+def print_summary(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    reference = (baseline or {}).get("metrics", {})
+    print(f"{'测量项':<48}{'中位数(ms)':>14}{'基线(ms)':>14}")
+    for metric, summary in result["metrics"].items():
+        before = reference.get(metric, {}).get("median_ms")
+        before_text = f"{before:.3f}" if before is not None else "-"
+        print(f"{metric:<48}{summary['median_ms']:>14.3f}{before_text:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行Word Format Fixer端到端基准测试")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES),
+                        help="要测试的文档形状")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的重复次数")
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR, help="语料文档缓存目录")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="结果 JSON 文件")
+    parser.add_argument("--baseline", type=Path, help="与该基线比较，出现退化时退出码为 1")
+    parser.add_argument("--save-baseline", type=Path, help="把本次结果另存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许变慢的比例")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="忽略小于该毫秒数的差值")
+
+    args = parser.parse_args()
+
+    result = run_benchmarks(args.shapes, args.repeat, args.corpus_dir)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print_summary(result, baseline)
+    if baseline is None:
+        return 0
+
+    regressions = compare_results(result, baseline, args.tolerance, args.min_delta)
+    for item in regressions:
+        print(f"性能退化: {item['metric']} {item['baseline_ms']:.3f}ms -> {item['current_ms']:.3f}ms "
+              f"(x{item['ratio']})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1199,24 +1199,36 @@ function generateParamControl(ruleId, paramName, paramValue) {
     return controlHtml;
 }
 
-// 显示进度条
+// 后端进度事件监听（只注册一次）
+let progressListenerRegistered = false;
+
+function registerProgressListener() {
+    if (progressListenerRegistered || !window.electronAPI.onBackendEvent) {
+        return;
+    }
+    progressListenerRegistered = true;
+    window.electronAPI.onBackendEvent((message) => {
+        if (message.event !== 'progress' || !message.data) {
+            return;
+        }
+        const progressFill = document.querySelector('.progress-fill');
+        if (progressFill && typeof message.data.percent === 'number') {
+            progressFill.style.width = message.data.percent + '%';
+        }
+        if (message.data.rule_id) {
+            logDev(`进度 ${message.data.percent}%: ${message.data.rule_id} (${message.data.rule_index}/${message.data.rule_total})`);
+        }
+    });
+}
+
+// 显示进度条，进度由后端 progress 事件驱动
 function showProgressBar() {
     const progressBar = document.querySelector('.progress-bar');
     const progressFill = document.querySelector('.progress-fill');
+    registerProgressListener();
     if (progressBar) {
         progressBar.style.display = 'block';
         progressFill.style.width = '0%';
-
-        // 模拟进度
-        let progress = 0;
-        const interval = setInterval(() => {
-            progress += 10;
-            if (progress <= 90) {
-                progressFill.style.width = progress + '%';
-            } else {
-                clearInterval(interval);
-            }
-        }, 200);
     }
 }
 
@@ -1517,13 +1529,18 @@ window.onclick = function (event) {
 
 // ==================== Diff/对比视图功能 ====================
 
-let diffViewMode = 'split'; // 'split' 或 'unified'
+let diffViewMode = 'unified'; // 'split' 或 'unified'
+
+// 当前对比的分页状态：差异块按页从后端读取，滚动到底部时追加下一页
+const DIFF_PAGE_SIZE = 100;
+let diffState = null;
 
 /**
  * 打开对比视图模态框
- * @param {Object} diffData - 对比数据
+ * @param {Object} diffData - generate-diff 返回的统计和分页信息
+ * @param {string} documentPath - 修改后的文档路径，分栏视图按需加载预览时使用
  */
-function openDiffModal(diffData) {
+function openDiffModal(diffData, documentPath) {
     const modal = document.getElementById('diffModal');
     const originalContent = document.getElementById('originalContent');
     const modifiedContent = document.getElementById('modifiedContent');
@@ -1531,31 +1548,94 @@ function openDiffModal(diffData) {
     const addCount = document.getElementById('addCount');
     const delCount = document.getElementById('delCount');
 
-    // 填充内容
-    originalContent.innerHTML = diffData.original_html || '<p>无内容</p>';
-    modifiedContent.innerHTML = diffData.modified_html || '<p>无内容</p>';
-    diffUnified.innerHTML = diffData.diff_html || '';
+    diffState = {
+        session: diffData.session,
+        documentPath,
+        nextPage: 0,
+        pageCount: diffData.page_count || 1,
+        loading: false,
+        splitLoaded: false
+    };
+
+    // 分栏视图的完整预览在切换到分栏视图时才加载
+    originalContent.innerHTML = '<p>加载中...</p>';
+    modifiedContent.innerHTML = '<p>加载中...</p>';
+    diffUnified.innerHTML = '<table class="diff-hunks"><thead><tr><th>位置</th><th>类型</th><th>内容</th>' +
+        '<th>格式</th></tr></thead><tbody id="diffHunkRows"></tbody></table>';
 
     // 更新统计
     if (diffData.stats) {
-        addCount.textContent = diffData.stats.additions || 0;
-        delCount.textContent = diffData.stats.deletions || 0;
+        addCount.textContent = (diffData.stats.additions || 0) + (diffData.stats.text_changes || 0);
+        delCount.textContent = (diffData.stats.deletions || 0) + (diffData.stats.text_changes || 0);
     }
 
     // 显示模态框
     modal.style.display = 'flex';
-    diffViewMode = 'split';
+    diffViewMode = 'unified';
     updateDiffViewMode();
+    loadNextDiffPage();
 
     logDev('打开对比视图');
 }
 
+/**
+ * 读取下一页差异块并追加到统一视图
+ */
+async function loadNextDiffPage() {
+    const state = diffState;
+    if (!state || state.loading || state.nextPage >= state.pageCount) {
+        return;
+    }
+    state.loading = true;
+    try {
+        const page = await window.electronAPI.getDiffPage(state.session, state.nextPage, DIFF_PAGE_SIZE);
+        if (state !== diffState) {
+            return;
+        }
+        if (page.status !== 'success') {
+            logDev(`读取对比结果失败: ${page.message}`);
+            state.pageCount = state.nextPage;
+            return;
+        }
+        document.getElementById('diffHunkRows').insertAdjacentHTML('beforeend', page.html || '');
+        state.pageCount = page.page_count;
+        state.nextPage += 1;
+    } catch (error) {
+        logDev(`读取对比结果失败: ${error.message}`);
+    } finally {
+        state.loading = false;
+    }
+}
+
+/**
+ * 加载分栏视图的两个版本预览
+ */
+async function loadSplitDiff() {
+    const state = diffState;
+    if (!state || state.splitLoaded) {
+        return;
+    }
+    state.splitLoaded = true;
+    try {
+        const result = await window.electronAPI.generateDiff(state.documentPath, state.session, true);
+        if (state !== diffState) {
+            return;
+        }
+        document.getElementById('originalContent').innerHTML = result.original_html || '<p>无内容</p>';
+        document.getElementById('modifiedContent').innerHTML = result.modified_html || '<p>无内容</p>';
+    } catch (error) {
+        state.splitLoaded = false;
+        logDev(`加载分栏对比失败: ${error.message}`);
+    }
+}
+
 /**
  * 关闭对比视图模态框
  */
 function closeDiffModal() {
     const modal = document.getElementById('diffModal');
     modal.style.display = 'none';
+    diffState = null;
 }
 
 /**
@@ -1578,6 +1658,7 @@ function updateDiffViewMode() {
         diffContainer.style.display = 'flex';
         diffUnified.style.display = 'none';
         toggleBtn.textContent = '切换到统一视图';
+        loadSplitDiff();
     } else {
         diffContainer.style.display = 'none';
         diffUnified.style.display = 'block';
@@ -1591,6 +1672,15 @@ document.addEventListener('DOMContentLoaded', function() {
     if (toggleBtn) {
         toggleBtn.addEventListener('click', toggleDiffViewMode);
     }
+    // 统一视图滚动到接近底部时加载下一页
+    const diffUnified = document.getElementById('diffUnified');
+    if (diffUnified) {
+        diffUnified.addEventListener('scroll', function() {
+            if (diffUnified.scrollTop + diffUnified.clientHeight >= diffUnified.scrollHeight - 200) {
+                loadNextDiffPage();
+            }
+        });
+    }
 });
 
 /**
@@ -1615,25 +1705,19 @@ async function processFileWithDiff() {
         return;
     }
 
-    updateStatus('正在准备对比...', 'processing');
+    updateStatus('正在处理文档...', 'processing');
     showProgressBar();
     logDev(`开始处理文档(带对比): ${targetFile}`);
 
     try {
-        // 1. 准备对比：缓存原始文档
-        const prepareResult = await window.electronAPI.prepareDiff(targetFile);
-        if (prepareResult.status !== 'success') {
-            logDev(`准备对比失败: ${prepareResult.message}`);
-        }
-
-        // 2. 处理文档
-        updateStatus('正在处理文档...', 'processing');
-        const result = await window.electronAPI.processDocument(targetFile, enabledRules);
+        // 一次调用完成处理和对比，原始文档只读取一次
+        const result = await window.electronAPI.processWithDiff(targetFile, enabledRules);
+        const diffResult = result.diff || {};
+        delete result.diff;
         logDev(`处理结果: ${JSON.stringify(result)}`);
-
-        // 3. 生成对比
-        updateStatus('正在生成对比...', 'processing');
-        const diffResult = await window.electronAPI.generateDiff(targetFile);
+        if (diffResult.status !== 'success') {
+            logDev(`生成对比失败: ${diffResult.message || '文档未保存'}`);
+        }
 
         hideProgressBar();
 
@@ -1645,9 +1729,9 @@ async function processFileWithDiff() {
 
         displayResult(result);
 
-        // 4. 如果对比生成成功，显示对比视图
+        // 对比生成成功且有变更时显示对比视图
         if (diffResult.status === 'success' && diffResult.stats && diffResult.stats.total_changes > 0) {
-            openDiffModal(diffResult);
+            openDiffModal(diffResult, targetFile);
         } else {
             logDev('无变更或对比生成失败，不显示对比视图');
         }
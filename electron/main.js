@@ -143,6 +143,14 @@ class PythonProcessManager {
                 return;
             }
 
+            // 中间事件（如批量处理的单个文件结果）转发给渲染进程，不结束请求
+            if (response.event) {
+                if (mainWindow) {
+                    mainWindow.webContents.send('backend-event', response);
+                }
+                return;
+            }
+
             // 处理请求响应
             const { id, success, result, error } = response;
             if (id && this.pendingRequests.has(id)) {
@@ -446,6 +454,44 @@ ipcMain.handle('process-document', async (event, documentPath, activeRules) => {
     }
 });
 
+ipcMain.handle('process-batch', async (event, files, outputDir, activeRules, workers) => {
+    try {
+        return await callPythonCLI('process-batch', {
+            files: files,
+            output_dir: outputDir,
+            active_rules: activeRules,
+            workers: workers
+        });
+    } catch (error) {
+        console.error('Error processing batch:', error);
+        throw error;
+    }
+});
+
+ipcMain.handle('check-document', async (event, documentPath, activeRules) => {
+    try {
+        return await callPythonCLI('check-document', {
+            file_path: documentPath,
+            active_rules: activeRules
+        });
+    } catch (error) {
+        console.error('Error checking document:', error);
+        throw error;
+    }
+});
+
+// 取消执行中的请求，requestId 取自 backend-event 消息的 id
+ipcMain.handle('cancel-request', async (event, requestId) => {
+    try {
+        return await callPythonCLI('cancel', {
+            target_id: requestId
+        });
+    } catch (error) {
+        console.error('Error cancelling request:', error);
+        throw error;
+    }
+});
+
 ipcMain.handle('get-rules', async () => {
     try {
         return await callPythonCLI('get-rules', {});
@@ -629,20 +675,55 @@ ipcMain.handle('prepare-diff', async (event, documentPath) => {
     }
 });
 
+// 处理文档并对比：一次调用完成准备对比、处理和生成对比
+ipcMain.handle('process-with-diff', async (event, documentPath, activeRules) => {
+    try {
+        return await callPythonCLI('process-with-diff', {
+            file_path: documentPath,
+            active_rules: activeRules
+        });
+    } catch (error) {
+        console.error('Error processing document with diff:', error);
+        throw error;
+    }
+});
+
 // 生成对比：对比修改后的文档
-ipcMain.handle('generate-diff', async (event, documentPath) => {
+ipcMain.handle('generate-diff', async (event, documentPath, session, includeHtml) => {
     try {
-        return await callPythonCLI('generate-diff', { file_path: documentPath });
+        // 默认只返回统计和第一页差异块，分栏视图需要两个版本的完整预览时才请求 HTML
+        return await callPythonCLI('generate-diff', { file_path: documentPath, session, include_html: !!includeHtml });
     } catch (error) {
         console.error('Error generating diff:', error);
         throw error;
     }
 });
 
+// 按页读取对比结果（含渲染好的表格行）
+ipcMain.handle('get-diff-page', async (event, session, page, pageSize) => {
+    try {
+        return await callPythonCLI('get-diff-page', { session, page, page_size: pageSize, include_html: true });
+    } catch (error) {
+        console.error('Error getting diff page:', error);
+        throw error;
+    }
+});
+
+// 按修改后文档的块区间读取对比结果
+ipcMain.handle('get-diff-range', async (event, session, start, end) => {
+    try {
+        return await callPythonCLI('get-diff-range', { session, start, end, include_html: true });
+    } catch (error) {
+        console.error('Error getting diff range:', error);
+        throw error;
+    }
+});
+
 // 获取文档HTML预览
-ipcMain.handle('get-preview', async (event, documentPath) => {
+// firstBlocks 指定时，首屏内容先以 backend-event（event 为 preview）发送
+ipcMain.handle('get-preview', async (event, documentPath, firstBlocks) => {
     try {
-        return await callPythonCLI('get-preview', { file_path: documentPath });
+        return await callPythonCLI('get-preview', { file_path: documentPath, first_blocks: firstBlocks });
     } catch (error) {
         console.error('Error getting preview:', error);
         throw error;
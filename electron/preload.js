@@ -3,6 +3,10 @@ const { contextBridge, ipcRenderer } = require('electron');
 // 向渲染进程暴露IPC方法
 contextBridge.exposeInMainWorld('electronAPI', {
     processDocument: (documentPath, activeRules) => ipcRenderer.invoke('process-document', documentPath, activeRules),
+    checkDocument: (documentPath, activeRules) => ipcRenderer.invoke('check-document', documentPath, activeRules),
+    processBatch: (files, outputDir, activeRules, workers) => ipcRenderer.invoke('process-batch', files, outputDir, activeRules, workers),
+    onBackendEvent: (callback) => ipcRenderer.on('backend-event', (event, message) => callback(message)),
+    cancelRequest: (requestId) => ipcRenderer.invoke('cancel-request', requestId),
     getRules: () => ipcRenderer.invoke('get-rules'),
     getPresets: () => ipcRenderer.invoke('get-presets'),
     configureRules: (configs) => ipcRenderer.invoke('configure-rules', configs),
@@ -15,8 +19,11 @@ contextBridge.exposeInMainWorld('electronAPI', {
     scanFolder: (folderPath) => ipcRenderer.invoke('scan-folder', folderPath),
     // Diff/对比功能
     prepareDiff: (documentPath) => ipcRenderer.invoke('prepare-diff', documentPath),
-    generateDiff: (documentPath) => ipcRenderer.invoke('generate-diff', documentPath),
-    getPreview: (documentPath) => ipcRenderer.invoke('get-preview', documentPath),
+    processWithDiff: (documentPath, activeRules) => ipcRenderer.invoke('process-with-diff', documentPath, activeRules),
+    generateDiff: (documentPath, session, includeHtml) => ipcRenderer.invoke('generate-diff', documentPath, session, includeHtml),
+    getDiffPage: (session, page, pageSize) => ipcRenderer.invoke('get-diff-page', session, page, pageSize),
+    getDiffRange: (session, start, end) => ipcRenderer.invoke('get-diff-range', session, start, end),
+    getPreview: (documentPath, firstBlocks) => ipcRenderer.invoke('get-preview', documentPath, firstBlocks),
     // 自动更新功能
     checkForUpdates: () => ipcRenderer.invoke('check-for-updates'),
     quitAndInstall: () => ipcRenderer.invoke('quit-and-install'),
@@ -6,25 +6,63 @@ Word Format Fixer 命令行工具
 
 import sys
 import json
-from typing import Dict, Any, List
+import importlib
+import threading
+from typing import Dict, Any, List, Callable, Optional, TextIO
 import os
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# 导入服务层
-from services import (
-    DocumentProcessingService,
-    ConfigManagementService,
-    RuleManagementService,
-    DiffService
-)
+from core.progress import ProgressReporter
+from core.cancellation import CancellationToken, ExecutionCancelled
 
-# 全局服务实例
-doc_service = DocumentProcessingService()
-config_service = ConfigManagementService()
-rule_service = RuleManagementService()
-diff_service = DiffService()
+# 进度事件的最小输出间隔（秒）
+PROGRESS_INTERVAL = 0.2
+
+# 交互模式下直接应答、不进入执行队列的只读命令
+IMMEDIATE_COMMANDS = frozenset(["get-version", "get-presets", "get-rules", "get-diff-page", "get-diff-range"])
+
+# 交互模式下同时执行的耗时命令数：处理和检查文档都持有共享规则引擎的锁，
+# 规则实例在执行中也保存状态，多个工作线程并不能同时处理文档，只执行一个
+HEAVY_WORKERS = 1
+
+# 单命令模式下不转发给后台进程的命令：读取版本无需转发；
+# 单命令模式的规则配置只对本次调用有效，不能修改后台进程中共享的规则配置
+LOCAL_COMMANDS = frozenset(["get-version", "configure-rules"])
+
+# 后台进程启动时预先导入的模块，第一个命令不必等待导入
+WARM_MODULES = ("core.context", "core.check", "core.streaming", "core.document_diff", "mammoth")
+
+# 全局服务实例在第一次使用时创建，每个命令只导入它需要的依赖：
+# 文档处理才加载 python-docx 和规则，文档对比和预览才加载 mammoth
+_SERVICE_CLASSES = {
+    "doc_service": ("services.application_service", "DocumentProcessingService"),
+    "config_service": ("services.application_service", "ConfigManagementService"),
+    "rule_service": ("services.application_service", "RuleManagementService"),
+    "diff_service": ("services.diff_service", "DiffService"),
+}
+_service_lock = threading.Lock()
+
+
+def get_service(name: str):
+    """获取全局服务实例，不存在时创建"""
+    service = globals().get(name)
+    if service is None:
+        with _service_lock:
+            service = globals().get(name)
+            if service is None:
+                module_path, class_name = _SERVICE_CLASSES[name]
+                service = getattr(importlib.import_module(module_path), class_name)()
+                globals()[name] = service
+    return service
+
+
+def __getattr__(name):
+    # 兼容以模块属性访问服务实例（如 cli.doc_service）
+    if name in _SERVICE_CLASSES:
+        return get_service(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_version() -> str:
@@ -47,17 +85,23 @@ def get_version() -> str:
     return "1.0.0"
 
 
-def process_command(command: str, data: Dict[str, Any]) -> Dict[str, Any]:
+def process_command(command: str, data: Dict[str, Any],
+                    emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                    cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
     """
     处理命令并返回结果
     
     Args:
         command: 命令名称
         data: 命令参数
+        emit: 发送中间事件的回调 emit(event, payload)，仅交互模式提供
+        cancel_token: 取消标记，仅交互模式提供
         
     Returns:
         处理结果，JSON格式
     """
+    # 长时间运行的命令通过 progress 事件报告进度，输出经过节流
+    progress = ProgressReporter(lambda payload: emit("progress", payload), PROGRESS_INTERVAL) if emit else None
     try:
         if command == "get-version":
             # 获取版本号
@@ -65,37 +109,86 @@ def process_command(command: str, data: Dict[str, Any]) -> Dict[str, Any]:
         
         elif command == "get-presets":
             # 获取所有预设
-            return config_service.get_all_presets()
+            return get_service("config_service").get_all_presets()
         
         elif command == "get-rules":
             # 获取所有规则
-            return rule_service.get_all_rules()
+            return get_service("rule_service").get_all_rules()
         
         elif command == "save-preset":
             # 保存预设
             preset_id = data.get('preset_id')
             preset_data = data.get('preset_data')
-            return config_service.save_preset(preset_id, preset_data)
+            return get_service("config_service").save_preset(preset_id, preset_data)
         
         elif command == "delete-preset":
             # 删除预设
             preset_id = data.get('preset_id')
-            return config_service.delete_preset(preset_id)
+            return get_service("config_service").delete_preset(preset_id)
         
         elif command == "process-document":
             # 处理文档
             file_path = data.get('file_path')
             active_rules = data.get('active_rules', [])
-            result = doc_service.process_document(file_path, active_rules)
+            result = get_service("doc_service").process_document(
+                file_path, active_rules, progress, cancel_token,
+                instrumentation=bool(data.get('instrumentation')),
+                trace_memory=bool(data.get('trace_memory')))
             
             # 构建响应
-            return {
+            response = {
                 "status": result.get("status", "success"),
                 "summary": result.get("summary", {}),
                 "results": result.get("results", []),
                 "save_success": result.get("save_success", False),
-                "saved_to": result.get("saved_to", file_path)
+                "saved_to": result.get("saved_to", file_path),
+                "cached": result.get("cached", False)
             }
+            if "instrumentation" in result:
+                response["instrumentation"] = result["instrumentation"]
+            return response
+        
+        elif command == "process-with-diff":
+            # 处理文档并对比修改前后的版本，返回处理结果和对比结果（diff 字段）
+            file_path = data.get('file_path')
+            result = get_service("doc_service").process_with_diff(
+                file_path, get_service("diff_service"), data.get('active_rules', []),
+                progress, cancel_token, data.get('page_size'))
+            result.setdefault("cached", False)
+            return result
+        
+        elif command == "process-batch":
+            # 批量处理文档，每完成一个文档发送一次 file-result 事件
+            inputs = data.get('files') or data.get('pattern') or []
+            on_result = (lambda item: emit("file-result", item)) if emit else None
+            return get_service("doc_service").process_batch(
+                inputs,
+                output_dir=data.get('output_dir'),
+                active_rules=data.get('active_rules', []),
+                workers=data.get('workers'),
+                on_result=on_result,
+                progress=progress,
+                cancel_token=cancel_token
+            )
+        
+        elif command == "check-document":
+            # 检查文档是否符合规则，不修改文档；传入 files 或 pattern 时批量检查
+            # 未指定 active_rules 时检查全部启用的规则
+            active_rules = data.get('active_rules') or None
+            inputs = data.get('files') or data.get('pattern')
+            doc_service = get_service("doc_service")
+            if inputs:
+                on_result = (lambda item: emit("file-result", item)) if emit else None
+                return doc_service.check_batch(inputs, active_rules, on_result, progress, cancel_token)
+            return doc_service.check_document(data.get('file_path'), active_rules, progress, cancel_token)
+        
+        elif command == "cache-info":
+            # 查看结果缓存
+            return get_service("doc_service").cache_info()
+        
+        elif command == "cache-purge":
+            # 清空结果缓存
+            return get_service("doc_service").purge_cache()
         
         elif command == "configure-rules":
             # 配置规则参数
@@ -104,99 +197,275 @@ def process_command(command: str, data: Dict[str, Any]) -> Dict[str, Any]:
             for config in configs:
                 rule_id = config.get('rule_id')
                 params = config.get('params', {})
-                result = rule_service.update_rule_config(rule_id, params)
+                result = get_service("rule_service").update_rule_config(rule_id, params)
                 results.append(result)
             return {"status": "success", "results": results}
         
         elif command == "prepare-diff":
-            # 准备对比：缓存原始文档
+            # 准备对比：缓存原始文档，返回会话令牌
             file_path = data.get('file_path')
-            return diff_service.prepare_diff(file_path)
+            return get_service("diff_service").prepare_diff(file_path, progress)
         
         elif command == "generate-diff":
-            # 生成对比：对比修改后的文档
+            # 生成对比：对比修改后的文档与会话中的原始文档
             file_path = data.get('file_path')
-            return diff_service.generate_diff(file_path)
+            session = data.get('session')
+            include_html = data.get('include_html', False)
+            page_size = data.get('page_size')
+            return get_service("diff_service").generate_diff(file_path, progress, session, include_html, page_size)
+        
+        elif command == "get-diff-page":
+            # 按页读取对比结果
+            return get_service("diff_service").get_diff_page(
+                data.get('session'), data.get('page', 0), data.get('page_size'),
+                data.get('include_html', False))
+        
+        elif command == "get-diff-range":
+            # 按修改后文档的块区间读取对比结果
+            return get_service("diff_service").get_diff_range(
+                data.get('session'), data.get('start', 0), data.get('end', 0), data.get('include_html', False))
         
         elif command == "get-preview":
-            # 获取文档HTML预览
+            # 获取文档HTML预览；交互模式下指定 first_blocks 时先以 preview 事件发送首屏内容
             file_path = data.get('file_path')
-            return diff_service.get_document_preview(file_path)
+            on_partial = (lambda payload: emit("preview", payload)) if emit else None
+            return get_service("diff_service").get_document_preview(file_path, data.get('first_blocks'), on_partial)
         
         else:
             return {"error": f"Unknown command: {command}"}
             
+    except ExecutionCancelled as e:
+        return {"error": str(e), "cancelled": True}
     except Exception as e:
         return {"error": str(e)}
+    finally:
+        if progress is not None:
+            progress.flush()
+
+
+class InteractiveDispatcher:
+    """
+    交互模式的请求分发器
+
+    持续读取请求：只读的元数据命令立即应答，其余命令交给工作线程依次执行，
+    结果按完成顺序输出，前端通过 id 对应请求。执行中和排队中的请求可以用
+    cancel 命令取消，引擎在规则之间检查取消标记。
+
+    分发器只保证耗时命令执行期间元数据命令和取消仍能及时应答，
+    耗时命令之间并不并发执行（见 HEAVY_WORKERS）。
+    """
+
+    def __init__(self, output: Optional[TextIO] = None, max_workers: int = HEAVY_WORKERS):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.output = output or sys.stdout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # 执行中（含排队）的请求：id -> 取消标记
+        self.jobs: Dict[Any, CancellationToken] = {}
+        self._tasks = set()
+        # 工作线程的进度事件和主循环的响应共用标准输出，逐行加锁写入
+        self._write_lock = threading.Lock()
+
+    def write_message(self, message: Dict[str, Any]):
+        """输出一行 JSON"""
+        line = json.dumps(message)
+        with self._write_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def respond(self, req_id, result: Dict[str, Any]):
+        """输出请求的最终结果"""
+        self.write_message({
+            "id": req_id,
+            "success": "error" not in result,
+            "result": result
+        })
+
+    def cancel(self, req_id, data: Dict[str, Any]):
+        """处理 cancel 命令：data.target_id 为要取消的请求 id"""
+        target_id = data.get('target_id')
+        token = self.jobs.get(target_id)
+        if token is None:
+            self.respond(req_id, {"error": f"No running request: {target_id}"})
+            return
+        token.cancel()
+        self.respond(req_id, {"status": "cancelling", "target_id": target_id})
+
+    def run_job(self, req_id, command: str, data: Dict[str, Any], token: CancellationToken):
+        """在工作线程中执行耗时命令"""
+        # 中间事件与最终结果使用相同的 id，并带有 event 字段
+        def emit(event, payload):
+            self.write_message({"id": req_id, "event": event, "data": payload})
+
+        try:
+            if token.cancelled:
+                # 排队期间已被取消
+                result = {"error": "任务已取消", "cancelled": True}
+            else:
+                result = process_command(command, data, emit, token)
+            self.respond(req_id, result)
+        finally:
+            self.jobs.pop(req_id, None)
+
+    def dispatch(self, line: str):
+        """分发一行请求"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            self.write_message({
+                "id": None,
+                "success": False,
+                "error": "Invalid JSON format"
+            })
+            return
+
+        req_id = request.get('id')
+        command = request.get('command')
+        data = request.get('data', {})
+
+        if command == "cancel":
+            self.cancel(req_id, data)
+        elif command in IMMEDIATE_COMMANDS:
+            self.respond(req_id, process_command(command, data))
+        else:
+            import asyncio
+
+            token = CancellationToken()
+            self.jobs[req_id] = token
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self.run_job, req_id, command, data, token)
+            self._tasks.add(future)
+            future.add_done_callback(self._tasks.discard)
+
+    async def run(self, readline: Callable[[], str]):
+        """读取请求直到输入结束，再等待执行中的请求完成"""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        # 读取标准输入会阻塞，放在独立线程中，避免占用执行耗时命令的线程
+        reader = ThreadPoolExecutor(max_workers=1)
+        try:
+            while True:
+                line = await loop.run_in_executor(reader, readline)
+                if not line:
+                    break
+
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    self.dispatch(line)
+                except Exception as e:
+                    # 捕获循环中的未处理异常，防止进程退出
+                    self.write_message({
+                        "id": None,
+                        "success": False,
+                        "error": f"Internal error: {str(e)}"
+                    })
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            reader.shutdown(wait=False)
+            self.executor.shutdown(wait=True)
 
 
 def run_interactive_mode():
     """
     交互模式：持续读取标准输入，输出 JSON 结果
     每行输入格式：{"id": "req-1", "command": "cmd_name", "data": {...}}
-    输出格式：{"id": "req-1", "result": {...}}
+    输出格式：{"id": "req-1", "success": true, "result": {...}}
+    取消请求：{"id": "req-2", "command": "cancel", "data": {"target_id": "req-1"}}
     """
     # 强制标准输出使用 UTF-8
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stdin.reconfigure(encoding='utf-8')
-    
+
+    import asyncio
+
+    # 常驻进程中同一文档会被多个命令反复加载，启用已解析文档缓存
+    from core import document_cache
+    document_cache.configure()
+    dispatcher = InteractiveDispatcher(sys.stdout)
+
     # 打印就绪信号
-    print(json.dumps({"status": "ready", "pid": os.getpid()}))
-    sys.stdout.flush()
-    
-    while True:
+    dispatcher.write_message({"status": "ready", "pid": os.getpid()})
+
+    asyncio.run(dispatcher.run(sys.stdin.readline))
+
+
+def run_one_off(command: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """单命令模式：有正在运行的后台进程时转发给它执行，否则在当前进程中执行"""
+    if command not in LOCAL_COMMANDS:
+        from services.daemon import DaemonUnavailable, forward
         try:
-            line = sys.stdin.readline()
-            if not line:
-                break
-                
-            line = line.strip()
-            if not line:
-                continue
-                
-            try:
-                request = json.loads(line)
-                req_id = request.get('id')
-                command = request.get('command')
-                data = request.get('data', {})
-                
-                # 处理命令
-                result = process_command(command, data)
-                
-                # 输出响应
-                response = {
-                    "id": req_id,
-                    "success": "error" not in result,
-                    "result": result
-                }
-                print(json.dumps(response))
-                sys.stdout.flush()
-                
-            except json.JSONDecodeError:
-                print(json.dumps({
-                    "id": None, 
-                    "success": False, 
-                    "error": "Invalid JSON format"
-                }))
-                sys.stdout.flush()
-                
-        except Exception as e:
-            # 捕获循环中的未处理异常，防止进程退出
-            print(json.dumps({
-                "id": None,
-                "success": False, 
-                "error": f"Internal error: {str(e)}"
-            }))
-            sys.stdout.flush()
+            return forward(command, data)
+        except DaemonUnavailable:
+            pass
+    return process_command(command, data)
+
+
+def warm_up():
+    """创建全部服务实例，加载全部规则和文档处理依赖"""
+    for name in _SERVICE_CLASSES:
+        get_service(name)
+    rules = get_service("doc_service").engine.rules
+    for rule_id in rules:
+        rules.get(rule_id)
+    for module_path in WARM_MODULES:
+        importlib.import_module(module_path)
+
+
+def run_daemon_mode(idle_timeout: Optional[float] = None):
+    """
+    后台进程模式：在 Unix 域套接字上接受单命令模式转发的命令，空闲超时后退出
+    启动后输出一行 {"status": "ready", "pid": ..., "socket": ...}；
+    已有后台进程在运行时输出 {"status": "running", "socket": ...} 并退出
+    """
+    from core import document_cache
+    from services.daemon import DaemonServer, supported
+
+    if not supported():
+        print(json.dumps({"error": "Daemon mode requires Unix domain sockets"}))
+        sys.exit(1)
+
+    server = DaemonServer(process_command, idle_timeout=idle_timeout)
+    if not server.bind():
+        print(json.dumps({"status": "running", "socket": server.path}))
+        return
+    try:
+        warm_up()
+        document_cache.configure()
+        print(json.dumps({"status": "ready", "pid": os.getpid(), "socket": server.path}), flush=True)
+        server.serve_forever()
+    finally:
+        server.close()
 
 
 def main():
     """命令行入口"""
+    # 打包后的可执行文件启动进程池工作进程时需要；未打包时 freeze_support 不起作用，不必导入 multiprocessing
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
     # 检查是否进入交互模式
     if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
         run_interactive_mode()
         return
 
+    # 后台进程模式：cli.py --daemon [空闲超时秒数]
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        try:
+            idle_timeout = float(sys.argv[2]) if len(sys.argv) > 2 else None
+        except ValueError:
+            print(json.dumps({"error": f"Invalid idle timeout: {sys.argv[2]}"}))
+            sys.exit(1)
+        run_daemon_mode(idle_timeout)
+        return
+
     # --- 兼容原有单命令模式 ---
     if len(sys.argv) < 2:
         print(json.dumps({"error": "Missing command"}))
@@ -214,15 +483,19 @@ def main():
             print(json.dumps({"error": f"Invalid JSON data: {str(e)}"}))
             sys.exit(1)
     
-    # 处理命令
-    result = process_command(command, data)
+    # 处理命令，优先交给正在运行的后台进程
+    result = run_one_off(command, data)
     
     # 输出结果
     print(json.dumps(result))
     
-    # 设置退出码
+    # 设置退出码：出错为 1，检查发现违规为 2
     if "error" in result:
         sys.exit(1)
+    elif command == "check-document" and result.get("status") == "error":
+        sys.exit(1)
+    elif command == "check-document" and result.get("status") == "violations":
+        sys.exit(2)
     else:
         sys.exit(0)
 
@@ -0,0 +1,34 @@
+"""
+任务取消
+
+交互模式下前端可以取消正在执行的请求。取消是协作式的：引擎在规则之间、
+批量处理在文档之间检查取消标记，发现已取消时抛出 ExecutionCancelled，
+文档不会被保存。
+"""
+
+import threading
+
+
+class ExecutionCancelled(Exception):
+    """任务已被取消"""
+
+
+class CancellationToken:
+    """线程安全的取消标记"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """已请求取消时抛出 ExecutionCancelled"""
+        if self._event.is_set():
+            raise ExecutionCancelled("任务已取消")
@@ -0,0 +1,87 @@
+"""
+文档检查（只读模式）
+
+检查模式下规则照常执行，但属性写入只记录为补丁、从不应用，文档也不保存。
+补丁集预览出的每一处变化就是一条违规：位置、属性、实际值、期望值。
+少数规则直接修改 XML 而不经过补丁（如删除水平线、调整表格宽度），这类规则
+在只读模式下不修改文档，而是用 record_change() 记录本应做出的修改，同样
+报告为带位置的违规；没有记录的规则只能报告规则级的违规数量。
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from core.patch import PropertyChange, describe_value
+
+
+def locate_element(element) -> str:
+    """
+    用类 XPath 的路径描述元素在 document.xml 中的位置，如 body/tbl[0]/tr[1]/tc[0]/p[0]/r[2]
+    下标从 0 开始，只计同名的兄弟元素
+    """
+    steps = []
+    node = element
+    while node is not None:
+        tag = node.tag.split('}')[-1]
+        parent = node.getparent()
+        if tag == 'body' or parent is None:
+            steps.append(tag)
+            break
+        position = sum(1 for _ in node.itersiblings(node.tag, preceding=True))
+        steps.append(f"{tag}[{position}]")
+        node = parent
+    return '/'.join(reversed(steps))
+
+
+class Violation:
+    """一条格式违规"""
+
+    def __init__(self, rule_id: Optional[str], location: Optional[str], prop: Optional[str],
+                 actual: Any = None, expected: Any = None, count: int = 1):
+        self.rule_id = rule_id
+        self.location = location
+        self.prop = prop
+        self.actual = actual
+        self.expected = expected
+        self.count = count
+
+    @classmethod
+    def from_change(cls, change: PropertyChange) -> 'Violation':
+        """由补丁预览出的属性变化构建违规"""
+        return cls(change.rule_id, locate_element(change.element), change.prop,
+                   change.old_value, change.new_value)
+
+    def dict(self) -> Dict[str, Any]:
+        """返回可序列化的字典表示"""
+        return {
+            "rule_id": self.rule_id,
+            "location": self.location,
+            "property": self.prop,
+            "actual": describe_value(self.actual),
+            "expected": describe_value(self.expected),
+            "count": self.count,
+        }
+
+
+def collect_violations(context, results: List[Dict[str, Any]]) -> List[Violation]:
+    """
+    汇总检查结果
+    规则报告的修复数量是它访问或写入的节点数，其中多数已经符合规则；
+    通过补丁或记录修改报告违规的规则，结果中的修复数量改为实际的违规数
+    :param context: 只读的规则上下文，补丁尚未应用
+    :param results: 引擎的规则执行结果，原地修改
+    """
+    changes = context.patches.preview() + context.direct_changes
+    violations = [Violation.from_change(change) for change in changes]
+    # 既没有通过补丁写入、也没有记录修改，但报告了修复数量的规则，只能给出规则级的违规
+    reported = context.patches.writers | {change.rule_id for change in context.direct_changes}
+    counts = Counter(violation.rule_id for violation in violations)
+    for result in results:
+        if not result["success"]:
+            continue
+        if result["rule_id"] in reported:
+            result["fixed_count"] = counts[result["rule_id"]]
+            result["details"] = [f"发现 {result['fixed_count']} 处违规"]
+        elif result["fixed_count"] > 0:
+            violations.append(Violation(result["rule_id"], None, None, count=result["fixed_count"]))
+    return violations
@@ -7,7 +7,26 @@ class ConfigLoader:
 
     def __init__(self, repository: IConfigRepository = None):
         self.repository = repository or YamlConfigRepository()
-        self.config = self.repository.load_config()
+        self._config: Dict[str, Any] = {}
+        self._signature = None
+        self.reload()
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """
+        当前配置
+        后台进程长期持有加载器，配置文件被其它进程（如单命令模式保存预设）修改后
+        按仓库的版本标识重新读取，不返回过期的预设
+        """
+        signature = self.repository.signature()
+        if signature is not None and signature != self._signature:
+            self.reload()
+        return self._config
+
+    def reload(self):
+        """重新读取持久化的配置"""
+        self._signature = self.repository.signature()
+        self._config = self.repository.load_config()
 
     def get_preset(self, preset_name: str) -> Optional[Dict[str, Any]]:
         """获取指定预设的配置"""
@@ -64,10 +83,10 @@ class ConfigLoader:
         """保存预设（委托给持久化层）"""
         self.repository.save_preset(preset_id, preset_data)
         # 更新内存中的配置
-        self.config = self.repository.load_config()
+        self.reload()
 
     def delete_preset(self, preset_id: str):
         """删除预设（委托给持久化层）"""
         self.repository.delete_preset(preset_id)
         # 更新内存中的配置
-        self.config = self.repository.load_config()
+        self.reload()
@@ -9,6 +9,13 @@ class IConfigRepository(ABC):
         """加载配置"""
         pass
 
+    def signature(self) -> Optional[Any]:
+        """
+        持久化配置的版本标识（如文件的修改时间和大小），配置被修改后随之变化
+        返回 None 表示无法判断，调用方不重新加载
+        """
+        return None
+
     @abstractmethod
     def save_config(self, config: Dict[str, Any]) -> None:
         """保存配置"""
@@ -1,15 +1,38 @@
+import os
+from contextlib import contextmanager
 from docx import Document
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
+from core.document_index import DocumentIndex
+from core.patch import PatchSet, PropertyChange, element_of
+from core.cancellation import ExecutionCancelled
+from core import document_cache
+from core.lazy_package import LazySource, open_document, source_signature
+from core.package_writer import save_package
+from core.style_resolver import StyleResolver
 
 class RuleContext:
     """规则执行上下文"""
     
-    def __init__(self, document_path: str):
+    def __init__(self, document_path: str, read_only: bool = False, lazy_parts: bool = True):
         self.document_path = document_path
+        # 只读（检查）模式：补丁只记录不应用，文档不能保存
+        self.read_only = read_only
+        # 图片等二进制部件是否延迟到访问时才读取
+        self.lazy_parts = lazy_parts
         self.document: Optional[Document] = None
+        self._lazy_source: Optional[LazySource] = None
+        self._source_signature = None  # 加载时源文件的大小和修改时间
+        self.last_save: Optional[Dict[str, Any]] = None  # 最近一次保存的方式和部件数
         self._load_document()
         self._cache: Dict[str, Any] = {}
-        self.available_width_cm = 15.92  # 默认值，页面布局规则会更新它
+        self._index: Optional[DocumentIndex] = None
+        self._styles: Optional[StyleResolver] = None
+        self.patches = PatchSet()  # 规则发出、尚未应用的属性写入
+        self.change_log: List[PropertyChange] = []  # 已应用的属性变化，用于撤销和差异
+        self.direct_changes: List[PropertyChange] = []  # 只读模式下直接修改 XML 的规则本应做出的修改
+        self.patch_writers: Set[str] = set()  # 通过补丁写入过属性的规则
+        self._defer_depth = 0
+        self._available_width_cm: Optional[float] = None  # 由页面布局规则发布
         self.runtime_data = {}  # 用于规则间传递临时数据
         
         # 为了兼容测试用例，添加别名
@@ -19,7 +42,15 @@ class RuleContext:
     def _load_document(self):
         """加载文档"""
         try:
-            self.document = Document(self.document_path)
+            self._source_signature = source_signature(self.document_path)
+            cache = document_cache.shared_cache()
+            if self.lazy_parts and cache is not None:
+                # 交互模式下同一文档重复加载时复制缓存中已解析的版本
+                self.document, self._lazy_source = cache.open(self.document_path)
+            elif self.lazy_parts:
+                self.document, self._lazy_source = open_document(self.document_path)
+            else:
+                self.document = Document(self.document_path)
         except Exception as e:
             raise Exception(f"加载文档失败: {str(e)}")
     
@@ -33,20 +64,128 @@ class RuleContext:
         """获取文件路径"""
         return self.document_path
     
+    @property
+    def styles(self) -> StyleResolver:
+        """样式解析器，首次访问时读取 styles.xml"""
+        if self._styles is None:
+            self._styles = StyleResolver.from_document(self.get_document())
+        return self._styles
+
+    @property
+    def index(self) -> DocumentIndex:
+        """文档索引，首次访问时构建"""
+        if self._index is None:
+            self._index = DocumentIndex(self.get_document(), self.styles)
+        return self._index
+
+    def invalidate_index(self):
+        """使文档索引失效 - 规则增删段落或重建段落内容后必须调用"""
+        self._index = None
+
+    # ============== 属性补丁 ==============
+
+    def set_property(self, node, prop: str, value: Any, rule_id: Optional[str] = None):
+        """记录一次属性写入，由引擎或 commit_patches() 统一应用"""
+        self.patches.set(node, prop, value, rule_id)
+
+    def get_property(self, node, prop: str) -> Any:
+        """读取属性值，包含尚未应用的写入"""
+        return self.patches.get(node, prop)
+
+    @property
+    def writes_deferred(self) -> bool:
+        """是否处于引擎的批量写入阶段"""
+        return self._defer_depth > 0
+
+    @contextmanager
+    def deferred_writes(self):
+        """在此范围内规则的写入只记录不应用，退出时统一应用；任务被取消时直接丢弃"""
+        self._defer_depth += 1
+        try:
+            yield self
+        except ExecutionCancelled:
+            self.patches.clear()
+            raise
+        finally:
+            self._defer_depth -= 1
+            if self._defer_depth == 0:
+                self.flush_patches()
+
+    def flush_patches(self) -> List[PropertyChange]:
+        """立即应用所有待处理的写入；只读模式下保留补丁，供检查时预览"""
+        if self.read_only or not self.patches:
+            return []
+        self.patch_writers |= self.patches.writers
+        changes = self.patches.apply()
+        self.change_log.extend(changes)
+        return changes
+
+    def commit_patches(self) -> List[PropertyChange]:
+        """单独执行规则时应用写入；批量写入阶段由引擎决定应用时机"""
+        if self.writes_deferred:
+            return []
+        return self.flush_patches()
+
+    def record_change(self, node, prop: str, old_value: Any, new_value: Any, rule_id: Optional[str] = None):
+        """
+        只读模式下，直接修改 XML 的规则（删除段落、改写边框等）不做修改，
+        改为记录本应做出的修改，检查时作为带位置的违规报告
+        :param prop: 描述修改内容的名称，如 'cell.borders'，不要求已注册
+        """
+        self.direct_changes.append(PropertyChange(element_of(node), prop, old_value, new_value, rule_id))
+
+    def undo_changes(self, changes: Optional[List[PropertyChange]] = None):
+        """
+        撤销已应用的属性变化
+        :param changes: 要撤销的变化，默认撤销 change_log 中的全部变化
+        """
+        if changes is None:
+            changes, self.change_log = self.change_log, []
+        PatchSet.undo(changes)
+
+    # ============== 规则发布的派生值 ==============
+
+    DEFAULT_AVAILABLE_WIDTH_CM = 15.92
+
+    @property
+    def available_width_cm(self) -> float:
+        """
+        第一节的版心宽度（页面宽度减左右边距）
+        页面布局规则执行后直接使用其发布的值，否则从文档（含待应用的写入）计算一次
+        """
+        if self._available_width_cm is None:
+            sections = self.index.sections
+            if not sections:
+                return self.DEFAULT_AVAILABLE_WIDTH_CM
+            section = sections[0]
+            page_width = self.get_property(section, 'section.page_width')
+            left_margin = self.get_property(section, 'section.left_margin')
+            right_margin = self.get_property(section, 'section.right_margin')
+            if page_width is None:
+                return self.DEFAULT_AVAILABLE_WIDTH_CM
+            self._available_width_cm = (page_width.cm
+                                        - (left_margin.cm if left_margin is not None else 0)
+                                        - (right_margin.cm if right_margin is not None else 0))
+        return self._available_width_cm
+
+    @available_width_cm.setter
+    def available_width_cm(self, value: Optional[float]):
+        """发布版心宽度；设为 None 时下次访问重新计算"""
+        self._available_width_cm = value
+
     def get_paragraphs(self) -> list:
         """获取文档中的所有段落"""
-        return self.get_document().paragraphs
+        return self.index.paragraphs
     
     def get_tables(self) -> list:
         """获取文档中的所有表格"""
-        return self.get_document().tables
+        return self.index.tables
     
     def get_document_statistics(self) -> Dict[str, int]:
         """获取文档统计信息"""
-        doc = self.get_document()
         return {
-            "paragraph_count": len(doc.paragraphs),
-            "table_count": len(doc.tables)
+            "paragraph_count": len(self.index.paragraphs),
+            "table_count": len(self.index.tables)
         }
     
     def set_cache(self, key: str, value: Any):
@@ -60,11 +199,28 @@ class RuleContext:
     def clear_cache(self):
         """清除缓存"""
         self._cache.clear()
+        self._styles = None
+        self.invalidate_index()
     
     def save_document(self, output_path: Optional[str] = None):
-        """保存文档"""
+        """
+        保存文档
+        未修改的部件（如图片）直接从源文件复制，写入临时文件后原子替换目标文件
+        """
+        if self.read_only:
+            raise RuntimeError("只读模式下不能保存文档")
         save_path = output_path or self.document_path
+        self.flush_patches()
         if self.document:
-            self.document.save(save_path)
+            self.last_save = save_package(self.document, save_path, self.document_path,
+                                          self._source_signature)
+            if os.path.abspath(save_path) == os.path.abspath(self.document_path):
+                # 源文件已被替换，新文件中的部件内容与加载的文档一致
+                self._source_signature = source_signature(save_path)
+                if self._lazy_source is not None:
+                    self._lazy_source.rebind(save_path)
+            cache = document_cache.shared_cache()
+            if cache is not None:
+                cache.store(self.document, save_path)
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+已解析文档缓存
+
+交互模式和后台进程中，处理后的文档常被接着检查、对比或再次处理，每次都要
+重新读取 zip 并解析全部 XML 部件。这里在进程内按文件内容的 sha256 保存刚
+保存过的包：下一次加载内容相同的文件时返回缓存的副本，不再解析。
+
+只缓存保存后的输出，加载时未命中不放入缓存：放入缓存要多计算一次哈希并
+深拷贝一次，未命中的处理会慢 10%~15%，而原始文件处理后通常不会再被加载。
+
+缓存中的包从不交给调用方：放入缓存和取出时都复制一份，命令对文档的修改
+不会影响缓存和其它命令。lxml 的元素树不能在副本间共享节点，副本整体深拷贝，
+耗时约为解析的一半；延迟读取的二进制部件（见 core.lazy_package）在副本中
+改为从新的路径读取。
+
+只有调用 configure() 后才启用；单命令模式的进程只执行一个命令，缓存不会命中，
+不启用。环境变量 WORD_FORMAT_FIXER_DOCUMENT_CACHE_MB 设置内存上限，为 0 时禁用。
+"""
+
+import copy
+import os
+import zipfile
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from core.memory_cache import MemoryCache
+from core.file_hash import hash_file
+
+# python-docx 在加载文档时才导入，启用缓存（configure）不需要加载它
+if TYPE_CHECKING:
+    from docx.document import Document as DocumentObject
+    from core.lazy_package import LazySource
+
+DOCUMENT_CACHE_ENV = "WORD_FORMAT_FIXER_DOCUMENT_CACHE_MB"
+
+# 默认最多缓存的文档数和内存上限（MB）
+DEFAULT_MAX_DOCUMENTS = 8
+DEFAULT_DOCUMENT_CACHE_MB = 256
+
+# 解析后的元素树占用的内存约为 XML 文本的倍数（实测约 8.6 倍）
+TREE_SIZE_FACTOR = 8
+
+
+def estimate_size(path: str) -> int:
+    """按包中 XML 部件解压后的大小估算解析后占用的内存"""
+    with zipfile.ZipFile(path) as zf:
+        xml_size = sum(info.file_size for info in zf.infolist()
+                       if info.filename.endswith(('.xml', '.rels')))
+    return xml_size * TREE_SIZE_FACTOR
+
+
+def clone_document(document: 'DocumentObject', path: str) -> Tuple['DocumentObject', 'LazySource']:
+    """
+    深拷贝文档所在的整个包
+    :param path: 副本中尚未读取的二进制部件从该文件读取
+    :return: (文档副本, 副本的延迟部件共享的源文件)
+    """
+    from core.lazy_package import LazyMember, LazySource
+
+    package = copy.deepcopy(document.part.package)
+    source = LazySource(path)
+    for part in package.iter_parts():
+        blob = getattr(part, "_blob", None)
+        if isinstance(blob, LazyMember):
+            part._blob = LazyMember(source, blob.membername)
+    return package.main_document_part.document, source
+
+
+class DocumentCache:
+    """进程内的已解析文档缓存，按文件内容的哈希查找"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_DOCUMENTS,
+                 max_bytes: int = DEFAULT_DOCUMENT_CACHE_MB * 1024 * 1024):
+        self._entries = MemoryCache(max_entries, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_environment(cls) -> 'DocumentCache':
+        """按环境变量创建缓存"""
+        try:
+            max_mb = float(os.environ.get(DOCUMENT_CACHE_ENV, DEFAULT_DOCUMENT_CACHE_MB))
+        except ValueError:
+            max_mb = DEFAULT_DOCUMENT_CACHE_MB
+        return cls(DEFAULT_MAX_DOCUMENTS, int(max_mb * 1024 * 1024))
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.enabled
+
+    def open(self, path: str) -> Tuple['DocumentObject', 'LazySource']:
+        """
+        打开文档，内容与缓存中的某个版本相同时返回它的副本
+        :return: 与 core.lazy_package.open_document 相同
+        """
+        from core.lazy_package import open_document
+
+        if not self.enabled:
+            return open_document(path)
+        # 缓存为空时不计算哈希
+        cached = self._entries.get(hash_file(path)) if len(self._entries) else None
+        if cached is None:
+            self.misses += 1
+            return open_document(path)
+        self.hits += 1
+        return clone_document(cached, path)
+
+    def store(self, document: 'DocumentObject', path: str):
+        """文档刚保存到 path 时调用，按保存后的内容放入缓存"""
+        if not self.enabled:
+            return
+        size = estimate_size(path)
+        if size <= self._entries.max_bytes:
+            self._entries.put(hash_file(path), clone_document(document, path)[0], size)
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self) -> Dict[str, Any]:
+        """缓存的条目数、估算内存和命中次数"""
+        return {
+            "entries": len(self._entries),
+            "estimated_bytes": self._entries.total_bytes,
+            "max_bytes": self._entries.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# 进程共享的缓存，由 configure() 创建
+_shared: Optional[DocumentCache] = None
+
+
+def configure(cache: Optional[DocumentCache] = None) -> DocumentCache:
+    """启用进程共享的缓存，默认按环境变量创建"""
+    global _shared
+    _shared = cache if cache is not None else DocumentCache.from_environment()
+    return _shared
+
+
+def disable():
+    """停用进程共享的缓存（如批量处理的工作进程从父进程继承的缓存）"""
+    global _shared
+    _shared = None
+
+
+def shared_cache() -> Optional[DocumentCache]:
+    """进程共享的缓存，未启用时返回 None"""
+    return _shared
@@ -0,0 +1,468 @@
+"""
+结构化文档对比
+
+直接从 word/document.xml 提取文档块并对齐，不经过 HTML 转换：
+- 正文段落、表格、表格单元格和分节属性各为一个块，块记录位置、文本和
+  规范化后的格式属性（字体、字号、颜色、间距、对齐、缩进、边框、底纹、页边距等）
+- 按块的类型和文本计算哈希对齐两个版本：先去掉相同的开头和结尾，中间部分
+  再用 difflib.SequenceMatcher 在哈希序列上匹配，格式修改不影响对齐
+- 对齐的块比较格式属性，得到结构化的差异块（hunk）：
+    text    文本修改（可能同时有格式修改）
+    format  只有格式修改
+    insert  新增的块
+    delete  删除的块
+
+每个差异块的 position 是它在修改后文档中的块序号（删除的块为其后一个块的序号），
+差异块按 position 排列，可以按块区间分页读取。HTML 只在需要展示时由 render_html
+（完整表格）或 render_rows（表格行，用于分页追加）生成。
+
+位置用路径表示：p3 为正文第 4 个段落，t1.r0.c2 为第 2 个表格第 1 行第 3 个
+单元格，t1.r0.c2.t0 为该单元格中的嵌套表格，s0 为分节属性。
+"""
+
+import html
+import posixpath
+import zipfile
+from collections import Counter
+from difflib import SequenceMatcher
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = "{%s}" % W_NS
+_OFFICE_DOCUMENT_TYPES = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument",
+    "http://purl.oclc.org/ooxml/officeDocument/relationships/officeDocument",
+)
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _clark(path: str) -> Tuple[str, ...]:
+    """把 "numPr/numId" 转换为带命名空间的元素标签序列"""
+    return tuple(W + part for part in path.split("/"))
+
+
+# 属性名 -> (属性元素路径, 候选属性名)；元素路径相对 pPr / rPr / tcPr / tblPr / sectPr
+PARAGRAPH_PROPERTIES = {
+    "style": ("pStyle", ("val",)),
+    "alignment": ("jc", ("val",)),
+    "spacing_before": ("spacing", ("before",)),
+    "spacing_after": ("spacing", ("after",)),
+    "line_spacing": ("spacing", ("line",)),
+    "line_rule": ("spacing", ("lineRule",)),
+    "indent_left": ("ind", ("left", "start")),
+    "indent_right": ("ind", ("right", "end")),
+    "first_line_indent": ("ind", ("firstLine",)),
+    "hanging_indent": ("ind", ("hanging",)),
+    "numbering": ("numPr/numId", ("val",)),
+    "numbering_level": ("numPr/ilvl", ("val",)),
+}
+RUN_PROPERTIES = {
+    "font": ("rFonts", ("ascii",)),
+    "font_east_asia": ("rFonts", ("eastAsia",)),
+    "size": ("sz", ("val",)),
+    "color": ("color", ("val",)),
+    "underline": ("u", ("val",)),
+    "highlight": ("highlight", ("val",)),
+}
+RUN_TOGGLES = {"bold": W + "b", "italic": W + "i", "strike": W + "strike"}
+CELL_PROPERTIES = {
+    "width": ("tcW", ("w",)),
+    "width_type": ("tcW", ("type",)),
+    "shading": ("shd", ("fill",)),
+    "vertical_alignment": ("vAlign", ("val",)),
+    "grid_span": ("gridSpan", ("val",)),
+    "vertical_merge": ("vMerge", ("val",)),
+}
+TABLE_PROPERTIES = {
+    "style": ("tblStyle", ("val",)),
+    "width": ("tblW", ("w",)),
+    "width_type": ("tblW", ("type",)),
+    "alignment": ("jc", ("val",)),
+    "layout": ("tblLayout", ("type",)),
+}
+SECTION_PROPERTIES = {
+    "page_width": ("pgSz", ("w",)),
+    "page_height": ("pgSz", ("h",)),
+    "orientation": ("pgSz", ("orient",)),
+    "margin_top": ("pgMar", ("top",)),
+    "margin_bottom": ("pgMar", ("bottom",)),
+    "margin_left": ("pgMar", ("left",)),
+    "margin_right": ("pgMar", ("right",)),
+}
+for _definitions in (PARAGRAPH_PROPERTIES, RUN_PROPERTIES, CELL_PROPERTIES, TABLE_PROPERTIES, SECTION_PROPERTIES):
+    for _name, (_path, _attributes) in _definitions.items():
+        _definitions[_name] = (_clark(_path), _attributes)
+
+# 边框属性 -> 边框容器元素
+BORDER_CONTAINERS = {"paragraph": "pBdr", "cell": "tcBorders", "table": "tblBorders"}
+
+_FALSE_VALUES = ("0", "false", "off", "none")
+
+PropertyValue = Union[None, str, Tuple[Optional[str], ...]]
+
+
+class Block:
+    """文档块：段落、表格、单元格或分节属性"""
+
+    __slots__ = ("kind", "location", "text", "properties", "key", "digest")
+
+    def __init__(self, kind: str, location: str, text: str, properties: Dict[str, PropertyValue]):
+        self.kind = kind
+        self.location = location
+        self.text = text
+        self.properties = properties
+        # 对齐只看类型和文本；格式不同的同一段落仍然对齐
+        self.key = hash((kind, text))
+        self.digest = hash((self.key, tuple(sorted(properties.items()))))
+
+    def dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "location": self.location, "text": self.text,
+                "properties": dict(self.properties)}
+
+
+def document_part(zf: zipfile.ZipFile) -> str:
+    """按包关系定位正文部件，找不到关系时使用默认位置"""
+    try:
+        rels = etree.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(_RELS_NS + "Relationship"):
+        if rel.get("Type") in _OFFICE_DOCUMENT_TYPES:
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return "word/document.xml"
+
+
+def read_document_xml(source: Union[str, bytes]) -> bytes:
+    """从 .docx 文件路径或文件内容读取 document.xml"""
+    with zipfile.ZipFile(BytesIO(source) if isinstance(source, bytes) else source) as zf:
+        return zf.read(document_part(zf))
+
+
+def _attribute(element, names: Tuple[str, ...]) -> Optional[str]:
+    for name in names:
+        value = element.get(W + name)
+        if value is not None:
+            return value
+    return None
+
+
+def _read_properties(container, definitions: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]
+                     ) -> Dict[str, str]:
+    """按属性定义读取属性元素，缺少的属性不出现在结果中"""
+    properties = {}
+    if container is None:
+        return properties
+    # 属性元素只有一层（编号为两层），先按标签索引子元素，避免对每个属性执行路径查找
+    children = {child.tag: child for child in container}
+    for name, (path, attributes) in definitions.items():
+        element = children.get(path[0])
+        for tag in path[1:]:
+            if element is None:
+                break
+            element = element.find(tag)
+        if element is not None:
+            value = _attribute(element, attributes)
+            if value is not None:
+                properties[name] = value
+    return properties
+
+
+def _borders(container, name: str) -> Optional[str]:
+    """把边框容器规范化为 "top=single/4/000000;bottom=..." 形式的字符串"""
+    borders = container.find(W + name) if container is not None else None
+    if borders is None or len(borders) == 0:
+        return None
+    edges = sorted(
+        "%s=%s/%s/%s" % (etree.QName(edge).localname, edge.get(W + "val"), edge.get(W + "sz"),
+                         edge.get(W + "color"))
+        for edge in borders
+    )
+    return ";".join(edges)
+
+
+def _run_properties(run) -> Dict[str, str]:
+    rpr = run.find(W + "rPr")
+    properties = _read_properties(rpr, RUN_PROPERTIES)
+    if rpr is not None:
+        for name, tag in RUN_TOGGLES.items():
+            element = rpr.find(tag)
+            if element is not None:
+                properties[name] = "off" if element.get(W + "val") in _FALSE_VALUES else "on"
+    return properties
+
+
+def _merge(values: List[Dict[str, str]]) -> Dict[str, PropertyValue]:
+    """合并多个文本运行（或段落）的属性：取值一致时为该值，不一致时为各不同取值组成的元组"""
+    if not values:
+        return {}
+    if len(values) == 1:
+        return dict(values[0])
+    merged = {}
+    for name in {name for value in values for name in value}:
+        distinct = list(dict.fromkeys(value.get(name) for value in values))
+        merged[name] = distinct[0] if len(distinct) == 1 else tuple(distinct)
+    return merged
+
+
+def paragraph_text(paragraph) -> str:
+    parts = []
+    for element in paragraph.iter(W + "t", W + "tab", W + "br", W + "cr"):
+        if element.tag == W + "t":
+            parts.append(element.text or "")
+        elif element.tag == W + "tab":
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def paragraph_properties(paragraph) -> Dict[str, PropertyValue]:
+    """段落属性和段落中有文本的运行的属性"""
+    ppr = paragraph.find(W + "pPr")
+    properties: Dict[str, PropertyValue] = _read_properties(ppr, PARAGRAPH_PROPERTIES)
+    borders = _borders(ppr, BORDER_CONTAINERS["paragraph"])
+    if borders:
+        properties["borders"] = borders
+    runs = [_run_properties(run) for run in paragraph.iter(W + "r") if run.find(W + "t") is not None]
+    properties.update(_merge(runs))
+    return properties
+
+
+class _Extractor:
+    """按文档顺序把 w:body 展开为块"""
+
+    def __init__(self):
+        self.blocks: List[Block] = []
+
+    def container(self, element, prefix: str, counters: Optional[Counter] = None):
+        counters = Counter() if counters is None else counters
+        for child in element:
+            tag = child.tag
+            if tag == W + "p":
+                self.paragraph(child, f"{prefix}p{counters['p']}")
+                counters['p'] += 1
+                section = child.find("w:pPr/w:sectPr", {"w": W_NS})
+                if section is not None:
+                    self.section(section, f"{prefix}s{counters['s']}")
+                    counters['s'] += 1
+            elif tag == W + "tbl":
+                self.table(child, f"{prefix}t{counters['t']}")
+                counters['t'] += 1
+            elif tag == W + "sdt":
+                content = child.find(W + "sdtContent")
+                if content is not None:
+                    self.container(content, prefix, counters)
+            elif tag == W + "sectPr":
+                self.section(child, f"{prefix}s{counters['s']}")
+                counters['s'] += 1
+
+    def paragraph(self, paragraph, location: str):
+        self.blocks.append(Block("paragraph", location, paragraph_text(paragraph),
+                                 paragraph_properties(paragraph)))
+
+    def table(self, table, location: str):
+        tblpr = table.find(W + "tblPr")
+        properties: Dict[str, PropertyValue] = _read_properties(tblpr, TABLE_PROPERTIES)
+        borders = _borders(tblpr, BORDER_CONTAINERS["table"])
+        if borders:
+            properties["borders"] = borders
+        rows = table.findall(W + "tr")
+        # 表格块的文本记录行列数，行列变化时表格不与原表格对齐
+        shape = "x".join(str(len(row.findall(W + "tc"))) for row in rows)
+        self.blocks.append(Block("table", location, shape, properties))
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row.findall(W + "tc")):
+                self.cell(cell, f"{location}.r{r}.c{c}")
+
+    def cell(self, cell, location: str):
+        tcpr = cell.find(W + "tcPr")
+        properties: Dict[str, PropertyValue] = _read_properties(tcpr, CELL_PROPERTIES)
+        borders = _borders(tcpr, BORDER_CONTAINERS["cell"])
+        if borders:
+            properties["borders"] = borders
+        paragraphs = cell.findall(W + "p")
+        # 单元格中段落的格式合并到单元格块；单元格自身的属性优先
+        for name, value in _merge([paragraph_properties(p) for p in paragraphs]).items():
+            properties.setdefault(name, value)
+        text = "\n".join(paragraph_text(p) for p in paragraphs)
+        self.blocks.append(Block("cell", location, text, properties))
+        for t, nested in enumerate(cell.findall(W + "tbl")):
+            self.table(nested, f"{location}.t{t}")
+
+    def section(self, section, location: str):
+        self.blocks.append(Block("section", location, "", _read_properties(section, SECTION_PROPERTIES)))
+
+
+def extract_blocks(document_xml: bytes) -> List[Block]:
+    """把 document.xml 展开为按文档顺序排列的块"""
+    parser = etree.XMLParser(huge_tree=True, resolve_entities=False, remove_blank_text=False)
+    root = etree.fromstring(document_xml, parser)
+    body = root.find(W + "body")
+    extractor = _Extractor()
+    if body is not None:
+        extractor.container(body, "")
+    return extractor.blocks
+
+
+def align(original: List[Block], modified: List[Block]) -> List[Tuple[str, int, int, int, int]]:
+    """
+    按块哈希对齐，返回与 SequenceMatcher.get_opcodes 相同格式的操作列表
+    相同的开头和结尾直接配对，只对中间不同的部分做序列匹配
+    """
+    a = [block.key for block in original]
+    b = [block.key for block in modified]
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < limit - start and a[len(a) - 1 - end] == b[len(b) - 1 - end]:
+        end += 1
+
+    opcodes = []
+    if start:
+        opcodes.append(("equal", 0, start, 0, start))
+    middle_a, middle_b = a[start:len(a) - end], b[start:len(b) - end]
+    if middle_a or middle_b:
+        matcher = SequenceMatcher(None, middle_a, middle_b, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            opcodes.append((tag, i1 + start, i2 + start, j1 + start, j2 + start))
+    if end:
+        opcodes.append(("equal", len(a) - end, len(a), len(b) - end, len(b)))
+    return opcodes
+
+
+def property_changes(before: Dict[str, PropertyValue], after: Dict[str, PropertyValue]) -> List[Dict[str, Any]]:
+    """两个块的格式属性差异，按属性名排序"""
+    return [
+        {"name": name, "before": before.get(name), "after": after.get(name)}
+        for name in sorted(set(before) | set(after))
+        if before.get(name) != after.get(name)
+    ]
+
+
+def _hunk(kind: str, original: Optional[Block], modified: Optional[Block],
+          original_index: Optional[int], modified_index: Optional[int], position: int) -> Dict[str, Any]:
+    block = modified if modified is not None else original
+    return {
+        "type": kind,
+        "kind": block.kind,
+        "location": block.location,
+        "position": position,
+        "original_index": original_index,
+        "modified_index": modified_index,
+        "before": original.text if original is not None else None,
+        "after": modified.text if modified is not None else None,
+        "properties": property_changes(original.properties if original is not None else {},
+                                       modified.properties if modified is not None else {}),
+    }
+
+
+def diff_blocks(original: List[Block], modified: List[Block]) -> List[Dict[str, Any]]:
+    """比较两组块，返回按文档顺序排列的差异块"""
+    hunks = []
+    for tag, i1, i2, j1, j2 in align(original, modified):
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                before, after = original[i1 + offset], modified[j1 + offset]
+                if before.digest != after.digest:
+                    hunks.append(_hunk("format", before, after, i1 + offset, j1 + offset, j1 + offset))
+            continue
+
+        # 替换区间内同类型的块按顺序配对为文本修改，其余为删除和新增
+        paired = 0
+        if tag == "replace":
+            while (paired < min(i2 - i1, j2 - j1)
+                   and original[i1 + paired].kind == modified[j1 + paired].kind):
+                hunks.append(_hunk("text", original[i1 + paired], modified[j1 + paired],
+                                   i1 + paired, j1 + paired, j1 + paired))
+                paired += 1
+        for i in range(i1 + paired, i2):
+            hunks.append(_hunk("delete", original[i], None, i, None, j1 + paired))
+        for j in range(j1 + paired, j2):
+            hunks.append(_hunk("insert", None, modified[j], None, j, j))
+    return hunks
+
+
+def summarize(hunks: List[Dict[str, Any]], original_blocks: int, modified_blocks: int) -> Dict[str, Any]:
+    """差异统计：各类修改的数量和各格式属性被修改的次数"""
+    types = Counter(hunk["type"] for hunk in hunks)
+    properties = Counter(change["name"] for hunk in hunks if hunk["type"] in ("text", "format")
+                         for change in hunk["properties"])
+    return {
+        "original_blocks": original_blocks,
+        "modified_blocks": modified_blocks,
+        "text_changes": types["text"],
+        "format_changes": types["format"],
+        "additions": types["insert"],
+        "deletions": types["delete"],
+        "total_changes": len(hunks),
+        "properties": dict(properties.most_common()),
+    }
+
+
+def compare_blocks(original: List[Block], modified: List[Block]) -> Dict[str, Any]:
+    """比较两组已提取的块，返回差异块和统计"""
+    hunks = diff_blocks(original, modified)
+    return {"hunks": hunks, "stats": summarize(hunks, len(original), len(modified))}
+
+
+def diff_documents(original_xml: bytes, modified_xml: bytes) -> Dict[str, Any]:
+    """比较两个 document.xml，返回差异块和统计"""
+    return compare_blocks(extract_blocks(original_xml), extract_blocks(modified_xml))
+
+
+def _format_value(value: PropertyValue) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, (tuple, list)):
+        return " / ".join("-" if item is None else item for item in value)
+    return value
+
+
+def _inline_diff(before: str, after: str) -> str:
+    """段落内的字符级差异，删除的文字用 del、新增的文字用 ins 标记"""
+    parts = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, before, after, autojunk=False).get_opcodes():
+        if tag == "equal":
+            parts.append(html.escape(before[i1:i2]))
+            continue
+        if i2 > i1:
+            parts.append('<del class="diff_sub">%s</del>' % html.escape(before[i1:i2]))
+        if j2 > j1:
+            parts.append('<ins class="diff_add">%s</ins>' % html.escape(after[j1:j2]))
+    return "".join(parts)
+
+
+_ROW_CLASSES = {"text": "diff_chg", "format": "diff_chg", "insert": "diff_add", "delete": "diff_sub"}
+
+
+def render_rows(hunks: List[Dict[str, Any]]) -> str:
+    """把差异块渲染为 HTML 表格行，分页读取时追加到已有表格中"""
+    rows = []
+    for hunk in hunks:
+        before, after = hunk["before"], hunk["after"]
+        if hunk["type"] == "text":
+            content = _inline_diff(before, after)
+        else:
+            content = html.escape(after if after is not None else before)
+        changes = "".join(
+            "<li>%s: %s &rarr; %s</li>" % (html.escape(change["name"]),
+                                          html.escape(_format_value(change["before"])),
+                                          html.escape(_format_value(change["after"])))
+            for change in hunk["properties"]
+        )
+        rows.append(
+            '<tr class="%s"><td>%s</td><td>%s</td><td>%s</td><td><ul>%s</ul></td></tr>'
+            % (_ROW_CLASSES[hunk["type"]], html.escape(hunk["location"]), hunk["type"], content, changes)
+        )
+    return "".join(rows)
+
+
+def render_html(hunks: List[Dict[str, Any]]) -> str:
+    """把差异块渲染为 HTML 表格"""
+    return ('<table class="diff-hunks"><thead><tr><th>位置</th><th>类型</th><th>内容</th><th>格式</th>'
+            '</tr></thead><tbody>%s</tbody></table>' % render_rows(hunks))
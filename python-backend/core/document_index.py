@@ -0,0 +1,170 @@
+"""
+文档索引
+
+首次使用时构建并缓存规则常用的节点列表：按级别分组的标题段落、正文段落、
+去重后的表格单元格、文本运行和节。python-docx 的代理对象只创建一次，
+所有规则共享；规则改变文档结构后需调用 RuleContext.invalidate_index()。
+"""
+
+from typing import Dict, List, Optional
+
+from docx.table import _Cell
+
+from core.style_resolver import StyleResolver
+
+
+class TableCellEntry:
+    """表格单元格索引项 - 每个物理单元格（包括合并单元格）只出现一次"""
+
+    def __init__(self, cell, table, table_index: int, row_index: int, column_index: int):
+        self.cell = cell
+        self.table = table
+        self.table_index = table_index
+        self.row_index = row_index  # 单元格起始行
+        self.column_index = column_index  # 单元格起始网格列
+        self._paragraphs = None
+
+    @property
+    def paragraphs(self) -> list:
+        """单元格中的段落（缓存）"""
+        if self._paragraphs is None:
+            self._paragraphs = self.cell.paragraphs
+        return self._paragraphs
+
+
+class DocumentIndex:
+    """文档索引 - 各部分在第一次访问时构建"""
+
+    def __init__(self, document, styles=None):
+        self._document = document
+        self._styles = styles if styles is not None else StyleResolver.from_document(document)
+        self._paragraphs: Optional[list] = None
+        self._tables: Optional[list] = None
+        self._sections: Optional[list] = None
+        self._heading_levels: Dict = {}
+        self._headings_by_level: Optional[Dict[int, list]] = None
+        self._body_paragraphs: Optional[list] = None
+        self._cells: Optional[List[TableCellEntry]] = None
+        self._cells_by_table: Dict = {}
+        self._runs: Dict = {}
+        self._all_runs: Optional[list] = None
+
+    # ============== 基础节点 ==============
+
+    @property
+    def paragraphs(self) -> list:
+        """正文中的所有段落（不含表格内段落）"""
+        if self._paragraphs is None:
+            self._paragraphs = self._document.paragraphs
+        return self._paragraphs
+
+    @property
+    def tables(self) -> list:
+        """正文中的顶层表格"""
+        if self._tables is None:
+            self._tables = self._document.tables
+        return self._tables
+
+    @property
+    def sections(self) -> list:
+        """文档中的所有节"""
+        if self._sections is None:
+            self._sections = list(self._document.sections)
+        return self._sections
+
+    # ============== 标题 ==============
+
+    def heading_level(self, paragraph) -> Optional[int]:
+        """
+        返回段落的标题级别
+        :return: 1-9 为标题级别，0 为未标明级别的标题，None 表示不是标题
+        """
+        p = paragraph._p
+        if p not in self._heading_levels:
+            self._heading_levels[p] = self._styles.heading_level(p)
+        return self._heading_levels[p]
+
+    def is_heading(self, paragraph) -> bool:
+        """段落是否为标题"""
+        return self.heading_level(paragraph) is not None
+
+    @property
+    def headings_by_level(self) -> Dict[int, list]:
+        """按级别分组的正文标题段落"""
+        if self._headings_by_level is None:
+            self._build_heading_groups()
+        return self._headings_by_level
+
+    @property
+    def body_paragraphs(self) -> list:
+        """正文中不是标题的段落"""
+        if self._body_paragraphs is None:
+            self._build_heading_groups()
+        return self._body_paragraphs
+
+    def _build_heading_groups(self):
+        headings_by_level: Dict[int, list] = {}
+        body_paragraphs = []
+        for paragraph in self.paragraphs:
+            level = self.heading_level(paragraph)
+            if level is None:
+                body_paragraphs.append(paragraph)
+            else:
+                headings_by_level.setdefault(level, []).append(paragraph)
+        self._headings_by_level = headings_by_level
+        self._body_paragraphs = body_paragraphs
+
+    # ============== 表格 ==============
+
+    @property
+    def cells(self) -> List[TableCellEntry]:
+        """所有顶层表格的单元格，合并单元格只出现一次"""
+        if self._cells is None:
+            cells = []
+            for table_index, table in enumerate(self.tables):
+                cells.extend(self.cells_of(table, table_index))
+            self._cells = cells
+        return self._cells
+
+    def cells_of(self, table, table_index: int = 0) -> List[TableCellEntry]:
+        """
+        返回一个表格的单元格索引项
+        直接遍历 w:tr / w:tc，避免 python-docx 为每一行重新计算整个表格的单元格网格
+        """
+        tbl = table._tbl
+        if tbl not in self._cells_by_table:
+            entries = []
+            for row_index, tr in enumerate(tbl.tr_lst):
+                column_index = 0
+                for tc in tr.tc_lst:
+                    # 纵向合并的后续单元格属于上方的物理单元格
+                    if tc.vMerge != 'continue':
+                        entries.append(TableCellEntry(_Cell(tc, table), table, table_index,
+                                                      row_index, column_index))
+                    column_index += tc.grid_span
+            self._cells_by_table[tbl] = entries
+        return self._cells_by_table[tbl]
+
+    # ============== 文本运行 ==============
+
+    def runs_of(self, paragraph) -> list:
+        """段落中的文本运行（缓存）"""
+        p = paragraph._p
+        runs = self._runs.get(p)
+        if runs is None:
+            runs = paragraph.runs
+            self._runs[p] = runs
+        return runs
+
+    @property
+    def runs(self) -> list:
+        """正文和表格中所有段落的文本运行"""
+        if self._all_runs is None:
+            runs = []
+            for paragraph in self.paragraphs:
+                runs.extend(self.runs_of(paragraph))
+            for entry in self.cells:
+                for paragraph in entry.paragraphs:
+                    runs.extend(self.runs_of(paragraph))
+            self._all_runs = runs
+        return self._all_runs
@@ -1,133 +1,134 @@
-from typing import List, Dict, Any
-import importlib
-import os
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Set, Tuple
 import time
 from rules.base_rule import BaseRule, RuleResult
-from core.context import RuleContext
+from core.traversal import DocumentTraversal
+from core.scheduler import RuleScheduler
+from core.progress import ProgressCallback, report_progress
+from core.cancellation import CancellationToken
+from core.instrumentation import (Instrumentation, count_changed_nodes, empty_metrics, measure,
+                                  round_metrics, stage)
+from core.rule_registry import RuleRegistry, discover_rules, load_manifest, rules_directory
+
+# 加载文档、检查和流式执行依赖 python-docx，在执行时才导入，
+# 获取规则列表等不处理文档的命令不需要加载它们
+if TYPE_CHECKING:
+    from core.context import RuleContext
 
 class RuleEngine:
     """规则执行引擎"""
     
-    def __init__(self):
-        self.rules: Dict[str, BaseRule] = {}
+    def __init__(self, fused_traversal: bool = True, dependency_ordering: bool = True,
+                 streaming_threshold: Optional[int] = None, instrumentation: bool = False,
+                 trace_memory: bool = False):
+        # 规则 ID -> 规则实例，实例在第一次使用时创建
+        self.rules: RuleRegistry = RuleRegistry()
+        # 是否把实现了访问者钩子的相邻规则合并为一次文档遍历
+        self.fused_traversal = fused_traversal
+        # 是否按规则声明的读写资源重新排定执行顺序
+        self.dependency_ordering = dependency_ordering
+        # document.xml（解压后）达到该字节数且规则都可流式执行时使用流式引擎；
+        # 为 None 时读取环境变量 WORD_FORMAT_FIXER_STREAMING_THRESHOLD_MB，0 表示不使用
+        self._streaming_threshold = streaming_threshold
+        # 是否默认收集每个规则和各阶段的耗时、节点数；trace_memory 同时记录内存峰值
+        self.instrumentation = instrumentation
+        self.trace_memory = trace_memory
         self._load_rules()
     
     def _load_rules(self):
-        """动态加载所有规则"""
-        import sys
-        if getattr(sys, 'frozen', False):
-            base_dir = os.path.dirname(sys.executable)
-            # Ensure base dir is in sys.path so we can import 'rules' package
-            if base_dir not in sys.path:
-                sys.path.insert(0, base_dir)
-        else:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            
-        # 扫描rules目录下的所有规则
-        rules_dir = os.path.join(base_dir, 'rules')
-        
-        # 遍历所有规则目录
-        for root, dirs, files in os.walk(rules_dir):
-            for file in files:
-                if file.endswith('.py') and not file.startswith('__init__') and not file.startswith('base_rule'):
-                    # 计算模块路径
-                    relative_path = os.path.relpath(os.path.join(root, file), rules_dir)
-                    module_path = 'rules.' + relative_path.replace(os.path.sep, '.').replace('.py', '')
-                    
-                    try:
-                        # 导入模块
-                        module = importlib.import_module(module_path)
-                        # 查找模块中的规则类
-                        for name, obj in module.__dict__.items():
-                            if isinstance(obj, type) and issubclass(obj, BaseRule) and obj != BaseRule:
-                                # 创建规则实例
-                                rule_instance = obj()
-                                self.rules[rule_instance.rule_id] = rule_instance
-                    except Exception as e:
-                        print(f"加载规则失败 {module_path}: {e}")
-    
+        """
+        加载规则：优先读取规则清单（rules/manifest.json），规则模块在第一次使用时才导入；
+        清单不存在或已过期时扫描 rules 目录并导入全部规则
+        """
+        rules_dir = rules_directory()
+        manifest = load_manifest(rules_dir)
+        if manifest is not None:
+            self.rules.add_entries(manifest["rules"])
+            return
+        for rule_id, rule in discover_rules(rules_dir).items():
+            self.rules[rule_id] = rule
+
+    @property
+    def streaming_threshold(self) -> Optional[int]:
+        """
+        document.xml（解压后）达到该字节数且规则都可流式执行时使用流式引擎；
+        构造时未指定则在第一次使用时读取环境变量 WORD_FORMAT_FIXER_STREAMING_THRESHOLD_MB，0 表示不使用
+        """
+        if self._streaming_threshold is None:
+            from core.streaming import streaming_threshold_from_environment
+            self._streaming_threshold = streaming_threshold_from_environment() or 0
+        return self._streaming_threshold or None
+
     def register_rule(self, rule: BaseRule):
         """注册规则"""
         self.rules[rule.rule_id] = rule
     
-    def execute(self, document_path: str, active_rules: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def execute(self, document_path: str, active_rules: List[Dict[str, Any]] = None,
+                progress: Optional[ProgressCallback] = None,
+                cancel_token: Optional[CancellationToken] = None,
+                instrumentation: Optional[bool] = None,
+                trace_memory: Optional[bool] = None) -> Dict[str, Any]:
         """
         执行规则
         :param document_path: 文档路径
         :param active_rules: 前端传来的激活规则列表
+        :param progress: 进度回调，参数为包含 rule_id、rule_index、rule_total、
+                         nodes_processed、percent 等字段的字典
+        :param cancel_token: 取消标记，在规则之间检查；取消时抛出 ExecutionCancelled，文档不保存
+        :param instrumentation: 是否收集度量数据，默认使用引擎的设置；开启时每个结果包含
+                                metrics，返回值包含各阶段（load、apply_patches、save）的 instrumentation
+        :param trace_memory: 度量时是否用 tracemalloc 记录内存峰值，默认使用引擎的设置
         """
         start_time = time.time()
-        context = RuleContext(document_path)
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        plan = self.build_plan(active_rules)
+
+        recorder = None
+        if self.instrumentation if instrumentation is None else instrumentation:
+            recorder = Instrumentation(self.trace_memory if trace_memory is None else trace_memory)
+
+        with recorder if recorder is not None else nullcontext():
+            if self.should_stream(document_path, plan):
+                from core.package_writer import IncrementalSaveUnsupported
+                try:
+                    return self._execute_streaming(document_path, plan, progress, cancel_token,
+                                                   start_time, recorder)
+                except IncrementalSaveUnsupported:
+                    # 需要 Zip64 等情况，源文件未被修改，改用常规引擎
+                    pass
+            return self._execute_loaded(document_path, plan, progress, cancel_token, start_time, recorder)
+
+    def _execute_loaded(self, document_path: str, plan: List[Tuple[str, Optional[BaseRule]]],
+                        progress: Optional[ProgressCallback], cancel_token: Optional[CancellationToken],
+                        start_time: float, recorder: Optional[Instrumentation]) -> Dict[str, Any]:
+        """加载整个文档执行规则计划并保存"""
+        from core.context import RuleContext
+
+        with stage(recorder, "load"):
+            context = RuleContext(document_path)
         results = []
         total_fixed = 0
-        
-        # 确定要执行的规则
-        if active_rules is not None:
-            # 执行前端指定的规则
-            for rule_info in active_rules:
-                rule_id = rule_info['rule_id']
-                params = rule_info.get('params', {})
-                
-                if rule_id in self.rules:
-                    rule = self.rules[rule_id]
-                    try:
-                        # 更新规则配置
-                        rule.config.update(params)
-                        # 执行规则
-                        result = rule.apply(context)
-                        # 直接构建结果字典，避免使用dict()方法
-                        result_dict = {
-                            "rule_id": result.rule_id,
-                            "success": result.success,
-                            "fixed_count": result.fixed_count,
-                            "details": result.details
-                        }
-                        results.append(result_dict)
-                        total_fixed += result.fixed_count
-                    except Exception as e:
-                        # 构建失败结果
-                        results.append({
-                            "rule_id": rule_id,
-                            "success": False,
-                            "fixed_count": 0,
-                            "details": [f"执行失败: {str(e)}"]
-                        })
-                else:
-                    # 无效规则ID，添加失败结果
-                    results.append({
-                        "rule_id": rule_id,
-                        "success": False,
-                        "fixed_count": 0,
-                        "details": [f"规则ID不存在: {rule_id}"]
-                    })
-        else:
-            # 执行所有启用的规则
-            for rule_id, rule in self.rules.items():
-                if rule.enabled:
-                    try:
-                        result = rule.apply(context)
-                        # 直接构建结果字典，避免使用dict()方法
-                        result_dict = {
-                            "rule_id": result.rule_id,
-                            "success": result.success,
-                            "fixed_count": result.fixed_count,
-                            "details": result.details
-                        }
-                        results.append(result_dict)
-                        total_fixed += result.fixed_count
-                    except Exception as e:
-                        results.append({
-                            "rule_id": rule_id,
-                            "success": False,
-                            "fixed_count": 0,
-                            "details": [f"执行失败: {str(e)}"]
-                        })
-        
+
+        # 规则的属性写入先合并为补丁，按组统一应用
+        with context.deferred_writes():
+            for result_dict in self._run_scheduled(context, plan, progress, cancel_token, recorder):
+                results.append(result_dict)
+                total_fixed += result_dict["fixed_count"]
+            report_progress(progress, stage="apply", rule_total=len(plan),
+                            pending_writes=len(context.patches), percent=100)
+            with stage(recorder, "apply_patches"):
+                context.flush_patches()
+
         # 保存修改后的文档
-        save_success = context.save_document()
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        report_progress(progress, stage="save", rule_total=len(plan), percent=100)
+        with stage(recorder, "save"):
+            save_success = context.save_document()
         time_taken = f"{time.time() - start_time:.2f}s"
-        
-        return {
+
+        result = {
             "status": "success" if save_success else "error",
             "summary": {
                 "total_fixed": total_fixed,
@@ -137,10 +138,330 @@ class RuleEngine:
             "save_success": save_success,
             "saved_to": document_path
         }
-    
+        if recorder is not None:
+            self._finish_metrics(results, count_changed_nodes(context.change_log), context.patch_writers)
+            result["instrumentation"] = recorder.report()
+        return result
+
+    @staticmethod
+    def _finish_metrics(results: List[Dict[str, Any]], changed_nodes: Dict[Optional[str], int],
+                        patch_writers: Set[str]):
+        """
+        补充每个规则修改的节点数
+        通过补丁写入的规则按实际发生变化的元素计数；直接修改 XML 的规则使用其报告的修复数
+        """
+        for result_dict in results:
+            metrics = result_dict.get("metrics")
+            if metrics is None:
+                continue
+            rule_id = result_dict["rule_id"]
+            if rule_id in patch_writers:
+                metrics["nodes_changed"] = changed_nodes.get(rule_id, 0)
+            else:
+                metrics["nodes_changed"] = result_dict["fixed_count"]
+            result_dict["metrics"] = round_metrics(metrics)
+
+    def should_stream(self, document_path: str, plan: List[Tuple[str, Optional[BaseRule]]]) -> bool:
+        """文档足够大且计划中的规则都可以流式执行时使用流式引擎"""
+        if not self.streaming_threshold or any(rule is None for _, rule in plan):
+            return False
+        from core.streaming import document_xml_size, is_streamable
+
+        if not is_streamable([rule for _, rule in plan]):
+            return False
+        size = document_xml_size(document_path)
+        return size is not None and size >= self.streaming_threshold
+
+    def _execute_streaming(self, document_path: str, plan: List[Tuple[str, Optional[BaseRule]]],
+                           progress: Optional[ProgressCallback], cancel_token: Optional[CancellationToken],
+                           start_time: float, recorder: Optional[Instrumentation] = None) -> Dict[str, Any]:
+        """用流式引擎一次遍历执行全部规则，边处理边写出文档"""
+        from core.streaming import stream_document
+
+        order = self.schedule(plan)
+        rules = [plan[i][1] for i in order]
+        on_node = self._node_callback([rule.rule_id for rule in rules], 0, len(plan), progress, cancel_token)
+        stream_metrics: Dict[str, Any] = {}
+        with measure(recorder, stream_metrics):
+            outcomes, stats = stream_document(document_path, rules, on_node=on_node,
+                                              instrument=recorder is not None)
+
+        executed = self._outcome_results(outcomes)
+        if recorder is not None:
+            # 加载、规则执行和保存交织进行，内存峰值只能按整个流式过程统计
+            recorder.stages["stream"] = stream_metrics
+            for result_dict, metrics in zip(executed, stats["metrics"]):
+                if "memory_peak_kb" in stream_metrics:
+                    metrics["memory_peak_kb"] = stream_metrics["memory_peak_kb"]
+                result_dict["metrics"] = metrics
+            self._finish_metrics(executed, stats["changed_nodes"], stats["patch_writers"])
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+        for position, result_dict in zip(order, executed):
+            results[position] = result_dict
+        report_progress(progress, stage="save", rule_total=len(plan), percent=100)
+
+        result = {
+            "status": "success",
+            "summary": {
+                "total_fixed": sum(result["fixed_count"] for result in results),
+                "time_taken": f"{time.time() - start_time:.2f}s"
+            },
+            "results": results,
+            "save_success": True,
+            "saved_to": document_path,
+            "streaming": True
+        }
+        if recorder is not None:
+            result["instrumentation"] = recorder.report()
+        return result
+
+    def check(self, document_path: str, active_rules: List[Dict[str, Any]] = None,
+              progress: Optional[ProgressCallback] = None,
+              cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        检查文档是否符合规则，不修改也不保存文档
+        规则的属性写入只记录为补丁，预览出的变化即为违规
+        :return: status 为 compliant（无违规）或 violations
+        """
+        start_time = time.time()
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        from core.check import collect_violations
+        from core.context import RuleContext
+
+        context = RuleContext(document_path, read_only=True)
+        plan = self.build_plan(active_rules)
+
+        with context.deferred_writes():
+            results = self._run_scheduled(context, plan, progress, cancel_token)
+        violations = [violation.dict() for violation in collect_violations(context, results)]
+        report_progress(progress, stage="check", rule_total=len(plan),
+                        violation_count=len(violations), percent=100)
+
+        return {
+            "status": "violations" if violations else "compliant",
+            "summary": {
+                "violation_count": len(violations),
+                "rules_checked": len(plan),
+                "rules_failed": sum(1 for result in results if not result["success"]),
+                "time_taken": f"{time.time() - start_time:.2f}s"
+            },
+            "violations": violations,
+            "results": results,
+            "file_path": document_path
+        }
+
+    def build_plan(self, active_rules: List[Dict[str, Any]] = None) -> List[Tuple[str, Optional[BaseRule]]]:
+        """
+        确定要执行的规则
+        请求中带参数的规则使用覆盖了参数的副本（BaseRule.with_params），参数只对本次
+        执行有效，不改变引擎中规则的配置
+        :return: (rule_id, 规则实例或 None) 列表
+        """
+        if active_rules is None:
+            # 执行所有启用的规则
+            return [(rule_id, rule) for rule_id, rule in self.rules.items() if rule.enabled]
+
+        # 执行前端指定的规则
+        plan = []
+        for rule_info in active_rules:
+            rule_id = rule_info['rule_id']
+            rule = self.rules.get(rule_id)
+            if rule is not None:
+                rule = rule.with_params(rule_info.get('params'))
+            plan.append((rule_id, rule))
+        return plan
+
+    def config_fingerprint(self, active_rules: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        返回本次执行实际生效的规则、版本和配置，不修改规则配置
+        相同的指纹作用于相同的文档得到相同的结果，供结果缓存使用
+        """
+        if active_rules is None:
+            requested = [{"rule_id": rule_id} for rule_id, rule in self.rules.items() if rule.enabled]
+        else:
+            requested = active_rules
+
+        fingerprint = []
+        for rule_info in requested:
+            rule = self.rules.get(rule_info['rule_id'])
+            if rule is None:
+                fingerprint.append({"rule_id": rule_info['rule_id'], "version": None, "config": None})
+            else:
+                fingerprint.append({
+                    "rule_id": rule.rule_id,
+                    "version": rule.version,
+                    "config": {**rule.config, **(rule_info.get('params') or {})},
+                })
+        return fingerprint
+
+    def schedule(self, plan: List[Tuple[str, Optional[BaseRule]]]) -> List[int]:
+        """
+        计算规则计划的执行顺序
+        :return: plan 的下标，按执行顺序排列；无效规则ID保持原位置
+        """
+        valid = [i for i, (_, rule) in enumerate(plan) if rule is not None]
+        if not self.dependency_ordering:
+            return list(range(len(plan)))
+        ordered = iter([valid[i] for i in RuleScheduler.order([plan[i][1] for i in valid])])
+        return [next(ordered) if rule is not None else i for i, (_, rule) in enumerate(plan)]
+
+    def _run_scheduled(self, context: 'RuleContext', plan: List[Tuple[str, Optional[BaseRule]]],
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_token: Optional[CancellationToken] = None,
+                       recorder: Optional[Instrumentation] = None) -> List[Dict[str, Any]]:
+        """按依赖顺序执行规则计划，结果仍按请求顺序返回"""
+        order = self.schedule(plan)
+        executed = self._run_plan(context, [plan[i] for i in order], progress, cancel_token, recorder)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+        for position, result_dict in zip(order, executed):
+            results[position] = result_dict
+        return results
+
+    def _run_plan(self, context: 'RuleContext', plan: List[Tuple[str, Optional[BaseRule]]],
+                  progress: Optional[ProgressCallback] = None,
+                  cancel_token: Optional[CancellationToken] = None,
+                  recorder: Optional[Instrumentation] = None) -> List[Dict[str, Any]]:
+        """
+        按顺序执行规则计划
+        相邻的、实现了访问者钩子的规则合并为一组，只遍历一次文档；
+        其余规则仍然单独调用 apply()，调用前先应用已有的补丁，
+        保证直接读取 XML 的规则看到之前规则的修改。
+        每个规则（或融合遍历组）开始前检查取消标记。
+        """
+        results = []
+        group: List[BaseRule] = []
+
+        def check_cancelled():
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+
+        def flush_group():
+            if group:
+                check_cancelled()
+                results.extend(self._run_traversal_group(context, group, len(results), len(plan),
+                                                         progress, cancel_token, recorder))
+                group.clear()
+
+        for rule_id, rule in plan:
+            if rule is None:
+                # 无效规则ID，添加失败结果
+                flush_group()
+                results.append(self._error_result(rule_id, f"规则ID不存在: {rule_id}"))
+            elif self.fused_traversal and rule.supports_traversal():
+                group.append(rule)
+            else:
+                flush_group()
+                check_cancelled()
+                with stage(recorder, "apply_patches"):
+                    context.flush_patches()
+                self._report_rules(progress, [rule_id], len(results), len(plan))
+                # 单独执行的规则无法统计访问的节点数
+                metrics = dict(empty_metrics(), nodes_visited=None) if recorder is not None else None
+                try:
+                    with measure(recorder, metrics):
+                        result_dict = self._result_to_dict(rule.apply(context))
+                except Exception as e:
+                    result_dict = self._error_result(rule_id, f"执行失败: {str(e)}")
+                if metrics is not None:
+                    result_dict["metrics"] = metrics
+                results.append(result_dict)
+        flush_group()
+        return results
+
+    def _run_traversal_group(self, context: 'RuleContext', rules: List[BaseRule], completed: int = 0,
+                             total: Optional[int] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             cancel_token: Optional[CancellationToken] = None,
+                             recorder: Optional[Instrumentation] = None) -> List[Dict[str, Any]]:
+        """对一组规则执行融合遍历，遍历过程中也会响应取消"""
+        on_node = self._node_callback([rule.rule_id for rule in rules], completed, total or len(rules),
+                                      progress, cancel_token)
+        traversal = DocumentTraversal(context, rules, on_node, instrument=recorder is not None)
+        group_metrics: Dict[str, Any] = {}
+        with measure(recorder, group_metrics):
+            results = self._outcome_results(traversal.run())
+
+        if recorder is not None:
+            for result_dict, metrics in zip(results, traversal.metrics):
+                # 同组规则交替处理节点，内存峰值只能按组统计
+                if "memory_peak_kb" in group_metrics:
+                    metrics["memory_peak_kb"] = group_metrics["memory_peak_kb"]
+                result_dict["metrics"] = metrics
+        return results
+
+    def _node_callback(self, rule_ids: List[str], completed: int, total: int,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_token: Optional[CancellationToken] = None):
+        """构建遍历的进度回调，同时响应取消；无需回调时返回 None"""
+        if progress is None and cancel_token is None:
+            return None
+        self._report_rules(progress, rule_ids, completed, total)
+
+        def on_node(processed: int, node_total: int):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            self._report_rules(progress, rule_ids, completed, total, processed, node_total)
+
+        return on_node
+
+    def _outcome_results(self, outcomes) -> List[Dict[str, Any]]:
+        """把遍历的 (规则, 结果, 异常) 列表转换为结果字典"""
+        results = []
+        for rule, result, error in outcomes:
+            if error is not None:
+                results.append(self._error_result(rule.rule_id, f"执行失败: {str(error)}"))
+            else:
+                results.append(self._result_to_dict(result))
+        return results
+
+    @staticmethod
+    def _report_rules(progress: Optional[ProgressCallback], rule_ids: List[str], completed: int,
+                      total: int, nodes_processed: int = 0, node_total: int = 0):
+        """
+        报告规则执行进度
+        :param rule_ids: 正在执行的规则；融合遍历时为同组的全部规则
+        :param completed: 之前已完成的规则数
+        """
+        if progress is None:
+            return
+        fraction = nodes_processed / node_total if node_total else 0.0
+        report_progress(
+            progress,
+            stage="rules",
+            rule_id=rule_ids[0],
+            rule_ids=rule_ids,
+            rule_index=completed + 1,
+            rule_total=total,
+            nodes_processed=nodes_processed,
+            node_total=node_total,
+            percent=(completed + fraction * len(rule_ids)) / total * 100 if total else 100,
+        )
+
+    @staticmethod
+    def _result_to_dict(result: RuleResult) -> Dict[str, Any]:
+        """直接构建结果字典，避免使用dict()方法"""
+        return {
+            "rule_id": result.rule_id,
+            "success": result.success,
+            "fixed_count": result.fixed_count,
+            "details": result.details
+        }
+
+    @staticmethod
+    def _error_result(rule_id: str, message: str) -> Dict[str, Any]:
+        """构建失败结果"""
+        return {
+            "rule_id": rule_id,
+            "success": False,
+            "fixed_count": 0,
+            "details": [message]
+        }
+
     def get_rules_info(self) -> List[Dict[str, Any]]:
         """获取所有规则信息"""
-        return [rule.get_metadata() for rule in self.rules.values()]
+        return [self.rules.metadata(rule_id) for rule_id in self.rules]
 
     def get_rule_by_id(self, rule_id: str) -> BaseRule:
         """
@@ -0,0 +1,19 @@
+"""
+文件内容哈希
+
+处理结果缓存（services.result_cache）和已解析文档缓存（core.document_cache）
+都按文件内容的 sha256 查找条目。
+"""
+
+import hashlib
+
+_READ_CHUNK = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,91 @@
+"""
+执行度量
+
+开启 instrumentation 时，引擎记录每个规则的墙钟时间、CPU 时间、访问和修改的
+节点数，以及文档加载、补丁应用和保存各阶段的耗时；trace_memory 开启时
+还用 tracemalloc 记录各阶段的内存峰值。关闭时引擎不创建 Instrumentation，
+只多一次 None 判断。
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Optional
+
+
+def empty_metrics() -> Dict[str, Any]:
+    """一组度量的初始值"""
+    return {"wall_time_ms": 0.0, "cpu_time_ms": 0.0}
+
+
+def round_metrics(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """时间保留三位小数，便于序列化和阅读"""
+    return {key: round(value, 3) if isinstance(value, float) else value
+            for key, value in metrics.items()}
+
+
+class Instrumentation:
+    """收集一次执行中各阶段和规则的度量"""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._started_tracing = False
+
+    def __enter__(self) -> 'Instrumentation':
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def measure(self, metrics: Dict[str, Any]):
+        """
+        度量一段代码，结果累加到 metrics
+        内存峰值为这段代码执行期间相对开始时的最大增量（KB），多次度量取最大值
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield metrics
+        finally:
+            metrics["wall_time_ms"] = metrics.get("wall_time_ms", 0.0) + (time.perf_counter() - wall_start) * 1000
+            metrics["cpu_time_ms"] = metrics.get("cpu_time_ms", 0.0) + (time.process_time() - cpu_start) * 1000
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                metrics["memory_peak_kb"] = max(metrics.get("memory_peak_kb", 0.0), (peak - base) / 1024)
+
+    def stage(self, name: str):
+        """度量一个执行阶段，如 load、apply_patches、save"""
+        return self.measure(self.stages.setdefault(name, empty_metrics()))
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段的度量"""
+        return {name: round_metrics(metrics) for name, metrics in self.stages.items()}
+
+
+def measure(instrumentation: Optional[Instrumentation], metrics: Dict[str, Any]):
+    """未开启度量时返回空上下文"""
+    return instrumentation.measure(metrics) if instrumentation is not None else nullcontext()
+
+
+def stage(instrumentation: Optional[Instrumentation], name: str):
+    """未开启度量时返回空上下文"""
+    return instrumentation.stage(name) if instrumentation is not None else nullcontext()
+
+
+def count_changed_nodes(changes: Iterable) -> Dict[Optional[str], int]:
+    """按规则统计实际发生变化的节点（元素）数"""
+    nodes: Dict[Optional[str], set] = {}
+    for change in changes:
+        nodes.setdefault(change.rule_id, set()).add(change.element)
+    return {rule_id: len(elements) for rule_id, elements in nodes.items()}
@@ -0,0 +1,160 @@
+"""
+延迟加载非 XML 部件
+
+python-docx 打开文档时会把包中的每个部件读入内存，包括图片、OLE 对象、
+嵌入字体等二进制部件，而规则只处理 XML。这里按 python-docx 的流程打开
+文档，但二进制部件只记录为指向源 zip 成员的引用，首次访问 part.blob 时
+才读取。保存时未读取过的部件由 core.package_writer 直接从源文件复制，
+内存占用只与 XML 的大小有关。
+
+延迟读取依赖源文件保持不变：源文件在加载后被其它程序修改时，读取会抛出
+IOError，而不是悄悄读到新的内容。
+"""
+
+import os
+import zipfile
+from typing import Dict, Optional, Tuple
+
+from docx.document import Document as DocumentObject
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.package import PartFactory, Unmarshaller
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import Part
+from docx.opc.pkgreader import PackageReader, _ContentTypeMap
+from docx.package import Package
+
+
+def source_signature(path: str) -> Optional[Tuple[int, int]]:
+    """记录源文件的大小和修改时间，据此判断源文件是否仍是加载时的版本"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class LazySource:
+    """延迟部件共享的源文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signature = source_signature(path)
+
+    def read(self, membername: str) -> bytes:
+        """读取源 zip 中的成员"""
+        if source_signature(self.path) != self.signature:
+            raise IOError(f"源文件在加载后被修改，无法读取 {membername}")
+        with zipfile.ZipFile(self.path) as zf:
+            return zf.read(membername)
+
+    def rebind(self, path: str):
+        """保存后指向新文件；新文件中的同名成员内容与原来相同"""
+        self.path = path
+        self.signature = source_signature(path)
+
+
+class LazyMember:
+    """尚未读取的部件内容"""
+
+    def __init__(self, source: LazySource, membername: str):
+        self.source = source
+        self.membername = membername
+
+    def read(self) -> bytes:
+        return self.source.read(self.membername)
+
+
+class LazyPartMixin:
+    """首次访问 blob 时才从源文件读取内容的部件"""
+
+    @property
+    def blob(self) -> bytes:
+        if isinstance(self._blob, LazyMember):
+            self._blob = self._blob.read()
+        return self._blob or b""
+
+    @property
+    def blob_loaded(self) -> bool:
+        """内容是否已读入内存"""
+        return not isinstance(self._blob, LazyMember)
+
+
+_LAZY_CLASSES: Dict[type, type] = {}
+
+
+def _lazy_class(part_class: type) -> type:
+    """为部件类生成带延迟读取的子类"""
+    lazy_class = _LAZY_CLASSES.get(part_class)
+    if lazy_class is None:
+        lazy_class = type(f"Lazy{part_class.__name__}", (LazyPartMixin, part_class), {})
+        _LAZY_CLASSES[part_class] = lazy_class
+    return lazy_class
+
+
+def is_lazy(content_type: str) -> bool:
+    """XML 部件需要解析，其余（图片、OLE 对象、字体等）延迟读取"""
+    return not content_type.endswith('xml')
+
+
+class _LazyZipReader:
+    """与 python-docx 的 zip 读取器接口相同，二进制部件返回 LazyMember"""
+
+    def __init__(self, path: str):
+        self._zipf = zipfile.ZipFile(path, 'r')
+        self.source = LazySource(path)
+        self.content_types = _ContentTypeMap.from_xml(self.content_types_xml)
+
+    def blob_for(self, pack_uri):
+        if pack_uri != CONTENT_TYPES_URI and not pack_uri.endswith('.rels'):
+            try:
+                content_type = self.content_types[pack_uri]
+            except KeyError:
+                content_type = None
+            if content_type is not None and is_lazy(content_type):
+                # 确认成员存在，缺失时与 python-docx 一样抛出 KeyError
+                self._zipf.getinfo(pack_uri.membername)
+                return LazyMember(self.source, pack_uri.membername)
+        return self._zipf.read(pack_uri.membername)
+
+    @property
+    def content_types_xml(self):
+        return self.blob_for(CONTENT_TYPES_URI)
+
+    def rels_xml_for(self, source_uri):
+        try:
+            return self.blob_for(source_uri.rels_uri)
+        except KeyError:
+            return None
+
+    def close(self):
+        self._zipf.close()
+
+
+def open_document(path: str) -> Tuple[DocumentObject, LazySource]:
+    """
+    打开文档，二进制部件延迟读取
+    :return: (文档对象, 延迟部件共享的源文件)
+    """
+    reader = _LazyZipReader(path)
+    try:
+        pkg_srels = PackageReader._srels_for(reader, PACKAGE_URI)
+        sparts = PackageReader._load_serialized_parts(reader, pkg_srels, reader.content_types)
+    finally:
+        reader.close()
+
+    package = Package()
+    Unmarshaller.unmarshal(PackageReader(reader.content_types, pkg_srels, sparts), package, PartFactory)
+    for part in package.iter_parts():
+        if isinstance(getattr(part, "_blob", None), LazyMember):
+            part.__class__ = _lazy_class(type(part))
+
+    document_part = package.main_document_part
+    if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+        raise ValueError(f"file '{path}' is not a Word file, content type is '{document_part.content_type}'")
+    return document_part.document, reader.source
+
+
+def unloaded_member(part: Part) -> Optional[str]:
+    """部件尚未读入内存时返回其在源文件中的成员名"""
+    blob = getattr(part, '_blob', None)
+    return blob.membername if isinstance(blob, LazyMember) else None
@@ -0,0 +1,87 @@
+"""
+内存缓存
+
+按条目数和估算的总字节数限制容量，超出时按最近最少使用淘汰。
+多个线程（交互模式的执行线程、后台进程的连接线程）可以同时读写。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+
+class MemoryCache:
+    """线程安全的内存 LRU 缓存"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        """
+        :param max_entries: 最多保留的条目数，为 0 时不缓存
+        :param max_bytes: 条目估算大小之和的上限，为 0 时不缓存
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取条目并标记为最近使用，不存在时返回 None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> bool:
+        """
+        写入条目，替换同名条目，必要时淘汰最久未使用的条目
+        :param size: 条目的估算字节数
+        :return: 单个条目超过容量上限时不缓存，返回 False
+        """
+        if not self.enabled or size > self.max_bytes:
+            return False
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """删除并返回条目，不存在时返回 None"""
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        """全部键，从最久未使用到最近使用"""
+        with self._lock:
+            return list(self._entries)
+
+    def _remove(self, key: Hashable) -> Optional[Any]:
+        value = self._entries.pop(key, None)
+        self._total_bytes -= self._sizes.pop(key, 0)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,307 @@
+"""
+增量保存 .docx 包
+
+python-docx 的 Document.save 会重新序列化并重新压缩包中的每个部件，
+包括规则从不修改的 word/media/* 图片。这里按照 python-docx 的写入顺序
+逐个生成部件，延迟加载后从未读取的部件（见 core.lazy_package）以及内容
+与源文件中对应成员相同（CRC 与长度一致）的部件直接
+复制源文件中已压缩的字节，不解压也不重新压缩；只有被修改的部件
+（通常是 document.xml、styles.xml、numbering.xml 及内容类型、关系部件）
+重新压缩写入。
+
+输出先写入目标目录下的临时文件，完成后原子替换目标文件。
+stream_package 供流式引擎（core.streaming）使用：正文部件边生成边压缩写入，
+其余成员原样复制。
+不满足增量条件时（源文件已变化、需要 Zip64 等）退回 Document.save。
+"""
+
+import os
+import stat
+import struct
+import time
+import uuid
+import zipfile
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from docx.opc.packuri import PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+from core.lazy_package import source_signature, unloaded_member
+
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+_END_RECORD = struct.Struct('<4s4H2LH')
+_LOCAL_SIGNATURE = b'PK\x03\x04'
+_CENTRAL_SIGNATURE = b'PK\x01\x02'
+_END_SIGNATURE = b'PK\x05\x06'
+
+# 不支持 Zip64，超过限制时退回 Document.save
+_ZIP_LIMIT = 0xFFFFFFFF
+_ZIP_COUNT_LIMIT = 0xFFFF
+
+# 本地文件头中的数据描述符标志；复制时已知 CRC 和长度，不再使用数据描述符
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_COPY_CHUNK = 1024 * 1024
+# 本地文件头中 CRC 字段的偏移，其后依次为压缩后和压缩前的长度
+_CRC_OFFSET = 14
+
+
+class IncrementalSaveUnsupported(Exception):
+    """当前包无法增量保存"""
+
+
+class _DeflateSink:
+    """边写边压缩的输出流，记录 CRC 和压缩前后的长度"""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+
+    def write(self, data: bytes):
+        self.crc = zlib.crc32(data, self.crc)
+        self.file_size += len(data)
+        self._emit(self._compressor.compress(data))
+
+    def close(self):
+        self._emit(self._compressor.flush())
+
+    def _emit(self, compressed: bytes):
+        if compressed:
+            self.fp.write(compressed)
+            self.compress_size += len(compressed)
+
+
+class _ZipWriter:
+    """只追加的 zip 写入器，支持复制源文件中已压缩的成员"""
+
+    def __init__(self, fp, source: Optional[zipfile.ZipFile], source_fp):
+        self.fp = fp
+        self.source = source
+        self.source_fp = source_fp
+        self.entries = []  # (name, flags, method, dos_time, dos_date, crc, csize, usize, offset)
+        self.copied = 0
+        self.written = 0
+
+    def _check_limits(self, *values: int):
+        if any(value >= _ZIP_LIMIT for value in values) or len(self.entries) >= _ZIP_COUNT_LIMIT:
+            raise IncrementalSaveUnsupported("需要 Zip64")
+
+    def _write_entry(self, name: str, flags: int, method: int, dos_time: int, dos_date: int,
+                     crc: int, csize: int, usize: int):
+        encoded = name.encode('utf-8')
+        if not name.isascii():
+            flags |= _FLAG_UTF8
+        offset = self.fp.tell()
+        self._check_limits(offset, csize, usize)
+        self.fp.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, 20, 0, flags, method, dos_time, dos_date,
+                                         crc, csize, usize, len(encoded), 0))
+        self.fp.write(encoded)
+        self.entries.append((encoded, flags, method, dos_time, dos_date, crc, csize, usize, offset))
+
+    def source_member(self, name: str) -> Optional[zipfile.ZipInfo]:
+        """源文件中的同名成员，可直接复制时返回"""
+        if self.source is None:
+            return None
+        try:
+            info = self.source.getinfo(name)
+        except KeyError:
+            return None
+        if info.flag_bits & 0x01 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            # 加密或使用了其它压缩算法的成员重新写入
+            return None
+        return info
+
+    def copy(self, info: zipfile.ZipInfo, name: Optional[str] = None):
+        """复制源文件中的成员，不解压；name 为输出中的成员名，默认与源成员相同"""
+        self.source_fp.seek(info.header_offset)
+        header = self.source_fp.read(_LOCAL_HEADER.size)
+        if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_SIGNATURE:
+            raise IncrementalSaveUnsupported(f"源文件成员头损坏: {info.filename}")
+        fields = _LOCAL_HEADER.unpack(header)
+        self.source_fp.seek(fields[10] + fields[11], os.SEEK_CUR)
+
+        dos_date = (info.date_time[0] - 1980) << 9 | info.date_time[1] << 5 | info.date_time[2]
+        dos_time = info.date_time[3] << 11 | info.date_time[4] << 5 | info.date_time[5] // 2
+        flags = info.flag_bits & ~(_FLAG_DATA_DESCRIPTOR | _FLAG_UTF8)
+        self._write_entry(name or info.filename, flags, info.compress_type, dos_time, dos_date,
+                          info.CRC, info.compress_size, info.file_size)
+
+        remaining = info.compress_size
+        while remaining:
+            chunk = self.source_fp.read(min(remaining, _COPY_CHUNK))
+            if not chunk:
+                raise IncrementalSaveUnsupported(f"源文件成员不完整: {info.filename}")
+            self.fp.write(chunk)
+            remaining -= len(chunk)
+        self.copied += 1
+
+    def write(self, name: str, data: bytes):
+        """压缩写入新的成员"""
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        now = time.localtime()
+        dos_date = (now.tm_year - 1980) << 9 | now.tm_mon << 5 | now.tm_mday
+        dos_time = now.tm_hour << 11 | now.tm_min << 5 | now.tm_sec // 2
+        self._write_entry(name, 0, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                          zlib.crc32(data), len(compressed), len(data))
+        self.fp.write(compressed)
+        self.written += 1
+
+    def write_stream(self, name: str, produce: Callable[[Any], None]):
+        """
+        流式压缩写入新的成员：produce(sink) 分块调用 sink.write(bytes)
+        先写入占位的本地文件头，写完后回填 CRC 和长度，内容不在内存中完整保留
+        """
+        now = time.localtime()
+        dos_date = (now.tm_year - 1980) << 9 | now.tm_mon << 5 | now.tm_mday
+        dos_time = now.tm_hour << 11 | now.tm_min << 5 | now.tm_sec // 2
+        self._write_entry(name, 0, zipfile.ZIP_DEFLATED, dos_time, dos_date, 0, 0, 0)
+        entry = self.entries[-1]
+
+        sink = _DeflateSink(self.fp)
+        produce(sink)
+        sink.close()
+        self._check_limits(sink.compress_size, sink.file_size)
+
+        end = self.fp.tell()
+        self.fp.seek(entry[8] + _CRC_OFFSET)
+        self.fp.write(struct.pack('<3L', sink.crc, sink.compress_size, sink.file_size))
+        self.fp.seek(end)
+        self.entries[-1] = entry[:5] + (sink.crc, sink.compress_size, sink.file_size, entry[8])
+        self.written += 1
+
+    def write_blob(self, name: str, data: bytes):
+        """写入部件内容；与源文件中的成员相同时直接复制"""
+        info = self.source_member(name)
+        if info is not None and info.file_size == len(data) and info.CRC == zlib.crc32(data):
+            self.copy(info)
+        else:
+            self.write(name, data)
+
+    def close(self):
+        """写入中央目录"""
+        start = self.fp.tell()
+        for encoded, flags, method, dos_time, dos_date, crc, csize, usize, offset in self.entries:
+            self.fp.write(_CENTRAL_HEADER.pack(_CENTRAL_SIGNATURE, 20, 0, 20, 0, flags, method,
+                                               dos_time, dos_date, crc, csize, usize,
+                                               len(encoded), 0, 0, 0, 0, 0, offset))
+            self.fp.write(encoded)
+        size = self.fp.tell() - start
+        self._check_limits(start, size)
+        self.fp.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, len(self.entries), len(self.entries),
+                                       size, start, 0))
+
+
+def _write_package(document, fp, source_path: Optional[str]) -> Tuple[int, int]:
+    """按 python-docx PackageWriter 的顺序写出整个包，返回 (复制数, 重新写入数)"""
+    package = document.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    source = zipfile.ZipFile(source_path) if source_path else None
+    source_fp = open(source_path, 'rb') if source_path else None
+    try:
+        writer = _ZipWriter(fp, source, source_fp)
+        writer.write_blob('[Content_Types].xml', _ContentTypesItem.from_parts(parts).blob)
+        writer.write_blob(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            member = unloaded_member(part)
+            info = writer.source_member(member) if member else None
+            if info is not None:
+                # 延迟加载且从未读取的部件，内容必然未变
+                writer.copy(info, part.partname.membername)
+            else:
+                writer.write_blob(part.partname.membername, part.blob)
+            if len(part.rels):
+                writer.write_blob(part.partname.rels_uri.membername, part.rels.xml)
+        writer.close()
+        return writer.copied, writer.written
+    finally:
+        if source is not None:
+            source.close()
+            source_fp.close()
+
+
+def _create_temp_file(target_path: str) -> Tuple[int, str]:
+    """在目标目录下创建临时文件；权限与普通新建文件一致（受 umask 影响）"""
+    directory = os.path.dirname(os.path.abspath(target_path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_path = os.path.join(directory, f".~{os.path.basename(target_path)}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            return os.open(temp_path, flags, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def _keep_mode(temp_path: str, target_path: str):
+    """替换已有文件时沿用其权限"""
+    try:
+        os.chmod(temp_path, stat.S_IMODE(os.stat(target_path).st_mode))
+    except OSError:
+        pass
+
+
+def stream_package(source_path: str, target_path: str, member: str,
+                   produce: Callable[[Any], None]) -> Dict[str, Any]:
+    """
+    流式生成包：member 成员由 produce(sink) 边生成边压缩写入，
+    其余成员按源文件中的顺序原样复制，写入临时文件后原子替换目标文件
+    :return: 复制、重新写入的部件数
+    """
+    fd, temp_path = _create_temp_file(target_path)
+    try:
+        with os.fdopen(fd, 'wb') as fp, zipfile.ZipFile(source_path) as source, \
+                open(source_path, 'rb') as source_fp:
+            writer = _ZipWriter(fp, source, source_fp)
+            for info in source.infolist():
+                if info.filename == member:
+                    writer.write_stream(member, produce)
+                elif writer.source_member(info.filename) is not None:
+                    writer.copy(info)
+                else:
+                    writer.write(info.filename, source.read(info))
+            writer.close()
+        _keep_mode(temp_path, target_path)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"mode": "streaming", "copied": writer.copied, "written": writer.written}
+
+
+def save_package(document, target_path: str, source_path: Optional[str] = None,
+                 signature: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """
+    保存文档：未修改的部件从源文件原样复制，写入临时文件后原子替换
+    :param source_path: 加载文档时的源文件
+    :param signature: 加载时 source_signature() 的返回值，源文件已变化时不从中复制
+    :return: 保存方式及复制、重新写入的部件数
+    """
+    if source_path and (signature is None or source_signature(source_path) != signature):
+        source_path = None
+
+    fd, temp_path = _create_temp_file(target_path)
+    try:
+        mode = 'incremental' if source_path else 'full'
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                copied, written = _write_package(document, fp, source_path)
+        except (IncrementalSaveUnsupported, zipfile.BadZipFile, OSError):
+            mode = 'full'
+            document.save(temp_path)
+            copied, written = 0, len(list(document.part.package.iter_parts()))
+        _keep_mode(temp_path, target_path)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"mode": mode, "copied": copied, "written": written}
@@ -0,0 +1,292 @@
+"""
+属性补丁集
+
+规则不直接修改 XML，而是把写操作记录为以 (元素, 属性) 为键的补丁。
+同一属性的多次写入按执行顺序合并，后写者覆盖先写者；应用时跳过与文档
+当前值相同的写入（按 XML 中保存的精度比较，见 PropertySpec.equal），只修改
+真正变化的属性。应用结果保留新旧值，可用于预演（dry-run）、撤销和差异展示，
+无需重新解析文档。
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from docx.enum.text import WD_LINE_SPACING
+from docx.oxml.ns import qn
+from docx.section import Section
+from docx.shared import Length
+from docx.table import _Cell
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+
+# 1 twip（1/20 磅）对应的 EMU 数
+EMU_PER_TWIP = 635
+
+
+def normalize_length(value: Any) -> Any:
+    """
+    长度按 twips 取整后比较，其它值原样比较
+    段落间距、缩进和页面尺寸在 XML 中以 twips 保存，Cm/Inches 等换算出的 EMU
+    写入后读回会有舍入误差（如 Cm(21) 读回为 7560310 而不是 7560000）
+    """
+    if isinstance(value, Length):
+        return round(value / EMU_PER_TWIP)
+    return value
+
+
+def _normalize_line_spacing_rule(value: Any) -> Any:
+    # 单倍、1.5 倍、双倍和多倍行距在 XML 中都是 lineRule="auto"，python-docx
+    # 按行距数值读回其中之一，倍数本身由 line_spacing 比较
+    if value in (WD_LINE_SPACING.SINGLE, WD_LINE_SPACING.ONE_POINT_FIVE, WD_LINE_SPACING.DOUBLE):
+        return WD_LINE_SPACING.MULTIPLE
+    return value
+
+
+def _normalize_line_spacing(value: Any) -> Any:
+    # 多倍行距在 XML 中以 1/240 行保存
+    if isinstance(value, float):
+        return ('lines', round(value * 240))
+    return normalize_length(value)
+
+
+class PropertySpec:
+    """可补丁属性的定义：在 XML 元素上读取和写入属性值"""
+
+    def __init__(self, name: str, getter: Callable[[Any], Any], setter: Callable[[Any, Any], None],
+                 normalize: Callable[[Any], Any] = normalize_length):
+        self.name = name
+        self.get = getter
+        self.set = setter
+        self.normalize = normalize
+
+    def equal(self, a: Any, b: Any) -> bool:
+        """两个取值写入文档后是否相同（按 XML 中保存的精度比较）"""
+        return self.normalize(a) == self.normalize(b)
+
+
+PROPERTIES: Dict[str, PropertySpec] = {}
+
+
+def register_property(name: str, getter: Callable[[Any], Any], setter: Callable[[Any, Any], None],
+                      normalize: Callable[[Any], Any] = normalize_length):
+    """注册一个可补丁属性"""
+    PROPERTIES[name] = PropertySpec(name, getter, setter, normalize)
+
+
+def _run_font_name(r):
+    rPr = r.rPr
+    if rPr is None:
+        return None
+    # python-docx 设置字体时同时写入 ascii 和 hAnsi，两者不一致时视为未统一
+    ascii_font = rPr.rFonts_ascii
+    return ascii_font if ascii_font == rPr.rFonts_hAnsi else None
+
+
+def _run_east_asia_font(r):
+    rPr = r.rPr
+    if rPr is None or rPr.rFonts is None:
+        return None
+    return rPr.rFonts.get(qn('w:eastAsia'))
+
+
+def _set_run_east_asia_font(r, value):
+    if value is None:
+        rPr = r.rPr
+        if rPr is not None and rPr.rFonts is not None:
+            rPr.rFonts.attrib.pop(qn('w:eastAsia'), None)
+        return
+    r.get_or_add_rPr().get_or_add_rFonts().set(qn('w:eastAsia'), value)
+
+
+def _run_font_property(attr: str):
+    def getter(r):
+        return getattr(Run(r, None).font, attr)
+
+    def setter(r, value):
+        setattr(Run(r, None).font, attr, value)
+
+    return getter, setter
+
+
+def _paragraph_format_property(attr: str):
+    def getter(p):
+        return getattr(Paragraph(p, None).paragraph_format, attr)
+
+    def setter(p, value):
+        setattr(Paragraph(p, None).paragraph_format, attr, value)
+
+    return getter, setter
+
+
+def _section_property(attr: str):
+    def getter(sectPr):
+        return getattr(Section(sectPr, None), attr)
+
+    def setter(sectPr, value):
+        setattr(Section(sectPr, None), attr, value)
+
+    return getter, setter
+
+
+register_property(
+    'run.font_name', _run_font_name,
+    lambda r, value: setattr(Run(r, None).font, 'name', value),
+)
+register_property('run.east_asia_font', _run_east_asia_font, _set_run_east_asia_font)
+register_property(
+    'run.color',
+    lambda r: Run(r, None).font.color.rgb,
+    lambda r, value: setattr(Run(r, None).font.color, 'rgb', value),
+)
+register_property('run.size', *_run_font_property('size'))
+register_property('run.bold', *_run_font_property('bold'))
+
+for _attr in ('alignment', 'left_indent', 'right_indent', 'first_line_indent',
+              'space_before', 'space_after'):
+    register_property('paragraph.' + _attr, *_paragraph_format_property(_attr))
+register_property('paragraph.line_spacing_rule', *_paragraph_format_property('line_spacing_rule'),
+                  normalize=_normalize_line_spacing_rule)
+register_property('paragraph.line_spacing', *_paragraph_format_property('line_spacing'),
+                  normalize=_normalize_line_spacing)
+
+for _attr in ('page_width', 'page_height', 'top_margin', 'bottom_margin',
+              'left_margin', 'right_margin'):
+    register_property('section.' + _attr, *_section_property(_attr))
+
+register_property(
+    'cell.vertical_alignment',
+    lambda tc: _Cell(tc, None).vertical_alignment,
+    lambda tc, value: setattr(_Cell(tc, None), 'vertical_alignment', value),
+)
+
+
+def element_of(node):
+    """取得 python-docx 代理对象对应的 XML 元素；传入元素时原样返回"""
+    element = getattr(node, '_element', None)
+    if element is None:
+        element = getattr(node, '_sectPr', None)
+    return element if element is not None else node
+
+
+class PropertyPatch:
+    """一条待应用的属性写入"""
+
+    def __init__(self, element, prop: str, value: Any, rule_id: Optional[str]):
+        self.element = element
+        self.prop = prop
+        self.value = value
+        self.rule_id = rule_id  # 最后写入该属性的规则
+        self.superseded: List[str] = []  # 被覆盖的先前写入者
+
+
+class PropertyChange:
+    """一条已确定的属性变化（旧值 -> 新值）"""
+
+    def __init__(self, element, prop: str, old_value: Any, new_value: Any, rule_id: Optional[str]):
+        self.element = element
+        self.prop = prop
+        self.old_value = old_value
+        self.new_value = new_value
+        self.rule_id = rule_id
+
+    def dict(self) -> Dict[str, Any]:
+        """返回可序列化的字典表示"""
+        return {
+            "property": self.prop,
+            "element": self.element.tag.split('}')[-1],
+            "old_value": describe_value(self.old_value),
+            "new_value": describe_value(self.new_value),
+            "rule_id": self.rule_id,
+        }
+
+
+def describe_value(value: Any):
+    """把属性值转换为可序列化的形式"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class PatchSet:
+    """补丁集 - 以 (元素, 属性) 为键合并写入，一次性应用"""
+
+    def __init__(self):
+        self._patches: Dict[Tuple[Any, str], PropertyPatch] = {}
+        self.write_count = 0  # 规则发出的写入总数（含被覆盖的写入）
+        self.writers: Set[str] = set()  # 发出过写入的规则
+
+    def __len__(self) -> int:
+        return len(self._patches)
+
+    def __bool__(self) -> bool:
+        return bool(self._patches)
+
+    def set(self, node, prop: str, value: Any, rule_id: Optional[str] = None):
+        """
+        记录一次属性写入，同一属性的后续写入覆盖先前的值
+        :param node: python-docx 代理对象或 XML 元素
+        :param prop: 已注册的属性名，如 'run.color'
+        """
+        if prop not in PROPERTIES:
+            raise KeyError(f"未注册的属性: {prop}")
+        element = element_of(node)
+        key = (element, prop)
+        self.write_count += 1
+        if rule_id is not None:
+            self.writers.add(rule_id)
+        patch = self._patches.get(key)
+        if patch is None:
+            self._patches[key] = PropertyPatch(element, prop, value, rule_id)
+        else:
+            if patch.rule_id != rule_id:
+                patch.superseded.append(patch.rule_id)
+            patch.value = value
+            patch.rule_id = rule_id
+
+    def get(self, node, prop: str) -> Any:
+        """读取属性值：有待应用的写入时返回写入值，否则返回文档中的当前值"""
+        element = element_of(node)
+        patch = self._patches.get((element, prop))
+        if patch is not None:
+            return patch.value
+        return PROPERTIES[prop].get(element)
+
+    def preview(self) -> List[PropertyChange]:
+        """不修改文档，返回应用后会产生的变化（dry-run）"""
+        changes = []
+        for patch in self._patches.values():
+            spec = PROPERTIES[patch.prop]
+            old_value = spec.get(patch.element)
+            if not spec.equal(old_value, patch.value):
+                changes.append(PropertyChange(patch.element, patch.prop, old_value,
+                                              patch.value, patch.rule_id))
+        return changes
+
+    def apply(self) -> List[PropertyChange]:
+        """
+        按首次写入的顺序应用补丁并清空补丁集，跳过与当前值相同的写入
+        :return: 实际发生的变化，可传给 undo() 撤销
+        """
+        changes = []
+        for patch in self._patches.values():
+            spec = PROPERTIES[patch.prop]
+            old_value = spec.get(patch.element)
+            if spec.equal(old_value, patch.value):
+                continue
+            spec.set(patch.element, patch.value)
+            changes.append(PropertyChange(patch.element, patch.prop, old_value,
+                                          patch.value, patch.rule_id))
+        self.clear()
+        return changes
+
+    def clear(self):
+        """丢弃所有未应用的补丁"""
+        self._patches.clear()
+        self.write_count = 0
+        self.writers.clear()
+
+    @staticmethod
+    def undo(changes: List[PropertyChange]):
+        """按相反顺序恢复变化前的值"""
+        for change in reversed(changes):
+            PROPERTIES[change.prop].set(change.element, change.old_value)
@@ -0,0 +1,50 @@
+"""
+进度上报
+
+引擎和服务在执行过程中以字典形式调用 progress(payload) 报告进度。
+ProgressReporter 负责节流：两次输出之间至少间隔 min_interval 秒，
+期间被跳过的最新进度在 flush() 时补发，保证前端能看到最终状态。
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class ProgressReporter:
+    """节流的进度回调"""
+
+    def __init__(self, emit: ProgressCallback, min_interval: float = 0.2):
+        self._emit = emit
+        self.min_interval = min_interval
+        self._last_emit_time: Optional[float] = None
+        self._pending: Optional[Dict[str, Any]] = None
+
+    def __call__(self, payload: Dict[str, Any]):
+        self.report(payload)
+
+    def report(self, payload: Dict[str, Any], force: bool = False):
+        """报告进度；距上次输出不足 min_interval 时只记录，不输出"""
+        now = time.monotonic()
+        if (force or self._last_emit_time is None
+                or now - self._last_emit_time >= self.min_interval):
+            self._pending = None
+            self._last_emit_time = now
+            self._emit(payload)
+        else:
+            self._pending = payload
+
+    def flush(self):
+        """输出被节流跳过的最新进度"""
+        if self._pending is not None:
+            self.report(self._pending, force=True)
+
+
+def report_progress(progress: Optional[ProgressCallback], **payload):
+    """progress 为 None 时忽略；百分比保留一位小数"""
+    if progress is None:
+        return
+    if 'percent' in payload:
+        payload['percent'] = round(min(max(payload['percent'], 0.0), 100.0), 1)
+    progress(payload)
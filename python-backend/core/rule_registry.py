@@ -0,0 +1,197 @@
+"""
+规则注册表
+
+rules/manifest.json 记录每个规则的 ID、所在模块和类名，以及默认配置下的
+元数据（显示名称、类别、参数 Schema 等）。引擎启动时只读取清单，规则模块
+在规则第一次被使用时才导入；获取规则列表直接返回清单中的元数据，不导入
+任何规则模块或 python-docx。
+
+清单按规则源文件的摘要校验，源文件增删或修改后清单失效，引擎退回到扫描
+rules 目录并导入全部模块的方式。修改规则后重新生成清单：
+    python -m core.rule_registry
+打包后的程序（sys.frozen）中规则源文件不会再修改，启动时不校验摘要。
+"""
+
+import copy
+import hashlib
+import importlib
+import json
+import os
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+MANIFEST_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def rules_directory() -> str:
+    """rules 目录；打包后位于可执行文件所在目录"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+        # 确保可以导入 rules 包
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, 'rules')
+
+
+def rule_modules(rules_dir: str) -> Dict[str, str]:
+    """rules 目录下的规则模块，模块路径 -> 文件路径"""
+    modules = {}
+    for root, dirs, files in os.walk(rules_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.py') and not file.startswith('__init__') and not file.startswith('base_rule'):
+                relative_path = os.path.relpath(os.path.join(root, file), rules_dir)
+                module_path = 'rules.' + relative_path.replace(os.path.sep, '.')[:-len('.py')]
+                modules[module_path] = os.path.join(root, file)
+    return modules
+
+
+def source_digests(rules_dir: str) -> Dict[str, str]:
+    """每个规则模块源文件的 SHA-1 摘要，用于判断清单是否过期；换行符统一后计算，不受检出方式影响"""
+    digests = {}
+    for module_path, file_path in rule_modules(rules_dir).items():
+        with open(file_path, 'rb') as f:
+            digests[module_path] = hashlib.sha1(f.read().replace(b'\r\n', b'\n')).hexdigest()
+    return digests
+
+
+def discover_rules(rules_dir: str) -> Dict[str, Any]:
+    """导入全部规则模块并创建规则实例，规则 ID -> 规则实例"""
+    from rules.base_rule import BaseRule
+
+    rules = {}
+    for module_path in rule_modules(rules_dir):
+        try:
+            module = importlib.import_module(module_path)
+            # 只取模块中定义的规则类，不重复登记从其它模块导入的规则
+            for name, obj in module.__dict__.items():
+                if (isinstance(obj, type) and issubclass(obj, BaseRule) and obj is not BaseRule
+                        and obj.__module__ == module_path):
+                    rule_instance = obj()
+                    rules[rule_instance.rule_id] = rule_instance
+        except Exception as e:
+            print(f"加载规则失败 {module_path}: {e}")
+    return rules
+
+
+def build_manifest(rules_dir: Optional[str] = None) -> Dict[str, Any]:
+    """导入全部规则，生成清单内容"""
+    rules_dir = rules_dir or rules_directory()
+    return {
+        "format": MANIFEST_FORMAT,
+        "sources": source_digests(rules_dir),
+        "rules": {
+            rule_id: {
+                "module": type(rule).__module__,
+                "class": type(rule).__name__,
+                "metadata": rule.get_metadata(),
+            }
+            for rule_id, rule in discover_rules(rules_dir).items()
+        },
+    }
+
+
+def write_manifest(rules_dir: Optional[str] = None) -> str:
+    """重新生成清单文件，返回文件路径"""
+    rules_dir = rules_dir or rules_directory()
+    path = os.path.join(rules_dir, MANIFEST_NAME)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(build_manifest(rules_dir), f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return path
+
+
+def load_manifest(rules_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """读取清单；清单不存在、格式不符或与规则源文件不一致时返回 None"""
+    rules_dir = rules_dir or rules_directory()
+    try:
+        with open(os.path.join(rules_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    # 打包后的规则源文件与清单在构建时一同生成、不会再修改，不必每次启动都读取并计算摘要
+    if not getattr(sys, 'frozen', False) and manifest.get("sources") != source_digests(rules_dir):
+        return None
+    return manifest
+
+
+class RuleRegistry(MutableMapping):
+    """
+    规则 ID -> 规则实例 的映射，规则实例在第一次访问时才创建
+    遍历规则 ID、判断规则是否存在和读取清单中的元数据都不会导入规则模块；
+    直接登记的规则实例（register_rule）覆盖清单中的同名规则。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._order: List[str] = []
+
+    def add_entries(self, entries: Dict[str, Dict[str, Any]]):
+        """登记清单中的规则，已创建的同名实例被丢弃，下次访问时重新创建"""
+        for rule_id, entry in entries.items():
+            self._entries[rule_id] = entry
+            self._instances.pop(rule_id, None)
+            if rule_id not in self._order:
+                self._order.append(rule_id)
+
+    def is_loaded(self, rule_id: str) -> bool:
+        """规则实例是否已经创建"""
+        return rule_id in self._instances
+
+    def metadata(self, rule_id: str) -> Dict[str, Any]:
+        """
+        规则元数据；实例尚未创建时返回清单中记录的默认元数据，
+        已创建的实例可能修改过配置，返回实例的当前元数据
+        """
+        if rule_id in self._instances or rule_id not in self._entries:
+            return self[rule_id].get_metadata()
+        return copy.deepcopy(self._entries[rule_id]["metadata"])
+
+    def __getitem__(self, rule_id: str):
+        rule = self._instances.get(rule_id)
+        if rule is not None:
+            return rule
+        entry = self._entries.get(rule_id)
+        if entry is None:
+            raise KeyError(rule_id)
+        try:
+            module = importlib.import_module(entry["module"])
+            rule = getattr(module, entry["class"])()
+        except Exception as e:
+            print(f"加载规则失败 {entry['module']}: {e}")
+            raise KeyError(rule_id) from e
+        self._instances[rule_id] = rule
+        return rule
+
+    def __setitem__(self, rule_id: str, rule):
+        self._instances[rule_id] = rule
+        if rule_id not in self._order:
+            self._order.append(rule_id)
+
+    def __delitem__(self, rule_id: str):
+        if rule_id not in self._order:
+            raise KeyError(rule_id)
+        self._order.remove(rule_id)
+        self._entries.pop(rule_id, None)
+        self._instances.pop(rule_id, None)
+
+    def __contains__(self, rule_id) -> bool:
+        return rule_id in self._instances or rule_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    print(f"已生成 {write_manifest()}")
@@ -0,0 +1,142 @@
+"""
+规则调度器
+
+规则通过 reads / writes 声明读写的文档资源，调度器据此构建依赖图并给出
+确定的执行顺序：
+1. 写入某资源的规则排在读取该资源的规则之前（如页面布局先于表格宽度）；
+2. 写入同一资源的规则保持请求中的先后顺序（后执行者覆盖先执行者），即使
+   其中一个还写入了另一个读取的资源（如编号列表重建段落并设置列表字体，
+   请求在它之前的字体规则仍先执行，列表字体不被覆盖）；
+3. 没有依赖关系的规则也保持请求顺序。
+未声明读写的规则视为读写全部资源，与其它规则之间保持请求顺序。
+"""
+
+from typing import Dict, FrozenSet, List, Sequence, Set
+
+
+class Resource:
+    """规则可以声明读写的文档资源"""
+
+    PAGE_GEOMETRY = 'page_geometry'  # 页面大小、边距及由此得到的可用宽度
+    RUN_FONT = 'run_font'  # 文本运行的字体、字号、颜色、加粗
+    PARAGRAPH_FORMAT = 'paragraph_format'  # 段落缩进、间距、对齐
+    PARAGRAPH_STYLE = 'paragraph_style'  # 段落样式（决定标题识别）
+    TABLE_GRID = 'table_grid'  # 表格宽度、列宽、对齐
+    TABLE_CELL = 'table_cell'  # 单元格边框、底纹、垂直对齐
+    DOCUMENT_STRUCTURE = 'document_structure'  # 段落、文本运行的增删和重建
+
+    ALL: FrozenSet[str] = frozenset([
+        PAGE_GEOMETRY, RUN_FONT, PARAGRAPH_FORMAT, PARAGRAPH_STYLE,
+        TABLE_GRID, TABLE_CELL, DOCUMENT_STRUCTURE,
+    ])
+
+
+class RuleScheduler:
+    """依据规则声明的读写资源排定执行顺序"""
+
+    @staticmethod
+    def reads_of(rule) -> FrozenSet[str]:
+        """规则读取的资源；所有规则都依赖文档结构"""
+        reads = getattr(rule, 'reads', None)
+        if reads is None:
+            return Resource.ALL
+        return frozenset(reads) | {Resource.DOCUMENT_STRUCTURE}
+
+    @staticmethod
+    def writes_of(rule) -> FrozenSet[str]:
+        """规则写入的资源"""
+        writes = getattr(rule, 'writes', None)
+        if writes is None:
+            return Resource.ALL
+        return frozenset(writes)
+
+    @staticmethod
+    def is_declared(rule) -> bool:
+        """规则是否声明了读写资源"""
+        return getattr(rule, 'reads', None) is not None and getattr(rule, 'writes', None) is not None
+
+    @classmethod
+    def produces_for(cls, producer, consumer) -> bool:
+        """
+        producer 写入了 consumer 读取、但 consumer 自己不写的资源
+        两者写入同一资源时后执行者覆盖先执行者，不视为生产者，保持请求顺序
+        """
+        producer_writes = cls.writes_of(producer)
+        consumer_writes = cls.writes_of(consumer)
+        if producer_writes & consumer_writes:
+            return False
+        return bool(producer_writes & cls.reads_of(consumer))
+
+    @classmethod
+    def conflicts(cls, first, second) -> bool:
+        """两个规则是否存在读写冲突，不冲突的规则可以安全地并发执行"""
+        first_writes = cls.writes_of(first)
+        second_writes = cls.writes_of(second)
+        return bool(
+            first_writes & second_writes
+            or first_writes & cls.reads_of(second)
+            or second_writes & cls.reads_of(first)
+        )
+
+    @classmethod
+    def order(cls, rules: Sequence) -> List[int]:
+        """
+        计算执行顺序
+        :param rules: 按请求顺序排列的规则
+        :return: 规则在 rules 中的下标，按执行顺序排列
+        """
+        count = len(rules)
+        successors: Dict[int, Set[int]] = {i: set() for i in range(count)}
+
+        def reachable(start: int, target: int) -> bool:
+            stack, seen = [start], set()
+            while stack:
+                node = stack.pop()
+                if node == target:
+                    return True
+                if node in seen:
+                    continue
+                seen.add(node)
+                stack.extend(successors[node])
+            return False
+
+        def add_edge(before: int, after: int):
+            # 产生环的约束被忽略，由后续的请求顺序兜底
+            if after not in successors[before] and not reachable(after, before):
+                successors[before].add(after)
+
+        # 1. 未声明读写的规则是屏障，与其它规则保持请求顺序
+        for i in range(count):
+            for j in range(i + 1, count):
+                if not (cls.is_declared(rules[i]) and cls.is_declared(rules[j])):
+                    add_edge(i, j)
+
+        # 2. 生产者 -> 消费者
+        for i in range(count):
+            for j in range(count):
+                if i != j and cls.produces_for(rules[i], rules[j]) \
+                        and not cls.produces_for(rules[j], rules[i]):
+                    add_edge(i, j)
+
+        # 3. 存在冲突的规则保持请求顺序
+        for i in range(count):
+            for j in range(i + 1, count):
+                if cls.conflicts(rules[i], rules[j]):
+                    add_edge(i, j)
+
+        # 拓扑排序，多个规则就绪时取请求顺序靠前的
+        in_degree = [0] * count
+        for i in range(count):
+            for j in successors[i]:
+                in_degree[j] += 1
+        ready = [i for i in range(count) if in_degree[i] == 0]
+        ordered = []
+        while ready:
+            ready.sort()
+            current = ready.pop(0)
+            ordered.append(current)
+            for j in successors[current]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    ready.append(j)
+        return ordered
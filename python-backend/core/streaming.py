@@ -0,0 +1,323 @@
+"""
+流式执行引擎
+
+document.xml 达到数百 MB 时，python-docx 构建的完整对象树是内存瓶颈。
+流式引擎用 lxml iterparse 逐个读取 w:body 的顶层元素（段落、表格），
+元素读完后立即把它分发给规则的访问者钩子、应用补丁、写入输出并从树中释放，
+内存占用只与读取块和单个顶层元素的大小有关，不随文档长度增长。
+
+只有声明了 streamable 的规则可以流式执行：它们只需要段落本身、其文本运行
+和样式定义（styles.xml）等局部信息，且不使用 on_section 钩子。
+输出的 document.xml 边生成边压缩写入（core.package_writer.stream_package），
+其余部件从源文件原样复制。
+"""
+
+import os
+import posixpath
+import zipfile
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.parser import element_class_lookup, parse_xml
+from docx.oxml.table import CT_Tbl
+from docx.oxml.text.paragraph import CT_P
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from core.document_index import DocumentIndex
+from core.instrumentation import count_changed_nodes
+from core.package_writer import stream_package
+from core.patch import PatchSet
+from core.style_resolver import StyleResolver
+from core.traversal import DocumentTraversal
+from rules.base_rule import BaseRule, RuleResult
+
+# document.xml（解压后）达到该大小时使用流式引擎，单位 MB；0 表示不使用
+DEFAULT_STREAMING_THRESHOLD_MB = 64
+STREAMING_THRESHOLD_ENV = "WORD_FORMAT_FIXER_STREAMING_THRESHOLD_MB"
+
+_XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+_READ_CHUNK = 64 * 1024
+
+
+def streaming_threshold_from_environment() -> Optional[int]:
+    """从环境变量读取流式阈值（字节），0 表示不使用流式引擎"""
+    try:
+        size_mb = float(os.environ.get(STREAMING_THRESHOLD_ENV, DEFAULT_STREAMING_THRESHOLD_MB))
+    except ValueError:
+        size_mb = DEFAULT_STREAMING_THRESHOLD_MB
+    return int(size_mb * 1024 * 1024) if size_mb > 0 else None
+
+
+def _relationship_targets(zf: zipfile.ZipFile, part_member: str) -> Dict[str, str]:
+    """读取部件的关系，返回 关系类型 -> 目标成员名（只取每种类型的第一个）"""
+    directory, name = posixpath.split(part_member)
+    rels_member = posixpath.join(directory, '_rels', name + '.rels')
+    try:
+        rels = etree.fromstring(zf.read(rels_member))
+    except KeyError:
+        return {}
+
+    targets = {}
+    for rel in rels:
+        if rel.get('TargetMode') == 'External' or rel.get('Type') in targets:
+            continue
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            member = target.lstrip('/')
+        else:
+            member = posixpath.normpath(posixpath.join(directory, target))
+        targets[rel.get('Type')] = member
+    return targets
+
+
+def main_part_members(zf: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+    """
+    按包关系定位正文和样式部件
+    :return: (正文成员名, 样式成员名或 None)
+    """
+    document_member = _relationship_targets(zf, '').get(RT.OFFICE_DOCUMENT)
+    if document_member is None:
+        raise ValueError("文档包中没有正文部件")
+    styles_member = _relationship_targets(zf, document_member).get(RT.STYLES)
+    return document_member, styles_member
+
+
+def document_xml_size(path: str) -> Optional[int]:
+    """正文部件解压后的大小；文件不是有效的 .docx 时返回 None"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            document_member, _ = main_part_members(zf)
+            return zf.getinfo(document_member).file_size
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, etree.XMLSyntaxError):
+        return None
+
+
+def is_streamable(rules: List[BaseRule]) -> bool:
+    """规则是否都可以流式执行"""
+    return bool(rules) and all(rule.streamable and 'on_section' not in rule.traversal_hooks()
+                               for rule in rules)
+
+
+class StreamingContext:
+    """
+    流式执行时传给规则的上下文
+
+    提供与 RuleContext 相同的属性读写接口和文档索引，但索引只覆盖当前
+    顶层元素，补丁在元素处理完毕后立即应用。
+    """
+
+    read_only = False
+    writes_deferred = True
+
+    def __init__(self, document_path: str, styles: StyleResolver, count_changes: bool = False):
+        self.document_path = document_path
+        self.styles = styles
+        self.patches = PatchSet()
+        self.change_count = 0  # 已应用的属性变化数
+        self.patch_writers: Set[str] = set()  # 通过补丁写入过属性的规则
+        # 开启度量时按规则统计发生变化的节点数
+        self.changed_nodes: Optional[Counter] = Counter() if count_changes else None
+        self.runtime_data = {}
+        self.index = DocumentIndex(None, styles)
+
+    def begin_element(self):
+        """开始处理新的顶层元素：索引只缓存当前元素中的节点"""
+        self.index = DocumentIndex(None, self.styles)
+
+    def set_property(self, node, prop: str, value, rule_id: Optional[str] = None):
+        self.patches.set(node, prop, value, rule_id)
+
+    def get_property(self, node, prop: str):
+        return self.patches.get(node, prop)
+
+    def flush_patches(self):
+        """应用当前元素上的补丁"""
+        if self.patches:
+            self.patch_writers |= self.patches.writers
+            changes = self.patches.apply()
+            self.change_count += len(changes)
+            if self.changed_nodes is not None:
+                self.changed_nodes.update(count_changed_nodes(changes))
+
+    def commit_patches(self):
+        """由流式引擎在元素处理完毕后统一应用"""
+        return []
+
+    def invalidate_index(self):
+        """索引只覆盖当前元素，无需失效"""
+        pass
+
+
+class _CountingReader:
+    """记录已读取字节数的输入流，用于报告进度"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(_READ_CHUNK if size is None or size < 0 else size)
+        self.bytes_read += len(data)
+        return data
+
+
+class DocumentStream:
+    """
+    逐个产出 w:body 的顶层元素，调用方处理完毕后将其写入输出并释放
+
+    w:body 以外的 w:document 子元素（如 w:background）原样写出。
+    """
+
+    def __init__(self, source, total_bytes: int):
+        self.reader = _CountingReader(source)
+        self.total_bytes = total_bytes
+        self._declared: List[bytes] = []  # 根元素上的命名空间声明
+
+    @property
+    def bytes_read(self) -> int:
+        return self.reader.bytes_read
+
+    def elements(self, sink) -> Iterator:
+        """
+        产出 w:body 的顶层元素
+        :param sink: 输出流，元素被处理后（生成器恢复时）写入
+        """
+        events = etree.iterparse(self.reader, events=('start', 'end'), remove_blank_text=True,
+                                 huge_tree=True, resolve_entities=False)
+        events.set_element_class_lookup(element_class_lookup)
+        depth = 0
+        in_body = False
+        for event, element in events:
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    sink.write(_XML_DECLARATION)
+                    sink.write(self._start_tag(element))
+                    self._declared = [
+                        f' xmlns:{prefix}="{uri}"'.encode() if prefix else f' xmlns="{uri}"'.encode()
+                        for prefix, uri in element.nsmap.items()
+                    ]
+                elif depth == 2 and etree.QName(element).localname == 'body':
+                    in_body = True
+                    sink.write(self._start_tag(element))
+                continue
+
+            depth -= 1
+            if depth == 0:
+                sink.write(self._end_tag(element))
+            elif depth == 1:
+                if in_body and etree.QName(element).localname == 'body':
+                    in_body = False
+                    sink.write(self._end_tag(element))
+                else:
+                    sink.write(self._serialize(element))
+                element.getparent().remove(element)
+            elif depth == 2 and in_body:
+                yield element
+                parent = element.getparent()
+                if parent is not None:
+                    # 规则未删除该元素
+                    sink.write(self._serialize(element))
+                    parent.remove(element)
+
+    def _start_tag(self, element) -> bytes:
+        shallow = etree.Element(element.tag, dict(element.attrib), nsmap=element.nsmap)
+        tag = self._strip_declared(etree.tostring(shallow, encoding='UTF-8'))
+        return tag[:-2] + b'>'
+
+    @staticmethod
+    def _end_tag(element) -> bytes:
+        localname = etree.QName(element).localname
+        name = f"{element.prefix}:{localname}" if element.prefix else localname
+        return f"</{name}>".encode('utf-8')
+
+    def _serialize(self, element) -> bytes:
+        return self._strip_declared(etree.tostring(element, encoding='UTF-8'))
+
+    def _strip_declared(self, data: bytes) -> bytes:
+        """去掉起始标签中与根元素相同的命名空间声明，避免每个元素重复声明"""
+        if not self._declared:
+            return data
+        end = data.index(b'>')
+        head = data[:end]
+        for declaration in self._declared:
+            head = head.replace(declaration, b'')
+        return head + data[end:]
+
+
+class StreamingTraversal(DocumentTraversal):
+    """按文档流的顶层元素分发节点的融合遍历"""
+
+    def __init__(self, doc_context: StreamingContext, rules: List[BaseRule], stream: DocumentStream,
+                 sink, on_node: Optional[Callable[[int, int], None]] = None, instrument: bool = False):
+        super().__init__(doc_context, rules, on_node, instrument)
+        self.stream = stream
+        self.sink = sink
+
+    def _walk(self):
+        self._refresh_hooks()
+        walk_tables = bool(self._hooks[('on_cell', True)]
+                           or self._hooks[('on_paragraph', True)]
+                           or self._hooks[('on_run', True)])
+        self._node_total = self.stream.total_bytes
+        context = self.doc_context
+
+        for element in self.stream.elements(self.sink):
+            context.begin_element()
+            if isinstance(element, CT_P):
+                self._walk_paragraphs([Paragraph(element, None)], in_table=False)
+            elif isinstance(element, CT_Tbl) and walk_tables:
+                for entry in context.index.cells_of(Table(element, None)):
+                    if self._hooks[('on_cell', True)]:
+                        self._dispatch('on_cell', True, entry.cell, entry.row_index)
+                    self._walk_paragraphs(entry.paragraphs, in_table=True, count_nodes=False)
+                    self._node_done()
+            context.flush_patches()
+
+        if self.on_node is not None:
+            self.on_node(self._node_total, self._node_total)
+
+    def _node_done(self):
+        """进度按已读取的字节数计算"""
+        self.nodes_processed += 1
+        if self.on_node is not None and self.nodes_processed % self.PROGRESS_STEP == 0:
+            self.on_node(self.stream.bytes_read, self._node_total)
+
+
+def stream_document(source_path: str, rules: List[BaseRule], target_path: Optional[str] = None,
+                    on_node: Optional[Callable[[int, int], None]] = None, instrument: bool = False
+                    ) -> Tuple[List[Tuple[BaseRule, Optional[RuleResult], Optional[Exception]]], Dict]:
+    """
+    流式执行一组规则并写出文档
+    :param rules: 按执行顺序排列的可流式执行的规则
+    :param target_path: 输出路径，默认覆盖源文件
+    :param on_node: 进度回调 on_node(已读取字节数, 正文部件总字节数)，可抛出异常中止执行
+    :param instrument: 是否收集每个规则的度量，开启时统计中包含 metrics、changed_nodes 和 patch_writers
+    :return: (按规则顺序排列的 (规则, 结果, 异常) 列表, 保存统计)
+    """
+    with zipfile.ZipFile(source_path) as zf:
+        document_member, styles_member = main_part_members(zf)
+        styles = StyleResolver(parse_xml(zf.read(styles_member)) if styles_member else None)
+        total_bytes = zf.getinfo(document_member).file_size
+
+    context = StreamingContext(source_path, styles, count_changes=instrument)
+    outcomes = []
+    traversals = []
+
+    def produce(sink):
+        with zipfile.ZipFile(source_path) as zf, zf.open(document_member) as source:
+            stream = DocumentStream(source, total_bytes)
+            traversal = StreamingTraversal(context, rules, stream, sink, on_node, instrument)
+            traversals.append(traversal)
+            outcomes.extend(traversal.run())
+
+    stats = stream_package(source_path, target_path or source_path, document_member, produce)
+    stats["changes"] = context.change_count
+    if instrument:
+        stats["metrics"] = traversals[0].metrics
+        stats["changed_nodes"] = dict(context.changed_nodes)
+        stats["patch_writers"] = context.patch_writers
+    return outcomes, stats
@@ -0,0 +1,178 @@
+"""
+样式解析器
+
+一次性读取 styles.xml，把 w:pStyle 的样式 ID 解析为样式记录（名称、标题级别、
+大纲级别），沿 basedOn 继承链解析并缓存。所有规则共享同一个解析器，
+避免对每个段落调用 paragraph.style 时在 styles.xml 中重复查找。
+"""
+
+import re
+from typing import Dict, Optional
+
+from docx.oxml.ns import qn
+from docx.styles import BabelFish
+
+
+class ResolvedStyle:
+    """解析后的样式记录"""
+
+    def __init__(self, style_id: Optional[str], name: str, style_type: str,
+                 based_on: Optional[str], heading_level: Optional[int],
+                 outline_level: Optional[int]):
+        self.style_id = style_id
+        self.name = name  # 与 python-docx 的 style.name 一致（内置样式使用界面名称）
+        self.style_type = style_type
+        self.based_on = based_on
+        self.heading_level = heading_level  # 1-9 标题级别，0 为未标明级别的标题，None 不是标题
+        self.outline_level = outline_level  # 生效的大纲级别 0-9（9 为正文），None 未设置
+
+    @property
+    def is_heading(self) -> bool:
+        return self.heading_level is not None
+
+
+class StyleResolver:
+    """样式解析器 - 样式 ID 到解析记录的缓存映射"""
+
+    # 内置标题的英文名称和本地化名称，如 "heading 1"、"Heading 1"、"标题 1"
+    HEADING_NAME_PATTERN = re.compile(r'^(?:heading|标题)\s*([1-9])$', re.IGNORECASE)
+    HEADING_PREFIX_PATTERN = re.compile(r'^(?:heading|标题)', re.IGNORECASE)
+    # 大纲级别 9 表示正文文本
+    BODY_TEXT_OUTLINE_LEVEL = 9
+
+    _NORMAL = ResolvedStyle(None, 'Normal', 'paragraph', None, None, None)
+
+    def __init__(self, styles_element=None):
+        # 样式 ID -> (名称, 类型, basedOn, 自身大纲级别)
+        self._definitions: Dict[str, tuple] = {}
+        self._name_to_id: Dict[str, str] = {}
+        self._default_paragraph_style_id: Optional[str] = None
+        self._resolved: Dict[str, ResolvedStyle] = {}
+
+        if styles_element is not None:
+            self._read_definitions(styles_element)
+
+    @classmethod
+    def from_document(cls, document) -> 'StyleResolver':
+        """从 python-docx 文档对象构建解析器"""
+        return cls(document.styles.element)
+
+    def _read_definitions(self, styles_element):
+        for style in styles_element.iterchildren(qn('w:style')):
+            style_id = style.get(qn('w:styleId'))
+            if style_id is None:
+                continue
+            style_type = style.get(qn('w:type'), 'paragraph')
+
+            name_element = style.find(qn('w:name'))
+            raw_name = name_element.get(qn('w:val')) if name_element is not None else None
+            name = BabelFish.internal2ui(raw_name) if raw_name else style_id
+
+            based_on_element = style.find(qn('w:basedOn'))
+            based_on = based_on_element.get(qn('w:val')) if based_on_element is not None else None
+
+            outline_level = None
+            outline_element = style.find('%s/%s' % (qn('w:pPr'), qn('w:outlineLvl')))
+            if outline_element is not None:
+                try:
+                    outline_level = int(outline_element.get(qn('w:val')))
+                except (TypeError, ValueError):
+                    outline_level = None
+
+            self._definitions[style_id] = (name, style_type, based_on, outline_level)
+            self._name_to_id.setdefault((style_type, name), style_id)
+            if (style_type == 'paragraph'
+                    and style.get(qn('w:default')) in ('1', 'true', 'on')
+                    and self._default_paragraph_style_id is None):
+                self._default_paragraph_style_id = style_id
+
+    # ============== 解析 ==============
+
+    def resolve(self, style_id: Optional[str]) -> ResolvedStyle:
+        """
+        解析样式 ID，结果缓存
+        :param style_id: w:pStyle 的值；为 None 或未定义时返回默认段落样式
+        """
+        if style_id is None or style_id not in self._definitions:
+            style_id = self._default_paragraph_style_id
+            if style_id is None or style_id not in self._definitions:
+                return self._NORMAL
+        return self._resolve(style_id, set())
+
+    def _resolve(self, style_id: str, visiting: set) -> ResolvedStyle:
+        resolved = self._resolved.get(style_id)
+        if resolved is not None:
+            return resolved
+
+        name, style_type, based_on, outline_level = self._definitions[style_id]
+
+        parent = None
+        # basedOn 链出现环时停止继承
+        if based_on in self._definitions and based_on not in visiting:
+            visiting.add(style_id)
+            parent = self._resolve(based_on, visiting)
+
+        if outline_level is None and parent is not None:
+            outline_level = parent.outline_level
+
+        resolved = ResolvedStyle(
+            style_id, name, style_type, based_on,
+            self._heading_level(name, style_type, outline_level, parent),
+            outline_level,
+        )
+        self._resolved[style_id] = resolved
+        return resolved
+
+    def _heading_level(self, name: str, style_type: str, outline_level: Optional[int],
+                       parent: Optional[ResolvedStyle]) -> Optional[int]:
+        if style_type != 'paragraph':
+            return None
+        match = self.HEADING_NAME_PATTERN.match(name)
+        if match:
+            return int(match.group(1))
+        if outline_level is not None:
+            if outline_level < self.BODY_TEXT_OUTLINE_LEVEL:
+                return outline_level + 1
+            return None
+        if parent is not None and parent.heading_level is not None:
+            return parent.heading_level
+        if self.HEADING_PREFIX_PATTERN.match(name):
+            return 0
+        return None
+
+    # ============== 段落 ==============
+
+    def paragraph_style(self, paragraph) -> ResolvedStyle:
+        """解析段落使用的样式，接受 python-docx 段落或 w:p 元素"""
+        p = getattr(paragraph, '_p', paragraph)
+        pPr = p.pPr
+        return self.resolve(pPr.style if pPr is not None else None)
+
+    def heading_level(self, paragraph) -> Optional[int]:
+        """
+        返回段落的标题级别
+        :return: 1-9 为标题级别，0 为未标明级别的标题，None 表示不是标题
+        """
+        return self.paragraph_style(paragraph).heading_level
+
+    # ============== 按名称查找 ==============
+
+    def style_id_for_name(self, name: str, style_type: str = 'paragraph') -> Optional[str]:
+        """按样式名称（与 style.name 一致）查找样式 ID"""
+        return self._name_to_id.get((style_type, name))
+
+    def has_style(self, name: str, style_type: str = 'paragraph') -> bool:
+        """文档中是否定义了该名称的样式"""
+        return (style_type, name) in self._name_to_id
+
+    def set_paragraph_style(self, paragraph, name: str) -> bool:
+        """
+        按名称设置段落样式，等价于 paragraph.style = document.styles[name]
+        :return: 样式不存在时返回 False
+        """
+        style_id = self.style_id_for_name(name)
+        if style_id is None:
+            return False
+        # 与 python-docx 一致：默认段落样式不写入 w:pStyle
+        paragraph._p.style = None if style_id == self._default_paragraph_style_id else style_id
+        return True
@@ -0,0 +1,203 @@
+"""
+单次遍历执行器
+
+将多个规则的访问者钩子（on_section / on_paragraph / on_run / on_cell）融合到
+一次文档遍历中：文档只走一遍，每个节点依次分发给所有关心它的规则。
+
+每个段落按规则顺序处理：一个规则的 on_paragraph 和它对该段落各文本运行的
+on_run 都分发完，才轮到下一个规则。这样同一段落上的写入顺序与逐个执行规则
+时相同，后面的规则覆盖前面的规则（如标题字体规则覆盖正文字体规则对标题的设置）。
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.instrumentation import empty_metrics
+from rules.base_rule import BaseRule, RuleResult
+
+
+class DocumentTraversal:
+    """融合遍历 - 一次遍历文档并把节点分发给多个规则"""
+
+    # 每处理多少个节点（段落或单元格）回调一次 on_node
+    PROGRESS_STEP = 50
+
+    def __init__(self, doc_context, rules: List[BaseRule],
+                 on_node: Optional[Callable[[int, int], None]] = None,
+                 instrument: bool = False):
+        self.doc_context = doc_context
+        self.rules = list(rules)
+        # 进度回调 on_node(已处理节点数, 节点总数)
+        self.on_node = on_node
+        self.nodes_processed = 0
+        self._node_total = 0
+        # 以规则在列表中的位置记录状态，同一规则出现多次时互不干扰
+        self._fixed_counts: List[int] = [0] * len(self.rules)
+        self._errors: Dict[int, Exception] = {}
+        self._hooks: Dict[Tuple[str, bool], List[Tuple[int, BaseRule]]] = {}
+        # 按位置（正文/表格）处理段落或文本运行的规则及其实现的钩子，按规则顺序排列
+        self._paragraph_rules: Dict[bool, List[Tuple[int, BaseRule, List[str]]]] = {}
+        # 开启度量时记录每个规则在钩子中花费的时间和访问的节点数；
+        # 未开启时不替换 _invoke，遍历没有额外开销
+        self.metrics: Optional[List[Dict[str, Any]]] = None
+        if instrument:
+            self.metrics = [dict(empty_metrics(), nodes_visited=0) for _ in self.rules]
+            self._invoke = self._invoke_measured
+
+    def run(self) -> List[Tuple[BaseRule, Optional[RuleResult], Optional[Exception]]]:
+        """
+        执行遍历
+        :return: 按规则顺序排列的 (规则, 结果, 异常) 列表，失败的规则结果为 None
+        """
+        for position, rule in enumerate(self.rules):
+            try:
+                self._call(position, rule.begin_traversal, self.doc_context)
+            except Exception as e:
+                self._errors[position] = e
+
+        self._walk()
+
+        outcomes = []
+        for position, rule in enumerate(self.rules):
+            error = self._errors.get(position)
+            if error is not None:
+                outcomes.append((rule, None, error))
+                continue
+            try:
+                result = self._call(position, rule.end_traversal, self.doc_context,
+                                    self._fixed_counts[position])
+                outcomes.append((rule, result, None))
+            except Exception as e:
+                outcomes.append((rule, None, e))
+        return outcomes
+
+    def _call(self, position: int, method: Callable, *args):
+        """调用规则的方法；开启度量时计入该规则的耗时"""
+        if self.metrics is None:
+            return method(*args)
+        metrics = self.metrics[position]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return method(*args)
+        finally:
+            metrics["wall_time_ms"] += (time.perf_counter() - wall_start) * 1000
+            metrics["cpu_time_ms"] += (time.process_time() - cpu_start) * 1000
+
+    HOOKS = ('on_section', 'on_paragraph', 'on_run', 'on_cell')
+
+    def _refresh_hooks(self):
+        """按钩子和位置（正文/表格）重建分发列表，排除已失败的规则"""
+        self._hooks = {}
+        for hook in self.HOOKS:
+            for in_table in (False, True):
+                self._hooks[(hook, in_table)] = [
+                    (position, rule) for position, rule in enumerate(self.rules)
+                    if position not in self._errors
+                    and hook in rule.traversal_hooks()
+                    and (not in_table or rule.traverse_tables)
+                ]
+        for in_table in (False, True):
+            self._paragraph_rules[in_table] = [
+                (position, rule, [hook for hook in ('on_paragraph', 'on_run') if hook in rule.traversal_hooks()])
+                for position, rule in enumerate(self.rules)
+                if position not in self._errors
+                and ('on_paragraph' in rule.traversal_hooks() or 'on_run' in rule.traversal_hooks())
+                and (not in_table or rule.traverse_tables)
+            ]
+
+    def _invoke(self, position: int, rule: BaseRule, hook: str, node: Any, *extra) -> bool:
+        """调用一个规则的钩子并累计修复数；规则抛出异常时记录并返回 False"""
+        try:
+            fixed = getattr(rule, hook)(node, self.doc_context, *extra)
+        except Exception as e:
+            self._errors[position] = e
+            return False
+        if fixed:
+            self._fixed_counts[position] += fixed
+        return True
+
+    def _invoke_measured(self, position: int, rule: BaseRule, hook: str, node: Any, *extra) -> bool:
+        """与 _invoke 相同，同时记录规则的耗时和访问的节点数"""
+        metrics = self.metrics[position]
+        metrics["nodes_visited"] += 1
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return DocumentTraversal._invoke(self, position, rule, hook, node, *extra)
+        finally:
+            metrics["wall_time_ms"] += (time.perf_counter() - wall_start) * 1000
+            metrics["cpu_time_ms"] += (time.process_time() - cpu_start) * 1000
+
+    def _dispatch(self, hook: str, in_table: bool, node: Any, *extra):
+        """将节点分发给关心该钩子的所有规则"""
+        failed = False
+        for position, rule in self._hooks[(hook, in_table)]:
+            if not self._invoke(position, rule, hook, node, *extra):
+                failed = True
+        if failed:
+            self._refresh_hooks()
+
+    def _dispatch_paragraph(self, paragraph, in_table: bool):
+        """按规则顺序把段落及其文本运行分发给各规则，每个规则处理完整个段落才轮到下一个"""
+        index = self.doc_context.index
+        failed = False
+        for position, rule, hooks in self._paragraph_rules[in_table]:
+            if paragraph._p.getparent() is None:
+                # 前面的规则删除了该段落
+                break
+            if 'on_paragraph' in hooks:
+                if not self._invoke(position, rule, 'on_paragraph', paragraph, in_table):
+                    failed = True
+                    continue
+                if paragraph._p.getparent() is None:
+                    break
+            if 'on_run' in hooks:
+                for run in index.runs_of(paragraph):
+                    if not self._invoke(position, rule, 'on_run', run, paragraph, in_table):
+                        failed = True
+                        break
+        if failed:
+            self._refresh_hooks()
+
+    def _walk(self):
+        self._refresh_hooks()
+        index = self.doc_context.index
+
+        if self._hooks[('on_section', False)]:
+            for section in index.sections:
+                self._dispatch('on_section', False, section)
+
+        walk_tables = bool(self._hooks[('on_cell', True)]
+                           or self._hooks[('on_paragraph', True)]
+                           or self._hooks[('on_run', True)])
+        self._node_total = len(index.paragraphs) + (len(index.cells) if walk_tables else 0)
+
+        self._walk_paragraphs(index.paragraphs, in_table=False)
+
+        if walk_tables:
+            # 合并单元格在索引中只出现一次，不会被重复处理
+            for entry in index.cells:
+                if self._hooks[('on_cell', True)]:
+                    self._dispatch('on_cell', True, entry.cell, entry.row_index)
+                self._walk_paragraphs(entry.paragraphs, in_table=True, count_nodes=False)
+                self._node_done()
+
+        if self.on_node is not None:
+            self.on_node(self.nodes_processed, self._node_total)
+
+    def _node_done(self):
+        self.nodes_processed += 1
+        if self.on_node is not None and self.nodes_processed % self.PROGRESS_STEP == 0:
+            self.on_node(self.nodes_processed, self._node_total)
+
+    def _walk_paragraphs(self, paragraphs, in_table: bool, count_nodes: bool = True):
+        if not (self._hooks[('on_paragraph', in_table)] or self._hooks[('on_run', in_table)]):
+            if count_nodes:
+                self.nodes_processed += len(paragraphs)
+            return
+
+        for paragraph in paragraphs:
+            self._dispatch_paragraph(paragraph, in_table)
+            if count_nodes:
+                self._node_done()
@@ -5,6 +5,9 @@ from core.config_repository import IConfigRepository
 
 import sys
 
+# 有 libyaml 时使用 C 实现的解析器，读取预设快得多，结果与 SafeLoader 相同
+_SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 class YamlConfigRepository(IConfigRepository):
     """YAML文件配置仓库 - 实现配置持久化"""
 
@@ -25,7 +28,15 @@ class YamlConfigRepository(IConfigRepository):
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
         with open(self.config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+            return yaml.load(f, Loader=_SAFE_LOADER) or {}
+
+    def signature(self) -> Optional[Any]:
+        """配置文件的修改时间和大小；文件不存在时返回 None"""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def save_config(self, config: Dict[str, Any]) -> None:
         """保存配置文件"""
@@ -1,42 +1,35 @@
 # Rules package initialization
 # Note: Rules are dynamically loaded by RuleEngine from the rules/ subdirectories.
 # This file only provides convenient imports for direct usage if needed.
+# 规则模块在第一次访问对应名称时才导入，导入 rules 包（如 rules.base_rule）不会加载全部规则
 
-# 字体规则
-from .font_rules.font_color_rule import FontColorRule
-from .font_rules.font_standard_rule import FontNameRule, TitleFontRule, FontSizeRule
+import importlib
 
-# 段落规则
-from .paragraph_rules.paragraph_spacing_rule import ParagraphSpacingRule
-from .paragraph_rules.title_bold_rule import TitleBoldRule
-from .paragraph_rules.title_alignment_rule import TitleAlignmentRule
-from .paragraph_rules.list_numbering_rule import ListNumberingRule
-from .paragraph_rules.horizontal_rule_removal_rule import HorizontalRuleRemovalRule
-
-# 表格规则
-from .table_rules.table_width_rule import TableWidthRule
-from .table_rules.table_border_rule import TableBorderRule
-from .table_rules.table_borders_rule import TableBordersRule
-
-# 页面规则
-from .page_rules.page_layout_rule import PageLayoutRule
-
-__all__ = [
+_RULE_MODULES = {
     # 字体规则
-    'FontColorRule',
-    'FontNameRule',
-    'TitleFontRule',
-    'FontSizeRule',
+    'FontColorRule': '.font_rules.font_color_rule',
+    'FontNameRule': '.font_rules.font_standard_rule',
+    'TitleFontRule': '.font_rules.font_standard_rule',
+    'FontSizeRule': '.font_rules.font_standard_rule',
     # 段落规则
-    'ParagraphSpacingRule',
-    'TitleBoldRule',
-    'TitleAlignmentRule',
-    'ListNumberingRule',
-    'HorizontalRuleRemovalRule',
+    'ParagraphSpacingRule': '.paragraph_rules.paragraph_spacing_rule',
+    'TitleBoldRule': '.paragraph_rules.title_bold_rule',
+    'TitleAlignmentRule': '.paragraph_rules.title_alignment_rule',
+    'ListNumberingRule': '.paragraph_rules.list_numbering_rule',
+    'HorizontalRuleRemovalRule': '.paragraph_rules.horizontal_rule_removal_rule',
     # 表格规则
-    'TableWidthRule',
-    'TableBorderRule',
-    'TableBordersRule',
+    'TableWidthRule': '.table_rules.table_width_rule',
+    'TableBorderRule': '.table_rules.table_border_rule',
+    'TableBordersRule': '.table_rules.table_borders_rule',
     # 页面规则
-    'PageLayoutRule',
-]
+    'PageLayoutRule': '.page_rules.page_layout_rule',
+}
+
+__all__ = list(_RULE_MODULES)
+
+
+def __getattr__(name):
+    module_path = _RULE_MODULES.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_path, __name__), name)
@@ -1,5 +1,6 @@
+import copy
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from schemas.rule_params import RuleConfigSchema, ParamSchema
 
@@ -30,15 +31,43 @@ class BaseRule(ABC):
     - display_name: 规则显示名称
     - category: 规则类别
     - param_schema: 参数 Schema 定义（RuleConfigSchema 实例）
+    - reads / writes: 读写的文档资源，引擎据此安排规则的执行顺序
+    - version: 规则实现的版本，输出结果变化时递增
+    - complexity: 执行时间随文档规模增长的复杂度类别
     - apply(): 规则执行逻辑
+
+    规则也可以覆盖访问者钩子（on_section / on_paragraph / on_run / on_cell），
+    由引擎在一次文档遍历中统一分发节点；未覆盖任何钩子的规则仍通过 apply() 单独执行。
+    修改格式属性时优先使用 set_property()，写入会被合并并由引擎一次性应用。
     """
-    
+
     # 子类需要覆盖的类属性
     display_name: str = "未命名规则"
     category: str = "其他规则"
     description: Optional[str] = None
     param_schema: Optional[RuleConfigSchema] = None
-    
+
+    # 规则实现的版本，修改会改变输出结果的实现时递增，已缓存的结果随之失效
+    version: str = "1"
+
+    # 执行时间随文档规模（段落、表格、单元格数）增长的复杂度类别：
+    # "constant"、"linear" 或 "quadratic"，由复杂度回归测试（tests/test_complexity.py）检查
+    complexity: str = "linear"
+
+    # 融合遍历时是否需要访问表格中的单元格、段落和文本运行
+    traverse_tables: bool = True
+
+    # 是否可以由流式引擎（core.streaming）执行：只通过访问者钩子处理段落、
+    # 文本运行和单元格，且只依赖当前段落或表格及样式定义
+    streamable: bool = False
+
+    # 规则读写的文档资源（core.scheduler.Resource），引擎据此排定执行顺序；
+    # 为 None 时视为读写全部资源
+    reads: Optional[Tuple[str, ...]] = None
+    writes: Optional[Tuple[str, ...]] = None
+
+    _TRAVERSAL_HOOKS = ('on_section', 'on_paragraph', 'on_run', 'on_cell')
+
     def __init__(self, config: Dict[str, Any] = None):
         # 使用 schema 的默认值初始化配置
         if self.param_schema:
@@ -59,7 +88,81 @@ class BaseRule(ABC):
         :param doc_context: python-docx 的文档对象或其封装
         """
         pass
-    
+
+    # ============== 访问者钩子（融合遍历） ==============
+
+    @classmethod
+    def traversal_hooks(cls) -> List[str]:
+        """返回子类覆盖了的访问者钩子名称"""
+        hooks = cls.__dict__.get('_cached_traversal_hooks')
+        if hooks is None:
+            hooks = [
+                name for name in cls._TRAVERSAL_HOOKS
+                if getattr(cls, name) is not getattr(BaseRule, name)
+            ]
+            cls._cached_traversal_hooks = hooks
+        return hooks
+
+    def supports_traversal(self) -> bool:
+        """规则是否可以参与融合遍历"""
+        return bool(self.traversal_hooks())
+
+    def begin_traversal(self, doc_context: Any) -> None:
+        """遍历开始前调用，可用于预先解析配置"""
+        pass
+
+    def on_section(self, section, doc_context: Any) -> int:
+        """处理一个节（section），返回修复数量"""
+        return 0
+
+    def on_paragraph(self, paragraph, doc_context: Any, in_table: bool = False) -> int:
+        """处理一个段落，返回修复数量"""
+        return 0
+
+    def on_run(self, run, doc_context: Any, paragraph=None, in_table: bool = False) -> int:
+        """处理一个文本运行，返回修复数量"""
+        return 0
+
+    def on_cell(self, cell, doc_context: Any, row_index: int = 0) -> int:
+        """处理一个表格单元格，返回修复数量"""
+        return 0
+
+    def end_traversal(self, doc_context: Any, fixed_count: int) -> RuleResult:
+        """遍历结束后调用，生成规则执行结果"""
+        return RuleResult(
+            rule_id=self.rule_id,
+            success=True,
+            fixed_count=fixed_count,
+            details=[]
+        )
+
+    def apply_by_traversal(self, doc_context: Any) -> RuleResult:
+        """
+        只针对当前规则执行一次遍历，供已迁移到钩子的规则实现 apply()
+        :param doc_context: 文档上下文
+        """
+        from core.traversal import DocumentTraversal
+
+        _, result, error = DocumentTraversal(doc_context, [self]).run()[0]
+        doc_context.commit_patches()
+        if error is not None:
+            raise error
+        return result
+
+    def set_property(self, doc_context: Any, node, prop: str, value: Any):
+        """
+        以补丁形式写入属性，由引擎合并后统一应用
+        :param prop: core.patch 中注册的属性名，如 'run.color'
+        """
+        doc_context.set_property(node, prop, value, self.rule_id)
+
+    def record_change(self, doc_context: Any, node, prop: str, old_value: Any, new_value: Any):
+        """
+        只读（检查）模式下记录本应直接修改 XML 的地方，代替修改
+        直接修改 XML 的规则在 doc_context.read_only 为真时调用
+        """
+        doc_context.record_change(node, prop, old_value, new_value, self.rule_id)
+
     def validate_config(self) -> List[str]:
         """
         验证当前配置是否有效
@@ -115,6 +218,17 @@ class BaseRule(ABC):
         """返回规则的可解释描述"""
         return self.description or self.__doc__ or "无描述"
     
+    def with_params(self, params: Optional[Dict[str, Any]]) -> 'BaseRule':
+        """
+        返回用 params 覆盖配置的副本，本规则的配置不变
+        请求中的参数只对该次执行有效；需要长期修改配置时使用 update_config()
+        """
+        if not params:
+            return self
+        rule = copy.copy(self)
+        rule.config = {**self.config, **params}
+        return rule
+
     def update_config(self, new_config: Dict[str, Any]) -> List[str]:
         """
         更新配置并验证
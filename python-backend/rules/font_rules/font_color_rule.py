@@ -2,6 +2,7 @@
 """字体颜色统一规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.shared import RGBColor
 from schemas.rule_params import RuleConfigSchema, ColorParam
 
@@ -11,7 +12,10 @@ class FontColorRule(BaseRule):
 
     display_name = "字体颜色统一"
     category = "字体规则"
+    streamable = True
     description = "将文档中所有文本的颜色统一为指定颜色"
+    reads = ()
+    writes = (Resource.RUN_FONT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -29,47 +33,39 @@ class FontColorRule(BaseRule):
         :param doc_context: 文档上下文
         :return: 规则执行结果
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
-        
-        # 解析颜色配置（支持 #RRGGBB 和 RRGGBB 两种格式）
+        return self.apply_by_traversal(doc_context)
+
+    def begin_traversal(self, doc_context):
+        """解析颜色配置（支持 #RRGGBB 和 RRGGBB 两种格式）"""
         text_color = self.config.get('text_color', '#000000')
         if text_color.startswith('#'):
             text_color = text_color[1:]
-        
+        self._text_color = text_color
+
         # 将十六进制颜色转换为RGB
         if isinstance(text_color, str) and len(text_color) == 6:
             r = int(text_color[0:2], 16)
             g = int(text_color[2:4], 16)
             b = int(text_color[4:6], 16)
-            target_color = RGBColor(r, g, b)
+            self._target_color = RGBColor(r, g, b)
         else:
             # 默认黑色
-            target_color = RGBColor(0, 0, 0)
-        
-        # 处理段落文本
-        for paragraph in document.paragraphs:
-            for run in paragraph.runs:
-                if run.font.color.rgb != target_color:
-                    run.font.color.rgb = target_color
-                    fixed_count += 1
-        
-        # 处理表格中的文本
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            if run.font.color.rgb != target_color:
-                                run.font.color.rgb = target_color
-                                fixed_count += 1
-        
+            self._target_color = RGBColor(0, 0, 0)
+
+    def on_run(self, run, doc_context, paragraph=None, in_table=False):
+        """统一正文和表格中文本运行的颜色"""
+        if doc_context.get_property(run, 'run.color') != self._target_color:
+            self.set_property(doc_context, run, 'run.color', self._target_color)
+            return 1
+        return 0
+
+    def end_traversal(self, doc_context, fixed_count):
+        details = []
         if fixed_count > 0:
-            details.append(f"统一了 {fixed_count} 个文本的颜色为 #{text_color}")
+            details.append(f"统一了 {fixed_count} 个文本的颜色为 #{self._text_color}")
         else:
-            details.append(f"文档中所有文本颜色已经是 #{text_color}")
-        
+            details.append(f"文档中所有文本颜色已经是 #{self._text_color}")
+
         return RuleResult(
             rule_id=self.rule_id,
             success=True,
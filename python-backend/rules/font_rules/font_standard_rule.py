@@ -2,8 +2,8 @@
 """字体标准化规则集"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.shared import Pt
-from docx.oxml.ns import qn
 from schemas.rule_params import (
     RuleConfigSchema, 
     FontParam, 
@@ -17,7 +17,10 @@ class FontNameRule(BaseRule):
 
     display_name = "字体名称标准化"
     category = "字体规则"
+    streamable = True
     description = "为文档设置统一的中文字体和西文字体"
+    reads = ()
+    writes = (Resource.RUN_FONT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -40,32 +43,16 @@ class FontNameRule(BaseRule):
         应用字体名称规则
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
+        return self.apply_by_traversal(doc_context)
 
-        for paragraph in document.paragraphs:
-            for run in paragraph.runs:
-                run.font.name = self.config['western_font']
-                run._element.rPr.rFonts.set(
-                    qn('w:eastAsia'),
-                    self.config['chinese_font']
-                )
-                fixed_count += 1
-
-        # 处理表格中的文本
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.name = self.config['western_font']
-                            run._element.rPr.rFonts.set(
-                                qn('w:eastAsia'),
-                                self.config['chinese_font']
-                            )
-                            fixed_count += 1
+    def on_run(self, run, doc_context, paragraph=None, in_table=False) -> int:
+        """设置正文和表格中文本运行的中西文字体"""
+        self.set_property(doc_context, run, 'run.font_name', self.config['western_font'])
+        self.set_property(doc_context, run, 'run.east_asia_font', self.config['chinese_font'])
+        return 1
 
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
+        details = []
         details.append(f"中文字体: {self.config['chinese_font']}, 西文字体: {self.config['western_font']}")
         details.append(f"标准化了 {fixed_count} 个文本运行的字体")
 
@@ -82,7 +69,11 @@ class TitleFontRule(BaseRule):
 
     display_name = "标题字体设置"
     category = "字体规则"
+    streamable = True
     description = "为文档标题设置专用字体"
+    traverse_tables = False
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.RUN_FONT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -99,20 +90,22 @@ class TitleFontRule(BaseRule):
         应用标题字体规则
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
+        return self.apply_by_traversal(doc_context)
 
-        for paragraph in document.paragraphs:
-            if paragraph.style.name.startswith('Heading'):
-                for run in paragraph.runs:
-                    run.font.name = 'Arial'  # 西文字体固定为Arial
-                    run._element.rPr.rFonts.set(
-                        qn('w:eastAsia'),
-                        self.config['title_font']
-                    )
-                    fixed_count += 1
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        """为标题段落的文本运行设置标题字体"""
+        if not doc_context.index.is_heading(paragraph):
+            return 0
+
+        fixed_count = 0
+        for run in doc_context.index.runs_of(paragraph):
+            self.set_property(doc_context, run, 'run.font_name', 'Arial')  # 西文字体固定为Arial
+            self.set_property(doc_context, run, 'run.east_asia_font', self.config['title_font'])
+            fixed_count += 1
+        return fixed_count
 
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
+        details = []
         details.append(f"标题使用字体: {self.config['title_font']}")
         details.append(f"标准化了 {fixed_count} 个标题文本运行的字体")
 
@@ -129,7 +122,11 @@ class FontSizeRule(BaseRule):
 
     display_name = "字号标准化"
     category = "字体规则"
+    streamable = True
     description = "统一设置文档中正文和各级标题的字号"
+    traverse_tables = False
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.RUN_FONT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -190,30 +187,37 @@ class FontSizeRule(BaseRule):
         应用字号规则
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
+        return self.apply_by_traversal(doc_context)
 
-        for paragraph in document.paragraphs:
-            if paragraph.style.name.startswith('Heading'):
-                # 根据标题级别设置字号
-                for run in paragraph.runs:
-                    if paragraph.style.name == 'Heading 1':
-                        run.font.size = Pt(self.config['font_size_title1'])
-                    elif paragraph.style.name == 'Heading 2':
-                        run.font.size = Pt(self.config['font_size_title2'])
-                    elif paragraph.style.name == 'Heading 3':
-                        run.font.size = Pt(self.config['font_size_title3'])
-                    else:
-                        run.font.size = Pt(self.config['font_size_body'])
-                    fixed_count += 1
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        """按标题级别或正文设置段落中文本运行的字号"""
+        fixed_count = 0
+        runs = doc_context.index.runs_of(paragraph)
+        level = doc_context.index.heading_level(paragraph)
+        if level is not None:
+            # 根据标题级别设置字号
+            if level == 1:
+                size = Pt(self.config['font_size_title1'])
+            elif level == 2:
+                size = Pt(self.config['font_size_title2'])
+            elif level == 3:
+                size = Pt(self.config['font_size_title3'])
             else:
-                # 正文：如果字号太小则标准化
-                for run in paragraph.runs:
-                    if run.font.size is None or run.font.size.pt < self.config['min_font_size']:
-                        run.font.size = Pt(self.config['font_size_body'])
-                        fixed_count += 1
+                size = Pt(self.config['font_size_body'])
+            for run in runs:
+                self.set_property(doc_context, run, 'run.size', size)
+                fixed_count += 1
+        else:
+            # 正文：如果字号太小则标准化
+            for run in runs:
+                size = doc_context.get_property(run, 'run.size')
+                if size is None or size.pt < self.config['min_font_size']:
+                    self.set_property(doc_context, run, 'run.size', Pt(self.config['font_size_body']))
+                    fixed_count += 1
+        return fixed_count
 
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
+        details = []
         details.append(f"正文字号: {self.config['font_size_body']}pt")
         details.append(f"一级标题字号: {self.config['font_size_title1']}pt")
         details.append(f"二级标题字号: {self.config['font_size_title2']}pt")
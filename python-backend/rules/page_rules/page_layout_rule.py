@@ -2,6 +2,7 @@
 """页面布局规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.shared import Cm
 from schemas.rule_params import (
     RuleConfigSchema,
@@ -16,6 +17,8 @@ class PageLayoutRule(BaseRule):
     display_name = "页面布局设置"
     category = "页面规则"
     description = "设置文档的页面大小、边距等布局参数"
+    reads = ()
+    writes = (Resource.PAGE_GEOMETRY,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -107,36 +110,46 @@ class PageLayoutRule(BaseRule):
         核心执行逻辑
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
-        
+        return self.apply_by_traversal(doc_context)
+
+    def begin_traversal(self, doc_context):
         # 获取页面尺寸
         page_size = self.config.get('page_size', 'a4')
         if page_size in self.PAGE_SIZES:
-            page_width, page_height = self.PAGE_SIZES[page_size]
+            self._page_width, self._page_height = self.PAGE_SIZES[page_size]
         else:
-            page_width = self.config.get('page_width_cm', 21.0)
-            page_height = self.config.get('page_height_cm', 29.7)
+            self._page_width = self.config.get('page_width_cm', 21.0)
+            self._page_height = self.config.get('page_height_cm', 29.7)
+        self._details = []
+
+    def on_section(self, section, doc_context) -> int:
+        """设置一个节的页面大小和边距"""
+        # 设置页面大小
+        self.set_property(doc_context, section, 'section.page_width', Cm(self._page_width))
+        self.set_property(doc_context, section, 'section.page_height', Cm(self._page_height))
 
-        for section in document.sections:
-            # 设置页面大小
-            section.page_width = Cm(page_width)
-            section.page_height = Cm(page_height)
-            fixed_count += 1
+        # 设置边距
+        top = Cm(self.config.get('page_margin_top_cm', 2.54))
+        bottom = Cm(self.config.get('page_margin_bottom_cm', 2.54))
+        left = Cm(self.config.get('page_margin_left_cm', 2.54))
+        right = Cm(self.config.get('page_margin_right_cm', 2.54))
+        self.set_property(doc_context, section, 'section.top_margin', top)
+        self.set_property(doc_context, section, 'section.bottom_margin', bottom)
+        self.set_property(doc_context, section, 'section.left_margin', left)
+        self.set_property(doc_context, section, 'section.right_margin', right)
 
-            # 设置边距
-            section.top_margin = Cm(self.config.get('page_margin_top_cm', 2.54))
-            section.bottom_margin = Cm(self.config.get('page_margin_bottom_cm', 2.54))
-            section.left_margin = Cm(self.config.get('page_margin_left_cm', 2.54))
-            section.right_margin = Cm(self.config.get('page_margin_right_cm', 2.54))
+        # 向后续规则（如表格宽度）发布版心宽度
+        if section is doc_context.index.sections[0]:
+            doc_context.available_width_cm = self._page_width - left.cm - right.cm
 
-            details.append(f"页面大小: {page_width:.1f}cm × {page_height:.1f}cm")
-            details.append(f"边距: 上{section.top_margin.cm:.1f}cm, 下{section.bottom_margin.cm:.1f}cm, 左{section.left_margin.cm:.1f}cm, 右{section.right_margin.cm:.1f}cm")
+        self._details.append(f"页面大小: {self._page_width:.1f}cm × {self._page_height:.1f}cm")
+        self._details.append(f"边距: 上{top.cm:.1f}cm, 下{bottom.cm:.1f}cm, 左{left.cm:.1f}cm, 右{right.cm:.1f}cm")
+        return 1
 
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
         return RuleResult(
             rule_id=self.rule_id,
             success=True,
             fixed_count=fixed_count,
-            details=details
+            details=self._details
         )
@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
 """编号列表规则"""
 
+import copy
 import re
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.enum.text import WD_LINE_SPACING
 from docx.shared import Pt, Cm
-from docx.oxml.ns import qn
 from schemas.rule_params import (
     RuleConfigSchema,
     FontParam,
@@ -21,20 +22,32 @@ class ListNumberingRule(BaseRule):
     display_name = "编号列表标准化"
     category = "段落规则"
     description = "修复和标准化文档中的编号列表和项目符号格式"
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.DOCUMENT_STRUCTURE, Resource.RUN_FONT,
+              Resource.PARAGRAPH_FORMAT, Resource.PARAGRAPH_STYLE)
+    version = "2"
     
+    # 不需要的项目符号（如·），匹配的段落转换为无序列表
+    BULLET_PATTERNS = [re.compile(pattern) for pattern in (
+        r'^\s*·\s+',  # 中文点号
+        r'^\s*\*\s+',  # 星号
+        r'^\s*-\s+',   # 连字符
+        r'^\s+•\s+',   # 实心圆点
+    )]
+
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
         FontParam(
             name="chinese_font",
             display_name="中文字体",
-            default="宋体",
-            description="列表项使用的中文字体"
+            default="",
+            description="列表项使用的中文字体，为空时不设置，沿用字体规则设置的字体"
         ),
         FontParam(
             name="western_font",
             display_name="西文字体",
-            default="Arial",
-            description="列表项使用的西文字体"
+            default="",
+            description="列表项使用的西文字体，为空时不设置，沿用字体规则设置的字体"
         ),
         SizeParam(
             name="font_size_body",
@@ -79,60 +92,47 @@ class ListNumberingRule(BaseRule):
         核心执行逻辑
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
         fixed_count = 0
         details = []
         
-        # 获取编号模式
-        patterns = self.detect_numbering_patterns()
+        # 获取编号模式，整个文档只编译一次
+        patterns = {name: re.compile(pattern) for name, pattern in self.detect_numbering_patterns().items()}
         
-        for paragraph in document.paragraphs:
+        index = doc_context.index
+        for paragraph in index.paragraphs:
             original_text = paragraph.text.strip()
             
-            if not original_text or paragraph.style.name.startswith('Heading'):
+            if not original_text or index.is_heading(paragraph):
                 continue
             
             # 处理不需要的项目符号（如·）
-            bullet_patterns = [
-                r'^\s*·\s+',  # 中文点号
-                r'^\s*\*\s+',  # 星号
-                r'^\s*-\s+',   # 连字符
-                r'^\s+•\s+',   # 实心圆点
-            ]
-            
             bullet_matched = False
-            for bullet_pattern in bullet_patterns:
-                bullet_match = re.match(bullet_pattern, original_text)
+            for bullet_pattern in self.BULLET_PATTERNS:
+                bullet_match = bullet_pattern.match(original_text)
                 if bullet_match:
                     bullet_matched = True
                     # 提取内容（去掉项目符号）
                     content = original_text[len(bullet_match.group()):].strip()
+                    fixed_count += 1
+                    if doc_context.read_only:
+                        # 检查模式下不重建段落，只记录本应做出的修改
+                        self.record_change(doc_context, paragraph, 'paragraph.list_item', original_text, content)
+                        break
                     
-                    # 清除原有内容
-                    paragraph.clear()
-                    
-                    # 添加内容
-                    run = paragraph.add_run(content)
-                    run.font.name = self.config['western_font']
-                    run._element.rPr.rFonts.set(
-                        qn('w:eastAsia'), 
-                        self.config['chinese_font']
-                    )
-                    run.font.color.rgb = self._parse_color(self.config.get('text_color', '#000000'))
-                    run.font.size = Pt(self.config['font_size_body'])
+                    # 只保留去掉项目符号后的内容
+                    self._rebuild_paragraph(paragraph, content, doc_context)
                     
                     # 设置为无序列表样式
-                    if 'List Paragraph' in [style.name for style in document.styles]:
-                        paragraph.style = document.styles['List Paragraph']
+                    doc_context.styles.set_paragraph_style(paragraph, 'List Paragraph')
                     
                     # 设置缩进
-                    paragraph_format = paragraph.paragraph_format
-                    paragraph_format.left_indent = Cm(self.config.get('list_indent', 1.27))
-                    paragraph_format.first_line_indent = Cm(-0.64)
-                    paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-                    paragraph_format.line_spacing = self.config.get('line_spacing', 1.5)
-                    
-                    fixed_count += 1
+                    self.set_property(doc_context, paragraph, 'paragraph.left_indent',
+                                      Cm(self.config.get('list_indent', 1.27)))
+                    self.set_property(doc_context, paragraph, 'paragraph.first_line_indent', Cm(-0.64))
+                    self.set_property(doc_context, paragraph, 'paragraph.line_spacing_rule',
+                                      WD_LINE_SPACING.MULTIPLE)
+                    self.set_property(doc_context, paragraph, 'paragraph.line_spacing',
+                                      self.config.get('line_spacing', 1.5))
                     break
             
             if bullet_matched:
@@ -140,12 +140,23 @@ class ListNumberingRule(BaseRule):
             
             # 检查各种编号模式
             for pattern_name, pattern in patterns.items():
-                match = re.match(pattern, original_text)
+                match = pattern.match(original_text)
                 if match:
-                    self._format_numbered_paragraph(paragraph, pattern_name, match, original_text, document)
+                    if doc_context.read_only:
+                        content = original_text[len(match.group()):].strip()
+                        self.record_change(doc_context, paragraph, 'paragraph.list_item', original_text, content)
+                    else:
+                        self._format_numbered_paragraph(paragraph, pattern_name, match, original_text,
+                                                        doc_context)
                     fixed_count += 1
                     break
         
+        doc_context.commit_patches()
+
+        # 段落内容已被重建，索引中缓存的文本运行失效
+        if fixed_count > 0 and not doc_context.read_only:
+            doc_context.invalidate_index()
+
         details.append(f"总共修复了 {fixed_count} 个编号或项目符号段落")
         
         return RuleResult(
@@ -170,54 +181,64 @@ class ListNumberingRule(BaseRule):
         }
         return patterns
     
-    def _format_numbered_paragraph(self, paragraph, pattern_type: str, match, original_text: str, document):
+    def _rebuild_paragraph(self, paragraph, content: str, doc_context):
+        """清除段落原有的文本运行，添加一个内容为 content 的文本运行，沿用原第一个文本运行的格式"""
+        runs = paragraph.runs
+        rPr = runs[0]._r.rPr if runs else None
+        paragraph.clear()
+        run = paragraph.add_run(content)
+        if rPr is not None:
+            run._r._insert_rPr(copy.deepcopy(rPr))
+        self._set_run_format(run, doc_context)
+        return run
+
+    def _set_run_format(self, run, doc_context):
+        """设置列表项文本运行的字体、颜色和字号"""
+        # 未指定字体时沿用原文本运行的字体：检查模式下不重建列表项，字体规则对原文本
+        # 运行的要求就是处理后应满足的要求，这里覆盖会使处理后的文档检查时仍有违规
+        if self.config.get('western_font'):
+            self.set_property(doc_context, run, 'run.font_name', self.config['western_font'])
+        if self.config.get('chinese_font'):
+            self.set_property(doc_context, run, 'run.east_asia_font', self.config['chinese_font'])
+        self.set_property(doc_context, run, 'run.color',
+                          self._parse_color(self.config.get('text_color', '#000000')))
+        self.set_property(doc_context, run, 'run.size', Pt(self.config['font_size_body']))
+
+    def _format_numbered_paragraph(self, paragraph, pattern_type: str, match, original_text: str, doc_context):
         """格式化编号段落"""
         # 提取编号和内容
         number_part = match.group()
         content = original_text[len(number_part):].strip()
         
-        # 清除原有内容
-        paragraph.clear()
-        
-        # 添加内容
-        run = paragraph.add_run(content)
-        run.font.name = self.config['western_font']
-        run._element.rPr.rFonts.set(
-            qn('w:eastAsia'), 
-            self.config['chinese_font']
-        )
-        run.font.color.rgb = self._parse_color(self.config.get('text_color', '#000000'))
-        run.font.size = Pt(self.config['font_size_body'])
+        # 只保留去掉编号后的内容
+        self._rebuild_paragraph(paragraph, content, doc_context)
         
         # 设置段落格式
-        if 'List Paragraph' in [style.name for style in document.styles]:
-            paragraph.style = document.styles['List Paragraph']
-        else:
-            paragraph.style = document.styles['Normal']
+        styles = doc_context.styles
+        if not styles.set_paragraph_style(paragraph, 'List Paragraph'):
+            styles.set_paragraph_style(paragraph, 'Normal')
         
         # 设置缩进
-        paragraph_format = paragraph.paragraph_format
         list_indent = self.config.get('list_indent', 1.27)
         
         # 根据编号类型设置不同缩进
         if pattern_type.startswith('arabic') or pattern_type.startswith('chinese'):
             # 主要列表项
-            paragraph_format.left_indent = Cm(list_indent)
-            paragraph_format.first_line_indent = Cm(-0.64)
+            left_indent = Cm(list_indent)
         elif pattern_type.startswith('lower_') or pattern_type.startswith('upper_'):
             # 次级列表项
-            paragraph_format.left_indent = Cm(list_indent * 2)
-            paragraph_format.first_line_indent = Cm(-0.64)
+            left_indent = Cm(list_indent * 2)
         else:
             # 默认缩进
-            paragraph_format.left_indent = Cm(list_indent)
-            paragraph_format.first_line_indent = Cm(-0.64)
+            left_indent = Cm(list_indent)
+        self.set_property(doc_context, paragraph, 'paragraph.left_indent', left_indent)
+        self.set_property(doc_context, paragraph, 'paragraph.first_line_indent', Cm(-0.64))
         
         # 设置行距
-        paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-        paragraph_format.line_spacing = self.config.get('line_spacing', 1.5)
-        paragraph_format.space_before = Pt(0)
-        paragraph_format.space_after = Pt(6)
+        self.set_property(doc_context, paragraph, 'paragraph.line_spacing_rule', WD_LINE_SPACING.MULTIPLE)
+        self.set_property(doc_context, paragraph, 'paragraph.line_spacing', self.config.get('line_spacing', 1.5))
+        self.set_property(doc_context, paragraph, 'paragraph.space_before', Pt(0))
+        self.set_property(doc_context, paragraph, 'paragraph.space_after', Pt(6))
     
     def _parse_color(self, color_value):
         """解析颜色值"""
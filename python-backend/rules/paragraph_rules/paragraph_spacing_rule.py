@@ -2,6 +2,7 @@
 """段落间距统一规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.shared import Cm
 from docx.enum.text import WD_LINE_SPACING
 from schemas.rule_params import RuleConfigSchema, RangeParam
@@ -12,7 +13,10 @@ class ParagraphSpacingRule(BaseRule):
 
     display_name = "段落间距统一"
     category = "段落规则"
+    streamable = True
     description = "统一设置文档中正文和表格内段落的间距、缩进和行距"
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.PARAGRAPH_FORMAT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -94,40 +98,36 @@ class ParagraphSpacingRule(BaseRule):
         :param doc_context: 文档上下文
         :return: 规则执行结果
         """
-        document = doc_context.get_document()
-        fixed_count = 0
+        return self.apply_by_traversal(doc_context)
+
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        """设置正文段落的间距和缩进，或表格内段落的缩进"""
+        if in_table:
+            self.set_property(doc_context, paragraph, 'paragraph.left_indent', Cm(self.config['table_left_indent']))
+            self.set_property(doc_context, paragraph, 'paragraph.right_indent', Cm(self.config['table_right_indent']))
+            return 1
+
+        # 跳过标题段落
+        if doc_context.index.is_heading(paragraph):
+            return 0
+
+        # 设置段落格式
+        self.set_property(doc_context, paragraph, 'paragraph.left_indent', Cm(self.config['body_left_indent']))
+        self.set_property(doc_context, paragraph, 'paragraph.right_indent', Cm(self.config['body_right_indent']))
+        self.set_property(doc_context, paragraph, 'paragraph.space_before', Cm(self.config['body_space_before']))
+        self.set_property(doc_context, paragraph, 'paragraph.space_after', Cm(self.config['body_space_after']))
+        self.set_property(doc_context, paragraph, 'paragraph.line_spacing_rule', WD_LINE_SPACING.MULTIPLE)
+        self.set_property(doc_context, paragraph, 'paragraph.line_spacing', self.config['body_line_spacing'])
+        return 1
+
+    def end_traversal(self, doc_context, fixed_count):
         details = []
-        
-        # 处理普通段落
-        for paragraph in document.paragraphs:
-            # 跳过标题段落
-            if not paragraph.style.name.startswith('Heading'):
-                # 设置段落格式
-                paragraph_format = paragraph.paragraph_format
-                paragraph_format.left_indent = Cm(self.config['body_left_indent'])
-                paragraph_format.right_indent = Cm(self.config['body_right_indent'])
-                paragraph_format.space_before = Cm(self.config['body_space_before'])
-                paragraph_format.space_after = Cm(self.config['body_space_after'])
-                paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-                paragraph_format.line_spacing = self.config['body_line_spacing']
-                fixed_count += 1
-        
-        # 处理表格中的段落
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        paragraph_format = paragraph.paragraph_format
-                        paragraph_format.left_indent = Cm(self.config['table_left_indent'])
-                        paragraph_format.right_indent = Cm(self.config['table_right_indent'])
-                        fixed_count += 1
-        
         if fixed_count > 0:
             details.append(f"统一了 {fixed_count} 个段落的间距和缩进")
             details.append(f"行间距: {self.config['body_line_spacing']}倍")
         else:
             details.append("文档中没有需要处理的段落")
-        
+
         return RuleResult(
             rule_id=self.rule_id,
             success=True,
@@ -2,6 +2,7 @@
 """标题对齐规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from schemas.rule_params import RuleConfigSchema, EnumParam
 
@@ -11,7 +12,11 @@ class TitleAlignmentRule(BaseRule):
 
     display_name = "标题对齐设置"
     category = "段落规则"
+    streamable = True
     description = "分别设置一级标题和其他级别标题的对齐方式"
+    traverse_tables = False
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.PARAGRAPH_FORMAT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -41,34 +46,40 @@ class TitleAlignmentRule(BaseRule):
         ),
     ])
 
+    # 对齐方式映射
+    ALIGN_MAP = {
+        'center': WD_ALIGN_PARAGRAPH.CENTER,
+        'left': WD_ALIGN_PARAGRAPH.LEFT,
+        'right': WD_ALIGN_PARAGRAPH.RIGHT,
+        'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
+    }
+
     def apply(self, doc_context) -> RuleResult:
         """
         应用标题对齐规则
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
+        return self.apply_by_traversal(doc_context)
 
-        # 对齐方式映射
-        align_map = {
-            'center': WD_ALIGN_PARAGRAPH.CENTER,
-            'left': WD_ALIGN_PARAGRAPH.LEFT,
-            'right': WD_ALIGN_PARAGRAPH.RIGHT,
-            'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
-        }
+    def begin_traversal(self, doc_context):
+        self._heading1_align = self.ALIGN_MAP.get(self.config['heading1_align'], WD_ALIGN_PARAGRAPH.CENTER)
+        self._other_heading_align = self.ALIGN_MAP.get(self.config['other_heading_align'], WD_ALIGN_PARAGRAPH.LEFT)
 
-        heading1_align = align_map.get(self.config['heading1_align'], WD_ALIGN_PARAGRAPH.CENTER)
-        other_heading_align = align_map.get(self.config['other_heading_align'], WD_ALIGN_PARAGRAPH.LEFT)
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        """设置标题段落的对齐方式"""
+        level = doc_context.index.heading_level(paragraph)
+        if level is None:
+            return 0
 
-        for paragraph in document.paragraphs:
-            if paragraph.style.name.startswith('Heading'):
-                if paragraph.style.name == 'Heading 1':
-                    paragraph.alignment = heading1_align
-                else:
-                    paragraph.alignment = other_heading_align
-                fixed_count += 1
+        if level == 1:
+            alignment = self._heading1_align
+        else:
+            alignment = self._other_heading_align
+        self.set_property(doc_context, paragraph, 'paragraph.alignment', alignment)
+        return 1
 
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
+        details = []
         details.append(f"一级标题对齐: {self.config['heading1_align']}")
         details.append(f"其他标题对齐: {self.config['other_heading_align']}")
         details.append(f"调整了 {fixed_count} 个标题的对齐方式")
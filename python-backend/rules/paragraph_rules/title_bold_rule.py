@@ -2,6 +2,7 @@
 """标题加粗规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
 from schemas.rule_params import RuleConfigSchema, BoolParam
 
 
@@ -10,7 +11,11 @@ class TitleBoldRule(BaseRule):
 
     display_name = "标题加粗"
     category = "段落规则"
+    streamable = True
     description = "设置是否将所有标题文本加粗显示"
+    traverse_tables = False
+    reads = (Resource.PARAGRAPH_STYLE,)
+    writes = (Resource.RUN_FONT,)
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -27,16 +32,21 @@ class TitleBoldRule(BaseRule):
         应用标题加粗规则
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
-        fixed_count = 0
-        details = []
+        return self.apply_by_traversal(doc_context)
 
-        for paragraph in document.paragraphs:
-            if paragraph.style.name.startswith('Heading'):
-                for run in paragraph.runs:
-                    run.font.bold = self.config['bold']
-                    fixed_count += 1
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        """设置标题段落中文本运行的加粗状态"""
+        if not doc_context.index.is_heading(paragraph):
+            return 0
 
+        fixed_count = 0
+        for run in doc_context.index.runs_of(paragraph):
+            self.set_property(doc_context, run, 'run.bold', self.config['bold'])
+            fixed_count += 1
+        return fixed_count
+
+    def end_traversal(self, doc_context, fixed_count) -> RuleResult:
+        details = []
         bold_text = "加粗" if self.config['bold'] else "取消加粗"
         details.append(f"标题文字{bold_text}")
         details.append(f"处理了 {fixed_count} 个标题文本运行")
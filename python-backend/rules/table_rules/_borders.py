@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""表格规则共用的单元格边框和底纹写入"""
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+# w:tcPr 中排在 w:tcBorders 之后的子元素，插入时保持 OOXML 规定的顺序
+TC_BORDERS_SUCCESSORS = ('w:shd', 'w:noWrap', 'w:tcMar', 'w:textDirection', 'w:tcFitText',
+                         'w:vAlign', 'w:hideMark', 'w:headers', 'w:cellIns', 'w:cellDel',
+                         'w:cellMerge', 'w:tcPrChange')
+SHD_SUCCESSORS = TC_BORDERS_SUCCESSORS[1:]
+
+CELL_BORDER_SIDES = ('top', 'left', 'bottom', 'right')
+
+
+def cell_border_attributes(border_size, border_color: str) -> dict:
+    """单元格四边边框元素应有的属性"""
+    return {
+        qn('w:val'): 'single',
+        qn('w:sz'): str(border_size),
+        qn('w:space'): '0',
+        qn('w:color'): border_color,
+    }
+
+
+def describe_cell_border(cell):
+    """单元格 w:tcBorders 中四边边框的描述（如 top=single/4/000000），没有边框时返回 None"""
+    tcPr = cell._tc.tcPr
+    tcBorders = tcPr.find(qn('w:tcBorders')) if tcPr is not None else None
+    if tcBorders is None:
+        return None
+    sides = []
+    for side in CELL_BORDER_SIDES:
+        border_elem = tcBorders.find(qn(f'w:{side}'))
+        if border_elem is not None:
+            sides.append(f"{side}={border_elem.get(qn('w:val'))}/{border_elem.get(qn('w:sz'))}/"
+                         f"{border_elem.get(qn('w:color'))}")
+    return ','.join(sides) or None
+
+
+def cell_background(cell):
+    """单元格底纹的填充色，没有底纹时返回 None"""
+    tcPr = cell._tc.tcPr
+    shading = tcPr.find(qn('w:shd')) if tcPr is not None else None
+    return shading.get(qn('w:fill')) if shading is not None else None
+
+
+def cell_border_matches(cell, border_size, border_color: str) -> bool:
+    """单元格四边的边框是否已经是指定样式（只读，不修改文档）"""
+    tcPr = cell._tc.tcPr
+    if tcPr is None:
+        return False
+    tcBorders = tcPr.find(qn('w:tcBorders'))
+    if tcBorders is None:
+        return False
+    expected = cell_border_attributes(border_size, border_color)
+    for side in CELL_BORDER_SIDES:
+        if tcPr.find(qn(f'w:{side}')) is not None:
+            return False
+        border_elem = tcBorders.find(qn(f'w:{side}'))
+        if border_elem is None or any(border_elem.get(name) != value for name, value in expected.items()):
+            return False
+    return True
+
+
+def set_cell_border(cell, border_size, border_color: str) -> bool:
+    """
+    设置单元格四边的边框，已有的边框设置被覆盖而不是重复追加
+    :return: 是否修改了单元格；边框已经是指定样式时不修改
+    """
+    if cell_border_matches(cell, border_size, border_color):
+        return False
+    tcPr = cell._tc.get_or_add_tcPr()
+    tcBorders = tcPr.find(qn('w:tcBorders'))
+    if tcBorders is None:
+        tcBorders = OxmlElement('w:tcBorders')
+        tcPr.insert_element_before(tcBorders, *TC_BORDERS_SUCCESSORS)
+
+    for side in CELL_BORDER_SIDES:
+        # 旧版本直接追加在 w:tcPr 下的边框元素一并清除
+        for stale in tcPr.findall(qn(f'w:{side}')):
+            tcPr.remove(stale)
+        border_elem = tcBorders.find(qn(f'w:{side}'))
+        if border_elem is None:
+            border_elem = OxmlElement(f'w:{side}')
+            tcBorders.append(border_elem)
+        for name, value in cell_border_attributes(border_size, border_color).items():
+            border_elem.set(name, value)
+    return True
+
+
+def cell_background_matches(cell, color: str) -> bool:
+    """单元格是否只有一个指定填充色的底纹（只读，不修改文档）"""
+    tcPr = cell._tc.tcPr
+    if tcPr is None:
+        return False
+    shadings = tcPr.findall(qn('w:shd'))
+    return len(shadings) == 1 and shadings[0].get(qn('w:fill')) == color
+
+
+def set_cell_background(cell, color: str) -> bool:
+    """
+    设置单元格底纹的填充色，只保留一个底纹元素
+    :return: 是否修改了单元格
+    """
+    if cell_background_matches(cell, color):
+        return False
+    tcPr = cell._tc.get_or_add_tcPr()
+    # 旧版本追加在末尾的底纹元素一并清除
+    for stale in tcPr.findall(qn('w:shd')):
+        tcPr.remove(stale)
+    shading = OxmlElement('w:shd')
+    shading.set(qn('w:fill'), color)
+    tcPr.insert_element_before(shading, *SHD_SUCCESSORS)
+    return True
+
+
+def update_cell_border(rule, doc_context, cell, border_size, border_color: str) -> bool:
+    """
+    由规则设置单元格边框；只读（检查）模式下不修改文档，记录本应做出的修改
+    :return: 边框是否需要修改
+    """
+    if cell_border_matches(cell, border_size, border_color):
+        return False
+    if doc_context.read_only:
+        expected = ','.join(f"{side}=single/{border_size}/{border_color}" for side in CELL_BORDER_SIDES)
+        rule.record_change(doc_context, cell._tc, 'cell.borders', describe_cell_border(cell), expected)
+    else:
+        set_cell_border(cell, border_size, border_color)
+    return True
+
+
+def update_cell_background(rule, doc_context, cell, color: str) -> bool:
+    """
+    由规则设置单元格底纹；只读（检查）模式下不修改文档，记录本应做出的修改
+    :return: 底纹是否需要修改
+    """
+    if cell_background_matches(cell, color):
+        return False
+    if doc_context.read_only:
+        rule.record_change(doc_context, cell._tc, 'cell.shading', cell_background(cell), color)
+    else:
+        set_cell_background(cell, color)
+    return True
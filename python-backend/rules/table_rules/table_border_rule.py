@@ -2,8 +2,8 @@
 """表格边框规则"""
 
 from rules.base_rule import BaseRule, RuleResult
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from core.scheduler import Resource
+from rules.table_rules._borders import update_cell_background, update_cell_border
 from docx.enum.table import WD_ALIGN_VERTICAL
 from docx.shared import Pt, RGBColor, Cm
 from schemas.rule_params import (
@@ -22,6 +22,9 @@ class TableBorderRule(BaseRule):
     display_name = "表格边框和格式"
     category = "表格规则"
     description = "为表格添加统一边框样式，并格式化表头和内容单元格"
+    reads = ()
+    writes = (Resource.TABLE_CELL, Resource.RUN_FONT, Resource.PARAGRAPH_FORMAT)
+    version = "2"
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -92,11 +95,11 @@ class TableBorderRule(BaseRule):
         核心执行逻辑
         :param doc_context: 文档上下文对象
         """
-        document = doc_context.get_document()
+        index = doc_context.index
         fixed_count = 0
         details = []
         
-        if not document.tables:
+        if not index.tables:
             details.append("文档中没有表格，跳过表格边框和格式设置")
             return RuleResult(
                 rule_id=self.rule_id,
@@ -105,20 +108,24 @@ class TableBorderRule(BaseRule):
                 details=details
             )
         
-        details.append(f"开始为表格添加边框和格式（共 {len(document.tables)} 个）...")
+        details.append(f"开始为表格添加边框和格式（共 {len(index.tables)} 个）...")
         
         border_size = self.config.get('border_size', 4)
         border_color = self._parse_color_hex(self.config.get('border_color', '#000000'))
         
-        for table_idx, table in enumerate(document.tables):
-            # 为表格添加边框
-            for row in table.rows:
-                for cell in row.cells:
-                    self._set_cell_border(cell, border_size, border_color)
+        for table_idx, table in enumerate(index.tables):
+            # 合并单元格只处理一次
+            entries = index.cells_of(table, table_idx)
+
+            # 为表格添加边框，只统计边框实际需要修改的单元格
+            for entry in entries:
+                if update_cell_border(self, doc_context, entry.cell, border_size, border_color):
                     fixed_count += 1
             
             # 格式化表格单元格
-            self._format_table_cells(table)
+            self._format_table_cells(entries, doc_context)
+
+        doc_context.commit_patches()
         
         details.append(f"总共处理了 {fixed_count} 个表格单元格")
         
@@ -137,56 +144,34 @@ class TableBorderRule(BaseRule):
             return color_value
         return "000000"
     
-    def _set_cell_border(self, cell, border_size: int = 4, border_color: str = "000000"):
-        """设置单元格边框"""
-        tc = cell._tc
-        tcPr = tc.get_or_add_tcPr()
-        
-        borders = ['top', 'left', 'bottom', 'right']
-        for border in borders:
-            border_elem = OxmlElement(f'w:{border}')
-            border_elem.set(qn('w:val'), 'single')
-            border_elem.set(qn('w:sz'), str(border_size))
-            border_elem.set(qn('w:space'), '0')
-            border_elem.set(qn('w:color'), border_color)
-            tcPr.append(border_elem)
-    
-    def _format_table_cells(self, table):
+    def _format_table_cells(self, entries, doc_context):
         """格式化表格单元格"""
-        for i, row in enumerate(table.rows):
-            for j, cell in enumerate(row.cells):
-                # 设置单元格垂直居中
-                cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                
-                # 设置字体
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.name = self.config['western_font']
-                        run._element.rPr.rFonts.set(
-                            qn('w:eastAsia'), 
-                            self.config['chinese_font']
-                        )
-                        run.font.color.rgb = RGBColor(0, 0, 0)
-                        
-                        # 根据位置设置字号
-                        if i == 0 and self.config['add_table_header_format']:
-                            run.font.size = Pt(self.config['font_size_table_header'])
-                            run.font.bold = True
-                        else:
-                            run.font.size = Pt(self.config['font_size_table_content'])
-                
-                # 设置表头背景色
-                if i == 0 and self.config['add_table_header_format']:
-                    bg_color = self._parse_color_hex(self.config.get('table_header_bg_color', '#E3E3E3'))
-                    self._set_cell_background(cell, bg_color)
-                
-                # 设置单元格边距
-                if cell.paragraphs:
-                    cell.paragraphs[0].paragraph_format.left_indent = Cm(0.2)
-                    cell.paragraphs[0].paragraph_format.right_indent = Cm(0.2)
-    
-    def _set_cell_background(self, cell, color):
-        """设置单元格背景色"""
-        shading = OxmlElement('w:shd')
-        shading.set(qn('w:fill'), color)
-        cell._element.tcPr.append(shading)
+        for entry in entries:
+            cell = entry.cell
+            i = entry.row_index
+            # 设置单元格垂直居中
+            self.set_property(doc_context, cell, 'cell.vertical_alignment', WD_ALIGN_VERTICAL.CENTER)
+            
+            # 设置字体
+            for paragraph in entry.paragraphs:
+                for run in doc_context.index.runs_of(paragraph):
+                    self.set_property(doc_context, run, 'run.font_name', self.config['western_font'])
+                    self.set_property(doc_context, run, 'run.east_asia_font', self.config['chinese_font'])
+                    self.set_property(doc_context, run, 'run.color', RGBColor(0, 0, 0))
+                    
+                    # 根据位置设置字号
+                    if i == 0 and self.config['add_table_header_format']:
+                        self.set_property(doc_context, run, 'run.size', Pt(self.config['font_size_table_header']))
+                        self.set_property(doc_context, run, 'run.bold', True)
+                    else:
+                        self.set_property(doc_context, run, 'run.size', Pt(self.config['font_size_table_content']))
+            
+            # 设置表头背景色
+            if i == 0 and self.config['add_table_header_format']:
+                bg_color = self._parse_color_hex(self.config.get('table_header_bg_color', '#E3E3E3'))
+                update_cell_background(self, doc_context, cell, bg_color)
+            
+            # 设置单元格边距
+            if entry.paragraphs:
+                self.set_property(doc_context, entry.paragraphs[0], 'paragraph.left_indent', Cm(0.2))
+                self.set_property(doc_context, entry.paragraphs[0], 'paragraph.right_indent', Cm(0.2))
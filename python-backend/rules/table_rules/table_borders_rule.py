@@ -1,13 +1,16 @@
 from rules.base_rule import BaseRule, RuleResult
+from core.scheduler import Resource
+from rules.table_rules._borders import update_cell_border
 from docx.enum.table import WD_ALIGN_VERTICAL
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 
 class TableBordersRule(BaseRule):
     """表格边框统一规则"""
 
     display_name = "表格边框统一"
     category = "表格规则"
+    reads = ()
+    writes = (Resource.TABLE_CELL,)
+    version = "2"
     
     def __init__(self, config=None):
         default_params = {
@@ -17,29 +20,30 @@ class TableBordersRule(BaseRule):
         }
         super().__init__({**default_params, **(config or {})})
     
+    # 对齐方式映射
+    ALIGN_MAP = {
+        'center': WD_ALIGN_VERTICAL.CENTER,
+        'top': WD_ALIGN_VERTICAL.TOP,
+        'bottom': WD_ALIGN_VERTICAL.BOTTOM,
+    }
+
     def apply(self, context):
         """应用表格边框规则"""
-        document = context.get_document()
-        fixed_count = 0
+        return self.apply_by_traversal(context)
+
+    def begin_traversal(self, context):
+        self._vertical_alignment = self.ALIGN_MAP.get(self.config['vertical_alignment'], WD_ALIGN_VERTICAL.CENTER)
+
+    def on_cell(self, cell, context, row_index=0):
+        """设置单元格的垂直对齐和边框"""
+        # 设置单元格垂直居中
+        self.set_property(context, cell, 'cell.vertical_alignment', self._vertical_alignment)
+        # 设置单元格边框，只统计边框实际需要修改的单元格
+        return int(update_cell_border(self, context, cell, self.config['border_size'],
+                                      self.config['border_color']))
+
+    def end_traversal(self, context, fixed_count):
         details = []
-        
-        # 对齐方式映射
-        align_map = {
-            'center': WD_ALIGN_VERTICAL.CENTER,
-            'top': WD_ALIGN_VERTICAL.TOP,
-            'bottom': WD_ALIGN_VERTICAL.BOTTOM,
-        }
-        vertical_alignment = align_map.get(self.config['vertical_alignment'], WD_ALIGN_VERTICAL.CENTER)
-        
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    # 设置单元格垂直居中
-                    cell.vertical_alignment = vertical_alignment
-                    # 设置单元格边框
-                    self._set_cell_border(cell)
-                    fixed_count += 1
-        
         details.append(f"统一了{fixed_count}个表格单元格的边框格式")
         details.append(f"边框大小: {self.config['border_size']}磅")
         details.append(f"边框颜色: {self.config['border_color']}")
@@ -51,20 +55,6 @@ class TableBordersRule(BaseRule):
             details=details
         )
     
-    def _set_cell_border(self, cell):
-        """设置单元格边框"""
-        tc = cell._tc
-        tcPr = tc.get_or_add_tcPr()
-        
-        borders = ['top', 'left', 'bottom', 'right']
-        for border in borders:
-            border_elem = OxmlElement(f'w:{border}')
-            border_elem.set(qn('w:val'), 'single')
-            border_elem.set(qn('w:sz'), str(self.config['border_size']))
-            border_elem.set(qn('w:space'), '0')
-            border_elem.set(qn('w:color'), self.config['border_color'])
-            tcPr.append(border_elem)
-    
     def explain(self) -> str:
         """解释规则"""
         return "为文档中所有表格的单元格添加统一的边框，并设置垂直居中对齐"
@@ -2,6 +2,8 @@
 """表格宽度规则"""
 
 from rules.base_rule import BaseRule, RuleResult
+from core.patch import normalize_length
+from core.scheduler import Resource
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.shared import Cm
 import re
@@ -19,6 +21,9 @@ class TableWidthRule(BaseRule):
     display_name = "表格宽度优化"
     category = "表格规则"
     description = "自动调整表格宽度和列宽，支持合并单元格和嵌套表格"
+    reads = (Resource.PAGE_GEOMETRY,)
+    writes = (Resource.TABLE_GRID,)
+    version = "2"
     
     # 参数 Schema 定义
     param_schema = RuleConfigSchema(params=[
@@ -78,11 +83,8 @@ class TableWidthRule(BaseRule):
         
         details.append(f"开始优化表格（共 {len(document.tables)} 个）...")
 
-        # 获取第一个分区的页面信息
-        section = document.sections[0]
-        available_width_cm = (section.page_width.cm -
-                             section.left_margin.cm -
-                             section.right_margin.cm)
+        # 版心宽度由页面布局规则发布，调度器保证它先于本规则执行
+        available_width_cm = doc_context.available_width_cm
 
         for table_idx, table in enumerate(document.tables):
             # 检查是否有合并单元格或嵌套表格
@@ -95,25 +97,28 @@ class TableWidthRule(BaseRule):
             
             # 设置对齐方式
             alignment = self.config.get('table_alignment', 'center')
-            table.alignment = self.ALIGN_MAP.get(alignment, WD_TABLE_ALIGNMENT.CENTER)
+            changed = self._update_alignment(doc_context, table,
+                                             self.ALIGN_MAP.get(alignment, WD_TABLE_ALIGNMENT.CENTER))
             
             # 处理列宽
             col_count = len(table.columns)
             
             if self.config['auto_adjust_columns']:
                 # 自动调整列宽
-                self._auto_adjust_column_widths(table, table_width_cm, details)
+                col_widths_cm = self._auto_column_widths(table, table_width_cm)
             else:
                 # 平均分配列宽
-                col_width_cm = table_width_cm / col_count
-                for col in table.columns:
-                    col.width = Cm(col_width_cm)
+                col_widths_cm = [table_width_cm / col_count] * col_count
+            for col, col_width_cm in zip(table.columns, col_widths_cm):
+                changed = self._update_column_width(doc_context, col, Cm(col_width_cm)) or changed
             
             # 处理嵌套表格
             if has_nested_tables:
-                self._process_nested_tables(table, document, details)
+                self._process_nested_tables(table, available_width_cm, details)
             
-            fixed_count += 1
+            # 只统计对齐或列宽实际需要修改的表格
+            if changed:
+                fixed_count += 1
         
         details.append(f"总共优化了 {fixed_count} 个表格的宽度")
         
@@ -124,62 +129,50 @@ class TableWidthRule(BaseRule):
             details=details
         )
     
+    def _update_alignment(self, doc_context, table, alignment) -> bool:
+        """设置表格对齐方式；只读模式下只记录，返回是否需要修改"""
+        if table.alignment == alignment:
+            return False
+        if doc_context.read_only:
+            self.record_change(doc_context, table._tbl, 'table.alignment', table.alignment, alignment)
+        else:
+            table.alignment = alignment
+        return True
+
+    def _update_column_width(self, doc_context, col, width) -> bool:
+        """设置列宽（按 twips 比较）；只读模式下只记录，返回是否需要修改"""
+        if normalize_length(col.width) == normalize_length(width):
+            return False
+        if doc_context.read_only:
+            self.record_change(doc_context, col._gridCol, 'table.column_width', col.width, width)
+        else:
+            col.width = width
+        return True
+
     def _check_merged_cells(self, table):
         """检查表格是否有合并单元格"""
-        for row in table.rows:
-            for cell in row.cells:
-                tcPr = cell._tc.get_or_add_tcPr()
-                for child in tcPr.iter():
-                    local_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                    if local_name in ['vMerge', 'hMerge']:
-                        return True
-        return False
+        return bool(table._tbl.xpath('./w:tr/w:tc/w:tcPr/*[self::w:vMerge or self::w:hMerge]'))
     
     def _check_nested_tables(self, table):
         """检查表格是否有嵌套表格"""
-        for row in table.rows:
-            for cell in row.cells:
-                if len(cell.tables) > 0:
-                    return True
-        return False
+        return bool(table._tbl.xpath('./w:tr/w:tc/w:tbl'))
     
-    def _process_nested_tables(self, table, document, details):
+    def _process_nested_tables(self, table, available_width_cm, details):
         """处理嵌套表格"""
-        section = document.sections[0]
-        available_width_cm = (section.page_width.cm -
-                             section.left_margin.cm -
-                             section.right_margin.cm)
-
         for row in table.rows:
             for cell in row.cells:
                 for nested_table in cell.tables:
                     nested_table_width_cm = cell.width.cm * 0.9 if cell.width else available_width_cm * 0.7
                     nested_table.width = Cm(nested_table_width_cm)
     
-    def _auto_adjust_column_widths(self, table, table_width_cm, details):
-        """自动调整列宽 - 支持复杂表格"""
+    def _auto_column_widths(self, table, table_width_cm):
+        """按内容长度计算各列宽度（厘米） - 支持复杂表格"""
         col_count = len(table.columns)
         max_lengths = [0] * col_count
         
         for row in table.rows:
             for j, cell in enumerate(row.cells):
-                tcPr = cell._tc.get_or_add_tcPr()
-                gridSpan = None
-                for child in tcPr.iter():
-                    local_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                    if local_name == 'gridSpan':
-                        gridSpan = child
-                        break
-                span = 1
-                if gridSpan is not None:
-                    val = None
-                    for attr in gridSpan.attrib:
-                        local_attr_name = attr.split('}')[-1] if '}' in attr else attr
-                        if local_attr_name == 'val':
-                            val = gridSpan.attrib[attr]
-                            break
-                    if val:
-                        span = int(val)
+                span = cell._tc.grid_span
                 
                 text = cell.text.strip()
                 if text:
@@ -192,7 +185,4 @@ class TableWidthRule(BaseRule):
         
         total_length = sum(max_lengths) if sum(max_lengths) > 0 else 1
         
-        for j, col in enumerate(table.columns):
-            width_ratio = max_lengths[j] / total_length
-            col_width_cm = table_width_cm * width_ratio
-            col.width = Cm(col_width_cm)
+        return [table_width_cm * max_lengths[j] / total_length for j in range(col_count)]
@@ -1,10 +1,14 @@
-from .application_service import (
-    DocumentProcessingService,
-    ConfigManagementService,
-    RuleManagementService,
-    ServiceContainer
-)
-from .diff_service import DiffService
+# 服务在第一次访问对应名称时才导入：文档对比依赖 mammoth，文档处理依赖 python-docx，
+# 只获取版本或预设的命令不需要加载它们
+import importlib
+
+_SERVICE_MODULES = {
+    'DocumentProcessingService': '.application_service',
+    'ConfigManagementService': '.application_service',
+    'RuleManagementService': '.application_service',
+    'ServiceContainer': '.application_service',
+    'DiffService': '.diff_service',
+}
 
 __all__ = [
     'DocumentProcessingService',
@@ -12,3 +16,10 @@ __all__ = [
     'RuleManagementService',
     'DiffService'
 ]
+
+
+def __getattr__(name):
+    module_path = _SERVICE_MODULES.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_path, __name__), name)
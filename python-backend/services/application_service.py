@@ -1,6 +1,17 @@
-from typing import Dict, Any, List
-from core.engine import RuleEngine
+import glob
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional
 from core.config_loader import ConfigLoader
+from core.progress import ProgressCallback, report_progress
+from core.cancellation import CancellationToken, ExecutionCancelled
+from services.result_cache import ResultCache, execute_with_cache
+
+# 规则引擎在第一次使用时才导入，只读取预设的命令不需要加载它
+if TYPE_CHECKING:
+    from core.engine import RuleEngine
+    from services.diff_service import DiffService
 
 
 class ServiceContainer:
@@ -11,6 +22,9 @@ class ServiceContainer:
     _instance = None
     _engine = None
     _config_loader = None
+    _result_cache = None
+    # 规则引擎的规则实例和配置是共享状态，执行和修改配置时需要持有此锁
+    _engine_lock = threading.RLock()
     
     @classmethod
     def get_instance(cls) -> 'ServiceContainer':
@@ -20,12 +34,25 @@ class ServiceContainer:
         return cls._instance
     
     @classmethod
-    def get_engine(cls) -> RuleEngine:
+    def get_engine(cls) -> 'RuleEngine':
         """获取共享的规则引擎实例"""
         if cls._engine is None:
+            from core.engine import RuleEngine
             cls._engine = RuleEngine()
         return cls._engine
     
+    @classmethod
+    def get_engine_lock(cls) -> threading.RLock:
+        """获取共享规则引擎的锁"""
+        return cls._engine_lock
+
+    @classmethod
+    def get_result_cache(cls) -> ResultCache:
+        """获取处理结果缓存，位置和容量由环境变量决定"""
+        if cls._result_cache is None:
+            cls._result_cache = ResultCache.from_environment()
+        return cls._result_cache
+
     @classmethod
     def get_config_loader(cls) -> ConfigLoader:
         """获取共享的配置加载器实例"""
@@ -37,24 +64,282 @@ class ServiceContainer:
 class DocumentProcessingService:
     """文档处理服务 - 封装文档处理相关的业务逻辑"""
 
+    # 多进程批量处理时检查取消标记的间隔（秒）
+    BATCH_POLL_INTERVAL = 0.2
+
     def __init__(self):
         # 使用共享的规则引擎实例
         self.engine = ServiceContainer.get_engine()
+        self.engine_lock = ServiceContainer.get_engine_lock()
+        self.result_cache = ServiceContainer.get_result_cache()
 
-    def process_document(self, document_path: str, active_rules: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def process_document(self, document_path: str, active_rules: List[Dict[str, Any]] = None,
+                         progress: Optional[ProgressCallback] = None,
+                         cancel_token: Optional[CancellationToken] = None,
+                         instrumentation: bool = False, trace_memory: bool = False) -> Dict[str, Any]:
         """
         处理文档
         :param document_path: 文档路径
         :param active_rules: 激活的规则列表
-        :return: 处理结果
+        :param progress: 进度回调，见 RuleEngine.execute
+        :param cancel_token: 取消标记，取消时抛出 ExecutionCancelled
+        :param instrumentation: 是否收集每个规则及加载、保存的耗时等度量（不使用结果缓存）
+        :param trace_memory: 收集度量时是否记录内存峰值
+        :return: 处理结果；命中结果缓存时 cached 为 True，文档不会被重新加载
         """
         if not document_path:
             raise ValueError("Missing document_path")
 
         # 调用规则引擎执行规则
-        result = self.engine.execute(document_path, active_rules)
+        with self.engine_lock:
+            result = execute_with_cache(self.engine, self.result_cache, document_path,
+                                        active_rules, progress, cancel_token,
+                                        instrumentation, trace_memory)
+        return result
+
+    def process_with_diff(self, document_path: str, diff_service: 'DiffService',
+                          active_rules: List[Dict[str, Any]] = None,
+                          progress: Optional[ProgressCallback] = None,
+                          cancel_token: Optional[CancellationToken] = None,
+                          page_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        处理文档并对比修改前后的版本，代替 prepare_diff、process_document、generate_diff
+        三次调用；原始文档只读取一次，内容保存在对比会话中
+        :param document_path: 文档路径
+        :param diff_service: 保存对比会话和结果的对比服务，结果可以继续按页读取
+        :param active_rules: 激活的规则列表
+        :param progress: 进度回调
+        :param cancel_token: 取消标记，取消时抛出 ExecutionCancelled
+        :param page_size: 对比结果每页的差异块数
+        :return: 处理结果，diff 字段为 DiffService.generate_diff 格式的对比结果；保存失败时没有 diff
+        """
+        if not document_path:
+            raise ValueError("Missing document_path")
+
+        with open(document_path, "rb") as f:
+            original_data = f.read()
+        with self.engine_lock:
+            result = execute_with_cache(self.engine, self.result_cache, document_path,
+                                        active_rules, progress, cancel_token)
+        if result.get("save_success"):
+            result["diff"] = diff_service.diff_processed(document_path, original_data, progress, page_size)
         return result
 
+    def process_batch(self, inputs: List[str], output_dir: Optional[str] = None,
+                      active_rules: List[Dict[str, Any]] = None, workers: Optional[int] = None,
+                      on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      progress: Optional[ProgressCallback] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        批量处理文档
+        :param inputs: 文件路径、目录（处理其中的 .docx）或通配符模式
+        :param output_dir: 输出目录，为空时直接修改原文件
+        :param active_rules: 激活的规则列表
+        :param workers: 工作进程数，默认为 CPU 核数；为 1 时在当前进程中顺序处理
+        :param on_result: 每个文档处理完成时的回调，参数为该文档的结果
+        :param progress: 进度回调，每完成一个文档报告一次
+        :param cancel_token: 取消标记，在文档之间检查；取消时未开始的文档不再处理
+        :return: 汇总结果，results 按输入顺序排列
+        """
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        from services import batch_worker
+
+        files = self.resolve_batch_inputs(inputs)
+        if not files:
+            raise ValueError("No documents found")
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        jobs = list(zip(files, self._batch_output_paths(files, output_dir)))
+
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        start_time = time.time()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+        completed = 0
+
+        def collect(position: int, item: Dict[str, Any]):
+            nonlocal completed
+            results[position] = item
+            completed += 1
+            if on_result:
+                on_result(item)
+            report_progress(progress, stage="batch", file_path=item["file_path"],
+                            completed=completed, total=len(jobs),
+                            percent=completed / len(jobs) * 100)
+
+        if workers <= 1:
+            for position, (input_path, output_path) in enumerate(jobs):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                with self.engine_lock:
+                    item = batch_worker.process_file(input_path, output_path, active_rules,
+                                                     self.engine, self.result_cache)
+                collect(position, item)
+        else:
+            # 工作进程重新加载规则，带上共享引擎中通过 configure-rules 修改过的配置
+            with self.engine_lock:
+                rule_configs = {item["rule_id"]: item["config"]
+                                for item in self.engine.config_fingerprint(active_rules)
+                                if item["config"] is not None}
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=batch_worker.init_worker,
+                                           initargs=(rule_configs,))
+            try:
+                futures = {
+                    executor.submit(batch_worker.process_file, input_path, output_path, active_rules): position
+                    for position, (input_path, output_path) in enumerate(jobs)
+                }
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=self.BATCH_POLL_INTERVAL,
+                                         return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(futures[future], future.result())
+                    if pending and cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+            finally:
+                # 取消时不等待未开始的文档
+                executor.shutdown(wait=not (cancel_token and cancel_token.cancelled), cancel_futures=True)
+
+        succeeded = sum(1 for item in results if item["success"])
+        return {
+            "status": "success" if succeeded == len(results) else "error",
+            "summary": {
+                "total": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "total_fixed": sum(item["summary"].get("total_fixed", 0) for item in results),
+                "workers": workers,
+                "time_taken": f"{time.time() - start_time:.2f}s",
+            },
+            "results": results,
+        }
+
+    def check_document(self, document_path: str, active_rules: List[Dict[str, Any]] = None,
+                       progress: Optional[ProgressCallback] = None,
+                       cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        检查文档是否符合规则，不修改文档
+        :return: 检查结果，status 为 compliant 或 violations
+        """
+        if not document_path:
+            raise ValueError("Missing document_path")
+
+        with self.engine_lock:
+            return self.engine.check(document_path, active_rules, progress, cancel_token)
+
+    def check_batch(self, inputs: List[str], active_rules: List[Dict[str, Any]] = None,
+                    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    progress: Optional[ProgressCallback] = None,
+                    cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        批量检查文档
+        :param inputs: 文件路径、目录或通配符模式，见 resolve_batch_inputs
+        :param on_result: 每个文档检查完成时的回调
+        :return: 汇总结果，status 为 compliant（全部合规）、violations 或 error（有文档无法检查）
+        """
+        files = self.resolve_batch_inputs(inputs)
+        if not files:
+            raise ValueError("No documents found")
+
+        start_time = time.time()
+        results = []
+        for position, file_path in enumerate(files):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            try:
+                item = self.check_document(file_path, active_rules, cancel_token=cancel_token)
+            except ExecutionCancelled:
+                raise
+            except Exception as e:
+                item = {"status": "error", "file_path": file_path, "error": str(e),
+                        "summary": {"violation_count": 0}, "violations": []}
+            results.append(item)
+            if on_result:
+                on_result(item)
+            report_progress(progress, stage="batch", file_path=file_path,
+                            completed=position + 1, total=len(files),
+                            percent=(position + 1) / len(files) * 100)
+
+        statuses = [item["status"] for item in results]
+        if "error" in statuses:
+            status = "error"
+        elif "violations" in statuses:
+            status = "violations"
+        else:
+            status = "compliant"
+        return {
+            "status": status,
+            "summary": {
+                "total": len(results),
+                "compliant": statuses.count("compliant"),
+                "non_compliant": statuses.count("violations"),
+                "failed": statuses.count("error"),
+                "violation_count": sum(item["summary"]["violation_count"] for item in results),
+                "time_taken": f"{time.time() - start_time:.2f}s",
+            },
+            "results": results,
+        }
+
+    def cache_info(self) -> Dict[str, Any]:
+        """获取结果缓存的状态；启用了已解析文档缓存时 documents 为它的状态"""
+        from core.document_cache import shared_cache
+
+        info = self.result_cache.info()
+        documents = shared_cache()
+        if documents is not None:
+            info["documents"] = documents.info()
+        return info
+
+    def purge_cache(self) -> Dict[str, Any]:
+        """清空结果缓存和已解析文档缓存"""
+        from core.document_cache import shared_cache
+
+        documents = shared_cache()
+        if documents is not None:
+            documents.clear()
+        return self.result_cache.purge()
+
+    @staticmethod
+    def resolve_batch_inputs(inputs: List[str]) -> List[str]:
+        """展开文件、目录和通配符，去重并保持顺序，跳过 Word 的临时锁文件"""
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        files = []
+        seen = set()
+        for item in inputs or []:
+            if os.path.isdir(item):
+                candidates = sorted(glob.glob(os.path.join(item, '*.docx')))
+            elif glob.has_magic(item):
+                candidates = sorted(glob.glob(item, recursive=True))
+            else:
+                candidates = [item]
+            for path in candidates:
+                key = os.path.abspath(path)
+                if key in seen or os.path.basename(path).startswith('~$'):
+                    continue
+                seen.add(key)
+                files.append(path)
+        return files
+
+    @staticmethod
+    def _batch_output_paths(files: List[str], output_dir: Optional[str]) -> List[str]:
+        """计算输出路径；不同目录下的同名文件追加序号避免相互覆盖"""
+        if not output_dir:
+            return list(files)
+        paths = []
+        used = set()
+        for path in files:
+            base, ext = os.path.splitext(os.path.basename(path))
+            candidate = os.path.join(output_dir, base + ext)
+            counter = 1
+            while candidate in used:
+                candidate = os.path.join(output_dir, f"{base}_{counter}{ext}")
+                counter += 1
+            used.add(candidate)
+            paths.append(candidate)
+        return paths
+
 
 class ConfigManagementService:
     """配置管理服务 - 封装配置管理相关的业务逻辑"""
@@ -135,7 +420,8 @@ class RuleManagementService:
         if not rule:
             return {"rule_id": rule_id, "success": False, "error": f"Rule not found: {rule_id}"}
         
-        errors = rule.update_config(params)
+        with ServiceContainer.get_engine_lock():
+            errors = rule.update_config(params)
         if errors:
             return {"rule_id": rule_id, "success": False, "errors": errors}
         return {"rule_id": rule_id, "success": True}
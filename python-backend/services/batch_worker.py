@@ -0,0 +1,80 @@
+"""
+批量处理工作进程
+
+进程池中的每个工作进程在启动时创建一个 RuleEngine（加载全部规则）和
+结果缓存，之后处理分配到的文档时直接复用，避免为每个文档重复加载规则。
+工作进程中的规则使用父进程传入的配置，与单进程处理时的结果相同。
+本模块的函数需要能被 pickle，因此都定义在模块顶层。
+"""
+
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+from core import document_cache
+from core.engine import RuleEngine
+from services.result_cache import ResultCache, execute_with_cache
+
+# 工作进程内的规则引擎和结果缓存，由 init_worker() 创建
+_engine: Optional[RuleEngine] = None
+_cache: Optional[ResultCache] = None
+
+
+def init_worker(rule_configs: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    进程池初始化函数：预热规则引擎
+    :param rule_configs: 规则 ID 到配置的映射，覆盖新加载的规则的默认配置，
+                         使工作进程与父进程中的引擎使用相同的配置
+    """
+    global _engine, _cache
+    # 每个文档只加载一次，不使用从父进程继承的已解析文档缓存
+    document_cache.disable()
+    _engine = RuleEngine()
+    for rule_id, config in (rule_configs or {}).items():
+        rule = _engine.rules.get(rule_id)
+        if rule is not None:
+            rule.config = dict(config)
+    _cache = ResultCache.from_environment()
+
+
+def get_worker_engine() -> RuleEngine:
+    """获取当前进程的规则引擎，未初始化时立即创建"""
+    if _engine is None:
+        init_worker()
+    return _engine
+
+
+def process_file(input_path: str, output_path: str,
+                 active_rules: Optional[List[Dict[str, Any]]] = None,
+                 engine: Optional[RuleEngine] = None,
+                 cache: Optional[ResultCache] = None) -> Dict[str, Any]:
+    """
+    处理单个文档：先复制到输出路径，再在副本上执行规则
+    :param engine: 使用的规则引擎，默认使用工作进程预热的引擎
+    :param cache: 结果缓存，未指定 engine 时默认使用工作进程的缓存
+    :return: 单个文件的处理结果，异常不会向外抛出
+    """
+    start_time = time.time()
+    try:
+        if os.path.abspath(input_path) != os.path.abspath(output_path):
+            shutil.copyfile(input_path, output_path)
+        if engine is None:
+            engine, cache = get_worker_engine(), _cache
+        result = execute_with_cache(engine, cache, output_path, active_rules)
+        return {
+            "file_path": input_path,
+            "output_path": output_path,
+            "success": result.get("status") == "success",
+            "cached": result.get("cached", False),
+            "summary": result.get("summary", {}),
+            "results": result.get("results", []),
+        }
+    except Exception as e:
+        return {
+            "file_path": input_path,
+            "output_path": output_path,
+            "success": False,
+            "error": str(e),
+            "summary": {"total_fixed": 0, "time_taken": f"{time.time() - start_time:.2f}s"},
+        }
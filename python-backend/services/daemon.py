@@ -0,0 +1,238 @@
+"""
+后台服务进程
+
+cli.py --daemon 在 Unix 域套接字上监听，进程内的服务实例、规则引擎和已导入的
+依赖在多次调用之间复用。单命令模式（cli.py <command> <json>）先尝试把命令转发给
+正在运行的后台进程，连接不上时在当前进程中执行。后台进程空闲超过 idle_timeout
+秒后自动退出。
+
+协议：每个连接发送一行 JSON 请求 {"command": ..., "data": {...}}，
+后台进程返回一行 JSON {"result": {...}} 后关闭连接。
+
+不支持 Unix 域套接字的平台（如 Windows）上不启用后台进程，单命令模式始终在
+当前进程中执行。
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+SOCKET_ENV = "WORD_FORMAT_FIXER_DAEMON_SOCKET"
+DISABLE_ENV = "WORD_FORMAT_FIXER_NO_DAEMON"
+IDLE_TIMEOUT_ENV = "WORD_FORMAT_FIXER_DAEMON_IDLE_TIMEOUT"
+
+# 后台进程无请求时自动退出的时间（秒）
+DEFAULT_IDLE_TIMEOUT = 600
+
+# 连接后台进程的超时（秒）；连接建立后等待命令执行完成，不设超时
+CONNECT_TIMEOUT = 0.5
+
+# 请求中的路径字段，转发前转换为绝对路径，后台进程的工作目录与调用方不同
+PATH_FIELDS = ("file_path", "output_dir", "files", "pattern")
+
+CommandHandler = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class DaemonUnavailable(Exception):
+    """没有可连接的后台进程"""
+
+
+def supported() -> bool:
+    """当前平台是否支持后台进程"""
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path() -> str:
+    """
+    套接字路径：环境变量 WORD_FORMAT_FIXER_DAEMON_SOCKET 指定，否则按用户和程序目录区分，
+    不同安装位置的程序不会连接到彼此的后台进程
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1(base_dir.encode("utf-8")).hexdigest()[:10]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        import tempfile
+        runtime_dir = tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(runtime_dir, f"word_format_fixer-{user}-{digest}.sock")
+
+
+def idle_timeout_from_environment() -> float:
+    """从环境变量读取空闲超时（秒）"""
+    try:
+        return float(os.environ.get(IDLE_TIMEOUT_ENV, DEFAULT_IDLE_TIMEOUT))
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+
+
+def absolute_paths(data: Dict[str, Any]) -> Dict[str, Any]:
+    """把请求中的相对路径转换为相对当前工作目录的绝对路径"""
+    converted = dict(data)
+    for field in PATH_FIELDS:
+        value = converted.get(field)
+        if isinstance(value, str) and value:
+            converted[field] = os.path.abspath(value)
+        elif isinstance(value, list):
+            converted[field] = [os.path.abspath(item) if isinstance(item, str) and item else item
+                                for item in value]
+    return converted
+
+
+def _read_line(conn: socket.socket) -> bytes:
+    """读取一行（不含换行符），连接关闭时返回已读到的内容"""
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        newline = chunk.find(b"\n")
+        if newline >= 0:
+            chunks.append(chunk[:newline])
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def forward(command: str, data: Dict[str, Any], path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    把命令转发给后台进程执行
+    :raises DaemonUnavailable: 平台不支持、已禁用或没有正在运行的后台进程
+    """
+    if not supported() or os.environ.get(DISABLE_ENV):
+        raise DaemonUnavailable()
+    path = path or default_socket_path()
+    if not os.path.exists(path):
+        raise DaemonUnavailable()
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(CONNECT_TIMEOUT)
+        try:
+            conn.connect(path)
+        except OSError as e:
+            # 套接字文件残留但后台进程已退出
+            raise DaemonUnavailable() from e
+        conn.settimeout(None)
+        request = {"command": command, "data": absolute_paths(data)}
+        conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        response = _read_line(conn)
+    finally:
+        conn.close()
+
+    if not response:
+        # 后台进程在执行前退出（如恰好空闲超时），由调用方在当前进程中执行
+        raise DaemonUnavailable()
+    return json.loads(response.decode("utf-8"))["result"]
+
+
+class DaemonServer:
+    """在 Unix 域套接字上接受命令的后台进程"""
+
+    def __init__(self, handler: CommandHandler, path: Optional[str] = None,
+                 idle_timeout: Optional[float] = None):
+        """
+        :param handler: 执行命令的函数 handler(command, data) -> 结果字典
+        :param path: 套接字路径，默认见 default_socket_path
+        :param idle_timeout: 空闲超时（秒），默认读取环境变量；0 表示不自动退出
+        """
+        self.handler = handler
+        self.path = path or default_socket_path()
+        self.idle_timeout = idle_timeout_from_environment() if idle_timeout is None else idle_timeout
+        self._sock: Optional[socket.socket] = None
+        self._active = 0
+        self._last_activity = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def bind(self) -> bool:
+        """
+        创建套接字；已有后台进程在监听同一路径时返回 False
+        套接字文件只允许当前用户访问
+        """
+        try:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            probe.settimeout(CONNECT_TIMEOUT)
+            try:
+                probe.connect(self.path)
+            finally:
+                probe.close()
+            return False
+        except OSError:
+            # 没有进程在监听，删除残留的套接字文件
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(16)
+        # 定期醒来检查空闲超时和停止标记
+        sock.settimeout(min(self.idle_timeout, 1.0) if self.idle_timeout else 1.0)
+        self._sock = sock
+        return True
+
+    def idle(self) -> bool:
+        """没有执行中的请求且空闲时间超过超时"""
+        with self._lock:
+            return (bool(self.idle_timeout) and self._active == 0
+                    and time.monotonic() - self._last_activity >= self.idle_timeout)
+
+    def serve_forever(self):
+        """接受连接直到空闲超时或 stop()，每个连接在独立线程中处理"""
+        try:
+            while not self._stopped.is_set() and not self.idle():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                with self._lock:
+                    self._active += 1
+                    self._last_activity = time.monotonic()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        """关闭套接字并删除套接字文件"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _handle(self, conn: socket.socket):
+        try:
+            conn.settimeout(None)
+            try:
+                request = json.loads(_read_line(conn).decode("utf-8"))
+                result = self.handler(request["command"], request.get("data") or {})
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                result = {"error": f"Invalid request: {e}"}
+            conn.sendall(json.dumps({"result": result}).encode("utf-8") + b"\n")
+        except OSError:
+            # 调用方已断开
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                self._active -= 1
+                self._last_activity = time.monotonic()
@@ -1,50 +1,164 @@
 """
 Visual Diff Service - 文档对比服务
 提供文档修改前后的可视化对比功能
+
+差异由 core.document_diff 直接比较两个版本的 document.xml 得到，包括文本修改
+和格式修改；HTML（差异表格和两个版本的完整预览）只在调用方需要时生成。
+
+generate_diff 只返回统计和第一页差异块，完整结果保存在服务中，调用方按页
+（get_diff_page）或按修改后文档的块区间（get_diff_range）读取，单次返回的数据量
+与文档长度无关。
+
+处理文档时也可以在处理后直接调用 diff_processed：原始文档只在处理前读取一次，
+不需要单独的 prepare_diff 和 generate_diff 调用。
+
+文档的HTML预览按文件内容的哈希缓存，内容未变的文件（包括对比中的两个版本）
+不重复转换。从 document.xml 提取的块按其内容的哈希缓存，块只读，各次对比直接
+共享：处理后再次处理同一文件时，上次的修改后版本就是这次的原始版本，不再重新提取。
 """
 
-import mammoth
-import difflib
-import tempfile
-import shutil
+import hashlib
 import os
-from typing import Dict, Any, List, Optional
+import threading
+import uuid
+import zipfile
+from bisect import bisect_left
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Tuple
+
+from core.memory_cache import MemoryCache
+from core.progress import ProgressCallback, report_progress
+
+if TYPE_CHECKING:
+    from core.document_diff import Block
+
+SESSIONS_ENV = "WORD_FORMAT_FIXER_DIFF_SESSIONS"
+SESSION_MEMORY_ENV = "WORD_FORMAT_FIXER_DIFF_MEMORY_MB"
+
+# 默认最多同时保留的对比会话数和原始文档占用的内存上限（MB）
+DEFAULT_MAX_SESSIONS = 16
+DEFAULT_MAX_MEMORY_MB = 128
+
+# 每页差异块数
+DEFAULT_PAGE_SIZE = 100
+
+# 最多缓存的块列表数（每次对比的原始和修改后版本各一个），与会话共用内存上限
+DEFAULT_MAX_BLOCK_LISTS = 8
+
+PREVIEW_CACHE_ENV = "WORD_FORMAT_FIXER_PREVIEW_CACHE_MB"
+
+# 默认最多缓存的预览数和预览HTML占用的内存上限（MB）
+DEFAULT_MAX_PREVIEWS = 32
+DEFAULT_PREVIEW_CACHE_MB = 64
+
+
+class DiffSession:
+    """一次对比的原始文档，文件内容保存在内存中"""
+
+    def __init__(self, token: str, path: str, data: bytes):
+        self.token = token
+        self.path = path
+        self.data = data
+
+    @property
+    def size(self) -> int:
+        """估算占用的内存字节数"""
+        return len(self.data)
+
+
+class DiffResult:
+    """一次对比的结果，差异块按在修改后文档中的位置排列"""
+
+    def __init__(self, hunks: List[Dict[str, Any]], stats: Dict[str, Any]):
+        self.hunks = hunks
+        self.stats = stats
+        self._positions = [hunk["position"] for hunk in hunks]
+
+    @property
+    def size(self) -> int:
+        """估算占用的内存字节数：文本长度加上每个差异块和格式修改的固定开销"""
+        return sum(len(hunk["before"] or "") + len(hunk["after"] or "") + 512
+                   + 256 * len(hunk["properties"]) for hunk in self.hunks)
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-len(self.hunks) // page_size))
+
+    def page(self, page: int, page_size: int) -> List[Dict[str, Any]]:
+        return self.hunks[page * page_size:(page + 1) * page_size]
+
+    def range(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """位置在 [start, end) 内的差异块"""
+        return self.hunks[bisect_left(self._positions, start):bisect_left(self._positions, end)]
+
+
+def _limit_from_environment(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
 
 
 class DiffService:
-    """文档对比服务 - 提供修改前后的可视化对比"""
+    """
+    文档对比服务 - 提供修改前后的可视化对比
+    prepare_diff 为每个原始文档创建一个会话并返回会话令牌，generate_diff 按令牌
+    取出对应的原始文档，多个文档可以同时准备和对比。会话按最近最少使用淘汰，
+    数量和内存上限可以通过环境变量 WORD_FORMAT_FIXER_DIFF_SESSIONS 和
+    WORD_FORMAT_FIXER_DIFF_MEMORY_MB 调整。
+    """
     
-    def __init__(self):
-        self._temp_dir = None
-        self._original_html = None
-        self._original_path = None
+    def __init__(self, max_sessions: Optional[int] = None, max_bytes: Optional[int] = None,
+                 preview_bytes: Optional[int] = None):
+        if max_sessions is None:
+            max_sessions = int(_limit_from_environment(SESSIONS_ENV, DEFAULT_MAX_SESSIONS))
+        if max_bytes is None:
+            max_bytes = int(_limit_from_environment(SESSION_MEMORY_ENV, DEFAULT_MAX_MEMORY_MB) * 1024 * 1024)
+        if preview_bytes is None:
+            preview_bytes = int(_limit_from_environment(PREVIEW_CACHE_ENV, DEFAULT_PREVIEW_CACHE_MB) * 1024 * 1024)
+        self._sessions = MemoryCache(max_sessions, max_bytes)
+        # 会话令牌 -> 最近一次生成的对比结果
+        self._results = MemoryCache(max_sessions, max_bytes)
+        # 文件内容的 sha256 -> 预览HTML
+        self._previews = MemoryCache(DEFAULT_MAX_PREVIEWS, preview_bytes)
+        # document.xml 的 sha256 -> 提取的块，大小按 document.xml 的长度估算
+        self._blocks = MemoryCache(DEFAULT_MAX_BLOCK_LISTS, max_bytes)
+        # 文档路径 -> 最近一次为它创建的会话令牌，兼容不传令牌的调用；
+        # 后台进程的连接线程和交互模式的执行线程会同时创建会话，读写时持有锁
+        self._latest_sessions: Dict[str, str] = {}
+        self._latest_lock = threading.Lock()
     
-    def prepare_diff(self, document_path: str) -> Dict[str, Any]:
+    def prepare_diff(self, document_path: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
-        准备对比：在处理文档前调用，缓存原始文档的HTML
+        准备对比：在处理文档前调用，在内存中保存原始文档
         
         Args:
             document_path: 原始文档路径
+            progress: 进度回调
             
         Returns:
-            包含状态和原始HTML的字典
+            包含状态和会话令牌的字典
         """
+        from core.document_diff import read_document_xml
+
         try:
-            # 创建临时目录存储原始文档副本
-            self._temp_dir = tempfile.mkdtemp(prefix="word_diff_")
-            self._original_path = document_path
+            report_progress(progress, stage="read-original", percent=0)
+            with open(document_path, "rb") as f:
+                data = f.read()
+            # 提前确认是有效的 .docx，避免处理完成后才发现无法对比
+            read_document_xml(data)
+            report_progress(progress, stage="read-original", percent=100)
             
-            # 复制原始文档到临时目录
-            temp_doc_path = os.path.join(self._temp_dir, "original.docx")
-            shutil.copy2(document_path, temp_doc_path)
-            
-            # 转换原始文档为HTML
-            self._original_html = self._docx_to_html(temp_doc_path)
+            session = self._create_session(document_path, data)
+            if session is None:
+                return {
+                    "status": "error",
+                    "message": "Document is too large to cache for comparison"
+                }
             
             return {
                 "status": "success",
                 "message": "Original document cached for comparison",
-                "original_html": self._original_html
+                "session": session.token
             }
         except Exception as e:
             return {
@@ -52,171 +166,309 @@ class DiffService:
                 "message": f"Failed to prepare diff: {str(e)}"
             }
     
-    def generate_diff(self, modified_path: str) -> Dict[str, Any]:
+    def _create_session(self, document_path: str, data: bytes) -> Optional[DiffSession]:
+        """保存原始文档并创建会话，文档超过内存上限无法保存时返回 None"""
+        session = DiffSession(uuid.uuid4().hex, os.path.abspath(document_path), data)
+        if not self._sessions.put(session.token, session, session.size):
+            return None
+        with self._latest_lock:
+            # 丢弃已被淘汰的会话的路径记录
+            self._latest_sessions = {path: token for path, token in self._latest_sessions.items()
+                                     if token in self._sessions}
+            self._latest_sessions[session.path] = session.token
+        return session
+    
+    def get_session(self, modified_path: str, session: Optional[str] = None) -> Optional[DiffSession]:
+        """按令牌查找会话；未指定令牌时取最近一次为同一路径准备的会话"""
+        if session is None:
+            with self._latest_lock:
+                session = self._latest_sessions.get(os.path.abspath(modified_path))
+            if session is None:
+                return None
+        return self._sessions.get(session)
+    
+    def generate_diff(self, modified_path: str, progress: Optional[ProgressCallback] = None,
+                      session: Optional[str] = None, include_html: bool = False,
+                      page_size: Optional[int] = None) -> Dict[str, Any]:
         """
         生成对比：在处理文档后调用，生成差异数据
         
         Args:
             modified_path: 修改后的文档路径
+            progress: 进度回调
+            session: prepare_diff 返回的会话令牌，不指定时使用最近一次为同一路径准备的会话
+            include_html: 是否同时返回差异表格和两个版本的HTML预览
+            page_size: 每页差异块数，默认 DEFAULT_PAGE_SIZE
             
         Returns:
-            包含差异数据的字典
+            包含统计、分页信息和第一页差异块的字典；结果过大无法保存时返回全部差异块
         """
+        from core.document_diff import read_document_xml, render_html
+
         try:
-            if not self._original_html:
+            original = self.get_session(modified_path, session)
+            if original is None:
+                if session is not None:
+                    return {
+                        "status": "error",
+                        "message": f"Unknown or expired diff session: {session}"
+                    }
                 return {
                     "status": "error",
                     "message": "No original document cached. Call prepare_diff first."
                 }
             
-            # 转换修改后的文档为HTML
-            modified_html = self._docx_to_html(modified_path)
-            
-            # 生成差异
-            diff_result = self._generate_html_diff(self._original_html, modified_html)
+            # 比较两个版本的正文部件
+            report_progress(progress, stage="compare", percent=0)
+            diff_result = self._compare(read_document_xml(original.data), read_document_xml(modified_path))
+            report_progress(progress, stage="compare", percent=100)
             
-            return {
-                "status": "success",
-                "original_html": self._original_html,
-                "modified_html": modified_html,
-                "diff_html": diff_result["diff_html"],
-                "changes": diff_result["changes"],
-                "stats": diff_result["stats"]
-            }
+            result = self._store_result(original.token, diff_result["hunks"], diff_result["stats"], page_size)
+            if include_html:
+                report_progress(progress, stage="render", percent=0)
+                result["diff_html"] = render_html(diff_result["hunks"])
+                result["original_html"] = self._preview_html(original.data)[0]
+                with open(modified_path, "rb") as f:
+                    result["modified_html"] = self._preview_html(f.read())[0]
+                report_progress(progress, stage="render", percent=100)
+            return result
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Failed to generate diff: {str(e)}"
             }
-        finally:
-            self._cleanup()
     
-    def get_document_preview(self, document_path: str) -> Dict[str, Any]:
+    def diff_processed(self, document_path: str, original_data: bytes,
+                       progress: Optional[ProgressCallback] = None,
+                       page_size: Optional[int] = None) -> Dict[str, Any]:
         """
-        获取文档的HTML预览
+        对比刚处理完的文档，代替处理前的 prepare_diff 和处理后的 generate_diff
         
         Args:
-            document_path: 文档路径
+            document_path: 已被处理并保存的文档路径
+            original_data: 处理前读取的文档内容，保存为会话的原始文档
+            progress: 进度回调
+            page_size: 每页差异块数，默认 DEFAULT_PAGE_SIZE
             
         Returns:
-            包含HTML预览的字典
+            与 generate_diff 相同；原始文档过大无法保存时结果仍可分页读取，但分栏视图不可用
         """
+        from core.document_diff import read_document_xml
+
         try:
-            html = self._docx_to_html(document_path)
-            return {
-                "status": "success",
-                "html": html
-            }
+            session = self._create_session(document_path, original_data)
+            token = session.token if session is not None else uuid.uuid4().hex
+            
+            report_progress(progress, stage="compare", percent=0)
+            diff_result = self._compare(read_document_xml(original_data), read_document_xml(document_path))
+            report_progress(progress, stage="compare", percent=100)
+            
+            return self._store_result(token, diff_result["hunks"], diff_result["stats"], page_size)
         except Exception as e:
             return {
                 "status": "error",
-                "message": f"Failed to generate preview: {str(e)}"
+                "message": f"Failed to generate diff: {str(e)}"
             }
     
-    def _docx_to_html(self, docx_path: str) -> str:
+    def _compare(self, original_xml: bytes, modified_xml: bytes) -> Dict[str, Any]:
+        """比较两个 document.xml，块从缓存中取出或提取后放入缓存"""
+        from core.document_diff import compare_blocks
+
+        return compare_blocks(self._extract_blocks(original_xml), self._extract_blocks(modified_xml))
+    
+    def _extract_blocks(self, document_xml: bytes) -> List['Block']:
+        from core.document_diff import extract_blocks
+
+        key = hashlib.sha256(document_xml).hexdigest()
+        blocks = self._blocks.get(key)
+        if blocks is None:
+            blocks = extract_blocks(document_xml)
+            self._blocks.put(key, blocks, len(document_xml))
+        return blocks
+    
+    def _store_result(self, token: str, hunks: List[Dict[str, Any]], stats: Dict[str, Any],
+                      page_size: Optional[int]) -> Dict[str, Any]:
+        """保存对比结果供分页读取，返回统计和第一页；结果过大无法保存时返回全部差异块"""
+        page_size = page_size or DEFAULT_PAGE_SIZE
+        stored = DiffResult(hunks, stats)
+        if self._results.put(token, stored, stored.size):
+            hunks, page_count = stored.page(0, page_size), stored.page_count(page_size)
+        else:
+            self._results.pop(token)
+            page_count = 1
+        return {
+            "status": "success",
+            "session": token,
+            "stats": stats,
+            "page_size": page_size,
+            "page_count": page_count,
+            "hunks": hunks
+        }
+    
+    def get_diff_page(self, session: str, page: int = 0, page_size: Optional[int] = None,
+                      include_html: bool = False) -> Dict[str, Any]:
         """
-        将Docx文档转换为HTML
+        按页读取对比结果
         
         Args:
-            docx_path: Docx文件路径
+            session: 会话令牌
+            page: 页码，从 0 开始
+            page_size: 每页差异块数，默认 DEFAULT_PAGE_SIZE
+            include_html: 是否同时返回这些差异块的 HTML 表格行
             
         Returns:
-            HTML字符串
+            包含该页差异块和分页信息的字典
         """
-        with open(docx_path, "rb") as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            return result.value
+        page_size = DEFAULT_PAGE_SIZE if page_size is None else page_size
+        if page < 0 or page_size <= 0:
+            return {
+                "status": "error",
+                "message": f"Invalid page: {page} (page size {page_size})"
+            }
+        stored = self._results.get(session)
+        if stored is None:
+            return self._missing_result(session)
+        return self._hunks_response(session, stored.page(page, page_size), include_html, {
+            "page": page,
+            "page_size": page_size,
+            "page_count": stored.page_count(page_size),
+            "total": len(stored.hunks)
+        })
     
-    def _generate_html_diff(self, original: str, modified: str) -> Dict[str, Any]:
+    def get_diff_range(self, session: str, start: int, end: int, include_html: bool = False) -> Dict[str, Any]:
         """
-        生成HTML差异对比
+        读取修改后文档中第 start 到 end（不含）个块范围内的差异块，用于虚拟滚动
         
         Args:
-            original: 原始HTML
-            modified: 修改后的HTML
+            session: 会话令牌
+            start: 起始块序号
+            end: 结束块序号（不含）
+            include_html: 是否同时返回这些差异块的 HTML 表格行
             
         Returns:
-            包含差异HTML和统计信息的字典
+            包含该范围内差异块的字典
         """
-        # 将HTML按行分割进行对比
-        original_lines = original.splitlines(keepends=True)
-        modified_lines = modified.splitlines(keepends=True)
-        
-        # 使用difflib生成差异
-        differ = difflib.HtmlDiff(wrapcolumn=80)
-        diff_table = differ.make_table(
-            original_lines, 
-            modified_lines,
-            fromdesc="修改前",
-            todesc="修改后",
-            context=True,
-            numlines=3
-        )
-        
-        # 生成unified diff用于统计
-        unified_diff = list(difflib.unified_diff(
-            original_lines, 
-            modified_lines,
-            lineterm=''
-        ))
-        
-        # 统计变更
-        additions = sum(1 for line in unified_diff if line.startswith('+') and not line.startswith('+++'))
-        deletions = sum(1 for line in unified_diff if line.startswith('-') and not line.startswith('---'))
-        
-        # 提取具体变更列表
-        changes = self._extract_changes(unified_diff)
-        
+        stored = self._results.get(session)
+        if stored is None:
+            return self._missing_result(session)
+        return self._hunks_response(session, stored.range(start, end), include_html, {
+            "start": start,
+            "end": end,
+            "total": len(stored.hunks)
+        })
+    
+    @staticmethod
+    def _missing_result(session: str) -> Dict[str, Any]:
         return {
-            "diff_html": diff_table,
-            "changes": changes,
-            "stats": {
-                "additions": additions,
-                "deletions": deletions,
-                "total_changes": additions + deletions
-            }
+            "status": "error",
+            "message": f"No diff result for session: {session}. Call generate_diff first."
         }
     
-    def _extract_changes(self, unified_diff: List[str]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _hunks_response(session: str, hunks: List[Dict[str, Any]], include_html: bool,
+                        extra: Dict[str, Any]) -> Dict[str, Any]:
+        from core.document_diff import render_rows
+
+        response = {"status": "success", "session": session, **extra, "hunks": hunks}
+        if include_html:
+            response["html"] = render_rows(hunks)
+        return response
+    
+    def get_document_preview(self, document_path: str, first_blocks: Optional[int] = None,
+                             on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
-        从unified diff中提取变更列表
+        获取文档的HTML预览
         
         Args:
-            unified_diff: unified diff行列表
+            document_path: 文档路径
+            first_blocks: 渐进模式：预览未缓存时先转换正文前若干个段落或表格，
+                          通过 on_partial 立即发送，再从头转换完整文档。前若干块因此
+                          转换两次，总耗时比直接预览多出转换这些块和重新打包的时间；
+                          mammoth 的输出不能按块拼接（跨越分界的列表会断开，脚注
+                          列表出现在部分结果末尾），所以第二遍不复用部分结果
+            on_partial: 接收部分预览 {"html": ..., "partial": True, "blocks": ...} 的回调
             
         Returns:
-            变更列表
+            包含完整HTML预览的字典，cached 表示预览取自缓存
         """
-        changes = []
-        current_change = None
-        
-        for line in unified_diff:
-            if line.startswith('@@'):
-                if current_change:
-                    changes.append(current_change)
-                current_change = {
-                    "header": line,
-                    "removed": [],
-                    "added": []
+        try:
+            with open(document_path, "rb") as f:
+                data = f.read()
+            key = hashlib.sha256(data).hexdigest()
+            html = self._previews.get(key)
+            if html is not None:
+                return {
+                    "status": "success",
+                    "html": html,
+                    "cached": True
                 }
-            elif current_change:
-                if line.startswith('-') and not line.startswith('---'):
-                    current_change["removed"].append(line[1:])
-                elif line.startswith('+') and not line.startswith('+++'):
-                    current_change["added"].append(line[1:])
-        
-        if current_change:
-            changes.append(current_change)
-        
-        return changes
-    
-    def _cleanup(self):
-        """清理临时文件"""
-        if self._temp_dir and os.path.exists(self._temp_dir):
-            try:
-                shutil.rmtree(self._temp_dir)
-            except Exception:
-                pass
-        self._temp_dir = None
-        self._original_html = None
-        self._original_path = None
+            
+            if first_blocks and on_partial is not None:
+                on_partial({
+                    "html": self._convert_to_html(BytesIO(self._first_blocks_package(data, first_blocks))),
+                    "partial": True,
+                    "blocks": first_blocks
+                })
+            html, _ = self._preview_html(data, key)
+            return {
+                "status": "success",
+                "html": html,
+                "cached": False
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to generate preview: {str(e)}"
+            }
+    
+    def _preview_html(self, data: bytes, key: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        按内容哈希读取或生成预览HTML
+        :return: (HTML, 是否取自缓存)
+        """
+        key = key or hashlib.sha256(data).hexdigest()
+        html = self._previews.get(key)
+        if html is not None:
+            return html, True
+        html = self._convert_to_html(BytesIO(data))
+        # 按 UTF-16 估算字符串占用的内存
+        self._previews.put(key, html, len(html) * 2)
+        return html, False
+    
+    @staticmethod
+    def _first_blocks_package(data: bytes, count: int) -> bytes:
+        """
+        只保留正文前 count 个段落或表格（以及分节属性）的文档包，用于快速生成首屏预览
+        其余部件原样复制，不压缩以减少打包时间
+        """
+        from lxml import etree
+        from core.document_diff import W, document_part
+
+        with zipfile.ZipFile(BytesIO(data)) as source:
+            member = document_part(source)
+            root = etree.fromstring(source.read(member), etree.XMLParser(huge_tree=True, resolve_entities=False))
+            body = root.find(W + "body")
+            kept = 0
+            for child in list(body) if body is not None else []:
+                if child.tag == W + "sectPr":
+                    continue
+                if kept >= count:
+                    body.remove(child)
+                elif child.tag in (W + "p", W + "tbl"):
+                    kept += 1
+            
+            output = BytesIO()
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as target:
+                for info in source.infolist():
+                    if info.filename == member:
+                        target.writestr(member, etree.tostring(root, xml_declaration=True,
+                                                               encoding="UTF-8", standalone=True))
+                    else:
+                        target.writestr(info.filename, source.read(info))
+            return output.getvalue()
+    
+    def _convert_to_html(self, docx_file) -> str:
+        """将打开的Docx文件对象转换为HTML"""
+        import mammoth
+
+        return mammoth.convert_to_html(docx_file).value
@@ -0,0 +1,226 @@
+"""
+处理结果缓存
+
+同一文档用同一套规则配置重复处理时，直接复制上次的输出文件并返回上次的
+处理结果，不再加载和保存文档。缓存键由输入文档内容的哈希和生效的规则
+配置（含规则版本）的规范化哈希组成。
+
+缓存保存在磁盘上，每个条目是一个目录：
+    <缓存目录>/<键的前两位>/<键>/output.docx   处理后的文档
+    <缓存目录>/<键的前两位>/<键>/meta.json     处理结果
+条目的修改时间记录最近一次使用，总大小超过上限时按最近最少使用淘汰。
+
+环境变量：
+    WORD_FORMAT_FIXER_CACHE_DIR      缓存目录
+    WORD_FORMAT_FIXER_CACHE_SIZE_MB  容量上限（MB），为 0 时禁用缓存
+"""
+
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from core.file_hash import hash_file
+
+CACHE_DIR_ENV = 'WORD_FORMAT_FIXER_CACHE_DIR'
+CACHE_SIZE_ENV = 'WORD_FORMAT_FIXER_CACHE_SIZE_MB'
+
+# 默认容量上限（MB）
+DEFAULT_MAX_SIZE_MB = 512
+
+# 缓存格式版本，条目布局或结果格式变化时递增
+CACHE_FORMAT = 1
+
+_OUTPUT_NAME = 'output.docx'
+_META_NAME = 'meta.json'
+
+
+def default_cache_dir() -> str:
+    """默认缓存目录：Windows 为 %LOCALAPPDATA%，其它系统为 ~/.cache"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'word_format_fixer', 'results')
+
+
+def hash_config(fingerprint: List[Dict[str, Any]]) -> str:
+    """计算规则配置指纹的规范化哈希（键排序，与字典插入顺序无关）"""
+    canonical = json.dumps({"format": CACHE_FORMAT, "rules": fingerprint},
+                           sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """磁盘上的处理结果缓存，按最近最少使用淘汰"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_environment(cls) -> 'ResultCache':
+        """按环境变量创建缓存"""
+        directory = os.environ.get(CACHE_DIR_ENV) or default_cache_dir()
+        try:
+            size_mb = float(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_SIZE_MB))
+        except ValueError:
+            size_mb = DEFAULT_MAX_SIZE_MB
+        return cls(directory, int(size_mb * 1024 * 1024))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(document_path: str, fingerprint: List[Dict[str, Any]]) -> str:
+        """由文档内容和规则配置指纹生成缓存键"""
+        combined = hash_file(document_path) + hash_config(fingerprint)
+        return hashlib.sha256(combined.encode('ascii')).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str, output_path: str) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存，命中时把缓存的输出复制到 output_path
+        :return: 缓存的处理结果，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, _META_NAME), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            shutil.copyfile(os.path.join(entry, _OUTPUT_NAME), output_path)
+        except (OSError, ValueError):
+            # 条目不存在、不完整或正在被淘汰
+            return None
+        try:
+            # 更新修改时间，记录最近一次使用
+            os.utime(entry)
+        except OSError:
+            pass
+        return meta.get('result')
+
+    def put(self, key: str, output_path: str, result: Dict[str, Any]) -> bool:
+        """
+        把处理后的文档和结果写入缓存
+        先写入临时目录再整体重命名，多个进程同时写入同一个键时只保留一份
+        """
+        if not self.enabled:
+            return False
+        size = os.path.getsize(output_path)
+        if size > self.max_bytes:
+            return False
+
+        entry = self._entry_dir(key)
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        try:
+            shutil.copyfile(output_path, os.path.join(staging, _OUTPUT_NAME))
+            with open(os.path.join(staging, _META_NAME), 'w', encoding='utf-8') as f:
+                json.dump({"key": key, "size": size, "created": time.time(), "result": result},
+                          f, ensure_ascii=False)
+            os.replace(staging, entry)
+        except OSError:
+            # 目标已存在（其它进程已写入）或磁盘错误，缓存写入失败不影响处理结果
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """列出缓存条目：key、size、last_used，按最近使用时间从旧到新排列"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                if key.startswith('.'):
+                    continue
+                entry = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(entry_file.stat().st_size for entry_file in os.scandir(entry))
+                    last_used = os.stat(entry).st_mtime
+                except OSError:
+                    continue
+                entries.append({"key": key, "size": size, "last_used": last_used})
+        entries.sort(key=lambda item: item["last_used"])
+        return entries
+
+    def evict(self) -> int:
+        """淘汰最近最少使用的条目直到总大小不超过上限，返回淘汰数量"""
+        entries = self.entries()
+        total = sum(item["size"] for item in entries)
+        removed = 0
+        for item in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(item["key"]), ignore_errors=True)
+            total -= item["size"]
+            removed += 1
+        return removed
+
+    def info(self) -> Dict[str, Any]:
+        """缓存状态"""
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "enabled": self.enabled,
+            "entries": len(entries),
+            "size_bytes": sum(item["size"] for item in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def purge(self) -> Dict[str, Any]:
+        """清空缓存"""
+        entries = self.entries()
+        for item in entries:
+            shutil.rmtree(self._entry_dir(item["key"]), ignore_errors=True)
+        return {
+            "status": "success",
+            "removed": len(entries),
+            "freed_bytes": sum(item["size"] for item in entries),
+        }
+
+
+def execute_with_cache(engine, cache: Optional[ResultCache], document_path: str,
+                       active_rules: Optional[List[Dict[str, Any]]] = None,
+                       progress=None, cancel_token=None, instrumentation: bool = False,
+                       trace_memory: bool = False) -> Dict[str, Any]:
+    """
+    处理文档，优先使用缓存的结果
+    命中时直接用缓存的输出覆盖 document_path，不加载文档
+    收集度量（instrumentation）时总是实际执行，既不读取也不写入缓存
+    """
+    if instrumentation:
+        return engine.execute(document_path, active_rules, progress, cancel_token,
+                              instrumentation=True, trace_memory=trace_memory)
+    if cache is None or not cache.enabled:
+        return engine.execute(document_path, active_rules, progress, cancel_token)
+
+    start_time = time.time()
+    key = cache.make_key(document_path, engine.config_fingerprint(active_rules))
+    cached = cache.get(key, document_path)
+    if cached is not None:
+        result = copy.deepcopy(cached)
+        result["summary"]["time_taken"] = f"{time.time() - start_time:.2f}s"
+        result["saved_to"] = document_path
+        result["cached"] = True
+        return result
+
+    result = engine.execute(document_path, active_rules, progress, cancel_token)
+    if result.get("save_success"):
+        cache.put(key, document_path, result)
+    return result
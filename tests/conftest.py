@@ -17,6 +17,8 @@ sys.path.insert(0, str(python_backend_path))
 
 # 设置测试环境变量
 os.environ["TESTING"] = "1"
+# 默认禁用处理结果缓存，避免测试之间相互影响；缓存测试自行创建缓存实例
+os.environ["WORD_FORMAT_FIXER_CACHE_SIZE_MB"] = "0"
 
 
 def pytest_configure(config):
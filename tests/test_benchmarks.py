@@ -0,0 +1,78 @@
+"""基准测试语料生成器和结果比较测试"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from docx import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from corpus import DocumentShape, generate_document  # noqa: E402
+from run_benchmarks import compare_results  # noqa: E402
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class CorpusGeneratorTestCase(unittest.TestCase):
+    """测试生成的文档符合形状参数"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def test_document_shape(self):
+        """测试表格、合并单元格、嵌套表格、列表、图片和横线"""
+        shape = DocumentShape(paragraphs=20, tables=2, table_rows=3, table_cols=3, merged_ratio=1.0,
+                              nested_tables=2, list_items=3, images=1, image_size=8, horizontal_rules=1)
+        doc_path = str(self.temp_path / "shape.docx")
+
+        generate_document(shape, doc_path)
+
+        doc = Document(doc_path)
+        body = doc.element.body
+        self.assertEqual(len(doc.tables), 2)
+        self.assertEqual(sum(len(table._tbl.xpath('.//w:tc//w:tbl')) for table in doc.tables), 2)
+        self.assertTrue(body.findall(f'.//{W_NS}gridSpan'))
+        styles = [p.style.name for p in doc.paragraphs]
+        self.assertEqual(styles.count("List Number"), 3)
+        self.assertEqual(styles.count("List Bullet"), 3)
+        self.assertIn("---", [p.text for p in doc.paragraphs])
+        self.assertEqual(len(doc.inline_shapes), 1)
+
+    def test_same_seed_same_content(self):
+        """测试相同形状生成相同的文本"""
+        shape = DocumentShape(paragraphs=10, tables=1)
+        paths = [str(self.temp_path / f"{name}.docx") for name in ("a", "b")]
+        for path in paths:
+            generate_document(shape, path)
+
+        texts = [[p.text for p in Document(path).paragraphs] for path in paths]
+        self.assertEqual(texts[0], texts[1])
+
+
+class CompareResultsTestCase(unittest.TestCase):
+    """测试与基线比较"""
+
+    @staticmethod
+    def result(**medians):
+        return {"metrics": {metric: {"median_ms": value} for metric, value in medians.items()}}
+
+    def test_detects_regressions(self):
+        """测试超过比例和绝对差值的变慢才视为退化"""
+        baseline = self.result(load=100.0, save=1.0, diff=100.0, preset=50.0)
+        current = self.result(load=150.0, save=2.5, diff=110.0, new=10.0)
+
+        regressions = compare_results(current, baseline, tolerance=0.25, min_delta_ms=2.0)
+
+        self.assertEqual([item["metric"] for item in regressions], ["load"])
+        self.assertEqual(regressions[0]["ratio"], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""任务取消与交互模式并发分发测试"""
+
+import asyncio
+import io
+import json
+import queue
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from docx import Document
+import cli
+from core.cancellation import CancellationToken, ExecutionCancelled
+from core.engine import RuleEngine
+from core.traversal import DocumentTraversal
+from services import DocumentProcessingService
+
+
+class EngineCancellationTestCase(unittest.TestCase):
+    """测试引擎执行过程中的取消"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.active_rules = [
+            {"rule_id": "FontColorRule", "params": {}},
+            {"rule_id": "FontNameRule", "params": {}},
+        ]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="cancel.docx", paragraphs=60):
+        """创建测试文档"""
+        doc = Document()
+        for i in range(paragraphs):
+            doc.add_paragraph(f"第 {i} 段")
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_cancelled_before_start(self):
+        """测试已取消的标记直接中止，文档不被修改"""
+        doc_path = self.create_test_document()
+        original = Path(doc_path).read_bytes()
+        token = CancellationToken()
+        token.cancel()
+
+        with self.assertRaises(ExecutionCancelled):
+            RuleEngine().execute(doc_path, self.active_rules, cancel_token=token)
+
+        self.assertEqual(Path(doc_path).read_bytes(), original)
+
+    def test_cancel_during_execution(self):
+        """测试执行过程中取消，挂起的修改被丢弃且不保存"""
+        doc_path = self.create_test_document()
+        original = Path(doc_path).read_bytes()
+        token = CancellationToken()
+
+        def progress(payload):
+            if payload.get("stage") == "rules" and payload.get("nodes_processed"):
+                token.cancel()
+
+        with patch.object(DocumentTraversal, 'PROGRESS_STEP', 10):
+            with self.assertRaises(ExecutionCancelled):
+                RuleEngine().execute(doc_path, self.active_rules, progress=progress, cancel_token=token)
+
+        self.assertEqual(Path(doc_path).read_bytes(), original)
+
+    def test_serial_batch_stops_between_files(self):
+        """测试串行批量处理在文档之间检查取消"""
+        inputs = [self.create_test_document(f"batch_{i}.docx", paragraphs=3) for i in range(3)]
+        token = CancellationToken()
+        processed = []
+
+        def on_result(item):
+            processed.append(item)
+            token.cancel()
+
+        with self.assertRaises(ExecutionCancelled):
+            DocumentProcessingService().process_batch(
+                inputs, str(self.temp_path / "out"), self.active_rules,
+                workers=1, on_result=on_result, cancel_token=token)
+
+        self.assertEqual(len(processed), 1)
+
+
+class InteractiveDispatcherTestCase(unittest.TestCase):
+    """测试交互模式的请求分发"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.output = io.StringIO()
+        self.lines = queue.Queue()
+        self.dispatcher = cli.InteractiveDispatcher(self.output)
+
+    def send(self, req_id, command, data=None):
+        """写入一行请求"""
+        self.lines.put(json.dumps({"id": req_id, "command": command, "data": data or {}}) + "\n")
+
+    def messages(self):
+        """已输出的消息"""
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def responses(self):
+        """已输出的最终结果，按输出顺序"""
+        return [m for m in self.messages() if "event" not in m]
+
+    def wait_for(self, condition, timeout=5.0):
+        """等待条件成立"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def run_dispatcher(self):
+        """在后台线程中运行分发器"""
+        thread = threading.Thread(target=asyncio.run, args=(self.dispatcher.run(self.lines.get),))
+        thread.start()
+        return thread
+
+    def test_metadata_answered_while_job_runs(self):
+        """测试耗时命令执行期间，元数据命令立即应答，结果乱序返回"""
+        release = threading.Event()
+
+        def slow_process(*args, **kwargs):
+            release.wait(5)
+            return {"status": "success"}
+
+        with patch.object(cli.doc_service, 'process_document', side_effect=slow_process):
+            thread = self.run_dispatcher()
+            self.send("slow", "process-document", {"file_path": "slow.docx"})
+            self.send("fast", "get-version")
+            self.assertTrue(self.wait_for(lambda: self.responses()))
+            release.set()
+            self.lines.put("")
+            thread.join(5)
+
+        self.assertEqual([r["id"] for r in self.responses()], ["fast", "slow"])
+        self.assertTrue(all(r["success"] for r in self.responses()))
+
+    def test_cancel_running_job(self):
+        """测试 cancel 命令中止执行中的请求"""
+        started = threading.Event()
+
+        def cancellable_process(file_path, active_rules, progress, cancel_token, **options):
+            started.set()
+            while not cancel_token.cancelled:
+                time.sleep(0.01)
+            cancel_token.raise_if_cancelled()
+
+        with patch.object(cli.doc_service, 'process_document', side_effect=cancellable_process):
+            thread = self.run_dispatcher()
+            self.send("job", "process-document", {"file_path": "job.docx"})
+            self.assertTrue(started.wait(5))
+            self.send("stop", "cancel", {"target_id": "job"})
+            self.lines.put("")
+            thread.join(5)
+
+        responses = {r["id"]: r for r in self.responses()}
+        self.assertTrue(responses["stop"]["success"])
+        self.assertFalse(responses["job"]["success"])
+        self.assertTrue(responses["job"]["result"]["cancelled"])
+        self.assertEqual(self.dispatcher.jobs, {})
+
+    def test_cancel_queued_job(self):
+        """测试耗时命令依次执行，排队中的请求被取消后不再执行"""
+        release = threading.Event()
+        started = []
+
+        def slow_process(file_path, *args, **kwargs):
+            started.append(file_path)
+            release.wait(5)
+            return {"status": "success"}
+
+        with patch.object(cli.doc_service, 'process_document', side_effect=slow_process):
+            thread = self.run_dispatcher()
+            self.send("first", "process-document", {"file_path": "first.docx"})
+            self.send("second", "process-document", {"file_path": "second.docx"})
+            self.assertTrue(self.wait_for(lambda: started))
+            self.send("stop", "cancel", {"target_id": "second"})
+            self.assertTrue(self.wait_for(lambda: len(self.responses()) == 1))
+            release.set()
+            self.lines.put("")
+            thread.join(5)
+
+        responses = {r["id"]: r for r in self.responses()}
+        self.assertEqual(started, ["first.docx"])
+        self.assertTrue(responses["first"]["success"])
+        self.assertTrue(responses["second"]["result"]["cancelled"])
+
+    def test_cancel_unknown_request(self):
+        """测试取消不存在的请求返回错误"""
+        thread = self.run_dispatcher()
+        self.send("stop", "cancel", {"target_id": "missing"})
+        self.lines.put("")
+        thread.join(5)
+
+        self.assertFalse(self.responses()[0]["success"])
+
+
+if __name__ == '__main__':
+    unittest.main()
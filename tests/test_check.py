@@ -0,0 +1,163 @@
+"""文档检查（只读模式）测试"""
+
+import subprocess
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from docx import Document
+from docx.shared import RGBColor
+from core.check import locate_element
+from core.config_loader import ConfigLoader
+from core.context import RuleContext
+from core.engine import RuleEngine
+from services.application_service import DocumentProcessingService
+
+
+class CheckDocumentTestCase(unittest.TestCase):
+    """测试检查模式"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.engine = RuleEngine()
+        self.active_rules = [{"rule_id": "FontColorRule", "params": {"text_color": "#000000"}}]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="check.docx", color=RGBColor(255, 0, 0)):
+        """创建第二段为指定颜色的测试文档"""
+        doc = Document()
+        doc.add_paragraph("第一段")
+        run = doc.add_paragraph().add_run("彩色文字")
+        run.font.color.rgb = color
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def create_structured_document(self, filename="structured.docx"):
+        """创建包含标题、编号段落、横线和表格的测试文档"""
+        doc = Document()
+        doc.add_heading("标题", level=1)
+        doc.add_paragraph("1. 编号段落")
+        doc.add_paragraph("---")
+        doc.add_paragraph().add_run("彩色文字").font.color.rgb = RGBColor(255, 0, 0)
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "表头"
+        table.cell(1, 1).text = "内容"
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_reports_violations_without_saving(self):
+        """测试报告违规的位置、属性、实际值和期望值，且文档不被修改"""
+        doc_path = self.create_test_document()
+        original = Path(doc_path).read_bytes()
+
+        result = self.engine.check(doc_path, self.active_rules)
+
+        self.assertEqual(result["status"], "violations")
+        red = [v for v in result["violations"] if v["actual"] == "FF0000"]
+        self.assertEqual(len(red), 1)
+        self.assertEqual(red[0]["location"], "body/p[1]/r[0]")
+        self.assertEqual(red[0]["property"], "run.color")
+        self.assertEqual(red[0]["expected"], "000000")
+        self.assertEqual(red[0]["rule_id"], "FontColorRule")
+        self.assertEqual(result["results"][0]["fixed_count"], len(result["violations"]))
+        self.assertEqual(Path(doc_path).read_bytes(), original)
+
+    def test_compliant_document(self):
+        """测试已符合规则的文档没有违规"""
+        doc_path = self.create_test_document(color=RGBColor(0, 0, 0))
+        self.engine.execute(doc_path, self.active_rules)
+
+        result = self.engine.check(doc_path, self.active_rules)
+
+        self.assertEqual(result["status"], "compliant")
+        self.assertEqual(result["violations"], [])
+
+    def test_processed_document_compliant(self):
+        """测试按各个完整预设处理后的文档检查时没有违规，各规则报告的数量为 0（长度按 twips 比较，
+        直接修改 XML 的规则只报告实际修改，列表项的字体不与字体规则冲突）"""
+        loader = ConfigLoader()
+        for preset_id in ("default", "academic", "bid", "product_manual"):
+            with self.subTest(preset=preset_id):
+                doc_path = self.create_structured_document(f"{preset_id}.docx")
+                config = loader.load_preset_config(preset_id)
+                active_rules = [{"rule_id": rule_id, "params": params} for rule_id, params in config.items()]
+                self.engine.execute(doc_path, active_rules)
+
+                result = self.engine.check(doc_path, active_rules)
+
+                self.assertEqual(result["violations"], [])
+                self.assertEqual(result["status"], "compliant")
+                self.assertEqual([item["fixed_count"] for item in result["results"]], [0] * len(active_rules))
+
+    def test_structural_rules_read_only(self):
+        """测试检查时删除段落、重建列表项和改写边框的规则不修改文档，报告带位置的违规"""
+        context = RuleContext(self.create_structured_document(), read_only=True)
+        original_xml = context.document.element.xml
+        active_rules = [{"rule_id": rule_id} for rule_id in
+                        ("ListNumberingRule", "HorizontalRuleRemovalRule", "TableBorderRule", "TableWidthRule")]
+
+        with context.deferred_writes():
+            self.engine._run_scheduled(context, self.engine.build_plan(active_rules))
+
+        self.assertEqual(context.document.element.xml, original_xml)
+        changes = {(change.rule_id, change.prop): change for change in context.direct_changes}
+        self.assertEqual(changes[("ListNumberingRule", "paragraph.list_item")].new_value, "编号段落")
+        self.assertEqual(locate_element(changes[("HorizontalRuleRemovalRule", "paragraph.removed")].element),
+                         "body/p[2]")
+        self.assertIn(("TableBorderRule", "cell.borders"), changes)
+        self.assertIn(("TableWidthRule", "table.column_width"), changes)
+
+    def test_read_only_context_cannot_save(self):
+        """测试只读上下文不应用补丁也不能保存"""
+        context = RuleContext(self.create_test_document(), read_only=True)
+        run = context.get_paragraphs()[1].runs[0]
+        context.set_property(run, 'run.color', RGBColor(0, 0, 0))
+
+        self.assertEqual(context.flush_patches(), [])
+        self.assertEqual(len(context.patches), 1)
+        with self.assertRaises(RuntimeError):
+            context.save_document()
+
+    def test_locate_table_cell_paragraph(self):
+        """测试表格中元素的位置描述"""
+        doc = Document()
+        doc.add_paragraph("表格前")
+        table = doc.add_table(rows=2, cols=2)
+        paragraph = table.cell(1, 1).paragraphs[0]
+
+        self.assertEqual(locate_element(paragraph._element), "body/tbl[0]/tr[1]/tc[1]/p[0]")
+
+    def test_check_batch(self):
+        """测试批量检查汇总合规与违规的文档"""
+        compliant = self.create_test_document("ok.docx", color=RGBColor(0, 0, 0))
+        self.engine.execute(compliant, self.active_rules)
+        failing = self.create_test_document("bad.docx")
+
+        result = DocumentProcessingService().check_batch([compliant, failing], self.active_rules)
+
+        self.assertEqual(result["status"], "violations")
+        self.assertEqual(result["summary"]["compliant"], 1)
+        self.assertEqual(result["summary"]["non_compliant"], 1)
+
+    def test_cli_exit_code(self):
+        """测试命令行检查发现违规时退出码为 2"""
+        cli_path = Path(__file__).parent.parent / "python-backend" / "cli.py"
+        data = json.dumps({"file_path": self.create_test_document(), "active_rules": self.active_rules})
+
+        completed = subprocess.run([sys.executable, str(cli_path), "check-document", data],
+                                   capture_output=True, text=True)
+
+        self.assertEqual(completed.returncode, 2)
+        self.assertEqual(json.loads(completed.stdout)["status"], "violations")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""规则复杂度回归测试"""
+
+import math
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+import pytest
+from core.engine import RuleEngine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from corpus import DocumentShape, generate_document  # noqa: E402
+
+# 复杂度类别允许的增长指数
+COMPLEXITY_EXPONENTS = {"constant": 0.0, "linear": 1.0, "quadratic": 2.0}
+
+# 拟合指数允许超出声明值的幅度，吸收计时噪声和缓存效应
+EXPONENT_TOLERANCE = 0.35
+
+SCALES = (1, 4, 16)
+REPEAT = 3
+
+BASE_SHAPE = DocumentShape(paragraphs=40, tables=2, table_rows=6, table_cols=4, merged_ratio=0.2,
+                           nested_tables=1, list_items=4, manual_list_items=4, images=1, image_size=8,
+                           horizontal_rules=2)
+
+
+def document_xml(path) -> bytes:
+    with zipfile.ZipFile(path) as zf:
+        return zf.read("word/document.xml")
+
+
+def fit_exponent(sizes, times) -> float:
+    """最小二乘拟合 log(时间) = k * log(规模) + c，返回 k"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-6)) for value in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+
+@pytest.mark.slow
+class RuleComplexityTestCase(unittest.TestCase):
+    """对每个已注册规则在 1x、4x、16x 规模的文档上计时，检查增长不超过声明的复杂度"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.temp_path = Path(cls.temp_dir.name)
+        cls.documents = {}
+        for scale in SCALES:
+            path = cls.temp_path / f"scale-{scale}.docx"
+            generate_document(BASE_SHAPE.scaled(scale), str(path))
+            cls.documents[scale] = path
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def rule_time(self, engine, rule_id, scale) -> float:
+        """
+        规则在指定规模文档上的执行时间（毫秒），取多次中的最小值
+        只计规则自身和应用其补丁的耗时，不含引擎构建计划、加载和保存等固定开销
+        """
+        samples = []
+        for _ in range(REPEAT):
+            path = self.temp_path / "work.docx"
+            shutil.copyfile(self.documents[scale], path)
+            result = engine.execute(str(path), [{"rule_id": rule_id}], instrumentation=True)
+            stages = result["instrumentation"]
+            samples.append(result["results"][0]["metrics"]["wall_time_ms"]
+                           + stages.get("apply_patches", {}).get("wall_time_ms", 0.0))
+        return min(samples)
+
+    def test_rules_within_declared_complexity(self):
+        """测试每个规则的拟合增长指数不超过声明的复杂度类别"""
+        engine = RuleEngine()
+        for rule_id in sorted(engine.rules):
+            with self.subTest(rule=rule_id):
+                declared = engine.rules[rule_id].complexity
+                self.assertIn(declared, COMPLEXITY_EXPONENTS)
+                times = [self.rule_time(engine, rule_id, scale) for scale in SCALES]
+                exponent = fit_exponent(SCALES, times)
+                self.assertLessEqual(
+                    exponent, COMPLEXITY_EXPONENTS[declared] + EXPONENT_TOLERANCE,
+                    f"{rule_id} 声明为 {declared}，实测增长指数 {exponent:.2f}，耗时 {times} ms")
+
+    def test_repeated_execution_is_stable(self):
+        """测试对已处理的文档再次执行不再增加内容，重复处理的耗时不会逐次增长"""
+        for rule_id in sorted(RuleEngine().rules):
+            with self.subTest(rule=rule_id):
+                path = self.temp_path / "repeat.docx"
+                shutil.copyfile(self.documents[SCALES[0]], path)
+                sizes = []
+                for _ in range(3):
+                    RuleEngine().execute(str(path), [{"rule_id": rule_id}])
+                    sizes.append(len(document_xml(path)))
+                self.assertEqual(sizes[1], sizes[2], f"{rule_id} 每次执行都会增加 document.xml 的内容")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+"""后台进程与单命令转发测试"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import yaml
+from docx import Document
+from docx.shared import RGBColor
+
+import cli
+from core.config_loader import ConfigLoader
+from core.yaml_config_repository import YamlConfigRepository
+from services import daemon
+from services.application_service import ConfigManagementService, DocumentProcessingService
+from services.result_cache import ResultCache
+
+PYTHON_BACKEND = Path(__file__).resolve().parent.parent / "python-backend"
+
+
+@unittest.skipUnless(daemon.supported(), "当前平台不支持 Unix 域套接字")
+class DaemonTestCase(unittest.TestCase):
+    """测试后台进程的请求处理、空闲退出和单命令模式的转发与回退"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.socket_path = str(self.temp_path / "daemon.sock")
+        self.received = []
+        environment = {daemon.SOCKET_ENV: self.socket_path}
+        self.env_patch = mock.patch.dict(os.environ, environment)
+        self.env_patch.start()
+        os.environ.pop(daemon.DISABLE_ENV, None)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.env_patch.stop()
+        self.temp_dir.cleanup()
+
+    def handler(self, command, data):
+        self.received.append((command, data))
+        return {"command": command, "pid": os.getpid()}
+
+    def start_server(self, idle_timeout=0, handler=None):
+        """在后台线程中运行服务端"""
+        server = daemon.DaemonServer(handler or self.handler, idle_timeout=idle_timeout)
+        self.assertTrue(server.bind())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.stop)
+        return server, thread
+
+    def test_forward(self):
+        """测试转发的命令由服务端执行，相对路径转换为调用方工作目录下的绝对路径"""
+        self.start_server()
+
+        result = daemon.forward("process-document", {"file_path": "a.docx", "files": ["b.docx"], "x": "c"})
+
+        self.assertEqual(result["command"], "process-document")
+        command, data = self.received[0]
+        self.assertEqual(data["file_path"], os.path.abspath("a.docx"))
+        self.assertEqual(data["files"], [os.path.abspath("b.docx")])
+        self.assertEqual(data["x"], "c")
+
+    def test_invalid_request(self):
+        """测试格式错误的请求返回错误，服务端继续运行"""
+        self.start_server()
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.socket_path)
+        conn.sendall(b"not json\n")
+        response = json.loads(conn.makefile().readline())
+        conn.close()
+
+        self.assertIn("error", response["result"])
+        self.assertEqual(daemon.forward("get-rules", {})["command"], "get-rules")
+
+    def test_unavailable(self):
+        """测试没有后台进程、套接字文件残留或禁用转发时抛出 DaemonUnavailable"""
+        with self.assertRaises(daemon.DaemonUnavailable):
+            daemon.forward("get-rules", {})
+
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        with self.assertRaises(daemon.DaemonUnavailable):
+            daemon.forward("get-rules", {})
+
+        self.start_server()
+        with mock.patch.dict(os.environ, {daemon.DISABLE_ENV: "1"}):
+            with self.assertRaises(daemon.DaemonUnavailable):
+                daemon.forward("get-rules", {})
+
+    def test_single_instance(self):
+        """测试已有后台进程在监听时不能再绑定同一路径，残留的套接字文件被替换"""
+        Path(self.socket_path).touch()
+        self.start_server()
+
+        self.assertFalse(daemon.DaemonServer(self.handler).bind())
+
+    def test_idle_timeout(self):
+        """测试空闲超时后服务端退出并删除套接字文件"""
+        server, thread = self.start_server(idle_timeout=0.3)
+        daemon.forward("get-rules", {})
+
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_one_off_forwarding(self):
+        """测试单命令模式转发给后台进程，本地命令和没有后台进程时在当前进程中执行"""
+        with mock.patch.object(cli, "process_command", return_value={"local": True}):
+            self.assertEqual(cli.run_one_off("get-rules", {}), {"local": True})
+
+            self.start_server()
+            self.assertEqual(cli.run_one_off("get-rules", {})["command"], "get-rules")
+            self.assertEqual(cli.run_one_off("configure-rules", {}), {"local": True})
+
+        self.assertEqual([command for command, _ in self.received], ["get-rules"])
+
+    def test_forwarded_state_not_stale(self):
+        """测试转发的请求参数不影响之后的请求，其它进程保存的预设在下次请求时可见"""
+        presets_path = self.temp_path / "presets.yaml"
+        presets_path.write_text(yaml.dump({"presets": {"default": {"name": "默认"}}}), encoding="utf-8")
+        doc_service = DocumentProcessingService()
+        doc_service.result_cache = ResultCache(str(self.temp_path / "cache"), 0)
+        config_service = ConfigManagementService()
+        config_service.config_loader = ConfigLoader(YamlConfigRepository(str(presets_path)))
+        services = mock.patch.dict(cli.__dict__, {"doc_service": doc_service, "config_service": config_service})
+        services.start()
+        self.addCleanup(services.stop)
+        self.start_server(handler=cli.process_command)
+
+        documents = []
+        for params in ({"text_color": "FF0000"}, {}):
+            doc = Document()
+            doc.add_paragraph().add_run("彩色文字").font.color.rgb = RGBColor(0, 0, 255)
+            documents.append(str(self.temp_path / f"doc{len(documents)}.docx"))
+            doc.save(documents[-1])
+            daemon.forward("process-document", {
+                "file_path": documents[-1],
+                "active_rules": [{"rule_id": "FontColorRule", "params": params}],
+            })
+        colors = [Document(path).paragraphs[0].runs[0].font.color.rgb for path in documents]
+        self.assertEqual(colors, [RGBColor(255, 0, 0), RGBColor(0, 0, 0)])
+
+        self.assertEqual(list(daemon.forward("get-presets", {})), ["default"])
+        # 模拟另一个进程修改预设文件
+        other = ConfigLoader(YamlConfigRepository(str(presets_path)))
+        other.save_preset("added", {"name": "新预设"})
+        self.assertEqual(sorted(daemon.forward("get-presets", {})), ["added", "default"])
+
+    def test_cli_daemon(self):
+        """测试 cli.py --daemon 启动后处理单命令调用，空闲超时后退出"""
+        process = subprocess.Popen([sys.executable, "cli.py", "--daemon", "2"], cwd=str(PYTHON_BACKEND),
+                                   stdout=subprocess.PIPE, text=True)
+        self.addCleanup(process.kill)
+        ready = json.loads(process.stdout.readline())
+        self.assertEqual(ready["status"], "ready")
+        self.assertEqual(ready["socket"], self.socket_path)
+
+        output = subprocess.run([sys.executable, "cli.py", "get-rules"], cwd=str(PYTHON_BACKEND),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertIn("FontColorRule", [rule["id"] for rule in json.loads(output)])
+
+        second = subprocess.run([sys.executable, "cli.py", "--daemon"], cwd=str(PYTHON_BACKEND),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(json.loads(second)["status"], "running")
+
+        process.wait(10)
+        self.assertEqual(process.returncode, 0)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
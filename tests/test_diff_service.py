@@ -6,8 +6,12 @@ DiffService 单元测试
 import unittest
 import tempfile
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 from pathlib import Path
 from docx import Document
+from docx.shared import RGBColor
 
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python-backend'))
@@ -25,13 +29,12 @@ class DiffServiceTestCase(unittest.TestCase):
 
     def tearDown(self):
         """测试后清理"""
-        import shutil
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
 
-    def create_test_document(self, content="测试内容"):
+    def create_test_document(self, content="测试内容", filename="test.docx"):
         """创建测试文档"""
-        doc_path = os.path.join(self.temp_dir, "test.docx")
+        doc_path = os.path.join(self.temp_dir, filename)
         doc = Document()
         doc.add_heading("测试标题", 0)
         doc.add_paragraph(content)
@@ -63,7 +66,8 @@ class DiffServiceTestCase(unittest.TestCase):
         result = self.service.prepare_diff(doc_path)
         
         self.assertEqual(result["status"], "success")
-        self.assertIn("original_html", result)
+        self.assertIn("session", result)
+        self.assertNotIn("original_html", result)
 
     def test_generate_diff_without_prepare(self):
         """测试未准备就生成对比"""
@@ -88,9 +92,10 @@ class DiffServiceTestCase(unittest.TestCase):
         doc.save(doc_path)
         
         # 3. 生成对比
-        diff_result = self.service.generate_diff(doc_path)
+        diff_result = self.service.generate_diff(doc_path, include_html=True)
         
         self.assertEqual(diff_result["status"], "success")
+        self.assertIn("hunks", diff_result)
         self.assertIn("original_html", diff_result)
         self.assertIn("modified_html", diff_result)
         self.assertIn("diff_html", diff_result)
@@ -118,8 +123,229 @@ class DiffServiceTestCase(unittest.TestCase):
         diff_result = self.service.generate_diff(doc_path)
         
         self.assertEqual(diff_result["status"], "success")
-        # 修改后的HTML应该包含新内容
-        self.assertIn("XYZ", diff_result["modified_html"])
+        self.assertEqual(diff_result["stats"]["additions"], 1)
+        inserted = diff_result["hunks"][0]
+        self.assertEqual(inserted["type"], "insert")
+        self.assertEqual(inserted["after"], "这是新增的段落XYZ")
+        # 默认不生成HTML
+        self.assertNotIn("modified_html", diff_result)
+
+    def test_diff_detects_format_changes(self):
+        """测试对比能检测到只改格式的段落"""
+        doc_path = self.create_test_document("原始内容")
+        self.service.prepare_diff(doc_path)
+
+        doc = Document(doc_path)
+        doc.paragraphs[1].runs[0].font.color.rgb = RGBColor(255, 0, 0)
+        doc.save(doc_path)
+        diff_result = self.service.generate_diff(doc_path)
+
+        hunk, = diff_result["hunks"]
+        self.assertEqual(hunk["type"], "format")
+        self.assertEqual(hunk["properties"], [{"name": "color", "before": None, "after": "FF0000"}])
+        self.assertEqual(diff_result["stats"]["format_changes"], 1)
+
+    def test_concurrent_sessions(self):
+        """测试同时准备的多个文档按会话令牌分别对比，互不覆盖"""
+        first = self.create_test_document("第一份文档", "first.docx")
+        second = self.create_test_document("第二份文档", "second.docx")
+
+        first_session = self.service.prepare_diff(first)["session"]
+        second_session = self.service.prepare_diff(second)["session"]
+        self.assertNotEqual(first_session, second_session)
+
+        first_result = self.service.generate_diff(second, session=first_session)
+        second_result = self.service.generate_diff(second, session=second_session)
+
+        self.assertEqual(first_result["session"], first_session)
+        self.assertEqual(first_result["hunks"][0]["before"], "第一份文档")
+        self.assertEqual(first_result["hunks"][0]["after"], "第二份文档")
+        self.assertEqual(second_result["stats"]["total_changes"], 0)
+
+    def test_sessions_created_from_threads(self):
+        """测试多个线程同时创建会话时，每个路径最近的会话都能找到"""
+        service = DiffService(max_sessions=1000)
+        paths = [os.path.join(self.temp_dir, f"thread{index}.docx") for index in range(400)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                sessions = list(executor.map(lambda path: service._create_session(path, b"data"), paths))
+        finally:
+            sys.setswitchinterval(interval)
+
+        for path, session in zip(paths, sessions):
+            self.assertIs(service.get_session(path), session)
+
+    def test_original_kept_in_memory(self):
+        """测试原始文档保存在内存中，准备后删除原文件不影响对比"""
+        doc_path = self.create_test_document("原始内容")
+        session = self.service.prepare_diff(doc_path)["session"]
+
+        modified_path = self.create_test_document("修改后内容", "modified.docx")
+        os.remove(doc_path)
+        result = self.service.generate_diff(modified_path, session=session, include_html=True)
+
+        self.assertEqual(result["status"], "success")
+        self.assertIn("原始内容", result["original_html"])
+        self.assertEqual(os.listdir(self.temp_dir), ["modified.docx"])
+
+    def test_unknown_session(self):
+        """测试未知或已过期的会话令牌"""
+        doc_path = self.create_test_document()
+
+        result = self.service.generate_diff(doc_path, session="missing")
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Unknown or expired diff session", result["message"])
+
+    def test_session_eviction(self):
+        """测试会话数量超过上限时淘汰最久未使用的会话"""
+        service = DiffService(max_sessions=2)
+        paths = [self.create_test_document(f"文档{index}", f"doc{index}.docx") for index in range(3)]
+        sessions = [service.prepare_diff(path)["session"] for path in paths]
+
+        self.assertEqual(service.generate_diff(paths[0], session=sessions[0])["status"], "error")
+        self.assertEqual(service.generate_diff(paths[1], session=sessions[1])["status"], "success")
+        self.assertEqual(service.generate_diff(paths[2])["status"], "success")
+
+    def test_session_memory_limit(self):
+        """测试超过内存上限的原始文档不缓存"""
+        service = DiffService(max_bytes=1024)
+
+        result = service.prepare_diff(self.create_test_document())
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("too large", result["message"])
+
+    def test_diff_pages(self):
+        """测试生成对比只返回第一页，其余差异块按页或按块区间读取"""
+        doc_path = self.create_test_document("原始内容")
+        session = self.service.prepare_diff(doc_path)["session"]
+        doc = Document(doc_path)
+        for index in range(25):
+            doc.add_paragraph(f"新增段落{index}")
+        doc.save(doc_path)
+
+        result = self.service.generate_diff(doc_path, session=session, page_size=10)
+
+        self.assertEqual((result["page_count"], len(result["hunks"])), (3, 10))
+        self.assertEqual(result["stats"]["additions"], 25)
+        page = self.service.get_diff_page(session, 2, page_size=10, include_html=True)
+        self.assertEqual([hunk["after"] for hunk in page["hunks"]], [f"新增段落{index}" for index in range(20, 25)])
+        self.assertEqual(page["total"], 25)
+        self.assertIn("新增段落24", page["html"])
+        self.assertEqual(self.service.get_diff_page(session, 3, page_size=10)["hunks"], [])
+        self.assertEqual(self.service.get_diff_page(session, -1)["status"], "error")
+
+        # 新增段落位于修改后文档的第 2 个块之后（标题、原段落）
+        in_range = self.service.get_diff_range(session, 5, 8)
+        self.assertEqual([hunk["position"] for hunk in in_range["hunks"]], [5, 6, 7])
+        self.assertNotIn("html", in_range)
+
+    def test_diff_page_without_result(self):
+        """测试未生成对比或会话未知时读取分页"""
+        doc_path = self.create_test_document()
+        session = self.service.prepare_diff(doc_path)["session"]
+
+        for result in (self.service.get_diff_page(session), self.service.get_diff_range("missing", 0, 10)):
+            self.assertEqual(result["status"], "error")
+            self.assertIn("Call generate_diff first", result["message"])
+
+    def test_unstored_result_returns_all_hunks(self):
+        """测试结果超过内存上限无法保存时一次返回全部差异块"""
+        service = DiffService(max_bytes=64 * 1024)
+        doc_path = self.create_test_document("原始内容")
+        session = service.prepare_diff(doc_path)["session"]
+        doc = Document(doc_path)
+        for index in range(200):
+            doc.add_paragraph(f"新增段落{index}")
+        doc.save(doc_path)
+
+        result = service.generate_diff(doc_path, session=session, page_size=10)
+
+        self.assertEqual((result["page_count"], len(result["hunks"])), (1, 200))
+        self.assertEqual(service.get_diff_page(session)["status"], "error")
+
+    def test_blocks_cache(self):
+        """测试再次对比时，上次修改后的版本作为原始版本不重新提取块"""
+        from core import document_diff
+
+        doc_path = self.create_test_document("原始内容")
+        with mock.patch.object(document_diff, "extract_blocks", wraps=document_diff.extract_blocks) as extract:
+            for text in ("第一次修改", "第二次修改"):
+                with open(doc_path, "rb") as f:
+                    original = f.read()
+                doc = Document(doc_path)
+                doc.paragraphs[1].runs[0].text = text
+                doc.save(doc_path)
+                result = self.service.diff_processed(doc_path, original)
+                self.assertEqual(result["hunks"][0]["after"], text)
+
+        self.assertEqual(extract.call_count, 3)
+
+    def test_preview_cache(self):
+        """测试预览按内容哈希缓存：内容不变时不重新转换，内容变化后重新转换"""
+        doc_path = self.create_test_document("预览内容")
+
+        with mock.patch.object(self.service, "_convert_to_html", wraps=self.service._convert_to_html) as convert:
+            first = self.service.get_document_preview(doc_path)
+            second = self.service.get_document_preview(doc_path)
+            # 内容相同的副本也命中缓存
+            copy_path = os.path.join(self.temp_dir, "copy.docx")
+            shutil.copyfile(doc_path, copy_path)
+            third = self.service.get_document_preview(copy_path)
+            self.assertEqual(convert.call_count, 1)
+
+            doc = Document(doc_path)
+            doc.add_paragraph("追加内容")
+            doc.save(doc_path)
+            changed = self.service.get_document_preview(doc_path)
+            self.assertEqual(convert.call_count, 2)
+
+        self.assertEqual([first["cached"], second["cached"], third["cached"]], [False, True, True])
+        self.assertEqual(first["html"], second["html"])
+        self.assertIn("追加内容", changed["html"])
+
+    def test_preview_cache_shared_with_diff(self):
+        """测试对比时生成的两个版本预览进入预览缓存"""
+        doc_path = self.create_test_document("原始内容")
+        session = self.service.prepare_diff(doc_path)["session"]
+        self.service.generate_diff(doc_path, session=session, include_html=True)
+
+        self.assertTrue(self.service.get_document_preview(doc_path)["cached"])
+
+    def test_preview_cache_limit(self):
+        """测试预览缓存超过内存上限时淘汰最久未使用的预览"""
+        service = DiffService(preview_bytes=1024)
+        first = self.create_test_document("第一份" * 100, "first.docx")
+        second = self.create_test_document("第二份" * 100, "second.docx")
+
+        service.get_document_preview(first)
+        service.get_document_preview(second)
+
+        self.assertFalse(service.get_document_preview(first)["cached"])
+
+    def test_progressive_preview(self):
+        """测试渐进模式先发送正文前若干块的预览，再返回完整预览"""
+        doc_path = os.path.join(self.temp_dir, "long.docx")
+        doc = Document()
+        for index in range(50):
+            doc.add_paragraph(f"段落{index}")
+        doc.save(doc_path)
+        partials = []
+
+        result = self.service.get_document_preview(doc_path, first_blocks=5, on_partial=partials.append)
+
+        partial, = partials
+        self.assertTrue(partial["partial"])
+        self.assertIn("段落4", partial["html"])
+        self.assertNotIn("段落5", partial["html"])
+        self.assertIn("段落49", result["html"])
+
+        # 已缓存的预览直接返回，不再发送部分预览
+        self.service.get_document_preview(doc_path, first_blocks=5, on_partial=partials.append)
+        self.assertEqual(len(partials), 1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,129 @@
+"""已解析文档缓存测试"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from docx import Document
+from docx.shared import RGBColor
+from core import document_cache
+from core.context import RuleContext
+from core.document_cache import DocumentCache
+from core.engine import RuleEngine
+
+
+class DocumentCacheTestCase(unittest.TestCase):
+    """测试按内容哈希缓存已解析的包，取出的副本互不影响"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.cache = DocumentCache()
+
+    def tearDown(self):
+        """清理测试环境"""
+        document_cache.disable()
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="test.docx"):
+        """创建包含红色文本的测试文档"""
+        doc = Document()
+        doc.add_paragraph().add_run("红色文本").font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_paragraph("第二段")
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def store(self, doc_path):
+        """模拟保存后放入缓存"""
+        document, _ = self.cache.open(doc_path)
+        self.cache.store(document, doc_path)
+        return document
+
+    def test_open_returns_copies(self):
+        """测试命中时返回副本，修改副本不影响缓存和其它副本"""
+        doc_path = self.create_test_document()
+        stored = self.store(doc_path)
+        first, _ = self.cache.open(doc_path)
+        first.paragraphs[0].runs[0].text = "已修改"
+        stored.paragraphs[0].runs[0].text = "已修改"
+
+        second, _ = self.cache.open(doc_path)
+
+        self.assertEqual(self.cache.info()["hits"], 2)
+        self.assertEqual(second.paragraphs[0].runs[0].text, "红色文本")
+        self.assertIsNot(second.part.package, first.part.package)
+
+    def test_load_miss_not_cached(self):
+        """测试加载时未命中的文档不放入缓存"""
+        doc_path = self.create_test_document()
+
+        self.cache.open(doc_path)
+        self.cache.open(doc_path)
+
+        self.assertEqual(self.cache.info()["entries"], 0)
+        self.assertEqual(self.cache.info()["hits"], 0)
+        self.assertEqual(self.cache.info()["misses"], 2)
+
+    def test_key_is_content(self):
+        """测试内容相同的文件共用条目，副本的延迟部件从请求的路径读取；内容改变后不命中"""
+        doc_path = self.create_test_document()
+        copy_path = str(self.temp_path / "copy.docx")
+        shutil.copyfile(doc_path, copy_path)
+        self.store(doc_path)
+
+        _, source = self.cache.open(copy_path)
+        self.assertEqual(source.path, copy_path)
+        self.assertEqual(self.cache.info()["hits"], 1)
+
+        doc = Document(doc_path)
+        doc.add_paragraph("新段落")
+        doc.save(doc_path)
+        reopened, _ = self.cache.open(doc_path)
+        self.assertEqual(reopened.paragraphs[-1].text, "新段落")
+        self.assertEqual(self.cache.info()["misses"], 2)
+
+    def test_memory_limit(self):
+        """测试超过内存上限的文档不缓存"""
+        cache = DocumentCache(max_bytes=1024)
+        doc_path = self.create_test_document()
+
+        document, _ = cache.open(doc_path)
+        cache.store(document, doc_path)
+        cache.open(doc_path)
+
+        self.assertEqual(cache.info()["entries"], 0)
+        self.assertEqual(cache.info()["hits"], 0)
+
+    def test_disabled_until_configured(self):
+        """测试未启用时规则上下文直接加载文档"""
+        self.assertIsNone(document_cache.shared_cache())
+
+        RuleContext(self.create_test_document())
+
+        self.assertEqual(self.cache.info()["entries"], 0)
+
+    def test_saved_document_is_cached(self):
+        """测试保存后的文档放入缓存，再次处理时不重新解析，结果与直接加载相同"""
+        document_cache.configure(self.cache)
+        doc_path = self.create_test_document()
+        active_rules = [{"rule_id": "FontColorRule", "params": {}}]
+
+        RuleEngine().execute(doc_path, active_rules)
+        context = RuleContext(doc_path)
+
+        self.assertEqual(self.cache.info()["hits"], 1)
+        run = context.document.paragraphs[0].runs[0]
+        self.assertEqual(run.font.color.rgb, RGBColor(0, 0, 0))
+        self.assertEqual(Document(doc_path).paragraphs[0].runs[0].font.color.rgb, RGBColor(0, 0, 0))
+
+        # 第一次和第二次保存后的版本各占一个条目，原始版本不缓存
+        run.text = "再次修改"
+        context.save_document()
+        self.assertEqual(self.cache.info()["entries"], 2)
+        self.assertEqual(RuleContext(doc_path).document.paragraphs[0].text, "再次修改")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""结构化文档对比测试"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+from docx.shared import Cm, Pt
+from core.document_diff import diff_documents, extract_blocks, read_document_xml, render_html, render_rows
+
+
+class DocumentDiffTestCase(unittest.TestCase):
+    """测试从 document.xml 提取块、对齐和生成差异块"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, paragraphs=("第一段", "第二段", "第三段"), table=True):
+        """创建若干段落和一个 2x2 表格的测试文档"""
+        doc = Document()
+        for text in paragraphs:
+            doc.add_paragraph(text)
+        if table:
+            table = doc.add_table(rows=2, cols=2)
+            table.cell(0, 0).text = "单元格"
+        return doc
+
+    def xml(self, doc, filename="test.docx") -> bytes:
+        path = self.temp_path / filename
+        doc.save(str(path))
+        return read_document_xml(str(path))
+
+    def test_extract_blocks(self):
+        """测试按文档顺序提取段落、表格、单元格和分节属性"""
+        blocks = extract_blocks(self.xml(self.create_test_document()))
+
+        self.assertEqual([block.location for block in blocks],
+                         ["p0", "p1", "p2", "t0", "t0.r0.c0", "t0.r0.c1", "t0.r1.c0", "t0.r1.c1", "s0"])
+        self.assertEqual(blocks[4].text, "单元格")
+        self.assertEqual(blocks[3].text, "2x2")
+
+    def test_identical(self):
+        """测试内容和格式相同的文档没有差异"""
+        doc = self.create_test_document()
+
+        result = diff_documents(self.xml(doc, "a.docx"), self.xml(doc, "b.docx"))
+
+        self.assertEqual(result["hunks"], [])
+        self.assertEqual(result["stats"]["total_changes"], 0)
+
+    def test_text_change(self):
+        """测试文本修改"""
+        doc = self.create_test_document()
+        original = self.xml(doc, "a.docx")
+        doc.paragraphs[1].runs[0].text = "第二段已修改"
+
+        hunk, = diff_documents(original, self.xml(doc, "b.docx"))["hunks"]
+
+        self.assertEqual(hunk["type"], "text")
+        self.assertEqual(hunk["location"], "p1")
+        self.assertEqual((hunk["before"], hunk["after"]), ("第二段", "第二段已修改"))
+
+    def test_insert_keeps_alignment(self):
+        """测试插入段落后其余段落仍然对齐，只报告新增"""
+        paragraphs = [f"段落{index}" for index in range(200)]
+        original = self.xml(self.create_test_document(paragraphs), "a.docx")
+        modified = self.xml(self.create_test_document(paragraphs[:50] + ["新段落"] + paragraphs[50:]), "b.docx")
+
+        result = diff_documents(original, modified)
+
+        hunk, = result["hunks"]
+        self.assertEqual(hunk["type"], "insert")
+        self.assertEqual((hunk["location"], hunk["modified_index"]), ("p50", 50))
+        self.assertEqual(result["stats"]["additions"], 1)
+
+    def test_delete(self):
+        """测试删除段落"""
+        original = self.xml(self.create_test_document(), "a.docx")
+        modified = self.xml(self.create_test_document(("第一段", "第三段")), "b.docx")
+
+        hunk, = diff_documents(original, modified)["hunks"]
+
+        self.assertEqual((hunk["type"], hunk["before"], hunk["original_index"]), ("delete", "第二段", 1))
+        # 删除的块的位置是它在修改后文档中之后的块
+        self.assertEqual(hunk["position"], 1)
+
+    def test_paragraph_format_changes(self):
+        """测试字体、字号、对齐和段落间距的修改"""
+        doc = self.create_test_document()
+        original = self.xml(doc, "a.docx")
+        paragraph = doc.paragraphs[0]
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        paragraph.paragraph_format.space_after = Pt(6)
+        paragraph.runs[0].font.size = Pt(12)
+        paragraph.runs[0].font.name = "Arial"
+
+        hunk, = diff_documents(original, self.xml(doc, "b.docx"))["hunks"]
+
+        self.assertEqual(hunk["type"], "format")
+        self.assertEqual({change["name"]: change["after"] for change in hunk["properties"]},
+                         {"alignment": "center", "spacing_after": "120", "size": "24", "font": "Arial"})
+
+    def test_mixed_run_properties(self):
+        """测试段落内各运行格式不一致时记录各不同取值"""
+        doc = self.create_test_document(table=False)
+        original = self.xml(doc, "a.docx")
+        doc.paragraphs[0].add_run("追加").bold = True
+
+        hunk, = diff_documents(original, self.xml(doc, "b.docx"))["hunks"]
+
+        self.assertEqual(hunk["type"], "text")
+        self.assertEqual(hunk["properties"], [{"name": "bold", "before": None, "after": (None, "on")}])
+
+    def test_cell_borders(self):
+        """测试单元格边框和底纹的修改"""
+        doc = self.create_test_document()
+        original = self.xml(doc, "a.docx")
+        tc_pr = doc.tables[0].cell(1, 1)._tc.get_or_add_tcPr()
+        borders = OxmlElement("w:tcBorders")
+        top = OxmlElement("w:top")
+        top.set(qn("w:val"), "single")
+        top.set(qn("w:sz"), "4")
+        borders.append(top)
+        tc_pr.append(borders)
+        shading = OxmlElement("w:shd")
+        shading.set(qn("w:fill"), "D9D9D9")
+        tc_pr.append(shading)
+
+        hunk, = diff_documents(original, self.xml(doc, "b.docx"))["hunks"]
+
+        self.assertEqual((hunk["kind"], hunk["location"]), ("cell", "t0.r1.c1"))
+        self.assertEqual({change["name"]: change["after"] for change in hunk["properties"]},
+                         {"borders": "top=single/4/None", "shading": "D9D9D9"})
+
+    def test_section_changes(self):
+        """测试页边距的修改"""
+        doc = self.create_test_document(table=False)
+        original = self.xml(doc, "a.docx")
+        doc.sections[0].left_margin = Cm(2)
+
+        hunk, = diff_documents(original, self.xml(doc, "b.docx"))["hunks"]
+
+        self.assertEqual((hunk["kind"], hunk["location"]), ("section", "s0"))
+        self.assertEqual(hunk["properties"][0]["name"], "margin_left")
+        self.assertEqual(diff_documents(original, self.xml(doc, "c.docx"))["stats"]["properties"],
+                         {"margin_left": 1})
+
+    def test_render_html(self):
+        """测试渲染的 HTML 用 del/ins 标记段落内的文字修改并列出格式修改"""
+        doc = self.create_test_document(table=False)
+        original = self.xml(doc, "a.docx")
+        doc.paragraphs[0].runs[0].text = "第1段<b>"
+        doc.paragraphs[1].runs[0].font.italic = True
+
+        html = render_html(diff_documents(original, self.xml(doc, "b.docx"))["hunks"])
+
+        self.assertIn('<del class="diff_sub">一</del><ins class="diff_add">1</ins>', html)
+        self.assertIn("&lt;b&gt;", html)
+        self.assertIn("<li>italic: - &rarr; on</li>", html)
+        self.assertTrue(html.startswith('<table class="diff-hunks">'))
+        self.assertEqual(render_rows([]), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""文档索引测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from docx import Document
+from core.context import RuleContext
+from rules.paragraph_rules.horizontal_rule_removal_rule import HorizontalRuleRemovalRule
+
+
+class DocumentIndexTestCase(unittest.TestCase):
+    """测试RuleContext上的文档索引"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="index.docx"):
+        """创建包含多级标题、横线和合并单元格的文档"""
+        doc = Document()
+        doc.add_heading("文档标题", 0)
+        doc.add_heading("一级标题", 1)
+        doc.add_paragraph("正文一")
+        doc.add_heading("二级标题", 2)
+        doc.add_paragraph("---")
+        doc.add_paragraph("正文二")
+
+        table = doc.add_table(rows=3, cols=3)
+        table.cell(0, 0).merge(table.cell(0, 1))  # 横向合并
+        table.cell(1, 2).merge(table.cell(2, 2))  # 纵向合并
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_index_is_built_once(self):
+        """测试索引首次访问时构建并被缓存"""
+        context = RuleContext(self.create_test_document())
+
+        self.assertIs(context.index, context.index)
+        self.assertIs(context.get_paragraphs(), context.get_paragraphs())
+
+    def test_headings_grouped_by_level(self):
+        """测试标题按级别分组，正文段落单独列出"""
+        context = RuleContext(self.create_test_document())
+        index = context.index
+
+        self.assertEqual([p.text for p in index.headings_by_level[1]], ["一级标题"])
+        self.assertEqual([p.text for p in index.headings_by_level[2]], ["二级标题"])
+        self.assertEqual([p.text for p in index.body_paragraphs],
+                         ["文档标题", "正文一", "---", "正文二"])
+
+    def test_merged_cells_appear_once(self):
+        """测试合并单元格在索引中只出现一次"""
+        context = RuleContext(self.create_test_document())
+
+        cells = context.index.cells
+
+        # 3x3 网格，横向合并和纵向合并各减少一个物理单元格
+        self.assertEqual(len(cells), 7)
+        self.assertEqual(len({id(entry.cell._tc) for entry in cells}), 7)
+        positions = [(entry.row_index, entry.column_index) for entry in cells]
+        self.assertIn((0, 0), positions)
+        self.assertNotIn((0, 1), positions)
+        self.assertIn((1, 2), positions)
+        self.assertNotIn((2, 2), positions)
+
+    def test_runs_cached_per_paragraph(self):
+        """测试段落的文本运行只创建一次"""
+        context = RuleContext(self.create_test_document())
+        paragraph = context.index.paragraphs[2]
+
+        self.assertIs(context.index.runs_of(paragraph), context.index.runs_of(paragraph))
+        self.assertEqual(len(context.index.runs), len(
+            [r for p in context.index.paragraphs for r in p.runs]
+            + [r for e in context.index.cells for p in e.paragraphs for r in p.runs]
+        ))
+
+    def test_structural_change_invalidates_index(self):
+        """测试删除段落的规则会使索引失效"""
+        context = RuleContext(self.create_test_document())
+        before = context.index
+
+        HorizontalRuleRemovalRule().apply(context)
+
+        self.assertIsNot(context.index, before)
+        self.assertNotIn("---", [p.text for p in context.get_paragraphs()])
+
+
+if __name__ == '__main__':
+    unittest.main()
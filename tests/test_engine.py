@@ -1,6 +1,7 @@
 """规则引擎完整测试"""
 
 import unittest
+from collections.abc import MutableMapping
 import tempfile
 from pathlib import Path
 from docx import Document
@@ -18,7 +19,7 @@ class RuleEngineLoadRulesTestCase(unittest.TestCase):
 
     def test_init_creates_rules_dict(self):
         """测试初始化创建规则字典"""
-        self.assertIsInstance(self.engine.rules, dict)
+        self.assertIsInstance(self.engine.rules, MutableMapping)
 
     def test_load_rules_populates_rules(self):
         """测试加载规则填充规则字典"""
@@ -0,0 +1,93 @@
+"""命令行冷启动导入开销测试"""
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+import pytest
+
+PYTHON_BACKEND = Path(__file__).resolve().parent.parent / "python-backend"
+
+# 冷启动时导入 cli 并执行命令的耗时上限（毫秒），取多次运行中的最小值；
+# 全部导入规则引擎、python-docx 和 mammoth 时约 200ms。耗时与机器负载有关，
+# 只在 slow 测试中检查
+IMPORT_BUDGET_MS = {"get-version": 100, "get-presets": 150}
+RUNS = 3
+
+# 只读命令不应加载的重量级依赖
+HEAVY_MODULES = ("docx", "lxml", "mammoth", "difflib", "asyncio", "core.engine", "core.context", "rules")
+
+MEASURE = """
+import json, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+import cli
+result = cli.process_command({command!r}, {{}})
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"elapsed_ms": elapsed, "error": result.get("error") if isinstance(result, dict) else None,
+                  "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_command(command: str) -> dict:
+    """在新的解释器中导入 cli 并执行命令，返回耗时和已导入的模块"""
+    code = MEASURE.format(backend=str(PYTHON_BACKEND), command=command)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True, cwd=str(PYTHON_BACKEND)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def heavy_modules(modules) -> list:
+    return [name for name in modules if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES]
+
+
+class CommandImportTestCase(unittest.TestCase):
+    """测试只读命令只导入需要的依赖"""
+
+    def check_command(self, command: str) -> dict:
+        run = measure_command(command)
+
+        self.assertIsNone(run["error"])
+        self.assertEqual(heavy_modules(run["modules"]), [])
+        return run
+
+    def test_get_version(self):
+        """测试 get-version 不加载服务层"""
+        run = self.check_command("get-version")
+        self.assertNotIn("services.application_service", run["modules"])
+
+    def test_get_presets(self):
+        """测试 get-presets 不加载规则引擎、python-docx 和 mammoth"""
+        self.check_command("get-presets")
+
+    def test_get_rules_imports_no_rule_modules(self):
+        """测试 get-rules 只读取规则清单，不导入规则模块和 python-docx"""
+        run = measure_command("get-rules")
+
+        self.assertIsNone(run["error"])
+        self.assertIn("core.engine", run["modules"])
+        self.assertEqual([name for name in run["modules"] if name.startswith("rules.")], ["rules.base_rule"])
+        self.assertEqual([name for name in run["modules"] if name.split(".")[0] in ("docx", "lxml", "mammoth")], [])
+
+
+@pytest.mark.slow
+class CommandImportTimeTestCase(unittest.TestCase):
+    """测试只读命令的冷启动耗时不超过预算"""
+
+    def check_budget(self, command: str):
+        fastest = min(measure_command(command)["elapsed_ms"] for _ in range(RUNS))
+        self.assertLess(fastest, IMPORT_BUDGET_MS[command],
+                        f"{command} 冷启动耗时 {fastest:.1f}ms，超过预算 {IMPORT_BUDGET_MS[command]}ms")
+
+    def test_get_version(self):
+        """测试 get-version 的冷启动耗时"""
+        self.check_budget("get-version")
+
+    def test_get_presets(self):
+        """测试 get-presets 的冷启动耗时"""
+        self.check_budget("get-presets")
+
+
+if __name__ == '__main__':
+    unittest.main()
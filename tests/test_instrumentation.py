@@ -0,0 +1,95 @@
+"""执行度量测试"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from docx import Document
+from docx.shared import RGBColor
+from core.engine import RuleEngine
+from services.result_cache import ResultCache, execute_with_cache
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    """测试每个规则及加载、保存阶段的度量"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.engine = RuleEngine()
+        self.active_rules = [
+            {"rule_id": "FontColorRule", "params": {"text_color": "#000000"}},
+            {"rule_id": "TableWidthRule"},
+        ]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="metrics.docx"):
+        """创建一段黑色、一段红色文字和一个表格的测试文档"""
+        doc = Document()
+        doc.add_paragraph().add_run("黑色文字").font.color.rgb = RGBColor(0, 0, 0)
+        doc.add_paragraph().add_run("红色文字").font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_table(rows=1, cols=2)
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_disabled_by_default(self):
+        """测试默认不收集度量"""
+        result = self.engine.execute(self.create_test_document(), self.active_rules)
+
+        self.assertNotIn("instrumentation", result)
+        self.assertTrue(all("metrics" not in item for item in result["results"]))
+
+    def test_rule_metrics(self):
+        """测试遍历规则统计访问和实际修改的节点数，单独执行的规则使用修复数"""
+        result = self.engine.execute(self.create_test_document(), self.active_rules, instrumentation=True)
+
+        color, width = result["results"]
+        self.assertEqual(color["metrics"]["nodes_visited"], 2)
+        self.assertEqual(color["metrics"]["nodes_changed"], 1)
+        self.assertGreaterEqual(color["metrics"]["wall_time_ms"], 0)
+        self.assertGreaterEqual(color["metrics"]["cpu_time_ms"], 0)
+        self.assertIsNone(width["metrics"]["nodes_visited"])
+        self.assertEqual(width["metrics"]["nodes_changed"], width["fixed_count"])
+        self.assertNotIn("memory_peak_kb", color["metrics"])
+
+    def test_stage_metrics(self):
+        """测试加载、补丁应用和保存分别计时，开启 trace_memory 时记录内存峰值"""
+        engine = RuleEngine(instrumentation=True, trace_memory=True)
+
+        result = engine.execute(self.create_test_document(), self.active_rules)
+
+        stages = result["instrumentation"]
+        self.assertEqual(set(stages), {"load", "apply_patches", "save"})
+        self.assertGreater(stages["load"]["wall_time_ms"], 0)
+        self.assertGreater(stages["save"]["memory_peak_kb"], 0)
+        self.assertIn("memory_peak_kb", result["results"][0]["metrics"])
+
+    def test_streaming_metrics(self):
+        """测试流式执行时按规则统计，加载和保存合并为 stream 阶段"""
+        engine = RuleEngine(streaming_threshold=1)
+
+        result = engine.execute(self.create_test_document(), self.active_rules[:1], instrumentation=True)
+
+        self.assertTrue(result["streaming"])
+        self.assertEqual(set(result["instrumentation"]), {"stream"})
+        self.assertEqual(result["results"][0]["metrics"]["nodes_visited"], 2)
+        self.assertEqual(result["results"][0]["metrics"]["nodes_changed"], 1)
+
+    def test_bypasses_result_cache(self):
+        """测试收集度量时总是实际执行，不读写结果缓存"""
+        cache = ResultCache(str(self.temp_path / "cache"), 10 * 1024 * 1024)
+        doc_path = self.create_test_document()
+
+        for _ in range(2):
+            result = execute_with_cache(self.engine, cache, doc_path, self.active_rules, instrumentation=True)
+            self.assertNotIn("cached", result)
+            self.assertIn("instrumentation", result)
+        self.assertEqual(cache.entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""延迟加载非 XML 部件测试"""
+
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+from docx import Document
+from docx.shared import Cm, RGBColor
+from core.context import RuleContext
+from core.lazy_package import open_document, unloaded_member
+from test_package_writer import make_png
+
+
+class LazyPackageTestCase(unittest.TestCase):
+    """测试二进制部件延迟读取"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="lazy.docx", image_size=64):
+        """创建包含图片的测试文档"""
+        doc = Document()
+        run = doc.add_paragraph().add_run("红色文字")
+        run.font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_picture(io.BytesIO(make_png(image_size, image_size)), width=Cm(3))
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    @staticmethod
+    def image_parts(document):
+        return [part for part in document.part.package.iter_parts()
+                if part.partname.startswith('/word/media/')]
+
+    def test_binary_parts_not_loaded(self):
+        """测试打开文档时图片部件不读入内存，访问 blob 时才读取"""
+        document, _ = open_document(self.create_test_document())
+        image_part = self.image_parts(document)[0]
+
+        self.assertIsNotNone(unloaded_member(image_part))
+        self.assertFalse(image_part.blob_loaded)
+        self.assertTrue(image_part.blob.startswith(b'\x89PNG'))
+        self.assertTrue(image_part.blob_loaded)
+        self.assertIsNone(unloaded_member(image_part))
+        # XML 部件照常解析
+        self.assertEqual(document.paragraphs[0].text, "红色文字")
+
+    @staticmethod
+    def process_peak_memory(doc_path, lazy_parts):
+        """加载、修改并保存文档，返回内存峰值"""
+        tracemalloc.start()
+        try:
+            context = RuleContext(doc_path, lazy_parts=lazy_parts)
+            context.set_property(context.get_paragraphs()[0].runs[0], 'run.color', RGBColor(0, 0, 0))
+            context.save_document()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return context, peak
+
+    def test_memory_independent_of_media_size(self):
+        """测试延迟加载时加载和保存的内存峰值不包含图片"""
+        doc_path = self.create_test_document(image_size=600)
+        media_size = os.path.getsize(doc_path)
+        # 预热导入和样式解析等一次性开销
+        self.process_peak_memory(doc_path, lazy_parts=True)
+
+        _, eager_peak = self.process_peak_memory(doc_path, lazy_parts=False)
+        context, lazy_peak = self.process_peak_memory(doc_path, lazy_parts=True)
+
+        self.assertGreater(eager_peak - lazy_peak, media_size * 0.8)
+        self.assertFalse(self.image_parts(context.document)[0].blob_loaded)
+        self.assertEqual(len(Document(doc_path).inline_shapes), 1)
+
+    def test_source_modified_after_load(self):
+        """测试源文件在加载后被修改时，读取延迟部件报错而不是读到新内容"""
+        doc_path = self.create_test_document()
+        document, _ = open_document(doc_path)
+        self.create_test_document()
+        stat = os.stat(doc_path)
+        os.utime(doc_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        with self.assertRaises(IOError):
+            self.image_parts(document)[0].blob
+
+    def test_lazy_source_follows_in_place_save(self):
+        """测试原地保存后延迟部件仍可读取"""
+        doc_path = self.create_test_document()
+        context = RuleContext(doc_path)
+        time.sleep(0.01)
+        context.save_document()
+
+        image_part = self.image_parts(context.document)[0]
+        self.assertTrue(image_part.blob.startswith(b'\x89PNG'))
+
+    def test_eager_loading(self):
+        """测试关闭延迟加载时所有部件都读入内存"""
+        context = RuleContext(self.create_test_document(), lazy_parts=False)
+
+        self.assertIsNone(unloaded_member(self.image_parts(context.document)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""内存缓存测试"""
+
+import unittest
+from core.memory_cache import MemoryCache
+
+
+class MemoryCacheTestCase(unittest.TestCase):
+    """测试内存 LRU 缓存的容量限制和淘汰顺序"""
+
+    def test_get_put(self):
+        """测试读写和替换同名条目"""
+        cache = MemoryCache(max_entries=4, max_bytes=100)
+
+        cache.put("a", 1, 10)
+        cache.put("a", 2, 20)
+
+        self.assertEqual(cache.get("a"), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.total_bytes, 20)
+        self.assertEqual(len(cache), 1)
+
+    def test_entry_limit(self):
+        """测试条目数超过上限时淘汰最久未使用的条目"""
+        cache = MemoryCache(max_entries=2, max_bytes=100)
+        cache.put("a", 1, 1)
+        cache.put("b", 2, 1)
+        cache.get("a")
+
+        cache.put("c", 3, 1)
+
+        self.assertEqual(cache.keys(), ["a", "c"])
+
+    def test_byte_limit(self):
+        """测试总大小超过上限时依次淘汰，单个条目超过上限时不缓存"""
+        cache = MemoryCache(max_entries=10, max_bytes=100)
+        for key in "abc":
+            cache.put(key, key, 40)
+
+        self.assertEqual(cache.keys(), ["b", "c"])
+        self.assertEqual(cache.total_bytes, 80)
+        self.assertFalse(cache.put("d", "d", 101))
+        self.assertNotIn("d", cache)
+
+    def test_pop_and_clear(self):
+        """测试删除条目和清空缓存"""
+        cache = MemoryCache(max_entries=4, max_bytes=100)
+        cache.put("a", 1, 10)
+        cache.put("b", 2, 10)
+
+        self.assertEqual(cache.pop("a"), 1)
+        self.assertIsNone(cache.pop("a"))
+        self.assertEqual(cache.total_bytes, 10)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.total_bytes, 0)
+
+    def test_disabled(self):
+        """测试容量为 0 时不缓存"""
+        cache = MemoryCache(max_entries=0, max_bytes=100)
+
+        self.assertFalse(cache.enabled)
+        self.assertFalse(cache.put("a", 1, 1))
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
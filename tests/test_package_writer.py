@@ -0,0 +1,115 @@
+"""增量保存测试"""
+
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zipfile
+import zlib
+from pathlib import Path
+from docx import Document
+from docx.shared import Cm, RGBColor
+from core.context import RuleContext
+from core.package_writer import save_package
+
+
+def make_png(width=64, height=64):
+    """生成内容随机（不可压缩）的 RGB PNG 图片"""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data)))
+
+    rows = b''.join(b'\x00' + os.urandom(width * 3) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+class PackageWriterTestCase(unittest.TestCase):
+    """测试只重新写入修改过的部件"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="media.docx"):
+        """创建包含图片和彩色文字的测试文档"""
+        doc = Document()
+        run = doc.add_paragraph().add_run("红色文字")
+        run.font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_picture(io.BytesIO(make_png()), width=Cm(3))
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    @staticmethod
+    def raw_member(path, name):
+        """读取成员压缩后的原始字节"""
+        with zipfile.ZipFile(path) as zf:
+            info = zf.getinfo(name)
+        with open(path, 'rb') as f:
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            f.seek(name_len + extra_len, os.SEEK_CUR)
+            return f.read(info.compress_size)
+
+    def media_name(self, path):
+        with zipfile.ZipFile(path) as zf:
+            return next(name for name in zf.namelist() if name.startswith('word/media/'))
+
+    def test_untouched_parts_copied_raw(self):
+        """测试修改文档后图片按原始压缩字节复制，文档部件重新写入"""
+        doc_path = self.create_test_document()
+        media = self.media_name(doc_path)
+        original_media = self.raw_member(doc_path, media)
+
+        context = RuleContext(doc_path)
+        run = context.get_paragraphs()[0].runs[0]
+        context.set_property(run, 'run.color', RGBColor(0, 0, 0))
+        self.assertTrue(context.save_document())
+
+        self.assertEqual(context.last_save["mode"], "incremental")
+        self.assertGreater(context.last_save["copied"], 0)
+        self.assertGreater(context.last_save["written"], 0)
+        self.assertEqual(self.raw_member(doc_path, media), original_media)
+        with zipfile.ZipFile(doc_path) as zf:
+            self.assertIsNone(zf.testzip())
+        reloaded = Document(doc_path)
+        self.assertEqual(reloaded.paragraphs[0].runs[0].font.color.rgb, RGBColor(0, 0, 0))
+        self.assertEqual(len(reloaded.inline_shapes), 1)
+
+    def test_save_to_other_path(self):
+        """测试另存为时源文件不变，输出可以被重新打开"""
+        doc_path = self.create_test_document()
+        original = Path(doc_path).read_bytes()
+        output = str(self.temp_path / "output.docx")
+
+        context = RuleContext(doc_path)
+        context.save_document(output)
+
+        self.assertEqual(Path(doc_path).read_bytes(), original)
+        self.assertEqual(len(Document(output).inline_shapes), 1)
+        self.assertEqual([p.name for p in self.temp_path.iterdir() if p.name.endswith('.tmp')], [])
+
+    def test_changed_source_rewrites_everything(self):
+        """测试源文件在加载后被替换时不从中复制"""
+        doc_path = self.create_test_document()
+        document = Document(doc_path)
+
+        stats = save_package(document, doc_path, doc_path, signature=(0, 0))
+
+        self.assertEqual(stats["mode"], "full")
+        self.assertEqual(stats["copied"], 0)
+        self.assertEqual(len(Document(doc_path).inline_shapes), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""属性补丁集测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from docx import Document
+from docx.enum.text import WD_LINE_SPACING
+from docx.shared import Cm, Pt, RGBColor
+from core.context import RuleContext
+from rules.font_rules.font_color_rule import FontColorRule
+from rules.font_rules.font_standard_rule import FontNameRule
+from rules.table_rules.table_border_rule import TableBorderRule
+
+
+class PatchSetTestCase(unittest.TestCase):
+    """测试属性补丁的合并、应用和撤销"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="patch.docx"):
+        """创建包含正文和表格文本的测试文档"""
+        doc = Document()
+        run = doc.add_paragraph().add_run("红色文本")
+        run.font.color.rgb = RGBColor(255, 0, 0)
+        run.font.size = Pt(12)
+        table = doc.add_table(rows=1, cols=1)
+        table.cell(0, 0).text = "表格文本"
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def first_run(self, context):
+        return context.index.runs_of(context.get_paragraphs()[0])[0]
+
+    def test_last_writer_wins(self):
+        """测试同一属性的多次写入合并为一次"""
+        context = RuleContext(self.create_test_document())
+        run = self.first_run(context)
+
+        with context.deferred_writes():
+            context.set_property(run, 'run.color', RGBColor(0, 255, 0), "A")
+            context.set_property(run, 'run.color', RGBColor(0, 0, 255), "B")
+            self.assertEqual(context.get_property(run, 'run.color'), RGBColor(0, 0, 255))
+            self.assertEqual(run.font.color.rgb, RGBColor(255, 0, 0))
+            self.assertEqual(len(context.patches), 1)
+            self.assertEqual(context.patches.write_count, 2)
+
+        self.assertEqual(run.font.color.rgb, RGBColor(0, 0, 255))
+        self.assertEqual(len(context.change_log), 1)
+        self.assertEqual(context.change_log[0].rule_id, "B")
+        self.assertEqual(context.change_log[0].old_value, RGBColor(255, 0, 0))
+
+    def test_redundant_write_dropped(self):
+        """测试与当前值相同的写入不修改文档"""
+        context = RuleContext(self.create_test_document())
+        run = self.first_run(context)
+
+        context.set_property(run, 'run.size', Pt(12))
+        self.assertEqual(context.patches.preview(), [])
+        self.assertEqual(context.flush_patches(), [])
+
+    def write_rounded_values(self, context):
+        """写入读回时有舍入或换算的属性值"""
+        paragraph = context.get_paragraphs()[0]
+        context.set_property(paragraph, 'paragraph.space_after', Cm(0.21))
+        context.set_property(paragraph, 'paragraph.line_spacing_rule', WD_LINE_SPACING.MULTIPLE)
+        context.set_property(paragraph, 'paragraph.line_spacing', 1.5)
+        context.set_property(context.document.sections[0], 'section.page_width', Cm(21))
+
+    def test_rounded_values_equal(self):
+        """测试长度按 twips 比较、多倍行距与读回的 1.5 倍行距视为相同，重复写入不修改文档"""
+        doc_path = self.create_test_document()
+        context = RuleContext(doc_path)
+        self.write_rounded_values(context)
+        context.save_document()
+
+        context = RuleContext(doc_path)
+        self.assertEqual(context.get_paragraphs()[0].paragraph_format.line_spacing_rule,
+                         WD_LINE_SPACING.ONE_POINT_FIVE)
+        self.assertNotEqual(context.document.sections[0].page_width, Cm(21))
+        with context.deferred_writes():
+            self.write_rounded_values(context)
+            self.assertEqual(context.patches.preview(), [])
+        self.assertEqual(context.change_log, [])
+
+    def test_preview_and_undo(self):
+        """测试预演不修改文档，撤销恢复原值"""
+        context = RuleContext(self.create_test_document())
+        run = self.first_run(context)
+        original_xml = context.document.element.xml
+
+        context.set_property(run, 'run.font_name', 'Arial')
+        context.set_property(run, 'run.east_asia_font', '宋体')
+        context.set_property(run, 'run.bold', True)
+        preview = context.patches.preview()
+        self.assertEqual([change.prop for change in preview],
+                         ['run.font_name', 'run.east_asia_font', 'run.bold'])
+        self.assertEqual(context.document.element.xml, original_xml)
+
+        context.flush_patches()
+        self.assertTrue(run.font.bold)
+        context.undo_changes()
+        self.assertIsNone(run.font.bold)
+        self.assertIsNone(run.font.name)
+        self.assertEqual(context.change_log, [])
+
+    def test_unknown_property_rejected(self):
+        """测试写入未注册的属性时报错"""
+        context = RuleContext(self.create_test_document())
+
+        with self.assertRaises(KeyError):
+            context.set_property(self.first_run(context), 'run.unknown', 1)
+
+    def test_standalone_rule_applies_immediately(self):
+        """测试单独执行规则时写入立即生效"""
+        context = RuleContext(self.create_test_document())
+
+        FontColorRule().apply(context)
+
+        self.assertEqual(self.first_run(context).font.color.rgb, RGBColor(0, 0, 0))
+        self.assertEqual(len(context.patches), 0)
+
+    def test_overlapping_rules_merged(self):
+        """测试多个规则写入同一文本运行的字体时只应用最后的值"""
+        context = RuleContext(self.create_test_document())
+        table_run = context.index.runs_of(context.index.cells[0].paragraphs[0])[0]
+
+        with context.deferred_writes():
+            FontNameRule().apply(context)
+            TableBorderRule({'western_font': 'Calibri'}).apply(context)
+            self.assertIsNone(table_run.font.name)
+
+        self.assertEqual(table_run.font.name, 'Calibri')
+        font_changes = [change for change in context.change_log
+                        if change.element is table_run._r and change.prop == 'run.font_name']
+        self.assertEqual(len(font_changes), 1)
+        self.assertEqual(font_changes[0].rule_id, 'TableBorderRule')
+
+
+if __name__ == '__main__':
+    unittest.main()
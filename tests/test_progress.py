@@ -0,0 +1,85 @@
+"""进度上报测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from docx import Document
+from core.engine import RuleEngine
+from core.progress import ProgressReporter
+from core.traversal import DocumentTraversal
+
+
+class ProgressReporterTestCase(unittest.TestCase):
+    """测试ProgressReporter的节流"""
+
+    def test_throttles_and_flushes_latest(self):
+        """测试间隔内的进度被合并，flush 补发最新的一条"""
+        emitted = []
+        reporter = ProgressReporter(emitted.append, min_interval=60)
+
+        for percent in range(5):
+            reporter({"percent": percent})
+        self.assertEqual(emitted, [{"percent": 0}])
+
+        reporter.flush()
+        self.assertEqual(emitted, [{"percent": 0}, {"percent": 4}])
+        reporter.flush()
+        self.assertEqual(len(emitted), 2)
+
+    def test_zero_interval_emits_everything(self):
+        """测试间隔为 0 时每条进度都输出"""
+        emitted = []
+        reporter = ProgressReporter(emitted.append, min_interval=0)
+
+        for percent in range(3):
+            reporter({"percent": percent})
+
+        self.assertEqual(len(emitted), 3)
+
+
+class EngineProgressTestCase(unittest.TestCase):
+    """测试引擎执行过程中的进度事件"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="progress.docx", paragraphs=120):
+        """创建包含较多段落的测试文档"""
+        doc = Document()
+        for i in range(paragraphs):
+            doc.add_paragraph(f"第 {i} 段")
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_progress_events(self):
+        """测试进度事件包含规则序号、节点数并单调递增到 100%"""
+        events = []
+        active_rules = [
+            {"rule_id": rule_id, "params": {}}
+            for rule_id in ["FontColorRule", "FontNameRule", "HorizontalRuleRemovalRule"]
+        ]
+
+        with patch.object(DocumentTraversal, 'PROGRESS_STEP', 10):
+            RuleEngine().execute(self.create_test_document(), active_rules, progress=events.append)
+
+        rule_events = [e for e in events if e["stage"] == "rules"]
+        self.assertEqual({e["rule_total"] for e in rule_events}, {3})
+        self.assertIn("HorizontalRuleRemovalRule", {e["rule_id"] for e in rule_events})
+        self.assertTrue(any(e["nodes_processed"] == 120 and e["node_total"] == 120
+                            for e in rule_events))
+        percents = [e["percent"] for e in events]
+        self.assertEqual(percents, sorted(percents))
+        self.assertEqual(events[-1]["stage"], "save")
+        self.assertEqual(events[-1]["percent"], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
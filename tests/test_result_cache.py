@@ -0,0 +1,138 @@
+"""处理结果缓存测试"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from docx import Document
+from docx.shared import RGBColor
+from core.engine import RuleEngine
+from services.application_service import DocumentProcessingService
+from services.result_cache import ResultCache, execute_with_cache
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    """测试结果缓存"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.cache = ResultCache(str(self.temp_path / "cache"), 10 * 1024 * 1024)
+        self.engine = RuleEngine()
+        self.active_rules = [{"rule_id": "FontColorRule", "params": {"text_color": "#000000"}}]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="cache.docx", text="红色文字"):
+        """创建包含彩色文字的测试文档"""
+        doc = Document()
+        run = doc.add_paragraph().add_run(text)
+        run.font.color.rgb = RGBColor(255, 0, 0)
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def copy_document(self, source, filename):
+        """复制文档，得到内容相同的另一个文件"""
+        target = self.temp_path / filename
+        shutil.copyfile(source, target)
+        return str(target)
+
+    def test_hit_skips_engine(self):
+        """测试相同文档和配置第二次处理时直接使用缓存的输出"""
+        original = self.create_test_document()
+        first = self.copy_document(original, "first.docx")
+        second = self.copy_document(original, "second.docx")
+
+        result = execute_with_cache(self.engine, self.cache, first, self.active_rules)
+        self.assertNotIn("cached", result)
+
+        with patch.object(RuleEngine, 'execute', side_effect=AssertionError("不应执行规则")):
+            cached = execute_with_cache(self.engine, self.cache, second, self.active_rules)
+
+        self.assertTrue(cached["cached"])
+        self.assertEqual(cached["results"], result["results"])
+        self.assertEqual(cached["saved_to"], second)
+        self.assertEqual(Path(second).read_bytes(), Path(first).read_bytes())
+
+    def test_key_depends_on_content_and_config(self):
+        """测试文档内容、规则参数或规则版本变化时缓存键不同"""
+        doc_path = self.create_test_document()
+        other_path = self.create_test_document("other.docx", text="其它文字")
+        fingerprint = self.engine.config_fingerprint(self.active_rules)
+        key = ResultCache.make_key(doc_path, fingerprint)
+
+        self.assertNotEqual(key, ResultCache.make_key(other_path, fingerprint))
+        other_params = [{"rule_id": "FontColorRule", "params": {"text_color": "#FF0000"}}]
+        self.assertNotEqual(key, ResultCache.make_key(doc_path, self.engine.config_fingerprint(other_params)))
+
+        with patch.object(type(self.engine.rules["FontColorRule"]), 'version', "2"):
+            self.assertNotEqual(key, ResultCache.make_key(doc_path, self.engine.config_fingerprint(self.active_rules)))
+
+    def test_null_params_accepted(self):
+        """测试请求中 params 为 null 时与不带参数的请求使用相同的缓存键，并能正常处理"""
+        doc_path = self.create_test_document()
+        null_params = [{"rule_id": "FontColorRule", "params": None}]
+
+        self.assertEqual(self.engine.config_fingerprint(null_params),
+                         self.engine.config_fingerprint([{"rule_id": "FontColorRule"}]))
+        result = execute_with_cache(self.engine, self.cache, doc_path, null_params)
+        self.assertEqual(result["status"], "success")
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最近最少使用的条目"""
+        doc_path = self.create_test_document()
+        size = os.path.getsize(doc_path)
+        cache = ResultCache(str(self.temp_path / "small"), int(size * 2.5))
+        result = {"summary": {}, "results": []}
+
+        cache.put("a" * 64, doc_path, result)
+        cache.put("b" * 64, doc_path, result)
+        os.utime(cache._entry_dir("a" * 64), (1, 1))
+        os.utime(cache._entry_dir("b" * 64), (2, 2))
+        # 访问 a 使其成为最近使用的条目
+        self.assertIsNotNone(cache.get("a" * 64, str(self.temp_path / "out.docx")))
+        cache.put("c" * 64, doc_path, result)
+
+        keys = {item["key"] for item in cache.entries()}
+        self.assertEqual(keys, {"a" * 64, "c" * 64})
+
+    def test_info_and_purge(self):
+        """测试查看和清空缓存"""
+        execute_with_cache(self.engine, self.cache, self.create_test_document(), self.active_rules)
+
+        info = self.cache.info()
+        self.assertEqual(info["entries"], 1)
+        self.assertGreater(info["size_bytes"], 0)
+
+        purged = self.cache.purge()
+        self.assertEqual(purged["removed"], 1)
+        self.assertEqual(self.cache.info()["entries"], 0)
+
+    def test_disabled_cache(self):
+        """测试容量为 0 时不缓存"""
+        cache = ResultCache(str(self.temp_path / "disabled"), 0)
+        execute_with_cache(self.engine, cache, self.create_test_document(), self.active_rules)
+
+        self.assertEqual(cache.info()["entries"], 0)
+
+    def test_service_uses_cache(self):
+        """测试文档处理服务使用结果缓存"""
+        original = self.create_test_document()
+        service = DocumentProcessingService()
+        service.result_cache = self.cache
+
+        service.process_document(self.copy_document(original, "a.docx"), self.active_rules)
+        result = service.process_document(self.copy_document(original, "b.docx"), self.active_rules)
+
+        self.assertTrue(result["cached"])
+        self.assertEqual(service.cache_info()["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
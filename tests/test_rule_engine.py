@@ -1,6 +1,7 @@
 """测试规则引擎模块"""
 
 import unittest
+from collections.abc import MutableMapping
 import os
 from unittest.mock import MagicMock, patch
 import sys
@@ -28,7 +29,7 @@ class TestRuleEngine(unittest.TestCase):
     def test_init(self):
         """测试规则引擎初始化"""
         self.assertIsInstance(self.engine, RuleEngine)
-        self.assertIsInstance(self.engine.rules, dict)
+        self.assertIsInstance(self.engine.rules, MutableMapping)
 
     def test_load_rules(self):
         """测试规则加载"""
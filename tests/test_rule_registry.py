@@ -0,0 +1,135 @@
+"""规则清单与延迟加载测试"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from core.engine import RuleEngine
+from core.rule_registry import (MANIFEST_NAME, RuleRegistry, build_manifest, load_manifest,
+                                rules_directory)
+from rules.base_rule import BaseRule, RuleResult
+
+PYTHON_BACKEND = Path(__file__).resolve().parent.parent / "python-backend"
+
+
+class DummyRule(BaseRule):
+    """测试用规则"""
+
+    def apply(self, doc_context) -> RuleResult:
+        return RuleResult(self.rule_id, True, 0, [])
+
+
+def run_isolated(code: str) -> dict:
+    """在新的解释器中执行代码，返回其输出的 JSON"""
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys, json; sys.path.insert(0, {str(PYTHON_BACKEND)!r})\n{code}"],
+        capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class RuleManifestTestCase(unittest.TestCase):
+    """测试规则清单"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def test_manifest_is_current(self):
+        """测试提交的清单与规则源文件一致（修改规则后需运行 python -m core.rule_registry）"""
+        manifest = load_manifest()
+
+        self.assertIsNotNone(manifest, "rules/manifest.json 已过期，请重新生成")
+        self.assertEqual(manifest["rules"], build_manifest()["rules"])
+
+    def test_stale_manifest_ignored(self):
+        """测试规则源文件修改后清单失效"""
+        rules_dir = self.temp_path / "rules"
+        shutil.copytree(rules_directory(), rules_dir)
+        self.assertIsNotNone(load_manifest(str(rules_dir)))
+
+        with open(rules_dir / "font_rules" / "font_color_rule.py", "a", encoding="utf-8") as f:
+            f.write("\n# changed\n")
+
+        self.assertIsNone(load_manifest(str(rules_dir)))
+        (rules_dir / MANIFEST_NAME).unlink()
+        self.assertIsNone(load_manifest(str(rules_dir)))
+
+    def test_frozen_skips_source_digests(self):
+        """测试打包后的程序读取清单时不计算规则源文件的摘要"""
+        rules_dir = rules_directory()
+        with patch.object(sys, 'frozen', True, create=True), \
+                patch('core.rule_registry.source_digests', side_effect=AssertionError("不应计算摘要")):
+            manifest = load_manifest(rules_dir)
+
+        self.assertIsNotNone(manifest)
+
+    def test_rules_info_without_importing_rules(self):
+        """测试获取规则列表不导入规则模块和 python-docx，执行时只导入用到的规则"""
+        result = run_isolated(
+            "from core.engine import RuleEngine\n"
+            "engine = RuleEngine()\n"
+            "info = engine.get_rules_info()\n"
+            "before = sorted(m for m in sys.modules if m.startswith(('rules.', 'docx')))\n"
+            "engine.rules['FontColorRule']\n"
+            "after = sorted(m for m in sys.modules if m.startswith('rules.'))\n"
+            "print(json.dumps({'count': len(info), 'before': before, 'after': after}))")
+
+        self.assertEqual(result["count"], len(RuleEngine().rules))
+        self.assertEqual(result["before"], ["rules.base_rule"])
+        self.assertEqual(result["after"], ["rules.base_rule", "rules.font_rules",
+                                           "rules.font_rules.font_color_rule"])
+
+
+class RuleRegistryTestCase(unittest.TestCase):
+    """测试延迟创建规则实例的注册表"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.registry = RuleRegistry()
+        self.registry.add_entries(load_manifest()["rules"])
+
+    def test_instances_created_on_access(self):
+        """测试规则实例在第一次访问时创建并复用"""
+        self.assertIn("FontColorRule", self.registry)
+        self.assertFalse(self.registry.is_loaded("FontColorRule"))
+
+        rule = self.registry["FontColorRule"]
+
+        self.assertTrue(self.registry.is_loaded("FontColorRule"))
+        self.assertIs(self.registry.get("FontColorRule"), rule)
+        self.assertIsNone(self.registry.get("MissingRule"))
+
+    def test_metadata_follows_instance_config(self):
+        """测试实例创建前返回清单中的元数据，修改配置后返回当前元数据"""
+        cached = self.registry.metadata("FontColorRule")
+        self.assertFalse(self.registry.is_loaded("FontColorRule"))
+
+        self.registry["FontColorRule"].config["text_color"] = "#123456"
+
+        self.assertNotEqual(cached["params"].get("text_color"), "#123456")
+        self.assertEqual(self.registry.metadata("FontColorRule")["params"]["text_color"], "#123456")
+
+    def test_registered_rule_overrides_manifest(self):
+        """测试直接登记的规则实例优先，并保持登记顺序"""
+        rule = DummyRule()
+        count = len(self.registry)
+
+        self.registry[rule.rule_id] = rule
+        self.registry["FontColorRule"] = DummyRule()
+
+        self.assertEqual(len(self.registry), count + 1)
+        self.assertEqual(list(self.registry)[-1], rule.rule_id)
+        self.assertIsInstance(self.registry["FontColorRule"], DummyRule)
+
+
+if __name__ == '__main__':
+    unittest.main()
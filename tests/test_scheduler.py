@@ -0,0 +1,157 @@
+"""规则调度器测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from docx import Document
+from core.engine import RuleEngine
+from core.scheduler import Resource, RuleScheduler
+from rules.base_rule import BaseRule, RuleResult
+
+
+def make_rule(name, reads=(), writes=()):
+    """创建声明了读写资源的测试规则"""
+
+    def apply(self, doc_context):
+        return RuleResult(self.rule_id, True, 0, [])
+
+    return type(name, (BaseRule,), {'reads': reads, 'writes': writes, 'apply': apply})()
+
+
+class RuleSchedulerTestCase(unittest.TestCase):
+    """测试RuleScheduler的排序"""
+
+    def names(self, rules):
+        return [rules[i].rule_id for i in RuleScheduler.order(rules)]
+
+    def test_producer_before_consumer(self):
+        """测试写入资源的规则排在读取它的规则之前"""
+        rules = [
+            make_rule("Width", reads=(Resource.PAGE_GEOMETRY,), writes=(Resource.TABLE_GRID,)),
+            make_rule("Layout", writes=(Resource.PAGE_GEOMETRY,)),
+        ]
+
+        self.assertEqual(self.names(rules), ["Layout", "Width"])
+
+    def test_writers_keep_request_order(self):
+        """测试写入同一资源的规则保持请求顺序"""
+        rules = [
+            make_rule("Body", writes=(Resource.RUN_FONT,)),
+            make_rule("Title", reads=(Resource.PARAGRAPH_STYLE,), writes=(Resource.RUN_FONT,)),
+        ]
+
+        self.assertEqual(self.names(rules), ["Body", "Title"])
+        self.assertEqual(self.names(rules[::-1]), ["Title", "Body"])
+
+    def test_structure_changes_run_first(self):
+        """测试改变文档结构的规则先于其它规则执行"""
+        rules = [
+            make_rule("Font", writes=(Resource.RUN_FONT,)),
+            make_rule("Remove", writes=(Resource.DOCUMENT_STRUCTURE,)),
+        ]
+
+        self.assertEqual(self.names(rules), ["Remove", "Font"])
+
+    def test_shared_writes_keep_request_order(self):
+        """测试写入同一资源的规则不因一方还改变文档结构而重排"""
+        rules = [
+            make_rule("Font", writes=(Resource.RUN_FONT,)),
+            make_rule("List", reads=(Resource.PARAGRAPH_STYLE,),
+                      writes=(Resource.DOCUMENT_STRUCTURE, Resource.RUN_FONT)),
+            make_rule("Layout", writes=(Resource.PAGE_GEOMETRY,)),
+        ]
+
+        self.assertEqual(self.names(rules), ["Font", "List", "Layout"])
+        self.assertEqual(self.names(rules[::-1]), ["List", "Layout", "Font"])
+
+    def test_undeclared_rule_is_barrier(self):
+        """测试未声明读写的规则与其它规则保持请求顺序"""
+        class LegacyRule(BaseRule):
+            def apply(self, doc_context):
+                return RuleResult(self.rule_id, True, 0, [])
+
+        rules = [
+            make_rule("Width", reads=(Resource.PAGE_GEOMETRY,), writes=(Resource.TABLE_GRID,)),
+            LegacyRule(),
+            make_rule("Layout", writes=(Resource.PAGE_GEOMETRY,)),
+        ]
+
+        self.assertEqual(self.names(rules), ["Width", "LegacyRule", "Layout"])
+
+    def test_conflicts(self):
+        """测试读写冲突判断"""
+        font = make_rule("Font", writes=(Resource.RUN_FONT,))
+        cell = make_rule("Cell", writes=(Resource.TABLE_CELL,))
+        title = make_rule("Title", reads=(Resource.PARAGRAPH_STYLE,), writes=(Resource.RUN_FONT,))
+
+        self.assertFalse(RuleScheduler.conflicts(font, cell))
+        self.assertTrue(RuleScheduler.conflicts(font, title))
+
+
+class ScheduledExecutionTestCase(unittest.TestCase):
+    """测试引擎按依赖顺序执行规则"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="schedule.docx"):
+        """创建包含表格的测试文档"""
+        doc = Document()
+        doc.add_paragraph("正文")
+        table = doc.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "A"
+        table.cell(0, 1).text = "B"
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_table_width_uses_published_layout(self):
+        """测试表格宽度在页面布局之后计算，结果按请求顺序返回"""
+        doc_path = self.create_test_document()
+        active_rules = [
+            {"rule_id": "TableWidthRule",
+             "params": {"table_width_percent": 100, "auto_adjust_columns": False}},
+            {"rule_id": "NotARule", "params": {}},
+            {"rule_id": "PageLayoutRule",
+             "params": {"page_size": "a4", "page_margin_left_cm": 3.0,
+                        "page_margin_right_cm": 3.0}},
+        ]
+
+        result = RuleEngine().execute(doc_path, active_rules)
+
+        self.assertEqual([r["rule_id"] for r in result["results"]],
+                         ["TableWidthRule", "NotARule", "PageLayoutRule"])
+        column = Document(doc_path).tables[0].columns[0]
+        self.assertAlmostEqual(column.width.cm, (21.0 - 6.0) / 2, places=2)
+
+    def test_list_fonts_follow_request_order(self):
+        """测试字体规则在编号列表之前请求时，列表项保留编号列表规则设置的字体"""
+        doc_path = self.create_test_document()
+        doc = Document(doc_path)
+        doc.add_paragraph("1. 列表项")
+        doc.save(doc_path)
+
+        RuleEngine().execute(doc_path, [{"rule_id": "FontNameRule", "params": {"western_font": "Times New Roman"}},
+                                        {"rule_id": "ListNumberingRule", "params": {"western_font": "Arial"}}])
+
+        run = Document(doc_path).paragraphs[-1].runs[0]
+        self.assertEqual(run.text, "列表项")
+        self.assertEqual(run.font.name, "Arial")
+
+    def test_ordering_can_be_disabled(self):
+        """测试关闭依赖排序后按请求顺序执行"""
+        engine = RuleEngine(dependency_ordering=False)
+        plan = [(rule_id, engine.rules[rule_id]) for rule_id in ["TableWidthRule", "PageLayoutRule"]]
+
+        self.assertEqual(engine.schedule(plan), [0, 1])
+        self.assertEqual(RuleEngine().schedule(plan), [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@ import unittest
 import tempfile
 from pathlib import Path
 from docx import Document
+from docx.shared import RGBColor
+from services.result_cache import ResultCache
 from services.application_service import (
     DocumentProcessingService,
     ConfigManagementService,
@@ -77,6 +79,152 @@ class DocumentProcessingServiceTestCase(unittest.TestCase):
         with self.assertRaises(Exception):
             self.service.process_document(str(nonexistent_path))
 
+    def test_process_with_diff(self):
+        """测试处理并对比：结果与分别调用 prepare_diff、process_document、generate_diff 相同"""
+        from services.diff_service import DiffService
+
+        self.service.result_cache = ResultCache(str(self.temp_path / "cache"), 10 * 1024 * 1024)
+        diff_service = DiffService()
+        active_rules = [{"rule_id": "FontColorRule", "params": {}}]
+        doc = Document()
+        doc.add_paragraph().add_run("红色文字").font.color.rgb = RGBColor(255, 0, 0)
+        combined_path, separate_path = str(self.temp_path / "a.docx"), str(self.temp_path / "b.docx")
+        doc.save(combined_path)
+        doc.save(separate_path)
+
+        result = self.service.process_with_diff(combined_path, diff_service, active_rules)
+        session = diff_service.prepare_diff(separate_path)["session"]
+        self.service.result_cache = None
+        self.service.process_document(separate_path, active_rules)
+        expected = diff_service.generate_diff(separate_path, session=session)
+
+        self.assertTrue(result["save_success"])
+        diff = result["diff"]
+        self.assertEqual(diff["status"], "success")
+        self.assertEqual(diff["stats"]["format_changes"], 1)
+        self.assertEqual((diff["stats"], diff["hunks"]), (expected["stats"], expected["hunks"]))
+        # 会话保存了原始文档，可以继续分页读取和加载分栏视图
+        self.assertEqual(diff_service.get_diff_page(diff["session"])["hunks"], diff["hunks"])
+        split = diff_service.generate_diff(combined_path, session=diff["session"], include_html=True)
+        self.assertIn("红色文字", split["original_html"])
+
+    def test_process_with_diff_cached(self):
+        """测试命中结果缓存时同样返回对比结果"""
+        from services.diff_service import DiffService
+
+        self.service.result_cache = ResultCache(str(self.temp_path / "cache"), 10 * 1024 * 1024)
+        active_rules = [{"rule_id": "FontColorRule", "params": {}}]
+        doc = Document()
+        doc.add_paragraph().add_run("红色文字").font.color.rgb = RGBColor(255, 0, 0)
+        first_path, second_path = str(self.temp_path / "a.docx"), str(self.temp_path / "b.docx")
+        doc.save(first_path)
+        doc.save(second_path)
+        first = self.service.process_with_diff(first_path, DiffService(), active_rules)
+
+        second = self.service.process_with_diff(second_path, DiffService(), active_rules)
+
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["diff"]["hunks"], first["diff"]["hunks"])
+
+
+class BatchProcessingTestCase(unittest.TestCase):
+    """测试批量处理文档"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.service = DocumentProcessingService()
+        self.active_rules = [{"rule_id": "FontColorRule", "params": {}}]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="test.docx", folder="input"):
+        """创建包含红色文本的测试文档"""
+        doc = Document()
+        run = doc.add_paragraph().add_run("红色文本")
+        run.font.color.rgb = RGBColor(255, 0, 0)
+
+        doc_dir = self.temp_path / folder
+        doc_dir.mkdir(parents=True, exist_ok=True)
+        doc_path = doc_dir / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_process_batch_serial(self):
+        """测试单进程批量处理：输出到指定目录，原文件不变"""
+        first = self.create_test_document("a.docx")
+        second = self.create_test_document("b.docx")
+        output_dir = self.temp_path / "output"
+        finished = []
+
+        result = self.service.process_batch([str(self.temp_path / "input")], str(output_dir),
+                                            self.active_rules, workers=1, on_result=finished.append)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["summary"]["succeeded"], 2)
+        self.assertEqual([item["file_path"] for item in result["results"]], [first, second])
+        self.assertEqual(len(finished), 2)
+        fixed = Document(str(output_dir / "a.docx")).paragraphs[0].runs[0]
+        self.assertEqual(fixed.font.color.rgb, RGBColor(0, 0, 0))
+        original = Document(first).paragraphs[0].runs[0]
+        self.assertEqual(original.font.color.rgb, RGBColor(255, 0, 0))
+
+    def test_process_batch_parallel(self):
+        """测试多进程批量处理，失败的文件不影响其它文件"""
+        files = [self.create_test_document(f"doc{i}.docx") for i in range(3)]
+        files.append(str(self.temp_path / "missing.docx"))
+        output_dir = self.temp_path / "output"
+
+        result = self.service.process_batch(files, str(output_dir), self.active_rules, workers=2)
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["summary"]["succeeded"], 3)
+        self.assertEqual(result["summary"]["workers"], 2)
+        self.assertFalse(result["results"][3]["success"])
+        for i in range(3):
+            fixed = Document(str(output_dir / f"doc{i}.docx")).paragraphs[0].runs[0]
+            self.assertEqual(fixed.font.color.rgb, RGBColor(0, 0, 0))
+
+    def test_parallel_uses_configured_rules(self):
+        """测试通过 configure-rules 修改的配置在多进程批量处理时同样生效"""
+        rule = self.service.engine.get_rule_by_id("FontColorRule")
+        original_config = dict(rule.config)
+        self.addCleanup(setattr, rule, "config", original_config)
+        RuleManagementService().update_rule_config("FontColorRule", {"text_color": "#0000FF"})
+
+        colors = {}
+        for workers in (1, 2):
+            files = [self.create_test_document(f"doc{i}.docx", f"input{workers}") for i in range(2)]
+            output_dir = self.temp_path / f"output{workers}"
+            result = self.service.process_batch(files, str(output_dir), self.active_rules, workers=workers)
+            self.assertEqual(result["summary"]["succeeded"], 2)
+            colors[workers] = [Document(str(output_dir / f"doc{i}.docx")).paragraphs[0].runs[0].font.color.rgb
+                               for i in range(2)]
+
+        self.assertEqual(colors[1], [RGBColor(0, 0, 255)] * 2)
+        self.assertEqual(colors[2], colors[1])
+
+    def test_resolve_batch_inputs(self):
+        """测试通配符展开、去重和同名文件的输出路径"""
+        first = self.create_test_document("same.docx", "one")
+        second = self.create_test_document("same.docx", "two")
+        (self.temp_path / "one" / "~$same.docx").write_bytes(b"")
+
+        files = DocumentProcessingService.resolve_batch_inputs(
+            [str(self.temp_path / "*" / "*.docx"), first])
+
+        self.assertEqual(files, [first, second])
+        outputs = DocumentProcessingService._batch_output_paths(files, "out")
+        self.assertEqual([Path(p).name for p in outputs], ["same.docx", "same_1.docx"])
+
+    def test_process_batch_without_documents(self):
+        """测试没有匹配的文档"""
+        with self.assertRaises(ValueError):
+            self.service.process_batch([str(self.temp_path / "*.docx")])
+
 
 class ConfigManagementServiceTestCase(unittest.TestCase):
     """测试配置管理服务"""
@@ -0,0 +1,138 @@
+"""流式引擎测试"""
+
+import io
+import shutil
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from docx import Document
+from docx.shared import Cm, RGBColor
+from core.cancellation import CancellationToken, ExecutionCancelled
+from core.engine import RuleEngine
+from rules.base_rule import BaseRule, RuleResult
+import test_package_writer
+from test_package_writer import make_png
+
+STREAMABLE_RULES = [
+    "FontColorRule", "FontNameRule", "FontSizeRule", "TitleBoldRule",
+    "TitleAlignmentRule", "ParagraphSpacingRule", "HorizontalRuleRemovalRule",
+]
+
+
+class SiblingCountRule(BaseRule):
+    """记录处理段落时正文中仍保留的顶层元素数"""
+
+    streamable = True
+    traverse_tables = False
+
+    def __init__(self):
+        super().__init__()
+        self.sibling_counts = []
+
+    def apply(self, doc_context) -> RuleResult:
+        return self.apply_by_traversal(doc_context)
+
+    def on_paragraph(self, paragraph, doc_context, in_table=False) -> int:
+        self.sibling_counts.append(len(paragraph._p.getparent()))
+        return 0
+
+
+class StreamingEngineTestCase(unittest.TestCase):
+    """测试流式引擎与常规引擎的结果一致且逐个释放元素"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.active_rules = [{"rule_id": rule_id} for rule_id in STREAMABLE_RULES]
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="stream.docx", paragraphs=3):
+        """创建包含标题、彩色文字、横线、表格和图片的测试文档"""
+        doc = Document()
+        doc.add_heading("第一章", level=1)
+        for i in range(paragraphs):
+            run = doc.add_paragraph().add_run(f"红色文字{i}")
+            run.font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_paragraph("---")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "单元格"
+        table.cell(0, 0).paragraphs[0].runs[0].font.color.rgb = RGBColor(0, 255, 0)
+        doc.add_picture(io.BytesIO(make_png()), width=Cm(3))
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    @staticmethod
+    def document_xml(path):
+        with zipfile.ZipFile(path) as zf:
+            return zf.read('word/document.xml')
+
+    def test_matches_regular_engine(self):
+        """测试流式执行的结果和输出与常规引擎相同"""
+        streamed = self.create_test_document()
+        regular = str(self.temp_path / "regular.docx")
+        shutil.copy(streamed, regular)
+        with zipfile.ZipFile(streamed) as zf:
+            media = next(name for name in zf.namelist() if name.startswith('word/media/'))
+        original_media = test_package_writer.PackageWriterTestCase.raw_member(streamed, media)
+
+        streamed_result = RuleEngine(streaming_threshold=1).execute(streamed, self.active_rules)
+        regular_result = RuleEngine(streaming_threshold=0).execute(regular, self.active_rules)
+
+        self.assertTrue(streamed_result["streaming"])
+        self.assertNotIn("streaming", regular_result)
+        self.assertEqual(streamed_result["results"], regular_result["results"])
+        self.assertEqual(self.document_xml(streamed), self.document_xml(regular))
+        self.assertEqual(test_package_writer.PackageWriterTestCase.raw_member(streamed, media), original_media)
+        with zipfile.ZipFile(streamed) as zf:
+            self.assertIsNone(zf.testzip())
+        self.assertNotIn("---", [p.text for p in Document(streamed).paragraphs])
+
+    def test_processed_elements_released(self):
+        """测试处理过的顶层元素立即从树中释放，树的大小与文档长度无关"""
+        engine = RuleEngine(streaming_threshold=1)
+        rule = SiblingCountRule()
+        engine.register_rule(rule)
+
+        result = engine.execute(self.create_test_document(paragraphs=2000), [{"rule_id": rule.rule_id}])
+
+        self.assertTrue(result["streaming"])
+        self.assertEqual(len(rule.sibling_counts), 2003)
+        # iterparse 按块读取，树中只保留当前块内尚未处理的元素
+        self.assertLess(max(rule.sibling_counts), len(rule.sibling_counts) // 4)
+
+    def test_threshold_and_rules_select_engine(self):
+        """测试低于阈值或包含不可流式执行的规则时使用常规引擎"""
+        doc_path = self.create_test_document()
+
+        below = RuleEngine(streaming_threshold=1024 * 1024).execute(doc_path, self.active_rules)
+        mixed = RuleEngine(streaming_threshold=1).execute(
+            doc_path, self.active_rules + [{"rule_id": "TableBordersRule"}])
+
+        self.assertNotIn("streaming", below)
+        self.assertNotIn("streaming", mixed)
+
+    def test_cancel_leaves_source_unchanged(self):
+        """测试流式执行中途取消时源文件不变且不留下临时文件"""
+        doc_path = self.create_test_document(paragraphs=200)
+        original = Path(doc_path).read_bytes()
+        token = CancellationToken()
+
+        def progress(info):
+            if info.get("nodes_processed"):
+                token.cancel()
+
+        with self.assertRaises(ExecutionCancelled):
+            RuleEngine(streaming_threshold=1).execute(doc_path, self.active_rules, progress, token)
+
+        self.assertEqual(Path(doc_path).read_bytes(), original)
+        self.assertEqual([p.name for p in self.temp_path.iterdir() if p.name.endswith('.tmp')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
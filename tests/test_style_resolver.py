@@ -0,0 +1,110 @@
+"""样式解析器测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from core.context import RuleContext
+from core.style_resolver import StyleResolver
+
+
+class StyleResolverTestCase(unittest.TestCase):
+    """测试StyleResolver"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="styles.docx"):
+        """创建包含本地化标题、继承样式和大纲级别样式的文档"""
+        doc = Document()
+        styles = doc.styles
+
+        localized = styles.add_style("标题 2", WD_STYLE_TYPE.PARAGRAPH)
+        localized.base_style = styles["Normal"]
+
+        derived = styles.add_style("章节标题", WD_STYLE_TYPE.PARAGRAPH)
+        derived.base_style = styles["Heading 1"]
+
+        outlined = styles.add_style("大纲三级", WD_STYLE_TYPE.PARAGRAPH)
+        outlined.element.get_or_add_pPr().append(
+            parse_xml('<w:outlineLvl %s w:val="2"/>' % nsdecls('w'))
+        )
+
+        doc.add_heading("文档标题", 0)
+        doc.add_heading("一级标题", 1)
+        doc.add_paragraph("本地化标题", style="标题 2")
+        doc.add_paragraph("继承标题", style="章节标题")
+        doc.add_paragraph("大纲标题", style="大纲三级")
+        doc.add_paragraph("正文")
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_heading_levels(self):
+        """测试内置、本地化、继承和大纲级别标题的识别"""
+        context = RuleContext(self.create_test_document())
+        levels = {p.text: context.styles.heading_level(p) for p in context.get_paragraphs()}
+
+        self.assertEqual(levels, {
+            "文档标题": None,
+            "一级标题": 1,
+            "本地化标题": 2,
+            "继承标题": 1,
+            "大纲标题": 3,
+            "正文": None,
+        })
+
+    def test_matches_python_docx_style_names(self):
+        """测试解析出的样式名称与 python-docx 一致"""
+        context = RuleContext(self.create_test_document())
+
+        for paragraph in context.get_paragraphs():
+            self.assertEqual(context.styles.paragraph_style(paragraph).name,
+                             paragraph.style.name)
+
+    def test_resolution_is_cached(self):
+        """测试样式记录只解析一次"""
+        context = RuleContext(self.create_test_document())
+        resolver = context.styles
+
+        self.assertIs(context.styles, resolver)
+        self.assertIs(resolver.resolve("Heading1"), resolver.resolve("Heading1"))
+        self.assertEqual(resolver.resolve("不存在的样式").name, "Normal")
+
+    def test_based_on_cycle(self):
+        """测试 basedOn 循环不会导致无限递归"""
+        styles = parse_xml(
+            '<w:styles %s>'
+            '<w:style w:type="paragraph" w:styleId="A"><w:name w:val="A"/><w:basedOn w:val="B"/></w:style>'
+            '<w:style w:type="paragraph" w:styleId="B"><w:name w:val="B"/><w:basedOn w:val="A"/></w:style>'
+            '</w:styles>' % nsdecls('w')
+        )
+        resolver = StyleResolver(styles)
+
+        self.assertIsNone(resolver.resolve("A").heading_level)
+        self.assertIsNone(resolver.resolve("B").heading_level)
+
+    def test_set_paragraph_style(self):
+        """测试按名称设置段落样式"""
+        doc = Document()
+        paragraph = doc.add_paragraph("列表项")
+        resolver = StyleResolver.from_document(doc)
+
+        self.assertTrue(resolver.set_paragraph_style(paragraph, "List Paragraph"))
+        self.assertEqual(paragraph.style.name, "List Paragraph")
+        self.assertTrue(resolver.set_paragraph_style(paragraph, "Normal"))
+        self.assertIsNone(paragraph._p.pPr.pStyle)
+        self.assertFalse(resolver.set_paragraph_style(paragraph, "不存在的样式"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -166,6 +166,21 @@ class TableBorderRuleTestCase(unittest.TestCase):
 
         self.assertTrue(result.success)
 
+    def test_repeated_apply_replaces_borders(self):
+        """测试重复执行覆盖已有边框和底纹，不重复追加"""
+        doc_path = self.create_document_with_tables()
+
+        for _ in range(2):
+            context = RuleContext(doc_path)
+            TableBorderRule().apply(context)
+            context.save_document()
+
+        tcPr = Document(doc_path).tables[0].cell(0, 0)._tc.tcPr
+        self.assertEqual(len(tcPr.xpath('./w:tcBorders')), 1)
+        self.assertEqual(len(tcPr.xpath('./w:tcBorders/w:top')), 1)
+        self.assertEqual(len(tcPr.xpath('./w:top | ./w:left | ./w:bottom | ./w:right')), 0)
+        self.assertEqual(len(tcPr.xpath('./w:shd')), 1)
+
 
 class TableBordersRuleTestCase(unittest.TestCase):
     """测试表格边框规则（复数形式）"""
@@ -0,0 +1,207 @@
+"""融合遍历测试"""
+
+import unittest
+import tempfile
+from pathlib import Path
+from docx import Document
+from docx.oxml.ns import qn
+from docx.shared import RGBColor
+from core.context import RuleContext
+from core.engine import RuleEngine
+from core.traversal import DocumentTraversal
+from rules.base_rule import BaseRule, RuleResult
+
+
+class CountingRule(BaseRule):
+    """记录收到的节点的测试规则"""
+
+    display_name = "计数规则"
+    category = "测试"
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.paragraphs = []
+        self.runs = 0
+
+    def apply(self, doc_context):
+        return self.apply_by_traversal(doc_context)
+
+    def on_paragraph(self, paragraph, doc_context, in_table=False):
+        self.paragraphs.append((paragraph.text, in_table))
+        return 1
+
+    def on_run(self, run, doc_context, paragraph=None, in_table=False):
+        self.runs += 1
+        return 0
+
+
+class FailingRule(BaseRule):
+    """遍历中抛出异常的测试规则"""
+
+    display_name = "失败规则"
+    category = "测试"
+
+    def apply(self, doc_context):
+        return self.apply_by_traversal(doc_context)
+
+    def on_paragraph(self, paragraph, doc_context, in_table=False):
+        raise ValueError("测试错误")
+
+
+class DocumentTraversalTestCase(unittest.TestCase):
+    """测试DocumentTraversal"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename="traversal.docx"):
+        """创建包含标题、正文和表格的测试文档"""
+        doc = Document()
+        doc.add_heading("测试文档", 1)
+        para = doc.add_paragraph()
+        para.add_run("红色")
+        para.runs[0].font.color.rgb = RGBColor(255, 0, 0)
+        para.add_run("文本")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "表头"
+        table.cell(1, 1).text = "数据"
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_hooks_detected(self):
+        """测试只有覆盖了钩子的规则参与遍历"""
+        self.assertEqual(CountingRule.traversal_hooks(), ['on_paragraph', 'on_run'])
+        self.assertTrue(CountingRule().supports_traversal())
+
+        class ApplyOnlyRule(BaseRule):
+            def apply(self, doc_context):
+                return RuleResult(self.rule_id, True, 0, [])
+
+        self.assertFalse(ApplyOnlyRule().supports_traversal())
+
+    def test_rules_share_single_walk(self):
+        """测试同一次遍历把每个节点分发给所有规则"""
+        context = RuleContext(self.create_test_document())
+        first, second = CountingRule(), CountingRule()
+
+        outcomes = DocumentTraversal(context, [first, second]).run()
+
+        self.assertEqual(first.paragraphs, second.paragraphs)
+        self.assertEqual(first.runs, second.runs)
+        self.assertIn(("表头", True), first.paragraphs)
+        self.assertEqual([result.fixed_count for _, result, _ in outcomes],
+                         [len(first.paragraphs)] * 2)
+
+    def test_traverse_tables_false_skips_table_nodes(self):
+        """测试 traverse_tables=False 的规则不接收表格节点"""
+        context = RuleContext(self.create_test_document())
+        rule = CountingRule()
+        rule.traverse_tables = False
+
+        DocumentTraversal(context, [rule]).run()
+
+        self.assertTrue(rule.paragraphs)
+        self.assertFalse(any(in_table for _, in_table in rule.paragraphs))
+
+    def test_failing_rule_is_isolated(self):
+        """测试一个规则失败不影响同组其它规则"""
+        context = RuleContext(self.create_test_document())
+        counting = CountingRule()
+
+        outcomes = DocumentTraversal(context, [FailingRule(), counting]).run()
+
+        (_, failed_result, error), (_, result, _) = outcomes
+        self.assertIsNone(failed_result)
+        self.assertIsInstance(error, ValueError)
+        self.assertGreater(result.fixed_count, 0)
+
+    def test_apply_by_traversal_raises_rule_error(self):
+        """测试单规则遍历把异常交给调用方"""
+        context = RuleContext(self.create_test_document())
+
+        with self.assertRaises(ValueError):
+            FailingRule().apply(context)
+
+
+class FusedExecutionTestCase(unittest.TestCase):
+    """测试引擎的融合执行模式"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.temp_dir.cleanup()
+
+    def create_test_document(self, filename):
+        doc = Document()
+        doc.add_heading("一级标题", 1)
+        doc.add_heading("二级标题", 2)
+        para = doc.add_paragraph()
+        run = para.add_run("红色文本")
+        run.font.color.rgb = RGBColor(255, 0, 0)
+        doc.add_paragraph("1. 列表项")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "表头"
+        table.cell(1, 0).text = "数据"
+        doc_path = self.temp_path / filename
+        doc.save(str(doc_path))
+        return str(doc_path)
+
+    def test_fused_matches_sequential(self):
+        """测试融合遍历与逐条执行产生相同的文档和结果"""
+        active_rules = [
+            {"rule_id": rule_id, "params": {}}
+            for rule_id in [
+                "PageLayoutRule", "FontColorRule", "FontNameRule", "FontSizeRule",
+                "ListNumberingRule", "TitleBoldRule", "TitleAlignmentRule",
+                "ParagraphSpacingRule", "TableBordersRule",
+            ]
+        ]
+        fused_path = self.create_test_document("fused.docx")
+        sequential_path = self.create_test_document("sequential.docx")
+
+        fused = RuleEngine(fused_traversal=True).execute(fused_path, active_rules)
+        sequential = RuleEngine(fused_traversal=False).execute(sequential_path, active_rules)
+
+        self.assertEqual(
+            [(r["rule_id"], r["fixed_count"]) for r in fused["results"]],
+            [(r["rule_id"], r["fixed_count"]) for r in sequential["results"]],
+        )
+        self.assertEqual(
+            Document(fused_path).element.xml,
+            Document(sequential_path).element.xml,
+        )
+
+    def test_later_rule_overrides_on_same_paragraph(self):
+        """测试融合遍历中标题字体规则的 on_paragraph 写入不被正文字体规则的 on_run 覆盖"""
+        active_rules = [
+            {"rule_id": "FontNameRule", "params": {"chinese_font": "宋体", "western_font": "Times New Roman"}},
+            {"rule_id": "TitleFontRule", "params": {"title_font": "黑体"}},
+        ]
+        fused_path = self.create_test_document("fused.docx")
+        sequential_path = self.create_test_document("sequential.docx")
+
+        RuleEngine(fused_traversal=True).execute(fused_path, active_rules)
+        RuleEngine(fused_traversal=False).execute(sequential_path, active_rules)
+
+        fused = Document(fused_path)
+        for heading in fused.paragraphs[:2]:
+            run = heading.runs[0]
+            self.assertEqual(run.font.name, "Arial")
+            self.assertEqual(run._r.rPr.rFonts.get(qn('w:eastAsia')), "黑体")
+        self.assertEqual(fused.paragraphs[2].runs[0].font.name, "Times New Roman")
+        self.assertEqual(fused.element.xml, Document(sequential_path).element.xml)
+
+
+if __name__ == '__main__':
+    unittest.main()